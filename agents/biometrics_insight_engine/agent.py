@@ -25,6 +25,7 @@ from infrastructure.adapters.state_manager_adapter import state_manager_adapter
 from core.logging_config import get_logger
 from services.program_classification_service import ProgramClassificationService
 from agents.shared.program_definitions import get_program_definition
+from agents.biometrics_insight_engine.analytics import build_prompt_data
 
 # Importar Skill y Toolkit desde adk.agent
 from adk.agent import Skill
@@ -301,8 +302,8 @@ class BiometricsInsightEngine(ADKAgent):
         Eres un experto en análisis de datos biométricos. Analiza los siguientes datos y proporciona insights 
         personalizados y recomendaciones basadas en los patrones observados.
         
-        DATOS BIOMÉTRICOS:
-        {json.dumps(biometric_data, indent=2)}
+        RESUMEN DE DATOS BIOMÉTRICOS (calculado localmente):
+        {build_prompt_data(biometric_data)}
         
         PERFIL DEL USUARIO:
         {json.dumps(user_profile, indent=2)}
@@ -391,8 +392,8 @@ class BiometricsInsightEngine(ADKAgent):
             
             "{input_data.user_input}"
             
-            Datos biométricos disponibles:
-            {json.dumps(biometric_data, indent=2)}
+            Resumen de los datos biométricos disponibles (estadísticas calculadas localmente):
+            {build_prompt_data(biometric_data)}
             
             El análisis debe incluir:
             1. Patrones identificados con descripción detallada
@@ -484,8 +485,8 @@ class BiometricsInsightEngine(ADKAgent):
             
             "{input_data.user_input}"
             
-            Datos biométricos disponibles:
-            {json.dumps(biometric_data, indent=2)}
+            Resumen de los datos biométricos disponibles (estadísticas calculadas localmente):
+            {build_prompt_data(biometric_data)}
             
             El análisis debe incluir:
             1. Tendencias identificadas a lo largo del tiempo
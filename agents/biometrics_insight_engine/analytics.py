@@ -0,0 +1,429 @@
+"""
+Motor de analítica local para series temporales biométricas.
+
+Este módulo convierte los datos biométricos crudos (listas de registros
+``{"date": ..., "value": ..., "unit": ...}``) en arrays columnares de NumPy y
+calcula de forma vectorizada medias móviles, pendientes, puntos de cambio,
+z-scores de anomalías y agregados específicos de HRV y sueño.
+
+El resumen resultante es compacto y determinista, y sustituye a los datos
+crudos en los prompts del agente BiometricsInsightEngine, de modo que el
+tamaño del prompt deja de crecer con la longitud del historial del usuario.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Campos de un registro que no son métricas numéricas
+_NON_METRIC_FIELDS = {"date", "timestamp", "unit"}
+
+# Parámetros por defecto del análisis
+DEFAULT_ROLLING_WINDOW = 7
+DEFAULT_ANOMALY_THRESHOLD = 2.5
+DEFAULT_MIN_SEGMENT = 3
+DEFAULT_CHANGE_THRESHOLD = 1.0
+MAX_ANOMALIES_PER_SERIES = 3
+
+# Umbral de sueño recomendado (horas)
+SLEEP_TARGET_HOURS = 7.0
+
+
+@dataclass
+class BiometricSeries:
+    """Serie temporal columnar de una métrica biométrica."""
+
+    name: str
+    days: np.ndarray  # Días (float) desde la primera observación
+    values: np.ndarray
+    unit: Optional[str] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+    def __len__(self) -> int:
+        return int(self.values.size)
+
+
+def _parse_dates(raw_dates: List[Any]) -> Optional[np.ndarray]:
+    """
+    Convierte una lista de fechas ISO a días (float) desde la primera fecha.
+
+    Devuelve None si alguna fecha no es interpretable; en ese caso se usa
+    el índice de la observación como eje temporal.
+    """
+    try:
+        dates = np.array(raw_dates, dtype="datetime64[s]")
+    except (ValueError, TypeError):
+        return None
+    seconds = (dates - dates.min()).astype(np.float64)
+    return seconds / 86400.0
+
+
+def to_columnar(biometric_data: Dict[str, Any]) -> Dict[str, BiometricSeries]:
+    """
+    Convierte los datos biométricos anidados en series columnares.
+
+    Acepta la estructura ``{categoria: {serie: [registros]}}`` usada por el
+    agente, así como ``{categoria: [registros]}``. Los registros con varios
+    campos numéricos (p. ej. sueño diario con ``deep_sleep`` y ``rem_sleep``)
+    generan una serie por campo.
+
+    Args:
+        biometric_data: Datos biométricos crudos
+
+    Returns:
+        Dict[str, BiometricSeries]: Series indexadas por ``categoria.serie[.campo]``
+    """
+    series: Dict[str, BiometricSeries] = {}
+
+    def _collect(prefix: str, records: List[Any]) -> None:
+        records = [r for r in records if isinstance(r, dict)]
+        if not records:
+            return
+
+        fields = [
+            key for key, value in records[0].items()
+            if key not in _NON_METRIC_FIELDS and isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        if not fields:
+            return
+
+        raw_dates = [r.get("date", r.get("timestamp")) for r in records]
+        days = _parse_dates(raw_dates) if all(d is not None for d in raw_dates) else None
+        dated = days is not None
+        if not dated:
+            days = np.arange(len(records), dtype=np.float64)
+
+        # Ordenar cronológicamente una única vez para todos los campos
+        order = np.argsort(days, kind="stable")
+        days = days[order]
+        unit = records[0].get("unit")
+        start = str(raw_dates[order[0]]) if dated else None
+        end = str(raw_dates[order[-1]]) if dated else None
+
+        for field in fields:
+            values = np.array(
+                [r.get(field, np.nan) for r in records], dtype=np.float64
+            )[order]
+            mask = np.isfinite(values)
+            if not mask.any():
+                continue
+            name = prefix if field == "value" else f"{prefix}.{field}"
+            series[name] = BiometricSeries(
+                name=name,
+                days=days[mask],
+                values=values[mask],
+                unit=unit,
+                start=start,
+                end=end,
+            )
+
+    for category, content in (biometric_data or {}).items():
+        if isinstance(content, list):
+            _collect(str(category), content)
+        elif isinstance(content, dict):
+            for sub_name, records in content.items():
+                if isinstance(records, list):
+                    _collect(f"{category}.{sub_name}", records)
+
+    return series
+
+
+def rolling_mean(values: np.ndarray, window: int = DEFAULT_ROLLING_WINDOW) -> np.ndarray:
+    """
+    Calcula la media móvil con ventana fija mediante sumas acumuladas.
+
+    Returns:
+        np.ndarray: Array de longitud ``len(values) - window + 1`` (vacío si
+        no hay suficientes observaciones)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if window <= 0 or values.size < window:
+        return np.empty(0, dtype=np.float64)
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+def linear_slope(days: np.ndarray, values: np.ndarray) -> float:
+    """
+    Calcula la pendiente por mínimos cuadrados (unidades por día).
+    """
+    days = np.asarray(days, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.size < 2:
+        return 0.0
+    x = days - days.mean()
+    denominator = float(np.dot(x, x))
+    if denominator == 0.0:
+        return 0.0
+    return float(np.dot(x, values - values.mean()) / denominator)
+
+
+def anomaly_zscores(values: np.ndarray) -> np.ndarray:
+    """
+    Calcula z-scores robustos (mediana y MAD) para detectar anomalías.
+
+    Si la MAD es cero se recurre a la desviación estándar; si ambas son cero
+    todos los z-scores son cero.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.size == 0:
+        return values
+    median = np.median(values)
+    mad = np.median(np.abs(values - median)) * 1.4826
+    scale = mad if mad > 0 else values.std()
+    if scale == 0:
+        return np.zeros_like(values)
+    return (values - median) / scale
+
+
+def detect_change_point(
+    values: np.ndarray,
+    min_segment: int = DEFAULT_MIN_SEGMENT,
+    threshold: float = DEFAULT_CHANGE_THRESHOLD,
+) -> Optional[Dict[str, float]]:
+    """
+    Detecta el punto de cambio de media más significativo de la serie.
+
+    Evalúa todas las particiones posibles en una sola pasada vectorizada
+    (sumas acumuladas) y elige la que maximiza la diferencia de medias
+    ponderada. Solo se reporta si el salto supera ``threshold`` desviaciones
+    estándar de la serie.
+
+    Returns:
+        Optional[Dict[str, float]]: ``index``, ``before``, ``after`` y
+        ``magnitude`` (en desviaciones estándar), o None si no hay cambio
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.size
+    if n < 2 * min_segment:
+        return None
+    std = values.std()
+    if std == 0:
+        return None
+
+    cumsum = np.cumsum(values)
+    total = cumsum[-1]
+    splits = np.arange(min_segment, n - min_segment + 1)
+    left_mean = cumsum[splits - 1] / splits
+    right_mean = (total - cumsum[splits - 1]) / (n - splits)
+    # Estadístico tipo CUSUM: diferencia de medias ponderada por tamaño
+    score = np.abs(left_mean - right_mean) * np.sqrt(splits * (n - splits) / n)
+    best = int(np.argmax(score))
+    magnitude = abs(left_mean[best] - right_mean[best]) / std
+    if magnitude < threshold:
+        return None
+    return {
+        "index": int(splits[best]),
+        "before": float(left_mean[best]),
+        "after": float(right_mean[best]),
+        "magnitude": float(magnitude),
+    }
+
+
+def summarize_series(
+    series: BiometricSeries,
+    window: int = DEFAULT_ROLLING_WINDOW,
+    anomaly_threshold: float = DEFAULT_ANOMALY_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Genera el resumen estadístico compacto de una serie.
+    """
+    values = series.values
+    days = series.days
+    summary: Dict[str, Any] = {
+        "n": len(series),
+        "unit": series.unit,
+        "from": series.start,
+        "to": series.end,
+        "last": _round(values[-1]),
+        "mean": _round(values.mean()),
+        "std": _round(values.std()),
+        "min": _round(values.min()),
+        "max": _round(values.max()),
+        "slope_per_day": _round(linear_slope(days, values), 4),
+    }
+
+    if values.size > 1:
+        first = values[0]
+        summary["change_pct"] = _round((values[-1] - first) / abs(first) * 100) if first else None
+
+    rolling = rolling_mean(values, window)
+    if rolling.size:
+        summary[f"rolling_mean_{window}"] = _round(rolling[-1])
+        if rolling.size > window:
+            summary[f"rolling_delta_{window}"] = _round(rolling[-1] - rolling[-1 - window])
+
+    change = detect_change_point(values)
+    if change:
+        summary["change_point"] = {
+            "at": _date_at(series, change["index"]),
+            "before": _round(change["before"]),
+            "after": _round(change["after"]),
+            "magnitude_sd": _round(change["magnitude"]),
+        }
+
+    zscores = anomaly_zscores(values)
+    anomalous = np.flatnonzero(np.abs(zscores) >= anomaly_threshold)
+    if anomalous.size:
+        # Priorizar las anomalías más extremas
+        top = anomalous[np.argsort(-np.abs(zscores[anomalous]))][:MAX_ANOMALIES_PER_SERIES]
+        summary["anomalies"] = [
+            {"at": _date_at(series, int(i)), "value": _round(values[i]), "z": _round(zscores[i])}
+            for i in sorted(top)
+        ]
+
+    return summary
+
+
+def hrv_aggregates(series: Dict[str, BiometricSeries]) -> Dict[str, Any]:
+    """
+    Calcula agregados específicos de HRV.
+
+    Incluye la media de la última semana frente a la línea base previa y el
+    coeficiente de variación, indicador habitual de la capacidad de
+    recuperación.
+    """
+    hrv = _pick_series(series, "hrv", ("rmssd", "daily_average"))
+    if hrv is None:
+        return {}
+    values = hrv.values
+    recent = values[-DEFAULT_ROLLING_WINDOW:]
+    baseline = values[:-DEFAULT_ROLLING_WINDOW]
+    result: Dict[str, Any] = {
+        "metric": hrv.name,
+        "recent_mean": _round(recent.mean()),
+        "cv_pct": _round(values.std() / values.mean() * 100) if values.mean() else None,
+    }
+    if baseline.size:
+        result["baseline_mean"] = _round(baseline.mean())
+        result["recent_vs_baseline_pct"] = _round(
+            (recent.mean() - baseline.mean()) / baseline.mean() * 100
+        ) if baseline.mean() else None
+    return result
+
+
+def sleep_aggregates(series: Dict[str, BiometricSeries]) -> Dict[str, Any]:
+    """
+    Calcula agregados específicos de sueño.
+
+    Incluye duración media, porcentaje de noches por debajo del objetivo,
+    proporción de sueño profundo/REM y regularidad (desviación estándar).
+    """
+    duration = _pick_series(series, "sleep", ("daily.total_duration", "total_duration", "duration"))
+    if duration is None:
+        return {}
+    values = duration.values
+    result: Dict[str, Any] = {
+        "metric": duration.name,
+        "mean_hours": _round(values.mean()),
+        "std_hours": _round(values.std()),
+        "nights_below_target_pct": _round(np.mean(values < SLEEP_TARGET_HOURS) * 100),
+    }
+    prefix = duration.name.rsplit(".", 1)[0]
+    for stage in ("deep_sleep", "rem_sleep"):
+        stage_series = series.get(f"{prefix}.{stage}")
+        if stage_series is not None and stage_series.values.size == values.size:
+            ratio = np.divide(
+                stage_series.values, values,
+                out=np.zeros_like(values), where=values > 0,
+            )
+            result[f"{stage}_ratio"] = _round(ratio.mean(), 3)
+    return result
+
+
+def summarize_biometric_data(
+    biometric_data: Dict[str, Any],
+    window: int = DEFAULT_ROLLING_WINDOW,
+    anomaly_threshold: float = DEFAULT_ANOMALY_THRESHOLD,
+) -> Dict[str, Any]:
+    """
+    Resume los datos biométricos en un diccionario compacto y determinista.
+
+    Args:
+        biometric_data: Datos biométricos crudos
+        window: Ventana de la media móvil (observaciones)
+        anomaly_threshold: Umbral de |z| para marcar anomalías
+
+    Returns:
+        Dict[str, Any]: Resumen con ``metrics``, ``hrv``, ``sleep`` y el
+        total de observaciones procesadas
+    """
+    series = to_columnar(biometric_data)
+    summary: Dict[str, Any] = {
+        "data_points": int(sum(len(s) for s in series.values())),
+        "metrics": {
+            name: summarize_series(s, window=window, anomaly_threshold=anomaly_threshold)
+            for name, s in sorted(series.items())
+        },
+    }
+
+    hrv = hrv_aggregates(series)
+    if hrv:
+        summary["hrv"] = hrv
+    sleep = sleep_aggregates(series)
+    if sleep:
+        summary["sleep"] = sleep
+
+    return summary
+
+
+def format_summary_for_prompt(summary: Dict[str, Any]) -> str:
+    """
+    Serializa el resumen en JSON compacto para incluirlo en un prompt.
+    """
+    return json.dumps(summary, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def build_prompt_data(biometric_data: Dict[str, Any]) -> str:
+    """
+    Obtiene la representación de los datos biométricos para un prompt.
+
+    Si los datos no contienen series numéricas reconocibles se recurre a
+    serializar los datos crudos, para no perder información.
+    """
+    try:
+        summary = summarize_biometric_data(biometric_data)
+    except Exception as e:
+        logger.warning(f"No se pudo resumir los datos biométricos localmente: {e}")
+        summary = None
+
+    if not summary or not summary["metrics"]:
+        return json.dumps(biometric_data, ensure_ascii=False, separators=(",", ":"))
+    return format_summary_for_prompt(summary)
+
+
+def _pick_series(
+    series: Dict[str, BiometricSeries], category: str, candidates: tuple
+) -> Optional[BiometricSeries]:
+    """Selecciona la primera serie disponible de una categoría."""
+    for candidate in candidates:
+        found = series.get(f"{category}.{candidate}")
+        if found is not None and len(found):
+            return found
+    return None
+
+
+def _date_at(series: BiometricSeries, index: int) -> Any:
+    """Devuelve la fecha (o el día relativo) de una observación."""
+    if series.start is None:
+        return index
+    start = np.datetime64(series.start, "s")
+    offset = np.timedelta64(int(round(series.days[index] * 86400)), "s")
+    return str((start + offset).astype("datetime64[D]"))
+
+
+def _round(value: Any, digits: int = 2) -> Optional[float]:
+    """Redondea valores numéricos para un resumen estable y compacto."""
+    if value is None:
+        return None
+    value = float(value)
+    if not np.isfinite(value):
+        return None
+    return round(value, digits)
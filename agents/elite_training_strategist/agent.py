@@ -356,7 +356,7 @@ class EliteTrainingStrategist(ADKAgent):
             context["last_updated"] = datetime.now().isoformat()
             
             # Guardar el contexto en el adaptador del StateManager
-            await state_manager_adapter.save_state(context, user_id, session_id)
+            await state_manager_adapter.save_state(user_id, session_id, context)
             logger.info(f"Contexto actualizado en el adaptador del StateManager para user_id={user_id}, session_id={session_id}")
         except Exception as e:
             logger.error(f"Error al actualizar contexto: {e}", exc_info=True)
@@ -23,6 +23,8 @@ from agents.base.adk_agent import ADKAgent
 from adk.agent import Skill
 from adk.toolkit import Toolkit
 from app.schemas.a2a import A2AProcessRequest, A2AResponse, A2ATaskContext
+from core.analysis_envelope import AnalysisEnvelope
+from core.consultation_cache import consultation_cache
 from config import settings
 
 logger = get_logger(__name__)
@@ -336,18 +338,30 @@ class NGXNexusOrchestrator(ADKAgent):
             prompt: El texto del usuario a analizar.
             
         Returns:
-            Un diccionario con la intención primaria, intenciones secundarias y confianza.
+            Un diccionario con la intención primaria, intenciones secundarias, confianza
+            y entidades reconocidas.
         """
         try:
             # Utilizar el adaptador del Intent Analyzer
             intent_analysis = await intent_analyzer_adapter.analyze_intent(prompt)
             
             # Convertir el resultado al formato esperado por el orquestador
-            result = {
-                "primary_intent": intent_analysis.get("primary_intent", "general"),
-                "secondary_intents": intent_analysis.get("secondary_intents", []),
-                "confidence": intent_analysis.get("confidence", 0.5)
-            }
+            if isinstance(intent_analysis, list):
+                # El adaptador devuelve una lista de Intent ordenada por relevancia
+                primary = intent_analysis[0] if intent_analysis else None
+                result = {
+                    "primary_intent": primary.intent_type if primary else "general",
+                    "secondary_intents": [intent.intent_type for intent in intent_analysis[1:]],
+                    "confidence": primary.confidence if primary else 0.5,
+                    "entities": [entity.to_dict() for entity in primary.entities] if primary else []
+                }
+            else:
+                result = {
+                    "primary_intent": intent_analysis.get("primary_intent", "general"),
+                    "secondary_intents": intent_analysis.get("secondary_intents", []),
+                    "confidence": intent_analysis.get("confidence", 0.5),
+                    "entities": intent_analysis.get("entities", [])
+                }
             
             logger.debug(f"Análisis de intención para '{prompt[:30]}...': {result}")
             return result
@@ -410,7 +424,9 @@ class NGXNexusOrchestrator(ADKAgent):
         """
         start_time = time.time()
         try:
-            result = await self._process_request(input_text, user_id, session_id, start_time=start_time, **kwargs)
+            # Las consultas entre agentes de este turno comparten respuestas
+            async with consultation_cache.turn():
+                result = await self._process_request(input_text, user_id, session_id, start_time=start_time, **kwargs)
             if 'metadata' not in result:
                 result['metadata'] = {}
             result['metadata']['processing_time'] = result['metadata'].get('processing_time', time.time() - start_time)
@@ -427,6 +443,24 @@ class NGXNexusOrchestrator(ADKAgent):
                 "metadata": {"processing_time": time.time() - start_time}
             }
 
+    async def run_async(self, input_text: str, user_id: Optional[str] = None,
+                        session_id: Optional[str] = None, context: Optional[Dict[str, Any]] = None,
+                        **kwargs) -> Dict[str, Any]:
+        """
+        Punto de entrada usado por el router de chat.
+
+        Args:
+            input_text: El texto de entrada del usuario.
+            user_id: El ID del usuario.
+            session_id: El ID de la sesión.
+            context: Contexto adicional de la petición.
+            **kwargs: Argumentos adicionales.
+
+        Returns:
+            Un diccionario con la respuesta del orquestador.
+        """
+        return await self.run(input_text, user_id=user_id, session_id=session_id, context=context, **kwargs)
+
     async def _process_request(self, input_text: str, user_id: Optional[str] = None, 
                                session_id: Optional[str] = None, start_time: Optional[float] = None, **kwargs) -> Dict[str, Any]:
         if start_time is None:
@@ -447,6 +481,7 @@ class NGXNexusOrchestrator(ADKAgent):
             # Analizar la intención del usuario utilizando la skill de Google ADK
             intent_analysis_result = await self.adk_toolkit.execute_skill("analyze_intent", prompt=input_text)
             
+            intent_extracted = True
             try:
                 if isinstance(intent_analysis_result, str):
                     intent_data = json.loads(intent_analysis_result)
@@ -455,6 +490,7 @@ class NGXNexusOrchestrator(ADKAgent):
             except json.JSONDecodeError:
                 logger.warning(f"No se pudo decodificar JSON del análisis de intención: {intent_analysis_result}. Usando fallback.")
                 intent_data = {"primary_intent": "general", "confidence": 0.5}
+                intent_extracted = False
             
             primary_intent = intent_data.get("primary_intent", "general").lower()
             secondary_intents = [intent.lower() for intent in intent_data.get("secondary_intents", [])]
@@ -488,6 +524,21 @@ class NGXNexusOrchestrator(ADKAgent):
                     }
                 }
             
+            # Los agentes reutilizan este análisis en lugar de clasificar de nuevo el texto.
+            # Con la intención por defecto no hay análisis que compartir: cada agente
+            # clasifica la consulta por su cuenta
+            analysis = None
+            if intent_extracted:
+                analysis = AnalysisEnvelope.build(
+                    query=input_text,
+                    primary_intent=primary_intent,
+                    secondary_intents=secondary_intents,
+                    confidence=confidence,
+                    entities=intent_data.get("entities", []),
+                    target_agents=agent_ids_to_call,
+                    source=self.agent_id
+                )
+            
             logger.info(f"Intención: {primary_intent}, confianza: {confidence}, agentes: {agent_ids_to_call}")
         except Exception as e:
             logger.error(f"Error en análisis de intención: {e}", exc_info=True)
@@ -502,7 +553,8 @@ class NGXNexusOrchestrator(ADKAgent):
             }
         
         agent_responses = await self._get_agent_responses(
-            user_input=input_text, agent_ids=agent_ids_to_call, user_id=user_id, context=context, session_id=session_id
+            user_input=input_text, agent_ids=agent_ids_to_call, user_id=user_id, context=context,
+            session_id=session_id, analysis=analysis
         )
         
         # Sintetizar la respuesta utilizando la skill de Google ADK
@@ -619,13 +671,15 @@ class NGXNexusOrchestrator(ADKAgent):
         agent_ids: List[str],
         user_id: Optional[str] = None,
         context: Optional[Dict[str, Any]] = None,
-        session_id: Optional[str] = None
+        session_id: Optional[str] = None,
+        analysis: Optional[AnalysisEnvelope] = None
     ) -> Dict[str, Dict[str, Any]]:
         agent_responses_map: Dict[str, Dict[str, Any]] = {}
         
-        # Crear el contexto de la tarea
+        # Crear el contexto de la tarea con el análisis de intención del turno
         task_context_data = A2ATaskContext(
-            session_id=session_id, user_id=user_id, additional_context=context if context else {}
+            session_id=session_id, user_id=user_id, additional_context=context if context else {},
+            analysis=analysis
         )
         
         # Llamar a múltiples agentes en paralelo utilizando el adaptador de A2A
@@ -24,6 +24,7 @@ from infrastructure.adapters.state_manager_adapter import state_manager_adapter
 from infrastructure.adapters.intent_analyzer_adapter import intent_analyzer_adapter
 from infrastructure.adapters.a2a_adapter import a2a_adapter
 from core.logging_config import get_logger
+from core.state_patch import StateVersionConflict
 from services.program_classification_service import ProgramClassificationService
 from agents.shared.program_definitions import get_program_definition
 
@@ -297,8 +298,14 @@ class PrecisionNutritionArchitect(ADKAgent):
             # Actualizar la marca de tiempo
             context["last_updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
             
-            # Guardar el contexto en el adaptador del StateManager
-            await state_manager_adapter.save_state(user_id, session_id, context)
+            # Enviar solo los campos modificados desde la carga del contexto
+            try:
+                await state_manager_adapter.commit_state(user_id, session_id, context)
+            except StateVersionConflict as e:
+                # Otro turno modificó los mismos campos: se reaplica el delta sobre la
+                # versión actual y gana la última escritura solo en esos campos
+                logger.warning(f"{e}; se reaplican los cambios sobre la versión actual")
+                await state_manager_adapter.commit_state(user_id, session_id, context, force=True)
             logger.info(f"Contexto actualizado en adaptador del StateManager para user_id={user_id}, session_id={session_id}")
         except Exception as e:
             logger.error(f"Error al actualizar contexto: {e}", exc_info=True)
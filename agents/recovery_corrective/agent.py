@@ -22,11 +22,62 @@ from core.agent_card import AgentCard, Example
 from infrastructure.adapters.state_manager_adapter import state_manager_adapter
 from core.logging_config import get_logger
 from services.program_classification_service import ProgramClassificationService
-from agents.shared.program_definitions import get_program_definition
+from agents.shared.program_definitions import get_program_definition, format_program_context
+from agents.shared.fused_generation import FusedGeneration
+from core.prompt_builder import PREFIX_SEPARATOR, PromptBuilder, PromptParts
+from core.analysis_envelope import AnalysisEnvelope, extract_analysis
 
 # Configurar logger
 logger = get_logger(__name__)
 
+# Mapeo de intenciones a la skill correspondiente
+RECOVERY_SKILL_MAPPING = {
+    "injury_prevention": "injury_prevention",
+    "rehabilitation": "rehabilitation",
+    "mobility_assessment": "mobility_assessment",
+    "mobility": "mobility_assessment",
+    "sleep_optimization": "sleep_optimization",
+    "sleep": "sleep_optimization",
+    "hrv_protocols": "hrv_protocols",
+    "hrv": "hrv_protocols",
+    "chronic_pain_management": "chronic_pain_management",
+    "pain": "chronic_pain_management",
+    "general_recovery": "general_recovery"
+}
+
+
+def build_skill_prompt(prefix_key: Any, role: str, instructions: str, request: str,
+                       program_context: str = "") -> PromptParts:
+    """
+    Construye el prompt de una skill con el prefijo estable primero y el turno al final.
+
+    El rol, el contexto del programa y las instrucciones solo dependen de la skill y
+    del tipo de programa, por lo que forman un prefijo que ``PromptBuilder`` memoriza
+    por ``prefix_key`` (sin volver a unir ni a calcular el hash de su texto) y que es
+    común a todas las consultas del mismo programa; la consulta del usuario y los
+    datos del turno van en el sufijo.
+
+    Args:
+        prefix_key: Clave que identifica el rol y las instrucciones (skill y tipo de programa)
+        role: Rol del especialista
+        instructions: Instrucciones y estructura de la respuesta
+        request: Consulta del usuario y datos del turno
+        program_context: Bloque de contexto del programa (vacío si no se determinó)
+
+    Returns:
+        PromptParts: Prefijo memorizado con su hash y sufijo con el turno
+    """
+    sections = (role, program_context, instructions)
+    return (
+        PromptBuilder()
+        .static(
+            ("recovery_corrective", prefix_key, bool(program_context)),
+            lambda: PREFIX_SEPARATOR.join(section.strip() for section in sections if section.strip())
+        )
+        .dynamic(request)
+        .build()
+    )
+
 # Definir esquemas de entrada y salida para las skills
 class InjuryPreventionInput(BaseModel):
     query: str = Field(..., description="Consulta del usuario sobre prevención de lesiones")
@@ -160,21 +211,8 @@ class InjuryPreventionSkill(GoogleADKSkill):
             program_type = await self.agent.program_classification_service.classify_program_type(context)
             logger.info(f"Tipo de programa determinado para prevención de lesiones: {program_type}")
             
-            # Obtener definición del programa para personalizar las recomendaciones
-            program_def = get_program_definition(program_type)
-            
             # Preparar contexto específico del programa
-            program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
-            
-            if program_def:
-                program_context += f"- {program_def.get('description', '')}\n"
-                program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
-                
-                # Añadir protocolos de recuperación específicos del programa si están disponibles
-                if program_def.get("key_protocols") and "recovery" in program_def.get("key_protocols", {}):
-                    program_context += "- Protocolos de recuperación recomendados:\n"
-                    for protocol in program_def.get("key_protocols", {}).get("recovery", []):
-                        program_context += f"  * {protocol}\n"
+            program_context = "\n\n" + format_program_context(program_type, "recovery", "Protocolos de recuperación recomendados")
         except Exception as e:
             logger.warning(f"No se pudo determinar el tipo de programa: {e}. Usando recomendaciones generales.")
             program_type = "GENERAL"
@@ -184,18 +222,7 @@ class InjuryPreventionSkill(GoogleADKSkill):
         activity_info = f"Actividad: {activity_type}" if activity_type else "Actividad no especificada"
         history_info = f"Historial de lesiones: {', '.join(injury_history)}" if injury_history else "Sin historial de lesiones conocido"
         
-        prompt = f"""
-        Eres un especialista en prevención de lesiones y recuperación física.
-        
-        El usuario solicita información sobre prevención de lesiones:
-        "{query}"
-        
-        Información adicional:
-        - {activity_info}
-        - {history_info}
-        - Tipo de programa: {program_type}
-        {program_context}
-        
+        instructions = f"""
         Proporciona una respuesta detallada sobre cómo prevenir lesiones específicas,
         incluyendo ejercicios de calentamiento, fortalecimiento, técnica adecuada y señales de alerta.
         Adapta tus recomendaciones específicamente para el programa {program_type} del usuario.
@@ -207,13 +234,26 @@ class InjuryPreventionSkill(GoogleADKSkill):
         4. Señales de alerta
         5. Cuándo buscar ayuda profesional
         """
+        request = f"""
+        El usuario solicita información sobre prevención de lesiones:
+        "{query}"
+        
+        Información adicional:
+        - {activity_info}
+        - {history_info}
+        - Tipo de programa: {program_type}
+        """
+        prompt = build_skill_prompt(
+            (self.name, program_type),
+            "Eres un especialista en prevención de lesiones y recuperación física.",
+            instructions,
+            request,
+            program_context=program_context
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar plan de prevención estructurado
         plan_prompt = f"""
         Basándote en la consulta del usuario:
@@ -231,7 +271,31 @@ class InjuryPreventionSkill(GoogleADKSkill):
         Devuelve SOLO el JSON, sin explicaciones adicionales.
         """
         
-        plan_json = await gemini_client.generate_structured_output(plan_prompt)
+        # Generar ejercicios recomendados
+        exercises_prompt = f"""
+        Basándote en la consulta del usuario sobre prevención de lesiones:
+        "{query}"
+        
+        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
+        - name: nombre del ejercicio
+        - description: descripción breve
+        - sets: número de series
+        - reps: número de repeticiones
+        - frequency: frecuencia recomendada
+        - notes: notas adicionales (opcional)
+        
+        Devuelve SOLO el JSON array, sin explicaciones adicionales.
+        """
+        
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("prevention_plan", plan_prompt)
+        generation.array("exercises", exercises_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        plan_json = results["prevention_plan"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(plan_json, dict):
@@ -249,23 +313,7 @@ class InjuryPreventionSkill(GoogleADKSkill):
                     "warning_signs": ["Dolor persistente", "Inflamación"]
                 }
         
-        # Generar ejercicios recomendados
-        exercises_prompt = f"""
-        Basándote en la consulta del usuario sobre prevención de lesiones:
-        "{query}"
-        
-        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
-        - name: nombre del ejercicio
-        - description: descripción breve
-        - sets: número de series
-        - reps: número de repeticiones
-        - frequency: frecuencia recomendada
-        - notes: notas adicionales (opcional)
-        
-        Devuelve SOLO el JSON array, sin explicaciones adicionales.
-        """
-        
-        exercises_json = await gemini_client.generate_structured_output(exercises_prompt)
+        exercises_json = results["exercises"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(exercises_json, list):
@@ -320,17 +368,9 @@ class RehabilitationSkill(GoogleADKSkill):
             program_def = get_program_definition(program_type)
             
             # Preparar contexto específico del programa
-            program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+            program_context = "\n\n" + format_program_context(program_type, "recovery", "Protocolos de recuperación recomendados")
             
             if program_def:
-                program_context += f"- {program_def.get('description', '')}\n"
-                program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
-                
-                # Añadir protocolos de recuperación específicos del programa si están disponibles
-                if program_def.get("key_protocols") and "recovery" in program_def.get("key_protocols", {}):
-                    program_context += "- Protocolos de recuperación recomendados:\n"
-                    for protocol in program_def.get("key_protocols", {}).get("recovery", []):
-                        program_context += f"  * {protocol}\n"
                         
                 # Añadir consideraciones especiales para la rehabilitación según el programa
                 if program_type == "PRIME":
@@ -352,18 +392,7 @@ class RehabilitationSkill(GoogleADKSkill):
         injury_info = f"Tipo de lesión: {injury_type}" if injury_type else "Tipo de lesión no especificado"
         phase_info = f"Fase de la lesión: {injury_phase}" if injury_phase else "Fase de la lesión no especificada"
         
-        prompt = f"""
-        Eres un especialista en rehabilitación física y recuperación de lesiones.
-        
-        El usuario solicita información sobre rehabilitación:
-        "{query}"
-        
-        Información adicional:
-        - {injury_info}
-        - {phase_info}
-        - Tipo de programa: {program_type}
-        {program_context}
-        
+        instructions = f"""
         Proporciona una respuesta detallada sobre cómo rehabilitar esta lesión específica,
         incluyendo fases de recuperación, ejercicios recomendados, progresión y señales de alerta.
         Adapta tus recomendaciones específicamente para el programa {program_type} del usuario.
@@ -376,13 +405,26 @@ class RehabilitationSkill(GoogleADKSkill):
         5. Señales de alerta
         6. Cuándo buscar ayuda profesional
         """
+        request = f"""
+        El usuario solicita información sobre rehabilitación:
+        "{query}"
+        
+        Información adicional:
+        - {injury_info}
+        - {phase_info}
+        - Tipo de programa: {program_type}
+        """
+        prompt = build_skill_prompt(
+            (self.name, program_type),
+            "Eres un especialista en rehabilitación física y recuperación de lesiones.",
+            instructions,
+            request,
+            program_context=program_context
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar protocolo de rehabilitación estructurado
         protocol_prompt = f"""
         Basándote en la consulta del usuario:
@@ -400,7 +442,32 @@ class RehabilitationSkill(GoogleADKSkill):
         Devuelve SOLO el JSON, sin explicaciones adicionales.
         """
         
-        protocol_json = await gemini_client.generate_structured_output(protocol_prompt)
+        # Generar ejercicios recomendados
+        exercises_prompt = f"""
+        Basándote en la consulta del usuario sobre rehabilitación:
+        "{query}"
+        
+        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
+        - name: nombre del ejercicio
+        - description: descripción breve
+        - phase: fase de rehabilitación en que se recomienda
+        - sets: número de series
+        - reps: número de repeticiones
+        - frequency: frecuencia recomendada
+        - progression: cómo progresar el ejercicio
+        
+        Devuelve SOLO el JSON array, sin explicaciones adicionales.
+        """
+        
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("rehab_protocol", protocol_prompt)
+        generation.array("exercises", exercises_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        protocol_json = results["rehab_protocol"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(protocol_json, dict):
@@ -437,24 +504,7 @@ class RehabilitationSkill(GoogleADKSkill):
                     "warning_signs": ["Aumento de dolor", "Inflamación persistente", "Pérdida de función"]
                 }
         
-        # Generar ejercicios recomendados
-        exercises_prompt = f"""
-        Basándote en la consulta del usuario sobre rehabilitación:
-        "{query}"
-        
-        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
-        - name: nombre del ejercicio
-        - description: descripción breve
-        - phase: fase de rehabilitación en que se recomienda
-        - sets: número de series
-        - reps: número de repeticiones
-        - frequency: frecuencia recomendada
-        - progression: cómo progresar el ejercicio
-        
-        Devuelve SOLO el JSON array, sin explicaciones adicionales.
-        """
-        
-        exercises_json = await gemini_client.generate_structured_output(exercises_prompt)
+        exercises_json = results["exercises"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(exercises_json, list):
@@ -499,16 +549,7 @@ class MobilityAssessmentSkill(GoogleADKSkill):
         areas_info = f"Áreas objetivo: {', '.join(target_areas)}" if target_areas else "Áreas objetivo no especificadas"
         goals_info = f"Objetivos de movimiento: {', '.join(movement_goals)}" if movement_goals else "Objetivos no especificados"
         
-        prompt = f"""
-        Eres un especialista en movilidad, flexibilidad y biomecánica.
-        
-        El usuario solicita información sobre movilidad:
-        "{query}"
-        
-        Información adicional:
-        - {areas_info}
-        - {goals_info}
-        
+        instructions = """
         Proporciona una respuesta detallada sobre cómo evaluar y mejorar la movilidad en las áreas específicas,
         incluyendo evaluaciones, ejercicios, progresiones y consideraciones especiales.
         
@@ -519,13 +560,24 @@ class MobilityAssessmentSkill(GoogleADKSkill):
         4. Progresión
         5. Integración con actividades diarias/deportivas
         """
+        request = f"""
+        El usuario solicita información sobre movilidad:
+        "{query}"
+        
+        Información adicional:
+        - {areas_info}
+        - {goals_info}
+        """
+        prompt = build_skill_prompt(
+            self.name,
+            "Eres un especialista en movilidad, flexibilidad y biomecánica.",
+            instructions,
+            request
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar evaluación de movilidad estructurada
         assessment_prompt = f"""
         Basándote en la consulta del usuario:
@@ -541,7 +593,32 @@ class MobilityAssessmentSkill(GoogleADKSkill):
         Devuelve SOLO el JSON, sin explicaciones adicionales.
         """
         
-        assessment_json = await gemini_client.generate_structured_output(assessment_prompt)
+        # Generar ejercicios recomendados
+        exercises_prompt = f"""
+        Basándote en la consulta del usuario sobre movilidad:
+        "{query}"
+        
+        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
+        - name: nombre del ejercicio
+        - target_area: área objetivo
+        - description: descripción breve
+        - sets: número de series
+        - reps_duration: repeticiones o duración
+        - frequency: frecuencia recomendada
+        - progression: cómo progresar el ejercicio
+        
+        Devuelve SOLO el JSON array, sin explicaciones adicionales.
+        """
+        
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("mobility_assessment", assessment_prompt)
+        generation.array("exercises", exercises_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        assessment_json = results["mobility_assessment"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(assessment_json, dict):
@@ -569,24 +646,7 @@ class MobilityAssessmentSkill(GoogleADKSkill):
                     "progression_timeline": "4-8 semanas para mejoras significativas con práctica consistente"
                 }
         
-        # Generar ejercicios recomendados
-        exercises_prompt = f"""
-        Basándote en la consulta del usuario sobre movilidad:
-        "{query}"
-        
-        Genera una lista de 3-5 ejercicios específicos en formato JSON array, donde cada ejercicio es un objeto con:
-        - name: nombre del ejercicio
-        - target_area: área objetivo
-        - description: descripción breve
-        - sets: número de series
-        - reps_duration: repeticiones o duración
-        - frequency: frecuencia recomendada
-        - progression: cómo progresar el ejercicio
-        
-        Devuelve SOLO el JSON array, sin explicaciones adicionales.
-        """
-        
-        exercises_json = await gemini_client.generate_structured_output(exercises_prompt)
+        exercises_json = results["exercises"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(exercises_json, list):
@@ -642,17 +702,9 @@ class SleepOptimizationSkill(GoogleADKSkill):
             program_def = get_program_definition(program_type)
             
             # Preparar contexto específico del programa
-            program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+            program_context = "\n\n" + format_program_context(program_type, "sleep", "Protocolos de sueño recomendados")
             
             if program_def:
-                program_context += f"- {program_def.get('description', '')}\n"
-                program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
-                
-                # Añadir protocolos de sueño específicos del programa si están disponibles
-                if program_def.get("key_protocols") and "sleep" in program_def.get("key_protocols", {}):
-                    program_context += "- Protocolos de sueño recomendados:\n"
-                    for protocol in program_def.get("key_protocols", {}).get("sleep", []):
-                        program_context += f"  * {protocol}\n"
                         
                 # Añadir consideraciones especiales para la optimización del sueño según el programa
                 if program_type == "PRIME":
@@ -674,18 +726,7 @@ class SleepOptimizationSkill(GoogleADKSkill):
         issues_info = f"Problemas de sueño: {', '.join(sleep_issues)}" if sleep_issues else "Problemas de sueño no especificados"
         data_info = "Datos de sueño disponibles" if sleep_data else "Sin datos de sueño específicos"
         
-        prompt = f"""
-        Eres un especialista en optimización del sueño y recuperación.
-        
-        El usuario solicita información sobre optimización del sueño:
-        "{query}"
-        
-        Información adicional:
-        - {issues_info}
-        - {data_info}
-        - Tipo de programa: {program_type}
-        {program_context}
-        
+        instructions = f"""
         Proporciona una respuesta detallada sobre cómo mejorar la calidad y cantidad del sueño,
         incluyendo estrategias de higiene del sueño, rutinas, entorno óptimo y consideraciones especiales.
         Adapta tus recomendaciones específicamente para el programa {program_type} del usuario.
@@ -698,13 +739,26 @@ class SleepOptimizationSkill(GoogleADKSkill):
         5. Suplementos y ayudas naturales específicas para el programa (si aplica)
         6. Cuándo buscar ayuda profesional
         """
+        request = f"""
+        El usuario solicita información sobre optimización del sueño:
+        "{query}"
+        
+        Información adicional:
+        - {issues_info}
+        - {data_info}
+        - Tipo de programa: {program_type}
+        """
+        prompt = build_skill_prompt(
+            (self.name, program_type),
+            "Eres un especialista en optimización del sueño y recuperación.",
+            instructions,
+            request,
+            program_context=program_context
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar plan de optimización del sueño estructurado
         plan_prompt = f"""
         Basándote en la consulta del usuario:
@@ -722,7 +776,26 @@ class SleepOptimizationSkill(GoogleADKSkill):
         Devuelve SOLO el JSON, sin explicaciones adicionales.
         """
         
-        plan_json = await gemini_client.generate_structured_output(plan_prompt)
+        # Generar recomendaciones específicas
+        recommendations_prompt = f"""
+        Basándote en la consulta del usuario sobre optimización del sueño:
+        "{query}"
+        
+        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
+        Cada recomendación debe ser concreta, práctica y fácil de implementar.
+        
+        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
+        """
+        
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("sleep_plan", plan_prompt)
+        generation.array("recommendations", recommendations_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        plan_json = results["sleep_plan"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(plan_json, dict):
@@ -765,18 +838,7 @@ class SleepOptimizationSkill(GoogleADKSkill):
                     ]
                 }
         
-        # Generar recomendaciones específicas
-        recommendations_prompt = f"""
-        Basándote en la consulta del usuario sobre optimización del sueño:
-        "{query}"
-        
-        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
-        Cada recomendación debe ser concreta, práctica y fácil de implementar.
-        
-        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
-        """
-        
-        recommendations_json = await gemini_client.generate_structured_output(recommendations_prompt)
+        recommendations_json = results["recommendations"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(recommendations_json, list):
@@ -828,17 +890,9 @@ class HRVProtocolSkill(GoogleADKSkill):
             program_def = get_program_definition(program_type)
             
             # Preparar contexto específico del programa
-            program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+            program_context = "\n\n" + format_program_context(program_type, "recovery", "Protocolos de recuperación recomendados")
             
             if program_def:
-                program_context += f"- {program_def.get('description', '')}\n"
-                program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
-                
-                # Añadir protocolos de recuperación específicos del programa si están disponibles
-                if program_def.get("key_protocols") and "recovery" in program_def.get("key_protocols", {}):
-                    program_context += "- Protocolos de recuperación recomendados:\n"
-                    for protocol in program_def.get("key_protocols", {}).get("recovery", []):
-                        program_context += f"  * {protocol}\n"
                         
                 # Añadir consideraciones especiales para HRV según el programa
                 if program_type == "PRIME":
@@ -860,18 +914,7 @@ class HRVProtocolSkill(GoogleADKSkill):
         data_info = "Datos de HRV disponibles" if hrv_data else "Sin datos de HRV específicos"
         context_info = "Contexto de entrenamiento disponible" if training_context else "Sin contexto de entrenamiento específico"
         
-        prompt = f"""
-        Eres un especialista en variabilidad de la frecuencia cardíaca (HRV) y su aplicación para optimizar entrenamiento y recuperación.
-        
-        El usuario solicita información sobre HRV:
-        "{query}"
-        
-        Información adicional:
-        - {data_info}
-        - {context_info}
-        - Tipo de programa: {program_type}
-        {program_context}
-        
+        instructions = f"""
         Proporciona una respuesta detallada sobre cómo interpretar y utilizar los datos de HRV,
         incluyendo su significado, aplicaciones prácticas, estrategias de implementación y consideraciones especiales.
         Adapta tus recomendaciones específicamente para el programa {program_type} del usuario.
@@ -884,13 +927,26 @@ class HRVProtocolSkill(GoogleADKSkill):
         5. Factores que afectan el HRV relevantes para el programa
         6. Seguimiento y ajustes para optimizar resultados dentro del programa
         """
+        request = f"""
+        El usuario solicita información sobre HRV:
+        "{query}"
+        
+        Información adicional:
+        - {data_info}
+        - {context_info}
+        - Tipo de programa: {program_type}
+        """
+        prompt = build_skill_prompt(
+            (self.name, program_type),
+            "Eres un especialista en variabilidad de la frecuencia cardíaca (HRV) y su aplicación para optimizar entrenamiento y recuperación.",
+            instructions,
+            request,
+            program_context=program_context
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar protocolo HRV estructurado
         protocol_prompt = f"""
         Basándote en la consulta del usuario:
@@ -908,7 +964,26 @@ class HRVProtocolSkill(GoogleADKSkill):
         Devuelve SOLO el JSON, sin explicaciones adicionales.
         """
         
-        protocol_json = await gemini_client.generate_structured_output(protocol_prompt)
+        # Generar recomendaciones específicas
+        recommendations_prompt = f"""
+        Basándote en la consulta del usuario sobre HRV:
+        "{query}"
+        
+        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
+        Cada recomendación debe ser concreta, práctica y fácil de implementar.
+        
+        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
+        """
+        
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("hrv_protocol", protocol_prompt)
+        generation.array("recommendations", recommendations_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        protocol_json = results["hrv_protocol"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(protocol_json, dict):
@@ -951,18 +1026,7 @@ class HRVProtocolSkill(GoogleADKSkill):
                     }
                 }
         
-        # Generar recomendaciones específicas
-        recommendations_prompt = f"""
-        Basándote en la consulta del usuario sobre HRV:
-        "{query}"
-        
-        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
-        Cada recomendación debe ser concreta, práctica y fácil de implementar.
-        
-        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
-        """
-        
-        recommendations_json = await gemini_client.generate_structured_output(recommendations_prompt)
+        recommendations_json = results["recommendations"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(recommendations_json, list):
@@ -1015,17 +1079,9 @@ class ChronicPainSkill(GoogleADKSkill):
             program_def = get_program_definition(program_type)
             
             # Preparar contexto específico del programa
-            program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+            program_context = "\n\n" + format_program_context(program_type, "pain_management", "Protocolos de manejo del dolor recomendados")
             
             if program_def:
-                program_context += f"- {program_def.get('description', '')}\n"
-                program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
-                
-                # Añadir protocolos de manejo del dolor específicos del programa si están disponibles
-                if program_def.get("key_protocols") and "pain_management" in program_def.get("key_protocols", {}):
-                    program_context += "- Protocolos de manejo del dolor recomendados:\n"
-                    for protocol in program_def.get("key_protocols", {}).get("pain_management", []):
-                        program_context += f"  * {protocol}\n"
                         
                 # Añadir consideraciones especiales para el manejo del dolor según el programa
                 if program_type == "PRIME":
@@ -1049,19 +1105,7 @@ class ChronicPainSkill(GoogleADKSkill):
         intensity_info = f"Intensidad del dolor: {pain_intensity}/10" if pain_intensity else "Intensidad del dolor no especificada"
         duration_info = f"Duración del dolor: {pain_duration}" if pain_duration else "Duración del dolor no especificada"
         
-        prompt = f"""
-        Eres un especialista en manejo del dolor y rehabilitación.
-        
-        El usuario solicita información sobre manejo del dolor:
-        "{query}"
-        
-        Información adicional:
-        - {location_info}
-        - {intensity_info}
-        - {duration_info}
-        - Tipo de programa: {program_type}
-        {program_context}
-        
+        instructions = f"""
         Proporciona una respuesta detallada sobre cómo manejar este dolor específico,
         incluyendo estrategias no farmacológicas, ejercicios, modificaciones de actividad y consideraciones especiales.
         Adapta tus recomendaciones específicamente para el programa {program_type} del usuario.
@@ -1075,13 +1119,27 @@ class ChronicPainSkill(GoogleADKSkill):
         
         IMPORTANTE: Aclara que tus recomendaciones no reemplazan la atención médica profesional.
         """
+        request = f"""
+        El usuario solicita información sobre manejo del dolor:
+        "{query}"
+        
+        Información adicional:
+        - {location_info}
+        - {intensity_info}
+        - {duration_info}
+        - Tipo de programa: {program_type}
+        """
+        prompt = build_skill_prompt(
+            (self.name, program_type),
+            "Eres un especialista en manejo del dolor y rehabilitación.",
+            instructions,
+            request,
+            program_context=program_context
+        )
         
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar evaluación del dolor estructurada
         assessment_prompt = f"""
         Basándote en la consulta del usuario:
@@ -1097,10 +1155,46 @@ class ChronicPainSkill(GoogleADKSkill):
         - possible_causes: posibles causas (aclarar que es educativo, no diagnóstico)
         - red_flags: señales de alerta que requieren atención médica
         
-        Devuelve SOLO el JSON, sin explicaciones adicionales.
+        Devuelve SOLO el JSON, sin explicaciones adicionales.
+        """
+        
+        # Generar plan de manejo del dolor estructurado
+        plan_prompt = f"""
+        Basándote en la consulta del usuario sobre dolor:
+        "{query}"
+        
+        Genera un plan de manejo del dolor estructurado en formato JSON con los siguientes campos:
+        - non_pharmacological: estrategias no farmacológicas
+        - movement_strategies: estrategias de movimiento
+        - lifestyle_modifications: modificaciones de estilo de vida
+        - self_management: técnicas de autogestión
+        - pacing_strategies: estrategias de dosificación de actividad
+        - progression: progresión recomendada
+        
+        Devuelve SOLO el JSON, sin explicaciones adicionales.
+        """
+        
+        # Generar recomendaciones específicas
+        recommendations_prompt = f"""
+        Basándote en la consulta del usuario sobre dolor:
+        "{query}"
+        
+        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
+        Cada recomendación debe ser concreta, práctica y fácil de implementar.
+        
+        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
         """
         
-        assessment_json = await gemini_client.generate_structured_output(assessment_prompt)
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("pain_assessment", assessment_prompt)
+        generation.object("management_plan", plan_prompt)
+        generation.array("recommendations", recommendations_prompt)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        assessment_json = results["pain_assessment"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(assessment_json, dict):
@@ -1124,23 +1218,7 @@ class ChronicPainSkill(GoogleADKSkill):
                     ]
                 }
         
-        # Generar plan de manejo del dolor estructurado
-        plan_prompt = f"""
-        Basándote en la consulta del usuario sobre dolor:
-        "{query}"
-        
-        Genera un plan de manejo del dolor estructurado en formato JSON con los siguientes campos:
-        - non_pharmacological: estrategias no farmacológicas
-        - movement_strategies: estrategias de movimiento
-        - lifestyle_modifications: modificaciones de estilo de vida
-        - self_management: técnicas de autogestión
-        - pacing_strategies: estrategias de dosificación de actividad
-        - progression: progresión recomendada
-        
-        Devuelve SOLO el JSON, sin explicaciones adicionales.
-        """
-        
-        management_json = await gemini_client.generate_structured_output(plan_prompt)
+        management_json = results["management_plan"]
         
         # Si la respuesta no es un diccionario, intentar convertirla
         if not isinstance(management_json, dict):
@@ -1177,18 +1255,7 @@ class ChronicPainSkill(GoogleADKSkill):
                     "progression": "Incremento gradual de actividad basado en tiempo, no en dolor"
                 }
         
-        # Generar recomendaciones específicas
-        recommendations_prompt = f"""
-        Basándote en la consulta del usuario sobre dolor:
-        "{query}"
-        
-        Genera una lista de 5-7 recomendaciones específicas y accionables en formato JSON array.
-        Cada recomendación debe ser concreta, práctica y fácil de implementar.
-        
-        Devuelve SOLO el JSON array de strings, sin explicaciones adicionales.
-        """
-        
-        recommendations_json = await gemini_client.generate_structured_output(recommendations_prompt)
+        recommendations_json = results["recommendations"]
         
         # Si la respuesta no es una lista, intentar convertirla
         if not isinstance(recommendations_json, list):
@@ -1246,9 +1313,6 @@ class GeneralRecoverySkill(GoogleADKSkill):
         # Obtener cliente Gemini del agente
         gemini_client = self.agent.gemini_client
         
-        # Generar respuesta utilizando Gemini
-        response_text = await gemini_client.generate_response(prompt, temperature=0.4)
-        
         # Generar protocolo de recuperación estructurado si es aplicable
         protocol_prompt = f"""
         Basándote en la consulta del usuario:
@@ -1267,7 +1331,14 @@ class GeneralRecoverySkill(GoogleADKSkill):
         Devuelve SOLO el JSON o null, sin explicaciones adicionales.
         """
         
-        protocol_json = await gemini_client.generate_structured_output(protocol_prompt)
+        # Generar la respuesta y los resultados estructurados en una sola llamada
+        generation = FusedGeneration(gemini_client, temperature=0.4)
+        generation.text("response", prompt)
+        generation.object("recovery_protocol", protocol_prompt, nullable=True)
+        results = await generation.run()
+        response_text = results["response"]
+        
+        protocol_json = results["recovery_protocol"]
         
         # Si la respuesta no es un diccionario ni None, intentar convertirla
         if protocol_json is not None and not isinstance(protocol_json, dict):
@@ -1317,11 +1388,9 @@ class PostureAnalysisSkill(GoogleADKSkill):
                 program_def = get_program_definition(program_type)
                 
                 # Preparar contexto específico del programa
-                program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+                program_context = "\n\n" + format_program_context(program_type)
                 
                 if program_def:
-                    program_context += f"- {program_def.get('description', '')}\n"
-                    program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
                     
                     # Añadir consideraciones especiales para el análisis de postura según el programa
                     if program_type == "PRIME":
@@ -1341,22 +1410,8 @@ class PostureAnalysisSkill(GoogleADKSkill):
             
             # Utilizar las capacidades de visión del agente
             with self.agent.tracer.start_as_current_span("posture_analysis"):
-                # Analizar la imagen utilizando el procesador de visión
-                vision_analysis = await self.agent.vision_processor.analyze_image(image_data)
-                
                 # Extraer análisis de postura usando el modelo multimodal
-                prompt = f"""
-                Eres un experto en análisis postural y biomecánica. Analiza esta imagen
-                de un usuario con programa tipo {program_type} y proporciona un análisis detallado
-                de su postura.
-                
-                Tipo de análisis: {analysis_type}
-                
-                Enfócate específicamente en las siguientes áreas:
-                {', '.join(focus_areas)}
-                
-                {program_context}
-                
+                instructions = f"""
                 Proporciona:
                 1. Un resumen general de la postura observada
                 2. Análisis detallado de alineación
@@ -1366,10 +1421,25 @@ class PostureAnalysisSkill(GoogleADKSkill):
                 
                 Sé objetivo, detallado y proporciona feedback constructivo basado en lo que observas.
                 """
+                request = f"""
+                Tipo de análisis: {analysis_type}
+                
+                Enfócate específicamente en las siguientes áreas:
+                {', '.join(focus_areas)}
+                """
+                prompt = build_skill_prompt(
+                    (self.name, program_type),
+                    f"Eres un experto en análisis postural y biomecánica. Analiza esta imagen "
+                    f"de un usuario con programa tipo {program_type} y proporciona un análisis detallado "
+                    f"de su postura.",
+                    instructions,
+                    request,
+                    program_context=program_context
+                )
                 
                 multimodal_result = await self.agent.multimodal_adapter.analyze_image(
                     image_data=image_data,
-                    analysis_prompt=prompt,
+                    analysis_prompt=prompt.text,
                     temperature=0.2,
                     max_output_tokens=1024
                 )
@@ -1392,7 +1462,59 @@ class PostureAnalysisSkill(GoogleADKSkill):
                 Devuelve la información en formato JSON estructurado.
                 """
                 
-                assessment_response = await self.agent.gemini_client.generate_structured_output(assessment_prompt)
+                # Extraer desequilibrios posturales
+                imbalances_prompt = f"""
+                Basándote en el siguiente análisis postural, extrae los desequilibrios posturales
+                en formato JSON array, donde cada elemento es un objeto con:
+                1. area: área afectada
+                2. description: descripción del desequilibrio
+                3. severity: severidad (leve, moderada, significativa)
+                4. implications: implicaciones para el movimiento y la función
+                
+                Análisis:
+                {multimodal_result.get("text", "")}
+                
+                Devuelve la información en formato JSON estructurado.
+                """
+                
+                # Extraer recomendaciones
+                recommendations_prompt = f"""
+                Basándote en el siguiente análisis postural, genera 3-5 recomendaciones específicas
+                para mejorar la postura. Considera el contexto del programa {program_type}.
+                
+                Análisis:
+                {multimodal_result.get("text", "")}
+                
+                Devuelve las recomendaciones como una lista de strings.
+                """
+                
+                # Generar ejercicios correctivos
+                exercises_prompt = f"""
+                Basándote en el siguiente análisis postural, genera 3-5 ejercicios correctivos
+                en formato JSON array, donde cada ejercicio es un objeto con:
+                - name: nombre del ejercicio
+                - target_area: área objetivo
+                - description: descripción breve
+                - sets: número de series
+                - reps: número de repeticiones
+                - frequency: frecuencia recomendada
+                - notes: notas adicionales (opcional)
+                
+                Análisis:
+                {multimodal_result.get("text", "")}
+                
+                Devuelve SOLO el JSON array, sin explicaciones adicionales.
+                """
+                
+                # Generar todos los resultados estructurados en una sola llamada
+                generation = FusedGeneration(self.agent.gemini_client)
+                generation.object("posture_assessment", assessment_prompt)
+                generation.array("imbalances", imbalances_prompt)
+                generation.array("recommendations", recommendations_prompt)
+                generation.array("corrective_exercises", exercises_prompt)
+                results = await generation.run()
+                
+                assessment_response = results["posture_assessment"]
                 
                 # Procesar evaluación postural
                 if not isinstance(assessment_response, dict):
@@ -1409,22 +1531,7 @@ class PostureAnalysisSkill(GoogleADKSkill):
                             "overall_assessment": "No se pudo determinar con precisión"
                         }
                 
-                # Extraer desequilibrios posturales
-                imbalances_prompt = f"""
-                Basándote en el siguiente análisis postural, extrae los desequilibrios posturales
-                en formato JSON array, donde cada elemento es un objeto con:
-                1. area: área afectada
-                2. description: descripción del desequilibrio
-                3. severity: severidad (leve, moderada, significativa)
-                4. implications: implicaciones para el movimiento y la función
-                
-                Análisis:
-                {multimodal_result.get("text", "")}
-                
-                Devuelve la información en formato JSON estructurado.
-                """
-                
-                imbalances_response = await self.agent.gemini_client.generate_structured_output(imbalances_prompt)
+                imbalances_response = results["imbalances"]
                 
                 # Procesar desequilibrios posturales
                 if not isinstance(imbalances_response, list):
@@ -1446,18 +1553,7 @@ class PostureAnalysisSkill(GoogleADKSkill):
                         }
                     ]
                 
-                # Extraer recomendaciones
-                recommendations_prompt = f"""
-                Basándote en el siguiente análisis postural, genera 3-5 recomendaciones específicas
-                para mejorar la postura. Considera el contexto del programa {program_type}.
-                
-                Análisis:
-                {multimodal_result.get("text", "")}
-                
-                Devuelve las recomendaciones como una lista de strings.
-                """
-                
-                recommendations_response = await self.agent.gemini_client.generate_structured_output(recommendations_prompt)
+                recommendations_response = results["recommendations"]
                 
                 # Procesar recomendaciones
                 if not isinstance(recommendations_response, list):
@@ -1477,25 +1573,7 @@ class PostureAnalysisSkill(GoogleADKSkill):
                         "Considerar una evaluación postural profesional para recomendaciones más específicas"
                     ]
                 
-                # Generar ejercicios correctivos
-                exercises_prompt = f"""
-                Basándote en el siguiente análisis postural, genera 3-5 ejercicios correctivos
-                en formato JSON array, donde cada ejercicio es un objeto con:
-                - name: nombre del ejercicio
-                - target_area: área objetivo
-                - description: descripción breve
-                - sets: número de series
-                - reps: número de repeticiones
-                - frequency: frecuencia recomendada
-                - notes: notas adicionales (opcional)
-                
-                Análisis:
-                {multimodal_result.get("text", "")}
-                
-                Devuelve SOLO el JSON array, sin explicaciones adicionales.
-                """
-                
-                exercises_response = await self.agent.gemini_client.generate_structured_output(exercises_prompt)
+                exercises_response = results["corrective_exercises"]
                 
                 # Procesar ejercicios correctivos
                 if not isinstance(exercises_response, list):
@@ -1688,11 +1766,9 @@ class MovementAnalysisSkill(GoogleADKSkill):
                 program_def = get_program_definition(program_type)
                 
                 # Preparar contexto específico del programa
-                program_context = f"\n\nCONTEXTO DEL PROGRAMA {program_type}:\n"
+                program_context = "\n\n" + format_program_context(program_type)
                 
                 if program_def:
-                    program_context += f"- {program_def.get('description', '')}\n"
-                    program_context += f"- Objetivo: {program_def.get('objective', '')}\n"
                     
                     # Añadir consideraciones especiales para el análisis de movimiento según el programa
                     if program_type == "PRIME":
@@ -1728,16 +1804,8 @@ class MovementAnalysisSkill(GoogleADKSkill):
                 # Analizar el primer frame/imagen como ejemplo
                 # En una implementación completa, se analizarían todos los frames clave
                 sample_image = frames[0]
-                vision_analysis = await self.agent.vision_processor.analyze_image(sample_image)
-                
                 # Extraer análisis de movimiento usando el modelo multimodal
-                prompt = f"""
-                Eres un experto en biomecánica y análisis de movimiento. Analiza esta imagen/video
-                de un usuario con programa tipo {program_type} realizando un {movement_type} y proporciona
-                un análisis detallado de su técnica y patrón de movimiento.
-                
-                {program_context}
-                
+                instructions = f"""
                 Proporciona:
                 1. Un resumen general del patrón de movimiento observado
                 2. Análisis detallado de la técnica en cada fase del movimiento
@@ -1747,10 +1815,22 @@ class MovementAnalysisSkill(GoogleADKSkill):
                 
                 Sé objetivo, detallado y proporciona feedback constructivo basado en lo que observas.
                 """
+                request = f"""
+                Movimiento analizado: {movement_type}
+                """
+                prompt = build_skill_prompt(
+                    (self.name, program_type),
+                    f"Eres un experto en biomecánica y análisis de movimiento. Analiza esta imagen/video "
+                    f"de un usuario con programa tipo {program_type} y proporciona un análisis detallado "
+                    f"de su técnica y patrón de movimiento.",
+                    instructions,
+                    request,
+                    program_context=program_context
+                )
                 
                 multimodal_result = await self.agent.multimodal_adapter.analyze_image(
                     image_data=sample_image,
-                    analysis_prompt=prompt,
+                    analysis_prompt=prompt.text,
                     temperature=0.2,
                     max_output_tokens=1024
                 )
@@ -1772,22 +1852,6 @@ class MovementAnalysisSkill(GoogleADKSkill):
                 Devuelve la información en formato JSON estructurado.
                 """
                 
-                assessment_response = await self.agent.gemini_client.generate_structured_output(assessment_prompt)
-                
-                # Procesar evaluación del movimiento
-                if not isinstance(assessment_response, dict):
-                    try:
-                        assessment_response = json.loads(assessment_response)
-                    except:
-                        assessment_response = {
-                            "movement_phases": {"preparación": "No determinado", "ejecución": "No determinado", "finalización": "No determinado"},
-                            "joint_positions": "No determinado",
-                            "weight_distribution": "No determinado",
-                            "movement_efficiency": "No determinado",
-                            "stability_control": "No determinado",
-                            "overall_technique": "No se pudo determinar con precisión"
-                        }
-                
                 # Extraer problemas técnicos
                 issues_prompt = f"""
                 Basándote en el siguiente análisis de movimiento para un {movement_type}, extrae los problemas técnicos
@@ -1803,7 +1867,60 @@ class MovementAnalysisSkill(GoogleADKSkill):
                 Devuelve la información en formato JSON estructurado.
                 """
                 
-                issues_response = await self.agent.gemini_client.generate_structured_output(issues_prompt)
+                # Extraer recomendaciones
+                recommendations_prompt = f"""
+                Basándote en el siguiente análisis de movimiento para un {movement_type}, genera 3-5 recomendaciones específicas
+                para mejorar la técnica. Considera el contexto del programa {program_type}.
+                
+                Análisis:
+                {multimodal_result.get("text", "")}
+                
+                Devuelve las recomendaciones como una lista de strings.
+                """
+                
+                # Generar ejercicios correctivos
+                exercises_prompt = f"""
+                Basándote en el siguiente análisis de movimiento para un {movement_type}, genera 3-5 ejercicios correctivos
+                en formato JSON array, donde cada ejercicio es un objeto con:
+                - name: nombre del ejercicio
+                - target_issue: problema que aborda
+                - description: descripción breve
+                - sets: número de series
+                - reps: número de repeticiones
+                - frequency: frecuencia recomendada
+                - notes: notas adicionales (opcional)
+                
+                Análisis:
+                {multimodal_result.get("text", "")}
+                
+                Devuelve SOLO el JSON array, sin explicaciones adicionales.
+                """
+                
+                # Generar todos los resultados estructurados en una sola llamada
+                generation = FusedGeneration(self.agent.gemini_client)
+                generation.object("movement_assessment", assessment_prompt)
+                generation.array("technique_issues", issues_prompt)
+                generation.array("recommendations", recommendations_prompt)
+                generation.array("corrective_exercises", exercises_prompt)
+                results = await generation.run()
+                
+                assessment_response = results["movement_assessment"]
+                
+                # Procesar evaluación del movimiento
+                if not isinstance(assessment_response, dict):
+                    try:
+                        assessment_response = json.loads(assessment_response)
+                    except:
+                        assessment_response = {
+                            "movement_phases": {"preparación": "No determinado", "ejecución": "No determinado", "finalización": "No determinado"},
+                            "joint_positions": "No determinado",
+                            "weight_distribution": "No determinado",
+                            "movement_efficiency": "No determinado",
+                            "stability_control": "No determinado",
+                            "overall_technique": "No se pudo determinar con precisión"
+                        }
+                
+                issues_response = results["technique_issues"]
                 
                 # Procesar problemas técnicos
                 if not isinstance(issues_response, list):
@@ -1825,18 +1942,7 @@ class MovementAnalysisSkill(GoogleADKSkill):
                         }
                     ]
                 
-                # Extraer recomendaciones
-                recommendations_prompt = f"""
-                Basándote en el siguiente análisis de movimiento para un {movement_type}, genera 3-5 recomendaciones específicas
-                para mejorar la técnica. Considera el contexto del programa {program_type}.
-                
-                Análisis:
-                {multimodal_result.get("text", "")}
-                
-                Devuelve las recomendaciones como una lista de strings.
-                """
-                
-                recommendations_response = await self.agent.gemini_client.generate_structured_output(recommendations_prompt)
+                recommendations_response = results["recommendations"]
                 
                 # Procesar recomendaciones
                 if not isinstance(recommendations_response, list):
@@ -1856,25 +1962,7 @@ class MovementAnalysisSkill(GoogleADKSkill):
                         "Considerar una evaluación técnica con un profesional para recomendaciones más específicas"
                     ]
                 
-                # Generar ejercicios correctivos
-                exercises_prompt = f"""
-                Basándote en el siguiente análisis de movimiento para un {movement_type}, genera 3-5 ejercicios correctivos
-                en formato JSON array, donde cada ejercicio es un objeto con:
-                - name: nombre del ejercicio
-                - target_issue: problema que aborda
-                - description: descripción breve
-                - sets: número de series
-                - reps: número de repeticiones
-                - frequency: frecuencia recomendada
-                - notes: notas adicionales (opcional)
-                
-                Análisis:
-                {multimodal_result.get("text", "")}
-                
-                Devuelve SOLO el JSON array, sin explicaciones adicionales.
-                """
-                
-                exercises_response = await self.agent.gemini_client.generate_structured_output(exercises_prompt)
+                exercises_response = results["corrective_exercises"]
                 
                 # Procesar ejercicios correctivos
                 if not isinstance(exercises_response, list):
@@ -2162,6 +2250,112 @@ class RecoveryCorrective(ADKAgent):
         
         logger.info(f"Agente RecoveryCorrective inicializado con ID: {agent_id}")
     
+    async def _analyze_message(self, message: str) -> Dict[str, Any]:
+        """
+        Clasifica la intención y extrae los datos de todas las skills en una sola llamada.
+        
+        Args:
+            message: Mensaje del usuario
+            
+        Returns:
+            Dict[str, Any]: Campos reconocidos (``intent``, ``activity_type``, ``injury``,
+            ``target_areas``, ``sleep_issues``, ``pain``). Los campos ausentes o con un
+            tipo inesperado se omiten para que se extraigan con su prompt específico.
+        """
+        analysis_prompt = f"""
+        Analiza el siguiente mensaje del usuario:
+        "{message}"
+        
+        Devuelve SOLO un objeto JSON con los siguientes campos:
+        - intent: categoría más relevante, una de: injury_prevention, rehabilitation,
+          mobility_assessment, sleep_optimization, hrv_protocols, chronic_pain_management,
+          general_recovery
+        - activity_type: tipo de actividad física mencionada, o null si no se menciona
+        - injury: objeto con injury_type (tipo de lesión) e injury_phase (aguda, subaguda,
+          crónica), cada uno null si no se menciona
+        - target_areas: array con las áreas objetivo para mejorar movilidad (vacío si no hay)
+        - sleep_issues: array con los problemas de sueño mencionados (vacío si no hay)
+        - pain: objeto con location, intensity (1-10) y duration del dolor, cada uno null si no se menciona
+        """
+        
+        try:
+            raw = await self.gemini_client.generate_structured_output(analysis_prompt)
+            if isinstance(raw, str):
+                raw = json.loads(raw)
+        except Exception as e:
+            logger.warning(f"No se pudo analizar el mensaje en una sola llamada: {e}")
+            return {}
+        
+        if not isinstance(raw, dict):
+            return {}
+        
+        expected_types = {
+            "intent": str,
+            "activity_type": (str, type(None)),
+            "injury": dict,
+            "target_areas": list,
+            "sleep_issues": list,
+            "pain": dict,
+        }
+        return {
+            key: raw[key]
+            for key, expected in expected_types.items()
+            if key in raw and isinstance(raw[key], expected)
+        }
+    
+    @staticmethod
+    def _analysis_from_envelope(envelope: AnalysisEnvelope) -> Dict[str, Any]:
+        """
+        Convierte el sobre de análisis del orquestador a los campos de ``_analyze_message``.
+        
+        Args:
+            envelope: Sobre de análisis recibido con el mensaje
+            
+        Returns:
+            Dict[str, Any]: Intención y solo los campos cuyas entidades incluye el sobre
+            (los demás se extraen con su prompt específico), o un diccionario vacío si
+            ninguna intención del sobre es una categoría de este agente
+        """
+        intent = next((candidate for candidate in envelope.intents if candidate in RECOVERY_SKILL_MAPPING), None)
+        if not intent:
+            return {}
+        
+        entities = envelope.entities
+        
+        def first(*names: str) -> Any:
+            for name in names:
+                value = entities.get(name)
+                if value not in (None, "", []):
+                    return value[0] if isinstance(value, list) else value
+            return None
+        
+        def as_list(*names: str) -> Optional[List[Any]]:
+            for name in names:
+                value = entities.get(name)
+                if value not in (None, "", []):
+                    return value if isinstance(value, list) else [value]
+            return None
+        
+        def group(**fields: Any) -> Optional[Dict[str, Any]]:
+            # Solo si el sobre trae alguno de los datos del grupo
+            return fields if any(value is not None for value in fields.values()) else None
+        
+        fields = {
+            "activity_type": first("activity_type", "activity", "exercise"),
+            "injury": group(
+                injury_type=first("injury_type", "injury"),
+                injury_phase=first("injury_phase")
+            ),
+            "target_areas": as_list("target_areas", "target_area", "body_part"),
+            "sleep_issues": as_list("sleep_issues", "sleep_issue"),
+            "pain": group(
+                location=first("pain_location", "body_part"),
+                intensity=first("pain_intensity"),
+                duration=first("pain_duration")
+            )
+        }
+        return {"intent": intent, **{key: value for key, value in fields.items() if value is not None}}
+    
     async def process_message(self, message: str, session_id: str = None, **kwargs) -> str:
         """
         Procesa un mensaje del usuario y genera una respuesta utilizando las skills apropiadas.
@@ -2169,7 +2363,8 @@ class RecoveryCorrective(ADKAgent):
         Args:
             message: Mensaje del usuario
             session_id: ID de la sesión de chat
-            **kwargs: Argumentos adicionales
+            **kwargs: Argumentos adicionales (``analysis`` o ``context`` con el sobre
+                de análisis del orquestador)
             
         Returns:
             Respuesta generada para el usuario
@@ -2194,27 +2389,24 @@ class RecoveryCorrective(ADKAgent):
         Devuelve SOLO el nombre de la categoría más relevante, sin explicaciones adicionales.
         """
         
-        # Determinar la intención utilizando el cliente Gemini
-        intent = await self.gemini_client.generate_response(intent_prompt, temperature=0.1)
+        # Reutilizar el análisis del orquestador si viaja con el mensaje; si no, determinar
+        # la intención y extraer los datos de la skill en una sola llamada y, si el análisis
+        # conjunto falla, usar los prompts específicos
+        envelope = kwargs.get("analysis")
+        if envelope is not None:
+            envelope = extract_analysis({"analysis": envelope}, message)
+        else:
+            envelope = extract_analysis(kwargs.get("context"), message)
+        analysis = self._analysis_from_envelope(envelope) if envelope else {}
+        if not analysis:
+            analysis = await self._analyze_message(message)
+        intent = analysis.get("intent")
+        if not intent:
+            intent = await self.gemini_client.generate_response(intent_prompt, temperature=0.1)
         intent = intent.strip().lower()
         
-        # Mapear la intención a la skill correspondiente
-        skill_mapping = {
-            "injury_prevention": "injury_prevention",
-            "rehabilitation": "rehabilitation",
-            "mobility_assessment": "mobility_assessment",
-            "mobility": "mobility_assessment",
-            "sleep_optimization": "sleep_optimization",
-            "sleep": "sleep_optimization",
-            "hrv_protocols": "hrv_protocols",
-            "hrv": "hrv_protocols",
-            "chronic_pain_management": "chronic_pain_management",
-            "pain": "chronic_pain_management",
-            "general_recovery": "general_recovery"
-        }
-        
         # Obtener el nombre de la skill a utilizar
-        skill_name = skill_mapping.get(intent, "general_recovery")
+        skill_name = RECOVERY_SKILL_MAPPING.get(intent, "general_recovery")
         
         logger.info(f"Intención detectada: {intent}, usando skill: {skill_name}")
         
@@ -2227,8 +2419,11 @@ class RecoveryCorrective(ADKAgent):
             
             Devuelve SOLO el nombre de la actividad, o null si no se menciona ninguna actividad específica.
             """
-            activity_type = await self.gemini_client.generate_response(activity_prompt, temperature=0.1)
-            activity_type = None if activity_type.lower() in ["null", "none", ""] else activity_type
+            if "activity_type" in analysis:
+                activity_type = analysis["activity_type"]
+            else:
+                activity_type = await self.gemini_client.generate_response(activity_prompt, temperature=0.1)
+            activity_type = None if not activity_type or activity_type.lower() in ["null", "none", ""] else activity_type
             
             input_data = InjuryPreventionInput(
                 query=message,
@@ -2251,7 +2446,9 @@ class RecoveryCorrective(ADKAgent):
             
             Devuelve SOLO el JSON, sin explicaciones adicionales.
             """
-            injury_info = await self.gemini_client.generate_structured_output(injury_prompt)
+            injury_info = analysis.get("injury")
+            if injury_info is None:
+                injury_info = await self.gemini_client.generate_structured_output(injury_prompt)
             
             if isinstance(injury_info, str):
                 try:
@@ -2282,7 +2479,9 @@ class RecoveryCorrective(ADKAgent):
             
             Devuelve SOLO el JSON array, sin explicaciones adicionales.
             """
-            target_areas = await self.gemini_client.generate_structured_output(mobility_prompt)
+            target_areas = analysis.get("target_areas")
+            if target_areas is None:
+                target_areas = await self.gemini_client.generate_structured_output(mobility_prompt)
             
             if isinstance(target_areas, str):
                 try:
@@ -2312,7 +2511,9 @@ class RecoveryCorrective(ADKAgent):
             
             Devuelve SOLO el JSON array, sin explicaciones adicionales.
             """
-            sleep_issues = await self.gemini_client.generate_structured_output(sleep_prompt)
+            sleep_issues = analysis.get("sleep_issues")
+            if sleep_issues is None:
+                sleep_issues = await self.gemini_client.generate_structured_output(sleep_prompt)
             
             if isinstance(sleep_issues, str):
                 try:
@@ -2355,7 +2556,9 @@ class RecoveryCorrective(ADKAgent):
             
             Devuelve SOLO el JSON, sin explicaciones adicionales.
             """
-            pain_info = await self.gemini_client.generate_structured_output(pain_prompt)
+            pain_info = analysis.get("pain")
+            if pain_info is None:
+                pain_info = await self.gemini_client.generate_structured_output(pain_prompt)
             
             if isinstance(pain_info, str):
                 try:
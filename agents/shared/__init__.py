@@ -7,6 +7,7 @@ utilizadas por múltiples agentes en el sistema.
 
 from agents.shared.program_definitions import (
     get_program_definition,
+    format_program_context,
     get_program_keywords,
     get_age_range,
     get_all_program_types,
@@ -17,6 +18,7 @@ from agents.shared.program_definitions import (
 
 __all__ = [
     'get_program_definition',
+    'format_program_context',
     'get_program_keywords',
     'get_age_range',
     'get_all_program_types',
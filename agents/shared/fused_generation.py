@@ -0,0 +1,305 @@
+"""
+Generación fusionada de resultados compuestos para las skills de los agentes.
+
+Muchas skills encadenan varias llamadas independientes al modelo sobre la misma
+consulta (una respuesta en texto, un plan estructurado, una lista de ejercicios,
+etc.). ``FusedGeneration`` registra esos pasos y los resuelve con una única
+generación estructurada cuyo resultado es un objeto JSON con una clave por paso.
+
+La llamada fusionada se restringe con ``response_mime_type="application/json"``
+y un ``response_schema`` con una propiedad obligatoria por paso. Los pasos con
+esquema propio lo incluyen tal cual; los objetos y arrays de forma libre (que
+el esquema de Gemini no admite sin propiedades o elementos) se piden como un
+string con el JSON, que se decodifica y valida antes de usarse.
+
+Si la respuesta fusionada no contiene un paso válido, ese paso se genera con
+su prompt original; los pasos pendientes se lanzan de forma concurrente, de
+modo que en el peor caso la latencia es de dos rondas y no de N rondas
+secuenciales. Las skills conservan su validación y sus valores por defecto.
+
+Los pasos pueden recibir un ``PromptParts`` de ``core.prompt_builder``: su
+prefijo estable encabeza el prompt fusionado (antes de las instrucciones de la
+fusión) y su hash se envía al cliente, de modo que la caché de prefijos se
+aprovecha también en la llamada fusionada.
+"""
+
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+from core.logging_config import get_logger
+from core.prompt_builder import PromptParts
+
+logger = get_logger(__name__)
+
+TEXT = "text"
+OBJECT = "object"
+ARRAY = "array"
+
+_KIND_LABELS = {
+    TEXT: "texto",
+    OBJECT: "objeto JSON",
+    ARRAY: "array JSON",
+}
+
+JSON_MIME_TYPE = "application/json"
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+def matches_schema(value: Any, schema: Dict[str, Any]) -> bool:
+    """
+    Comprueba un valor contra un esquema de respuesta (tipo, propiedades
+    obligatorias, elementos y ``nullable``).
+
+    Args:
+        value: Valor decodificado
+        schema: Esquema en el formato de ``response_schema``
+
+    Returns:
+        bool: True si el valor cumple el esquema
+    """
+    if value is None:
+        return bool(schema.get("nullable"))
+    expected = _JSON_TYPES.get(str(schema.get("type", "")).lower())
+    if expected is None:
+        return True
+    if not isinstance(value, expected) or (expected is not bool and isinstance(value, bool)):
+        return False
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        if any(key not in value for key in schema.get("required", [])):
+            return False
+        return all(matches_schema(value[key], sub) for key, sub in properties.items() if key in value)
+    if isinstance(value, list) and "items" in schema:
+        return all(matches_schema(item, schema["items"]) for item in value)
+    return True
+
+
+@dataclass
+class GenerationStep:
+    """Paso registrado en una generación fusionada."""
+    key: str
+    kind: str
+    prompt: Union[str, PromptParts]
+    temperature: Optional[float] = None
+    nullable: bool = False
+    schema: Optional[Dict[str, Any]] = None
+
+    def response_schema(self) -> Optional[Dict[str, Any]]:
+        """Esquema del paso en una llamada individual (None si es de forma libre)."""
+        if self.schema is None:
+            return None
+        return {**self.schema, "nullable": True} if self.nullable else self.schema
+
+    def fused_schema(self) -> Dict[str, Any]:
+        """Esquema del paso dentro de la respuesta fusionada."""
+        schema = self.response_schema()
+        if schema is None:
+            schema = {"type": "string"}
+            if self.kind != TEXT:
+                schema["description"] = f"{_KIND_LABELS[self.kind]} serializado como string"
+            if self.nullable:
+                schema["nullable"] = True
+        return schema
+
+
+class FusedGeneration:
+    """
+    Agrupa varias generaciones independientes en una sola llamada al modelo.
+
+    Ejemplo:
+        plan = FusedGeneration(gemini_client, temperature=0.4)
+        plan.text("response", prompt)
+        plan.object("prevention_plan", plan_prompt)
+        plan.array("exercises", exercises_prompt)
+        results = await plan.run()
+    """
+
+    def __init__(self, gemini_client: Any, temperature: float = 0.4, fuse: bool = True):
+        """
+        Inicializa la generación fusionada.
+
+        Args:
+            gemini_client: Cliente con ``generate_response`` y ``generate_structured_output``
+            temperature: Temperatura de los pasos de texto
+            fuse: Si es False, cada paso se genera por separado (de forma concurrente)
+        """
+        self.gemini_client = gemini_client
+        self.temperature = temperature
+        self.fuse = fuse
+        self.steps: List[GenerationStep] = []
+        self.model_calls = 0
+
+    def text(self, key: str, prompt: Union[str, PromptParts],
+             temperature: Optional[float] = None) -> "FusedGeneration":
+        """Registra un paso cuyo resultado es texto libre (el prompt puede ser un ``PromptParts``)."""
+        self.steps.append(GenerationStep(key, TEXT, prompt, temperature))
+        return self
+
+    def object(self, key: str, prompt: Union[str, PromptParts], nullable: bool = False,
+               schema: Optional[Dict[str, Any]] = None) -> "FusedGeneration":
+        """Registra un paso cuyo resultado es un objeto JSON (con esquema opcional)."""
+        self.steps.append(GenerationStep(key, OBJECT, prompt, nullable=nullable, schema=schema))
+        return self
+
+    def array(self, key: str, prompt: Union[str, PromptParts], schema: Optional[Dict[str, Any]] = None) -> "FusedGeneration":
+        """Registra un paso cuyo resultado es un array JSON (con esquema opcional)."""
+        self.steps.append(GenerationStep(key, ARRAY, prompt, schema=schema))
+        return self
+
+    def build_schema(self) -> Dict[str, Any]:
+        """
+        Construye el esquema de la respuesta fusionada.
+
+        Returns:
+            Dict[str, Any]: Objeto con una propiedad obligatoria por paso
+        """
+        return {
+            "type": "object",
+            "properties": {step.key: step.fused_schema() for step in self.steps},
+            "required": [step.key for step in self.steps],
+        }
+
+    def _fused_temperature(self) -> Optional[float]:
+        """Temperatura de los pasos de texto, que la llamada fusionada también genera."""
+        temperatures = [
+            step.temperature if step.temperature is not None else self.temperature
+            for step in self.steps if step.kind == TEXT
+        ]
+        return min(temperatures) if temperatures else None
+
+    def build_prompt(self) -> PromptParts:
+        """
+        Construye el prompt fusionado con una sección por paso.
+
+        El prefijo estable del primer paso que lo tiene encabeza el prompt, y la
+        sección de ese paso solo incluye su sufijo; el resto de pasos se incluyen
+        completos.
+
+        Returns:
+            PromptParts: Prompt que solicita un único objeto JSON con una clave por paso
+        """
+        shared = next(
+            (step.prompt for step in self.steps if isinstance(step.prompt, PromptParts) and step.prompt.prefix),
+            None
+        )
+        keys = ", ".join(f'"{step.key}"' for step in self.steps)
+        sections = []
+        for step in self.steps:
+            prompt = step.prompt.suffix if step.prompt is shared else str(step.prompt)
+            sections.append(
+                f"### Clave \"{step.key}\" ({_KIND_LABELS[step.kind]})\n{prompt.strip()}"
+            )
+
+        suffix = (
+            "Resuelve las siguientes tareas sobre la misma consulta en una sola respuesta.\n"
+            f"Devuelve SOLO un objeto JSON con exactamente estas claves: {keys}.\n"
+            "El valor de cada clave es el resultado de su tarea: las tareas de texto se devuelven "
+            "como un string (puede contener markdown) y las tareas JSON como el objeto o array pedido "
+            "(o como un string con ese JSON si el esquema de la respuesta lo indica).\n\n"
+            + "\n\n".join(sections)
+        )
+        if shared is None:
+            return PromptParts(prefix="", suffix=suffix, prefix_hash="", prefix_tokens=0)
+        return PromptParts(
+            prefix=shared.prefix,
+            suffix=suffix,
+            prefix_hash=shared.prefix_hash,
+            prefix_tokens=shared.prefix_tokens,
+            prefix_reused=shared.prefix_reused,
+        )
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Ejecuta los pasos registrados.
+
+        Returns:
+            Dict[str, Any]: Resultado por clave. Los pasos que no se pudieron generar
+            contienen None y la skill aplica sus valores por defecto.
+        """
+        results: Dict[str, Any] = {}
+        pending = list(self.steps)
+
+        if self.fuse and len(self.steps) > 1:
+            fused = await self._call_structured(self.build_prompt(), self.build_schema(),
+                                                self._fused_temperature())
+            if isinstance(fused, str):
+                try:
+                    fused = json.loads(fused)
+                except ValueError:
+                    fused = None
+            # Cada paso se valida por separado: los que no cumplen se regeneran
+            if isinstance(fused, dict):
+                pending = []
+                for step in self.steps:
+                    value = self._coerce(step, fused.get(step.key))
+                    if value is None and not (step.nullable and step.key in fused):
+                        pending.append(step)
+                    else:
+                        results[step.key] = value
+            if pending:
+                logger.info(
+                    f"Generación fusionada incompleta; regenerando {len(pending)} de {len(self.steps)} pasos"
+                )
+
+        if pending:
+            values = await asyncio.gather(*(self._run_step(step) for step in pending))
+            for step, value in zip(pending, values):
+                results[step.key] = value
+
+        return results
+
+    async def _run_step(self, step: GenerationStep) -> Any:
+        """Genera un paso con su prompt original."""
+        if step.kind == TEXT:
+            temperature = step.temperature if step.temperature is not None else self.temperature
+            self.model_calls += 1
+            return await self.gemini_client.generate_response(str(step.prompt), temperature=temperature)
+        return self._coerce(step, await self._call_structured(step.prompt, step.response_schema()))
+
+    async def _call_structured(self, prompt: Union[str, PromptParts], schema: Optional[Dict[str, Any]] = None,
+                               temperature: Optional[float] = None) -> Any:
+        kwargs: Dict[str, Any] = {"response_mime_type": JSON_MIME_TYPE}
+        if schema is not None:
+            kwargs["response_schema"] = schema
+        if temperature is not None:
+            kwargs["temperature"] = temperature
+        # El prefijo estable viaja aparte con su hash, como en ``VertexAIClient.generate_content``
+        if isinstance(prompt, PromptParts):
+            if prompt.prefix:
+                kwargs["prompt_prefix"] = prompt.prefix
+                kwargs["prefix_hash"] = prompt.prefix_hash
+            prompt = prompt.suffix
+        try:
+            self.model_calls += 1
+            return await self.gemini_client.generate_structured_output(prompt, **kwargs)
+        except Exception as e:
+            logger.warning(f"Error en generación estructurada: {e}")
+            return None
+
+    @staticmethod
+    def _coerce(step: GenerationStep, value: Any) -> Any:
+        """Devuelve el valor si cumple el tipo y el esquema del paso, o None."""
+        if step.kind == TEXT:
+            return value if isinstance(value, str) and value.strip() else None
+
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except (TypeError, ValueError):
+                return None
+
+        if not isinstance(value, dict if step.kind == OBJECT else list):
+            return None
+        if step.schema is not None and not matches_schema(value, step.schema):
+            return None
+        return value
@@ -4,6 +4,7 @@ Definiciones detalladas de los programas ofrecidos por NGX.
 Este módulo centraliza las definiciones de los diferentes programas (PRIME, LONGEVITY, etc.)
 para garantizar consistencia en cómo todos los agentes entienden y trabajan con estos programas.
 """
+from functools import lru_cache
 from typing import Dict, List, Any, Optional, Tuple
 
 # Definiciones completas de los programas
@@ -357,6 +358,37 @@ def get_program_definition(program_type: str) -> Dict[str, Any]:
     
     return PROGRAM_DEFINITIONS[program_type]
 
+@lru_cache(maxsize=128)
+def format_program_context(program_type: str, protocol_key: Optional[str] = None,
+                           protocol_title: str = "Protocolos recomendados") -> str:
+    """
+    Renderiza el bloque de contexto de un programa que los agentes añaden a sus prompts.
+    
+    El resultado se memoriza: las definiciones son estáticas, por lo que el bloque
+    se construye una sola vez por combinación de argumentos y puede formar parte
+    del prefijo estable de un prompt (ver ``core.prompt_builder``).
+    
+    Args:
+        program_type: Tipo de programa (PRIME, LONGEVITY, etc.)
+        protocol_key: Clave de ``key_protocols`` a incluir (p. ej. "recovery"), o None
+        protocol_title: Título de la lista de protocolos
+        
+    Returns:
+        str: Bloque de texto con la descripción, el objetivo y los protocolos del programa
+    """
+    program_def = get_program_definition(program_type)
+    
+    lines = [
+        f"CONTEXTO DEL PROGRAMA {program_type}:",
+        f"- {program_def.get('description', '')}",
+        f"- Objetivo: {program_def.get('objective', '')}"
+    ]
+    protocols = program_def.get("key_protocols", {}).get(protocol_key, []) if protocol_key else []
+    if protocols:
+        lines.append(f"- {protocol_title}:")
+        lines.extend(f"  * {protocol}" for protocol in protocols)
+    return "\n".join(lines) + "\n"
+
 def get_program_keywords(program_type: str) -> List[str]:
     """
     Obtiene las palabras clave asociadas a un programa específico.
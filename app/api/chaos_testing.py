@@ -11,6 +11,7 @@ from fastapi import APIRouter, HTTPException, Depends, Body, Query, Path
 from pydantic import BaseModel, Field
 
 from core.chaos_testing import chaos_testing_manager, ChaosEventType, ChaosEvent
+from core.fault_injection import fault_injector
 from core.auth import get_current_user
 
 # Crear router
@@ -238,4 +239,19 @@ async def get_chaos_event_types(
     Returns:
         Tipos de eventos disponibles
     """
-    return {event_type.value: event_type.name for event_type in ChaosEventType}
\ No newline at end of file
+    return {event_type.value: event_type.name for event_type in ChaosEventType}
+
+@router.get("/faults", response_model=Dict[str, Any])
+async def get_active_faults(
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Obtiene los fallos inyectados activos en las fronteras de los clientes.
+    
+    Args:
+        user_id: ID del usuario autenticado
+        
+    Returns:
+        Fallos activos con sus estadísticas y fronteras instaladas
+    """
+    return fault_injector.get_stats()
@@ -25,8 +25,11 @@ class CircuitBreakerConfigRequest(BaseModel):
     failure_threshold: int = Field(default=5, description="Número de fallos para abrir el circuito")
     success_threshold: int = Field(default=2, description="Número de éxitos para cerrar el circuito")
     timeout: int = Field(default=60, description="Tiempo en segundos que el circuito permanece abierto")
-    window_size: int = Field(default=10, description="Tamaño de la ventana para calcular la tasa de fallos")
+    window_size: int = Field(default=10, description="Llamadas mínimas en la ventana para evaluar la tasa de fallos")
     error_threshold_percentage: float = Field(default=50.0, description="Porcentaje de fallos para abrir el circuito")
+    window_duration: float = Field(default=60.0, description="Duración en segundos de la ventana deslizante")
+    window_buckets: int = Field(default=10, description="Cubetas temporales en las que se divide la ventana")
+    half_open_max_calls: int = Field(default=1, description="Sondas simultáneas permitidas en estado half-open")
 
 class CircuitBreakerConfigResponse(BaseModel):
     """Respuesta con la configuración de un circuit breaker."""
@@ -36,19 +39,23 @@ class CircuitBreakerConfigResponse(BaseModel):
     has_fallback: bool = Field(..., description="Si tiene función de fallback")
     exclude_exceptions: List[str] = Field(..., description="Excepciones que no cuentan como fallos")
     include_exceptions: Optional[List[str]] = Field(default=None, description="Solo estas excepciones cuentan como fallos")
-    window_size: int = Field(..., description="Tamaño de la ventana para calcular la tasa de fallos")
+    window_size: int = Field(..., description="Llamadas mínimas en la ventana para evaluar la tasa de fallos")
     error_threshold_percentage: float = Field(..., description="Porcentaje de fallos para abrir el circuito")
+    window_duration: float = Field(..., description="Duración en segundos de la ventana deslizante")
+    window_buckets: int = Field(..., description="Cubetas temporales en las que se divide la ventana")
+    half_open_max_calls: int = Field(..., description="Sondas simultáneas permitidas en estado half-open")
 
 class CircuitBreakerStateResponse(BaseModel):
     """Respuesta con el estado de un circuit breaker."""
     name: str = Field(..., description="Nombre del circuit breaker")
     state: str = Field(..., description="Estado del circuit breaker (closed, open, half_open)")
-    failure_count: int = Field(..., description="Contador de fallos")
+    failure_count: int = Field(..., description="Fallos dentro de la ventana")
     success_count: int = Field(..., description="Contador de éxitos")
     last_failure_time: Optional[str] = Field(default=None, description="Fecha del último fallo")
     last_state_change_time: str = Field(..., description="Fecha del último cambio de estado")
-    results_window: List[bool] = Field(..., description="Historial de resultados")
+    window: Dict[str, Any] = Field(..., description="Éxitos y fallos dentro de la ventana")
     failure_rate: float = Field(..., description="Tasa de fallos")
+    half_open_in_flight: int = Field(..., description="Sondas en curso en estado half-open")
     config: CircuitBreakerConfigResponse = Field(..., description="Configuración del circuit breaker")
     stats: Dict[str, Any] = Field(..., description="Estadísticas del circuit breaker")
 
@@ -116,7 +123,10 @@ async def create_circuit_breaker(
         success_threshold=request.config.success_threshold,
         timeout=request.config.timeout,
         window_size=request.config.window_size,
-        error_threshold_percentage=request.config.error_threshold_percentage
+        error_threshold_percentage=request.config.error_threshold_percentage,
+        window_duration=request.config.window_duration,
+        window_buckets=request.config.window_buckets,
+        half_open_max_calls=request.config.half_open_max_calls
     )
     
     # Crear circuit breaker
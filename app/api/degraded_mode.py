@@ -34,6 +34,7 @@ class ServiceStatusResponse(BaseModel):
     last_check: str = Field(..., description="Fecha de la última comprobación")
     failure_count: int = Field(..., description="Contador de fallos")
     success_count: int = Field(..., description="Contador de éxitos")
+    unavailable_dependencies: List[str] = Field(default=[], description="Dependencias que bloquean el servicio")
     metadata: Dict[str, Any] = Field(..., description="Metadatos adicionales")
 
 class SystemStatusResponse(BaseModel):
@@ -69,6 +70,7 @@ class ServiceStatusUpdateRequest(BaseModel):
 class FeatureUpdateRequest(BaseModel):
     """Solicitud para actualizar el estado de una funcionalidad."""
     enabled: bool = Field(..., description="Si la funcionalidad está habilitada")
+    depends_on: Optional[List[str]] = Field(default=None, description="IDs de servicios de los que depende la funcionalidad")
 
 @router.get("/system", response_model=SystemStatusResponse)
 async def get_system_status(
@@ -139,13 +141,16 @@ async def register_service(
     Returns:
         Estado del servicio registrado
     """
-    service = await degraded_mode_manager.register_service(
-        service_id=request.service_id,
-        name=request.name,
-        description=request.description,
-        is_critical=request.is_critical,
-        dependencies=request.dependencies
-    )
+    try:
+        service = await degraded_mode_manager.register_service(
+            service_id=request.service_id,
+            name=request.name,
+            description=request.description,
+            is_critical=request.is_critical,
+            dependencies=request.dependencies
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return ServiceStatusResponse(**service.to_dict())
 
@@ -228,7 +233,7 @@ async def update_feature_status(
     Returns:
         Resultado de la operación
     """
-    await degraded_mode_manager.set_feature_enabled(feature_id, request.enabled)
+    await degraded_mode_manager.set_feature_enabled(feature_id, request.enabled, request.depends_on)
     
     return {
         "success": True,
@@ -6,11 +6,16 @@ y ejecutar runbooks automatizados en respuesta a incidentes.
 """
 
 import json
+import time
+import hashlib
 import logging
 import asyncio
-from typing import Dict, Any, Optional, List
-from fastapi import APIRouter, Request, Response, HTTPException, BackgroundTasks
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Any, Optional, List
+from fastapi import APIRouter, Request, Response, HTTPException
 
+from core.latency_histogram import LatencyHistogram
+from core.settings import settings
 from tools.runbooks import RunbookExecutor
 from infrastructure.adapters import get_telemetry_adapter
 
@@ -36,22 +41,284 @@ ALERT_RUNBOOK_MAPPING = {
 # Ejecutor de runbooks
 runbook_executor = RunbookExecutor()
 
-# Cola de alertas para procesamiento asíncrono
-alert_queue = asyncio.Queue()
 
-# Flag para indicar si el worker está ejecutándose
-worker_running = False
+def fingerprint_alert(alert: Dict[str, Any]) -> str:
+    """
+    Calcula la huella de una alerta para detectar duplicados.
+    
+    Usa la huella del sistema de monitoreo si viene en la alerta; si no, la
+    deriva del tipo, el runbook, el servicio, el recurso y las etiquetas
+    (sin marcas de tiempo ni textos descriptivos).
+    
+    Args:
+        alert: Datos de la alerta.
+        
+    Returns:
+        str: Huella de la alerta.
+    """
+    if alert.get("fingerprint"):
+        return str(alert["fingerprint"])
+    
+    identity = json.dumps({
+        "type": alert.get("type"),
+        "runbook_id": alert.get("runbook_id"),
+        "service": alert.get("service"),
+        "resource": alert.get("resource"),
+        "labels": alert.get("labels") or {}
+    }, sort_keys=True, default=str)
+    return hashlib.sha1(identity.encode("utf-8")).hexdigest()[:16]
+
+
+class AlertProcessor:
+    """
+    Procesador de alertas con deduplicación y pool de workers acotado.
+    
+    Las alertas con la misma huella se descartan mientras su runbook está en
+    cola o en ejecución y durante ``dedup_window`` segundos después de
+    completarse. Un pool de ``max_workers`` workers ejecuta los runbooks en
+    paralelo con un máximo de ``runbook_concurrency`` ejecuciones simultáneas
+    por runbook; las alertas que superan ese límite se aplazan sin ocupar un
+    worker y las recoge el worker que libera el runbook.
+    """
+    
+    def __init__(
+        self,
+        executor: RunbookExecutor,
+        max_workers: Optional[int] = None,
+        runbook_concurrency: Optional[int] = None,
+        dedup_window: Optional[float] = None
+    ):
+        """
+        Inicializa el procesador.
+        
+        Args:
+            executor: Ejecutor de runbooks.
+            max_workers: Número de workers (por defecto ALERT_WORKERS).
+            runbook_concurrency: Ejecuciones simultáneas por runbook
+                (por defecto ALERT_RUNBOOK_CONCURRENCY).
+            dedup_window: Ventana de deduplicación tras completar un runbook
+                en segundos (por defecto ALERT_DEDUP_WINDOW; 0 la desactiva).
+        """
+        self.executor = executor
+        self.max_workers = max_workers or settings.alert_workers
+        self.runbook_concurrency = runbook_concurrency or settings.alert_runbook_concurrency
+        self.dedup_window = settings.alert_dedup_window if dedup_window is None else dedup_window
+        
+        # Cola y workers del bucle de eventos activo
+        self.queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._workers: List[asyncio.Task] = []
+        self._idle: Optional[asyncio.Event] = None
+        
+        # Huellas en cola o en ejecución y huellas completadas (por caducidad)
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._recent: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        
+        # Ejecuciones activas y alertas aplazadas por runbook
+        self._active: Dict[str, int] = {}
+        self._deferred: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._outstanding = 0
+        
+        # Tiempo desde la primera alerta hasta que termina su runbook
+        self.time_to_remediation = LatencyHistogram()
+        self.stats = {
+            "received": 0,
+            "accepted": 0,
+            "deduplicated": 0,
+            "unmapped": 0,
+            "executed": 0,
+            "failed": 0,
+            "deferred": 0
+        }
+    
+    def _expire(self, now: float) -> None:
+        """Elimina las huellas completadas cuya ventana ha caducado."""
+        while self._recent:
+            fingerprint, entry = next(iter(self._recent.items()))
+            if entry["expires_at"] > now:
+                break
+            del self._recent[fingerprint]
+    
+    def submit(self, alert: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Admite una alerta enriquecida, descartándola si es un duplicado.
+        
+        Args:
+            alert: Alerta enriquecida (con ``runbook_id``).
+            
+        Returns:
+            Dict[str, Any]: Estado de la admisión ("accepted", "deduplicated"
+                o "ignored") y huella de la alerta.
+        """
+        self.stats["received"] += 1
+        
+        if not alert.get("runbook_id"):
+            self.stats["unmapped"] += 1
+            logger.warning(f"No se encontró runbook para la alerta: {alert.get('type', 'unknown')}")
+            return {"status": "ignored", "reason": "no_runbook"}
+        
+        now = time.monotonic()
+        self._expire(now)
+        fingerprint = fingerprint_alert(alert)
+        
+        entry = self._pending.get(fingerprint) or self._recent.get(fingerprint)
+        if entry is not None:
+            entry["duplicates"] += 1
+            entry["last_seen"] = now
+            self.stats["deduplicated"] += 1
+            return {
+                "status": "deduplicated",
+                "fingerprint": fingerprint,
+                "duplicates": entry["duplicates"]
+            }
+        
+        self._pending[fingerprint] = {
+            "status": "queued",
+            "runbook_id": alert["runbook_id"],
+            "first_seen": now,
+            "last_seen": now,
+            "duplicates": 0
+        }
+        self.ensure_started()
+        self._outstanding += 1
+        self._idle.clear()
+        self.queue.put_nowait({**alert, "fingerprint": fingerprint})
+        self.stats["accepted"] += 1
+        return {"status": "accepted", "fingerprint": fingerprint}
+    
+    def ensure_started(self) -> None:
+        """Arranca (o repone) los workers en el bucle de eventos activo."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nuevo bucle: los workers y la cola anteriores ya no sirven
+            self._loop = loop
+            self.queue = asyncio.Queue()
+            self._idle = asyncio.Event()
+            self._idle.set()
+            self._workers = []
+            self._active.clear()
+            self._deferred.clear()
+            self._outstanding = 0
+        
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        while len(self._workers) < self.max_workers:
+            self._workers.append(loop.create_task(self._worker()))
+    
+    async def _worker(self) -> None:
+        """Worker del pool: ejecuta alertas y después las aplazadas de su runbook."""
+        while True:
+            alert = await self.queue.get()
+            try:
+                runbook_id = alert["runbook_id"]
+                if self._active.get(runbook_id, 0) >= self.runbook_concurrency:
+                    # El runbook está saturado: lo recogerá quien lo libere
+                    self._deferred.setdefault(runbook_id, deque()).append(alert)
+                    self.stats["deferred"] += 1
+                    continue
+                
+                while alert is not None:
+                    await self._execute(alert)
+                    alert = self._next_deferred(runbook_id)
+            except Exception as e:
+                logger.error(f"Error en worker de alertas: {str(e)}")
+            finally:
+                self.queue.task_done()
+    
+    def _next_deferred(self, runbook_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene la siguiente alerta aplazada de un runbook si hay capacidad."""
+        deferred = self._deferred.get(runbook_id)
+        if not deferred or self._active.get(runbook_id, 0) >= self.runbook_concurrency:
+            return None
+        alert = deferred.popleft()
+        if not deferred:
+            del self._deferred[runbook_id]
+        return alert
+    
+    async def _execute(self, alert: Dict[str, Any]) -> None:
+        """Ejecuta el runbook de una alerta y actualiza la deduplicación."""
+        runbook_id = alert["runbook_id"]
+        fingerprint = alert["fingerprint"]
+        entry = self._pending.get(fingerprint)
+        if entry is not None:
+            entry["status"] = "running"
+        
+        self._active[runbook_id] = self._active.get(runbook_id, 0) + 1
+        result = None
+        try:
+            result = await handle_alert(alert, self.executor)
+        finally:
+            self._active[runbook_id] -= 1
+            if not self._active[runbook_id]:
+                del self._active[runbook_id]
+            
+            now = time.monotonic()
+            entry = self._pending.pop(fingerprint, None)
+            succeeded = bool(result) and result.get("status") == "completed"
+            if succeeded:
+                self.stats["executed"] += 1
+                if entry is not None:
+                    self.time_to_remediation.record((now - entry["first_seen"]) * 1000)
+                    if self.dedup_window > 0:
+                        entry["status"] = "completed"
+                        entry["expires_at"] = now + self.dedup_window
+                        self._recent[fingerprint] = entry
+            else:
+                # Sin ventana: la siguiente alerta vuelve a lanzar el runbook
+                self.stats["failed"] += 1
+            
+            self._outstanding -= 1
+            if self._outstanding <= 0:
+                self._idle.set()
+    
+    async def wait_idle(self) -> None:
+        """Espera a que no queden alertas en cola, aplazadas ni en ejecución."""
+        if self._idle is not None:
+            await self._idle.wait()
+    
+    async def stop(self) -> None:
+        """Detiene los workers del pool."""
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del procesador.
+        
+        Returns:
+            Dict[str, Any]: Contadores, estado del pool y tiempo hasta la remediación.
+        """
+        self._expire(time.monotonic())
+        return {
+            **self.stats,
+            "queue_size": self.queue.qsize() if self.queue is not None else 0,
+            "workers": len([worker for worker in self._workers if not worker.done()]),
+            "max_workers": self.max_workers,
+            "runbook_concurrency": self.runbook_concurrency,
+            "dedup_window": self.dedup_window,
+            "active_runbooks": dict(self._active),
+            "deferred_by_runbook": {runbook_id: len(alerts) for runbook_id, alerts in self._deferred.items()},
+            "pending_fingerprints": len(self._pending),
+            "suppressed_fingerprints": len(self._recent),
+            "time_to_remediation_ms": self.time_to_remediation.summary()
+        }
+
+
+# Procesador de alertas compartido
+alert_processor = AlertProcessor(runbook_executor)
 
 
 @router.post("/webhook")
-async def receive_alert_webhook(request: Request, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+async def receive_alert_webhook(request: Request) -> Dict[str, Any]:
     """
     Recibe alertas de sistemas de monitoreo (Prometheus, Cloud Monitoring, etc.)
     y ejecuta runbooks automatizados en respuesta.
     
+    Las alertas duplicadas de un incidente ya en curso se descartan sin encolar.
+    
     Args:
         request: Solicitud HTTP con la alerta.
-        background_tasks: Tareas en segundo plano.
         
     Returns:
         Dict[str, Any]: Resultado del procesamiento de la alerta.
@@ -68,15 +335,13 @@ async def receive_alert_webhook(request: Request, background_tasks: BackgroundTa
             "alert_type": alert_data.get("type", "unknown")
         })
         
-        # Procesar la alerta en segundo plano
-        background_tasks.add_task(process_alert, alert_data)
-        
-        # Asegurar que el worker está ejecutándose
-        ensure_alert_worker()
+        # Deduplicar y encolar (sin E/S: no hace falta una tarea en segundo plano)
+        admission = await process_alert(alert_data)
         
         return {
-            "status": "accepted",
+            **admission,
             "message": "Alerta recibida y encolada para procesamiento"
+            if admission["status"] == "accepted" else "Alerta duplicada o sin runbook; no se encola"
         }
     except Exception as e:
         telemetry.record_exception(span, e)
@@ -95,8 +360,8 @@ async def get_alert_status() -> Dict[str, Any]:
         Dict[str, Any]: Estado del sistema de alertas.
     """
     return {
-        "queue_size": alert_queue.qsize(),
-        "worker_running": worker_running,
+        **alert_processor.get_stats(),
+        "runbook_cache": runbook_executor.cache_stats,
         "runbook_mappings": ALERT_RUNBOOK_MAPPING
     }
 
@@ -116,13 +381,12 @@ async def get_alert_history() -> Dict[str, Any]:
 
 
 @router.post("/test")
-async def test_alert_handler(alert_type: str, background_tasks: BackgroundTasks) -> Dict[str, Any]:
+async def test_alert_handler(alert_type: str) -> Dict[str, Any]:
     """
     Envía una alerta de prueba para verificar el funcionamiento del sistema.
     
     Args:
         alert_type: Tipo de alerta a probar.
-        background_tasks: Tareas en segundo plano.
         
     Returns:
         Dict[str, Any]: Resultado de la prueba.
@@ -142,15 +406,13 @@ async def test_alert_handler(alert_type: str, background_tasks: BackgroundTasks)
             "timestamp": "2025-05-13T17:30:00Z"
         }
         
-        # Procesar la alerta en segundo plano
-        background_tasks.add_task(process_alert, test_alert)
-        
-        # Asegurar que el worker está ejecutándose
-        ensure_alert_worker()
+        # Deduplicar y encolar
+        admission = await process_alert(test_alert)
         
         return {
-            "status": "accepted",
+            **admission,
             "message": f"Alerta de prueba '{alert_type}' encolada para procesamiento"
+            if admission["status"] == "accepted" else f"Alerta de prueba '{alert_type}' no encolada"
         }
     except Exception as e:
         telemetry.record_exception(span, e)
@@ -160,12 +422,15 @@ async def test_alert_handler(alert_type: str, background_tasks: BackgroundTasks)
         telemetry.end_span(span)
 
 
-async def process_alert(alert_data: Dict[str, Any]) -> None:
+async def process_alert(alert_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Procesa una alerta y la encola para su procesamiento asíncrono.
     
     Args:
         alert_data: Datos de la alerta.
+        
+    Returns:
+        Dict[str, Any]: Resultado de la admisión en el procesador de alertas.
     """
     span = telemetry.start_span("alert_handler.process_alert", {
         "alert_type": alert_data.get("type", "unknown")
@@ -175,19 +440,23 @@ async def process_alert(alert_data: Dict[str, Any]) -> None:
         # Enriquecer alerta con información adicional
         enriched_alert = await enrich_alert(alert_data)
         
-        # Encolar para procesamiento asíncrono
-        await alert_queue.put(enriched_alert)
+        # Deduplicar y encolar para procesamiento asíncrono
+        admission = alert_processor.submit(enriched_alert)
         
         # Registrar evento de telemetría
-        telemetry.add_span_event(span, "alert_enqueued", {
+        telemetry.add_span_event(span, f"alert_{admission['status']}", {
             "alert_type": enriched_alert.get("type", "unknown"),
-            "queue_size": alert_queue.qsize()
+            "fingerprint": admission.get("fingerprint", ""),
+            "queue_size": alert_processor.queue.qsize() if alert_processor.queue is not None else 0
         })
         
-        logger.info(f"Alerta encolada para procesamiento: {enriched_alert.get('type', 'unknown')}")
+        if admission["status"] == "accepted":
+            logger.info(f"Alerta encolada para procesamiento: {enriched_alert.get('type', 'unknown')}")
+        return admission
     except Exception as e:
         telemetry.record_exception(span, e)
         logger.error(f"Error al procesar alerta: {str(e)}")
+        return {"status": "error", "error": str(e)}
     finally:
         telemetry.end_span(span)
 
@@ -223,55 +492,21 @@ async def enrich_alert(alert_data: Dict[str, Any]) -> Dict[str, Any]:
 
 def ensure_alert_worker() -> None:
     """
-    Asegura que el worker de procesamiento de alertas está ejecutándose.
+    Asegura que el pool de workers de procesamiento de alertas está ejecutándose.
     """
-    global worker_running
-    
-    if not worker_running:
-        # Iniciar worker en una tarea de fondo
-        asyncio.create_task(alert_worker())
+    alert_processor.ensure_started()
 
 
-async def alert_worker() -> None:
-    """
-    Worker para procesar alertas de forma asíncrona.
-    """
-    global worker_running
-    
-    # Marcar como ejecutándose
-    worker_running = True
-    
-    try:
-        logger.info("Iniciando worker de procesamiento de alertas")
-        
-        while True:
-            try:
-                # Obtener alerta de la cola
-                alert = await alert_queue.get()
-                
-                # Procesar alerta
-                await handle_alert(alert)
-                
-                # Marcar como completada
-                alert_queue.task_done()
-            except asyncio.CancelledError:
-                # El worker fue cancelado
-                break
-            except Exception as e:
-                logger.error(f"Error en worker de alertas: {str(e)}")
-                # Continuar con la siguiente alerta
-    finally:
-        # Marcar como no ejecutándose
-        worker_running = False
-        logger.info("Worker de procesamiento de alertas detenido")
-
-
-async def handle_alert(alert: Dict[str, Any]) -> None:
+async def handle_alert(alert: Dict[str, Any], executor: Optional[RunbookExecutor] = None) -> Optional[Dict[str, Any]]:
     """
     Maneja una alerta ejecutando el runbook correspondiente.
     
     Args:
         alert: Datos de la alerta.
+        executor: Ejecutor de runbooks (por defecto el compartido).
+        
+    Returns:
+        Optional[Dict[str, Any]]: Resultado de la ejecución, o None si no se ejecutó.
     """
     span = telemetry.start_span("alert_handler.handle_alert", {
         "alert_type": alert.get("type", "unknown")
@@ -283,7 +518,7 @@ async def handle_alert(alert: Dict[str, Any]) -> None:
         
         if not runbook_id:
             logger.warning(f"No se encontró runbook para la alerta: {alert.get('type', 'unknown')}")
-            return
+            return None
         
         # Registrar evento de telemetría
         telemetry.add_span_event(span, "executing_runbook", {
@@ -294,7 +529,7 @@ async def handle_alert(alert: Dict[str, Any]) -> None:
         logger.info(f"Ejecutando runbook {runbook_id} para alerta {alert.get('type', 'unknown')}")
         
         # Ejecutar runbook
-        result = await runbook_executor.execute_runbook(runbook_id, {
+        result = await (executor or runbook_executor).execute_runbook(runbook_id, {
             "alert": alert
         })
         
@@ -306,9 +541,11 @@ async def handle_alert(alert: Dict[str, Any]) -> None:
         })
         
         logger.info(f"Runbook {runbook_id} ejecutado con resultado: {result.get('status', '')}")
+        return result
     except Exception as e:
         telemetry.record_exception(span, e)
         logger.error(f"Error al manejar alerta: {str(e)}")
+        return None
     finally:
         telemetry.end_span(span)
 
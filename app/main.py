@@ -5,6 +5,7 @@ para interactuar con los agentes NGX y gestionar la autenticación
 mediante JWT.
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List
 from fastapi import FastAPI, Request, Depends, HTTPException, status
@@ -114,9 +115,20 @@ async def startup_event():
             await supabase_client.initialize()
             logger.info("Cliente Supabase inicializado correctamente")
             
+            # Iniciar el búfer de escritura diferida (reproduce el WAL pendiente)
+            from clients.supabase_write_buffer import supabase_write_buffer
+            await supabase_write_buffer.start()
+            logger.info("Búfer de escritura diferida de Supabase iniciado correctamente")
+            
+            # Exportador por lotes de spans y métricas agregadas
+            from infrastructure.adapters import get_telemetry_adapter
+            get_telemetry_adapter().start_exporter()
+            logger.info("Exportador de telemetría por lotes iniciado correctamente")
+            
             # Inicializar sistema de presupuestos si está habilitado
             if settings.enable_budgets:
                 from core.budget import budget_manager
+                await budget_manager.start_flusher()
                 logger.info("Sistema de presupuestos inicializado correctamente")
                 
             # Inicializar analizador de prompts
@@ -146,10 +158,24 @@ async def startup_event():
             asyncio.create_task(degraded_mode_manager.start_monitoring())
             logger.info("Sistema de modos degradados iniciado correctamente")
             
+            # Cargar agentes: perezosamente (con precalentamiento opcional) o todos al inicio
+            from app.routers.agents import discover_agents
+            from core.agent_registry import agent_registry
+            if settings.agent_lazy_loading:
+                prewarm_ids = agent_registry.parse_agent_ids(settings.agent_prewarm)
+                if prewarm_ids:
+                    asyncio.create_task(agent_registry.prewarm(prewarm_ids))
+                    logger.info(f"Precalentando agentes en segundo plano: {prewarm_ids}")
+                logger.info(f"Registro de agentes en modo perezoso ({len(agent_registry.list_agents())} agentes)")
+            else:
+                await asyncio.to_thread(discover_agents)
+                logger.info("Agentes cargados al inicio")
+            
             # Registrar dependencias para health checks
             from infrastructure.health import health_check
             health_check.register_dependency("supabase", health_check.check_supabase, critical=True)
             health_check.register_dependency("vertex_ai", health_check.check_vertex_ai, critical=True)
+            health_check.start_background_refresh()
             
             # Inicializar sistema de runbooks
             from tools.runbooks import RunbookExecutor
@@ -186,6 +212,67 @@ async def shutdown_event():
         except Exception as e:
             logger.error(f"Error al detener procesador asíncrono: {e}")
         
+        # Cerrar la sesión HTTP compartida de recursos multimedia
+        try:
+            from clients.vertex_ai.media import media_fetcher
+            await media_fetcher.close()
+            logger.info("Sesión HTTP de recursos multimedia cerrada correctamente")
+        except Exception as e:
+            logger.error(f"Error al cerrar sesión HTTP de recursos multimedia: {e}")
+        
+        # Detener el pool de workers de alertas
+        try:
+            from app.handlers.alert_handler import alert_processor
+            await alert_processor.stop()
+        except Exception as e:
+            logger.error(f"Error al detener el pool de workers de alertas: {e}")
+        
+        # Detener el refresco de health checks en segundo plano
+        try:
+            from infrastructure.health import health_check
+            await health_check.stop_background_refresh()
+        except Exception as e:
+            logger.error(f"Error al detener el refresco de health checks: {e}")
+        
+        # Cerrar el pool de conexiones del cliente MCP
+        try:
+            from tools.mcp_client import mcp_client
+            await mcp_client.close()
+        except Exception as e:
+            logger.error(f"Error al cerrar el pool de conexiones MCP: {e}")
+        
+        # Detener el pool de procesos de imágenes
+        try:
+            from core.image_optimizer import image_optimizer
+            await image_optimizer.shutdown()
+        except Exception as e:
+            logger.error(f"Error al detener pool de procesos de imágenes: {e}")
+        
+        # Volcar las escrituras diferidas pendientes de Supabase
+        try:
+            from clients.supabase_write_buffer import supabase_write_buffer
+            await supabase_write_buffer.stop()
+            logger.info("Búfer de escritura diferida de Supabase volcado correctamente")
+        except Exception as e:
+            logger.error(f"Error al volcar el búfer de escritura diferida de Supabase: {e}")
+        
+        # Exportar los spans y métricas pendientes
+        try:
+            from infrastructure.adapters import get_telemetry_adapter
+            await get_telemetry_adapter().stop_exporter()
+            logger.info("Exportador de telemetría detenido correctamente")
+        except Exception as e:
+            logger.error(f"Error al detener el exportador de telemetría: {e}")
+        
+        # Volcar el uso de presupuestos pendiente
+        if settings.enable_budgets:
+            try:
+                from core.budget import budget_manager
+                await budget_manager.stop_flusher()
+                logger.info("Sistema de presupuestos detenido correctamente")
+            except Exception as e:
+                logger.error(f"Error al detener sistema de presupuestos: {e}")
+        
         # Detener sistema de priorización de solicitudes
         try:
             from core.request_prioritizer import request_prioritizer
@@ -5,14 +5,14 @@ Este módulo proporciona middleware para instrumentar aplicaciones FastAPI
 con telemetría, incluyendo métricas, tracing y logging.
 """
 
+import random
 import time
 import uuid
 from typing import Callable, Dict, Any, Optional
 
 from fastapi import FastAPI, Request, Response
 from fastapi.routing import APIRoute
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Local imports
 from core.telemetry import get_meter, get_tracer, record_exception, extract_trace_context
@@ -24,6 +24,10 @@ logger = configure_logging(__name__)
 # Importar configuración
 from core.settings import settings
 
+# Etiqueta usada cuando la solicitud no coincide con ninguna ruta registrada.
+# Evita que rutas inexistentes (escaneos, 404) generen series de métricas nuevas.
+UNMATCHED_ROUTE = "<unmatched>"
+
 # Variables globales para telemetría
 tracer = None
 meter = None
@@ -64,147 +68,231 @@ if settings.telemetry_enabled:
     )
 
 
-class TelemetryMiddleware(BaseHTTPMiddleware):
+def _get_default_tracer() -> Optional[Any]:
+    """Devuelve el tracer del módulo (None si la telemetría está deshabilitada)."""
+    return tracer
+
+
+def get_route_template(scope: Scope) -> str:
     """
-    Middleware para añadir telemetría a las solicitudes HTTP.
+    Obtiene la plantilla de la ruta que atendió la solicitud.
+    
+    El router de FastAPI deja la ruta coincidente en ``scope["route"]``, por lo
+    que ``/agents/abc/run`` se etiqueta como ``/agents/{agent_id}/run`` y la
+    cardinalidad de las métricas queda acotada al número de rutas declaradas.
+    
+    Args:
+        scope: Scope ASGI de la solicitud (tras pasar por el router).
+        
+    Returns:
+        str: Plantilla de la ruta o ``UNMATCHED_ROUTE`` si no hubo coincidencia.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path_format", None) or getattr(route, "path", None)
+    return path or UNMATCHED_ROUTE
+
+
+class TelemetryMiddleware:
+    """
+    Middleware ASGI para añadir telemetría a las solicitudes HTTP.
     
     Este middleware captura métricas de solicitudes HTTP, añade información
     de contexto a los spans, registra errores y excepciones, y proporciona
     correlación entre logs y traces.
+    
+    Se implementa como middleware ASGI puro: no crea tareas adicionales ni
+    almacena el cuerpo de la respuesta, por lo que es compatible con
+    respuestas en streaming. Las métricas se etiquetan con la plantilla de la
+    ruta y los spans se muestrean según ``sample_rate`` (las solicitudes que ya
+    traen un ``traceparent`` se trazan siempre para no romper trazas
+    distribuidas).
     """
     
-    def __init__(self, app: ASGIApp):
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: Optional[float] = None,
+        tracer: Optional[Any] = None,
+        meter: Optional[Any] = None,
+    ):
         """
         Inicializa el middleware de telemetría.
         
         Args:
             app: La aplicación ASGI a instrumentar.
+            sample_rate: Fracción de solicitudes que generan span (0.0 - 1.0).
+                Por defecto se usa ``settings.telemetry_trace_sample_rate``.
+            tracer: Tracer a utilizar (por defecto el tracer del módulo).
+            meter: Meter para crear las métricas (por defecto las del módulo).
         """
-        super().__init__(app)
+        self.app = app
+        self.sample_rate = settings.telemetry_trace_sample_rate if sample_rate is None else sample_rate
+        self.tracer = tracer if tracer is not None else _get_default_tracer()
+        
+        if meter is not None:
+            self.requests_counter = meter.create_counter(
+                name="http.requests", description="Número de solicitudes HTTP recibidas", unit="1"
+            )
+            self.request_duration = meter.create_histogram(
+                name="http.request.duration", description="Duración de las solicitudes HTTP", unit="ms"
+            )
+            self.request_size = meter.create_histogram(
+                name="http.request.size", description="Tamaño de las solicitudes HTTP", unit="bytes"
+            )
+            self.response_size = meter.create_histogram(
+                name="http.response.size", description="Tamaño de las respuestas HTTP", unit="bytes"
+            )
+        else:
+            self.requests_counter = http_requests_counter
+            self.request_duration = http_request_duration
+            self.request_size = http_request_size
+            self.response_size = http_response_size
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+    def _should_sample(self, has_traceparent: bool) -> bool:
+        """Decide si la solicitud genera un span."""
+        if self.tracer is None:
+            return False
+        if has_traceparent or self.sample_rate >= 1.0:
+            return True
+        return self.sample_rate > 0.0 and random.random() < self.sample_rate
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        Procesa una solicitud HTTP y añade telemetría.
+        Procesa una solicitud ASGI y añade telemetría.
         
         Args:
-            request: La solicitud HTTP.
-            call_next: La función para procesar la solicitud.
-            
-        Returns:
-            Response: La respuesta HTTP.
+            scope: Scope ASGI de la conexión.
+            receive: Canal de recepción de mensajes ASGI.
+            send: Canal de envío de mensajes ASGI.
         """
-        # Generar ID de solicitud si no existe
-        request_id = request.headers.get("X-Request-ID")
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # Leer solo las cabeceras necesarias, sin decodificar el resto
+        raw_headers = scope.get("headers", [])
+        request_id = None
+        content_length = None
+        has_traceparent = False
+        for key, value in raw_headers:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")
+            elif key == b"content-length":
+                content_length = value.decode("latin-1")
+            elif key == b"traceparent":
+                has_traceparent = True
+        
+        # Generar ID de solicitud si no existe y propagarlo hacia la aplicación
         if not request_id:
             request_id = str(uuid.uuid4())
-            # Añadir el ID de solicitud a los headers
-            request.headers.__dict__["_list"].append(
-                (b"x-request-id", request_id.encode())
-            )
+            scope = dict(scope)
+            scope["headers"] = [*raw_headers, (b"x-request-id", request_id.encode())]
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+        
+        method = scope.get("method", "")
+        state = {"status_code": 500, "response_size": 0}
+        
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                state["status_code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), request_id_header]
+            elif message["type"] == "http.response.body":
+                state["response_size"] += len(message.get("body", b""))
+            await send(message)
+        
+        start_time = time.perf_counter()
+        
+        if not self._should_sample(has_traceparent):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            except Exception:
+                self._record_metrics(scope, method, 500, start_time, content_length, state, error=True)
+                raise
+            self._record_metrics(scope, method, state["status_code"], start_time, content_length, state)
+            return
         
         # Extraer contexto de trace de los headers
-        trace_context = extract_trace_context(dict(request.headers))
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in raw_headers
+        }
+        trace_context = extract_trace_context(headers)
+        path = scope.get("path", "")
         
-        # Iniciar span para la solicitud
-        with tracer.start_as_current_span(
-            f"{request.method} {request.url.path}",
+        # Iniciar span para la solicitud (el nombre se actualiza con la plantilla de la ruta)
+        with self.tracer.start_as_current_span(
+            f"{method} {path}",
             context=trace_context,
             attributes={
-                "http.method": request.method,
-                "http.url": str(request.url),
-                "http.scheme": request.url.scheme,
-                "http.host": request.url.hostname,
-                "http.target": request.url.path,
+                "http.method": method,
+                "http.scheme": scope.get("scheme", "http"),
+                "http.host": headers.get("host", ""),
+                "http.target": path,
                 "http.request_id": request_id,
-                "http.user_agent": request.headers.get("user-agent", ""),
-                "http.client_ip": request.client.host if request.client else "",
+                "http.user_agent": headers.get("user-agent", ""),
+                "http.client_ip": scope["client"][0] if scope.get("client") else "",
             }
         ) as span:
-            start_time = time.time()
-            
-            # Registrar información de la solicitud
-            content_length = request.headers.get("content-length")
             if content_length:
                 span.set_attribute("http.request_content_length", int(content_length))
-                http_request_size.record(int(content_length))
             
             try:
-                # Procesar la solicitud
-                response = await call_next(request)
-                
-                # Registrar información de la respuesta
-                span.set_attribute("http.status_code", response.status_code)
-                
-                # Añadir el ID de solicitud a la respuesta
-                response.headers["X-Request-ID"] = request_id
-                
-                # Registrar métricas
-                duration_ms = (time.time() - start_time) * 1000
-                http_request_duration.record(
-                    duration_ms,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": str(response.status_code),
-                    }
-                )
-                
-                http_requests_counter.add(
-                    1,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": str(response.status_code),
-                    }
-                )
-                
-                # Registrar tamaño de la respuesta
-                resp_content_length = response.headers.get("content-length")
-                if resp_content_length:
-                    span.set_attribute("http.response_content_length", int(resp_content_length))
-                    http_response_size.record(int(resp_content_length))
-                
-                return response
-                
+                await self.app(scope, receive, send_wrapper)
             except Exception as e:
                 # Registrar la excepción en el span
                 record_exception(e, {"error.type": type(e).__name__})
                 span.set_attribute("http.status_code", 500)
-                
-                # Registrar métricas de error
-                duration_ms = (time.time() - start_time) * 1000
-                http_request_duration.record(
-                    duration_ms,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": "500",
-                        "error": True,
-                    }
-                )
-                
-                http_requests_counter.add(
-                    1,
-                    {
-                        "http.method": request.method,
-                        "http.route": request.url.path,
-                        "http.status_code": "500",
-                        "error": True,
-                    }
-                )
+                self._record_metrics(scope, method, 500, start_time, content_length, state, error=True)
                 
                 # Registrar el error
                 logger.exception(
-                    f"Error procesando solicitud: {request.method} {request.url.path}",
+                    f"Error procesando solicitud: {method} {path}",
                     extra={
                         "request_id": request_id,
-                        "http.method": request.method,
-                        "http.url": str(request.url),
+                        "http.method": method,
+                        "http.url": path,
                     }
                 )
                 
                 # Re-lanzar la excepción para que FastAPI la maneje
                 raise
+            
+            route = get_route_template(scope)
+            if hasattr(span, "update_name"):
+                span.update_name(f"{method} {route}")
+            span.set_attribute("http.route", route)
+            span.set_attribute("http.status_code", state["status_code"])
+            span.set_attribute("http.response_content_length", state["response_size"])
+            self._record_metrics(scope, method, state["status_code"], start_time, content_length, state)
+    
+    def _record_metrics(
+        self,
+        scope: Scope,
+        method: str,
+        status_code: int,
+        start_time: float,
+        content_length: Optional[str],
+        state: Dict[str, int],
+        error: bool = False,
+    ) -> None:
+        """Registra las métricas HTTP etiquetadas con la plantilla de la ruta."""
+        if self.requests_counter is None:
+            return
+        
+        attributes = {
+            "http.method": method,
+            "http.route": get_route_template(scope),
+            "http.status_code": str(status_code),
+        }
+        if error:
+            attributes["error"] = True
+        
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        self.request_duration.record(duration_ms, attributes)
+        self.requests_counter.add(1, attributes)
+        if content_length:
+            self.request_size.record(int(content_length))
+        self.response_size.record(state["response_size"])
 
 
 class TelemetryRoute(APIRoute):
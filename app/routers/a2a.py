@@ -12,9 +12,9 @@ import logging
 # Importar esquemas desde app.schemas.a2a
 from app.schemas.a2a import A2AProcessRequest, A2AResponse
 
-# Importar BaseAgent y get_agent desde la ubicación correcta
+# Importar BaseAgent y load_agent desde la ubicación correcta
 from agents.base.base_agent import BaseAgent 
-from app.routers.agents import get_agent
+from app.routers.agents import load_agent
 
 logger = logging.getLogger(__name__)
 router = APIRouter(
@@ -36,7 +36,7 @@ async def process_agent_request(
     logger.debug(f"A2A Router: Cuerpo de la solicitud: {request_body.dict()}")
 
     try:
-        agent: BaseAgent = get_agent(agent_id=agent_path_id)
+        agent: BaseAgent = await load_agent(agent_path_id)
     except HTTPException as e:
         logger.warning(f"A2A Router: Agente {agent_path_id} no encontrado. Detalle: {e.detail}")
         raise e
@@ -4,21 +4,17 @@ Router de agentes para la API de NGX Agents.
 Este módulo proporciona endpoints para interactuar con los agentes
 del sistema NGX Agents.
 """
+import asyncio
 from typing import Dict, List, Any, Optional
-import importlib
-import inspect
-import os
-import pkgutil
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
 
+from core.agent_registry import agent_registry
 from core.auth import get_current_user
 from core.logging_config import get_logger
-from infrastructure.adapters.state_manager_adapter import state_manager_adapter
+from core.settings import settings as app_settings
+from infrastructure.adapters.state_manager_adapter import StateManagerAdapter, state_manager_adapter
 from app.schemas.agent import AgentRunRequest, AgentRunResponse, AgentInfo, AgentListResponse
-from agents.base.base_agent import BaseAgent
-from tools.mcp_toolkit import MCPToolkit
-from agents.orchestrator.agent import NGXNexusOrchestrator
 from config import settings
 
 # Configurar logger
@@ -32,7 +28,7 @@ router = APIRouter(
 )
 
 
-def get_state_manager() -> StateManager:
+def get_state_manager() -> StateManagerAdapter:
     """
     Dependencia para obtener una instancia del StateManager.
     
@@ -42,94 +38,50 @@ def get_state_manager() -> StateManager:
     return state_manager_adapter
 
 
-def discover_agents() -> Dict[str, BaseAgent]:
+def _create_mcp_toolkit() -> Any:
+    """Crea el toolkit MCP compartido por los agentes (importado bajo demanda)."""
+    from tools.mcp_toolkit import MCPToolkit
+    return MCPToolkit()
+
+
+# Dependencias que el registro inyecta en los constructores de los agentes
+agent_registry.register_provider("state_manager", get_state_manager)
+agent_registry.register_provider("mcp_toolkit", _create_mcp_toolkit)
+agent_registry.register_provider("a2a_server_url", lambda: f"http://{settings.A2A_HOST}:{settings.A2A_PORT}")
+
+
+def discover_agents() -> Dict[str, Any]:
     """
-    Descubre todos los agentes disponibles en el sistema.
+    Construye todos los agentes declarados en el manifiesto.
+    
+    Solo se usa con la carga perezosa desactivada (``AGENT_LAZY_LOADING=False``);
+    en modo perezoso cada agente se construye en su primera petición.
     
     Returns:
         Diccionario con los agentes disponibles (agent_id -> instancia)
     """
-    agents = {}
-    agents_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "agents")
-    
-    # Excluir directorios y módulos que no son agentes
-    exclude_dirs = ["__pycache__", "base"]
-
-    # Preparar dependencias comunes
-    try:
-        sm_instance = get_state_manager()
-        toolkit_instance = MCPToolkit()
-        a2a_url = f"http://{settings.A2A_HOST}:{settings.A2A_PORT}"
-    except Exception as e:
-        logger.error(f"Error al inicializar dependencias para discover_agents: {e}", exc_info=True)
-        # Si las dependencias fallan, no podemos instanciar agentes
-        return agents
-    
-    # Recorrer todos los directorios en agents/
-    for item in os.listdir(agents_path):
-        item_path = os.path.join(agents_path, item)
-        
-        # Verificar si es un directorio y no está excluido
-        if os.path.isdir(item_path) and item not in exclude_dirs:
-            # Verificar si existe el archivo agent.py
-            agent_file = os.path.join(item_path, "agent.py")
-            if os.path.isfile(agent_file):
-                try:
-                    # Importar el módulo
-                    module_name = f"agents.{item}.agent"
-                    module = importlib.import_module(module_name)
-                    
-                    # Buscar clases que heredan de BaseAgent
-                    for name, obj_class in inspect.getmembers(module):
-                        if (inspect.isclass(obj_class) and 
-                            issubclass(obj_class, BaseAgent) and 
-                            obj_class != BaseAgent):
-                            
-                            # Preparar argumentos del constructor
-                            constructor_args = {
-                                "state_manager": sm_instance,
-                                "mcp_toolkit": toolkit_instance
-                            }
-                            
-                            # Si es el orquestador, añadir a2a_server_url
-                            if obj_class == NGXNexusOrchestrator:
-                                constructor_args["a2a_server_url"] = a2a_url
-                                # Opcional: pasar un model_id específico si es necesario aquí
-                                # constructor_args["model_id"] = settings.ORCHESTRATOR_DEFAULT_MODEL_ID
-
-                            # Instanciar el agente con los argumentos preparados
-                            agent_instance = obj_class(**constructor_args)
-                            agents[agent_instance.agent_id] = agent_instance
-                            logger.info(f"Agente descubierto e instanciado: {agent_instance.agent_id} ({agent_instance.name})")
-                            
-                except Exception as e:
-                    logger.error(f"Error al cargar o instanciar agente {item} ({module_name if 'module_name' in locals() else 'N/A'}): {e}", exc_info=True)
-    
+    agents = agent_registry.load_all()
+    for agent_id, agent in agents.items():
+        logger.info(f"Agente descubierto e instanciado: {agent_id} ({agent.name})")
     return agents
 
 
-# Caché de agentes
-_agents_cache: Dict[str, BaseAgent] = {}
-
-
-def get_agents() -> Dict[str, BaseAgent]:
+def get_agents() -> Dict[str, Any]:
     """
-    Obtiene todos los agentes disponibles (con caché).
+    Obtiene los agentes ya construidos, construyéndolos todos si la carga
+    perezosa está desactivada.
     
     Returns:
         Diccionario con los agentes disponibles (agent_id -> instancia)
     """
-    global _agents_cache
-    
-    if not _agents_cache:
-        _agents_cache = discover_agents()
-        
-    return _agents_cache
+    if not app_settings.agent_lazy_loading and not agent_registry.loaded_agents():
+        return discover_agents()
+    return agent_registry.loaded_agents()
 
 
-def get_agent(agent_id: str) -> BaseAgent:
+def get_agent(agent_id: str) -> Any:
     """
-    Obtiene un agente específico por su ID.
+    Obtiene un agente específico por su ID, construyéndolo en el primer uso.
     
     Args:
         agent_id: ID del agente
@@ -140,16 +92,53 @@ def get_agent(agent_id: str) -> BaseAgent:
     Raises:
         HTTPException: Si el agente no existe
     """
-    agents = get_agents()
-    
-    if agent_id not in agents:
+    if not agent_registry.has(agent_id):
         logger.warning(f"Agente no encontrado: {agent_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Agente {agent_id} no encontrado"
         )
     
-    return agents[agent_id]
+    try:
+        return agent_registry.get(agent_id)
+    except Exception as e:
+        logger.error(f"Error al cargar o instanciar agente {agent_id}: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Agente {agent_id} no disponible"
+        )
+
+
+async def load_agent(agent_id: str) -> Any:
+    """
+    Obtiene un agente desde un endpoint asíncrono.
+    
+    Si el agente aún no está construido, la importación y la construcción (o la
+    espera al precalentamiento que lo está construyendo) se hacen en un hilo
+    para no bloquear el event loop.
+    
+    Args:
+        agent_id: ID del agente
+        
+    Returns:
+        Instancia del agente
+        
+    Raises:
+        HTTPException: Si el agente no existe o no se puede construir
+    """
+    if agent_registry.is_loaded(agent_id):
+        return get_agent(agent_id)
+    return await asyncio.to_thread(get_agent, agent_id)
+
+
+def list_agent_metadata() -> List[Any]:
+    """
+    Obtiene los metadatos de los agentes desde el manifiesto, sin importarlos.
+    
+    Returns:
+        Lista de entradas con agent_id, name, description y capabilities
+    """
+    return agent_registry.list_agents()
 
 
 @router.get("/", response_model=AgentListResponse)
@@ -165,8 +154,6 @@ async def list_agents(
     Returns:
         Lista de agentes disponibles
     """
-    agents = get_agents()
-    
     agent_list = [
         AgentInfo(
             agent_id=agent.agent_id,
@@ -174,7 +161,7 @@ async def list_agents(
             description=agent.description,
             capabilities=agent.capabilities
         )
-        for agent in agents.values()
+        for agent in list_agent_metadata()
     ]
     
     logger.info(f"Usuario {user_id} solicitó lista de agentes")
@@ -187,7 +174,7 @@ async def run_agent(
     agent_id: str = Path(..., description="ID del agente a ejecutar"),
     request: AgentRunRequest = ...,
     user_id: str = Depends(get_current_user),
-    state_manager: StateManager = Depends(get_state_manager)
+    state_manager: StateManagerAdapter = Depends(get_state_manager)
 ) -> Dict[str, Any]:
     """
     Ejecuta un agente con un texto de entrada.
@@ -201,8 +188,8 @@ async def run_agent(
     Returns:
         Respuesta del agente
     """
-    # Obtener el agente
-    agent = get_agent(agent_id)
+    # Obtener el agente (construyéndolo fuera del event loop si hace falta)
+    agent = await load_agent(agent_id)
     
     # Obtener o generar session_id
     session_id = request.session_id or None
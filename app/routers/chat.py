@@ -16,7 +16,6 @@ from core.auth import get_current_user
 from core.logging_config import get_logger
 from infrastructure.adapters.state_manager_adapter import state_manager_adapter
 from app.schemas.chat import ChatRequest, ChatResponse, AgentResponse
-from agents.orchestrator.agent import NGXNexusOrchestrator
 from config import settings
 
 # Configurar logger
@@ -30,13 +29,14 @@ router = APIRouter(
 )
 
 # Variable global para el orquestador (Singleton)
-_orchestrator_instance: Optional[NGXNexusOrchestrator] = None
+_orchestrator_instance: Optional[Any] = None
 _orchestrator_lock = asyncio.Lock()
 
-def get_orchestrator() -> NGXNexusOrchestrator:
+def get_orchestrator() -> Any:
     """
     Dependencia para obtener una instancia del Orchestrator.
-    Utiliza un patrón Singleton simple para la instancia del orquestador.
+    Utiliza un patrón Singleton simple para la instancia del orquestador; el
+    módulo del orquestador se importa en la primera petición.
     
     Returns:
         Instancia del Orchestrator
@@ -44,6 +44,8 @@ def get_orchestrator() -> NGXNexusOrchestrator:
     global _orchestrator_instance
 
     if _orchestrator_instance is None:
+        from agents.orchestrator.agent import NGXNexusOrchestrator
+
         logger.info("Creando nueva instancia de NGXNexusOrchestrator.")
         state_manager = state_manager_adapter
         
@@ -70,7 +72,7 @@ async def chat(
     request: ChatRequest,
     background_tasks: BackgroundTasks,
     user_id: Optional[str] = Depends(get_current_user),
-    orchestrator: NGXNexusOrchestrator = Depends(get_orchestrator)
+    orchestrator: Any = Depends(get_orchestrator)
 ) -> Dict[str, Any]:
     """
     Procesa un mensaje de chat utilizando el Orchestrator.
@@ -161,7 +163,7 @@ async def chat_stream(
     request: ChatRequest,
     background_tasks: BackgroundTasks,
     user_id: Optional[str] = Depends(get_current_user),
-    orchestrator: NGXNexusOrchestrator = Depends(get_orchestrator)
+    orchestrator: Any = Depends(get_orchestrator)
 ):
     """
     Procesa un mensaje de chat y devuelve la respuesta como un stream.
@@ -1,10 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, Any, Optional, List
 
+from core.analysis_envelope import AnalysisEnvelope
+
 class A2ATaskContext(BaseModel):
     user_id: Optional[str] = None
-    # Otros campos de contexto que puedan ser necesarios
-    # Ejemplo: session_id: Optional[str] = None 
+    session_id: Optional[str] = None
+    additional_context: Dict[str, Any] = Field(default_factory=dict)
+    # Análisis de intención del orquestador para que los agentes no lo repitan
+    analysis: Optional[AnalysisEnvelope] = None
 
 class A2ATaskRequest(BaseModel):
     input: str
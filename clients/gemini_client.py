@@ -5,13 +5,18 @@ Cliente para interactuar con la API de Gemini de Google.
 Este cliente implementa el patrón Singleton para asegurar una única instancia
 y proporciona métodos para generar respuestas, analizar intenciones y más.
 """
+import asyncio
+import hashlib
 import logging
 import os
 import base64
 import mimetypes
 import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union, BinaryIO, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Union, BinaryIO, Tuple
 
 import google.generativeai as genai
 from google.generativeai.types import GenerationConfig
@@ -21,9 +26,87 @@ from config.secrets import settings
 from core.budget import budget_manager
 from core.prompt_analyzer import prompt_analyzer
 from core.domain_cache import domain_cache, CacheStrategy
+from core.prompt_builder import PREFIX_SEPARATOR, estimate_tokens, hash_prefix
 
 logger = logging.getLogger(__name__)
 
+# Agente que origina la llamada actual. Se propaga por contexto (tarea asyncio)
+# para que llamadas concurrentes de distintos agentes no se atribuyan entre sí.
+_current_agent_id: ContextVar[str] = ContextVar("gemini_current_agent_id", default="default")
+
+
+class GeminiModelRegistry:
+    """
+    Caché de instancias de ``genai.GenerativeModel``.
+    
+    Las instancias se indexan por (nombre del modelo, configuración de
+    generación, configuración de seguridad) y se reutilizan entre llamadas,
+    de modo que cambiar de modelo (p. ej. al degradar por presupuesto) no
+    construye un objeto nuevo por llamada ni modifica estado compartido.
+    """
+    
+    def __init__(self, max_models: int = 32):
+        """
+        Inicializa el registro.
+        
+        Args:
+            max_models: Número máximo de instancias en caché (LRU)
+        """
+        self.max_models = max_models
+        self._models: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+    
+    @staticmethod
+    def _freeze(value: Any) -> Any:
+        """Convierte diccionarios y listas en una clave hashable."""
+        if isinstance(value, dict):
+            return tuple(sorted((str(k), GeminiModelRegistry._freeze(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)):
+            return tuple(GeminiModelRegistry._freeze(v) for v in value)
+        return value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+    
+    def get(
+        self,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        safety_settings: Optional[Any] = None
+    ) -> Any:
+        """
+        Obtiene (o crea) la instancia del modelo para una configuración.
+        
+        Args:
+            model_name: Nombre del modelo de Gemini
+            generation_config: Parámetros de generación
+            safety_settings: Configuración de filtros de seguridad
+            
+        Returns:
+            Instancia de ``genai.GenerativeModel``
+        """
+        key = (model_name, self._freeze(generation_config), self._freeze(safety_settings))
+        model = self._models.get(key)
+        if model is not None:
+            self._models.move_to_end(key)
+            self.stats["hits"] += 1
+            return model
+        
+        self.stats["misses"] += 1
+        kwargs: Dict[str, Any] = {}
+        if generation_config:
+            kwargs["generation_config"] = GenerationConfig(**generation_config)
+        if safety_settings:
+            kwargs["safety_settings"] = safety_settings
+        model = genai.GenerativeModel(model_name, **kwargs)
+        
+        self._models[key] = model
+        if len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+            self.stats["evictions"] += 1
+        return model
+    
+    def clear(self) -> None:
+        """Elimina todas las instancias en caché."""
+        self._models.clear()
+
 
 class GeminiClient(BaseClient):
     """
@@ -64,9 +147,14 @@ class GeminiClient(BaseClient):
         super().__init__(service_name="gemini")
         self.model_name = model_name
         self.model = None
+        self.models = GeminiModelRegistry()
         self.optimize_prompts = optimize_prompts
         self.use_cache = use_cache
         self.cache_ttl = cache_ttl
+        # Prefijos de prompt ya enviados (hash -> tokens), para medir su reutilización
+        self._prefix_registry: "OrderedDict[str, int]" = OrderedDict()
+        self.prefix_registry_size = 256
+        self.prefix_stats = {"hits": 0, "misses": 0, "reused_prefix_tokens": 0}
         self._initialized = True
     
     async def initialize(self) -> None:
@@ -82,7 +170,7 @@ class GeminiClient(BaseClient):
         genai.configure(api_key=settings.GEMINI_API_KEY)
         
         # Inicializar el modelo
-        self.model = genai.GenerativeModel(self.model_name)
+        self.model = self.models.get(self.model_name)
         logger.info(f"Cliente Gemini inicializado con modelo {self.model_name}")
     
     @retry_with_backoff()
@@ -93,7 +181,8 @@ class GeminiClient(BaseClient):
         max_output_tokens: int = 1024,
         top_p: float = 0.95,
         top_k: int = 40,
-        safety_settings: Optional[Dict[str, Any]] = None
+        safety_settings: Optional[Dict[str, Any]] = None,
+        model_name: Optional[str] = None
     ) -> str:
         """
         Genera texto a partir de un prompt utilizando Gemini.
@@ -105,6 +194,7 @@ class GeminiClient(BaseClient):
             top_p: Parámetro de nucleus sampling
             top_k: Parámetro de top-k sampling
             safety_settings: Configuración de filtros de seguridad
+            model_name: Modelo a usar en esta llamada (por defecto el del cliente)
             
         Returns:
             Texto generado por el modelo
@@ -114,17 +204,19 @@ class GeminiClient(BaseClient):
         
         self._record_call("generate_text")
         
-        generation_config = GenerationConfig(
-            temperature=temperature,
-            max_output_tokens=max_output_tokens,
-            top_p=top_p,
-            top_k=top_k
-        )
+        generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "top_p": top_p,
+            "top_k": top_k
+        }
         
         try:
-            # Verificar caché primero si está habilitado
-            agent_id = getattr(self, "current_agent_id", "default")
-            cache_domain = f"gemini:{agent_id}"
+            # Verificar caché primero si está habilitado; la clave incluye el modelo
+            # y la configuración, que también determinan la respuesta
+            agent_id = self.current_agent_id
+            selected_model = model_name or self.model_name
+            cache_domain = self._cache_domain("gemini", agent_id, selected_model, generation_config, safety_settings)
             
             if self.use_cache:
                 cached_result = await domain_cache.get(
@@ -148,50 +240,55 @@ class GeminiClient(BaseClient):
             # Estimar tokens de entrada (aproximado)
             prompt_tokens = self._estimate_tokens(prompt)
             
-            # Verificar presupuesto antes de la llamada
-            allowed, fallback_model = await budget_manager.record_usage(
-                agent_id=agent_id,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=0,  # Se actualizará después
-                model=self.model_name
-            )
+            # Verificar presupuesto antes de la llamada (lectura sin lock)
+            allowed, fallback_model = budget_manager.check_budget(agent_id, prompt_tokens)
             
             if not allowed:
+                if budget_manager.should_queue(agent_id):
+                    # Diferir la llamada hasta que el agente recupere presupuesto;
+                    # el resultado quedará en caché para la siguiente solicitud
+                    try:
+                        budget_manager.defer(
+                            agent_id, self.generate_text, original_prompt,
+                            temperature=temperature, max_output_tokens=max_output_tokens,
+                            top_p=top_p, top_k=top_k, safety_settings=safety_settings,
+                            model_name=model_name
+                        )
+                        logger.info(f"Llamada puesta en cola por límite de presupuesto para agente {agent_id}")
+                        return "Tu solicitud ha sido puesta en cola y se procesará cuando haya presupuesto disponible."
+                    except asyncio.QueueFull:
+                        logger.warning(f"Cola de presupuesto llena para agente {agent_id}")
                 logger.warning(f"Llamada bloqueada por límite de presupuesto para agente {agent_id}")
                 return "Lo siento, no puedo procesar esta solicitud debido a restricciones de presupuesto."
             
             # Si se debe degradar a un modelo más económico
             if fallback_model:
-                logger.info(f"Cambiando de {self.model_name} a {fallback_model} por restricciones de presupuesto")
-                original_model = self.model
-                self.model = genai.GenerativeModel(fallback_model)
-                
-                response = await self.model.generate_content_async(
-                    prompt,
-                    generation_config=generation_config,
-                    safety_settings=safety_settings
-                )
-                
-                # Restaurar modelo original para futuras llamadas
-                self.model = original_model
-            else:
-                response = await self.model.generate_content_async(
-                    prompt,
-                    generation_config=generation_config,
-                    safety_settings=safety_settings
-                )
-            
-            # Estimar tokens de salida y actualizar presupuesto
-            completion_tokens = self._estimate_tokens(response.text)
+                logger.info(f"Cambiando de {selected_model} a {fallback_model} por restricciones de presupuesto")
+                selected_model = fallback_model
+                cache_domain = self._cache_domain("gemini", agent_id, selected_model, generation_config, safety_settings)
+                if self.use_cache:
+                    cached_result = await domain_cache.get(
+                        prompt=original_prompt,
+                        domain=cache_domain,
+                        strategy=CacheStrategy.EXACT_MATCH
+                    )
+                    if cached_result is not None:
+                        logger.info(f"Resultado obtenido de caché para agente {agent_id} con {selected_model}")
+                        return cached_result
+            
+            model = self.models.get(selected_model, generation_config, safety_settings)
+            response = await model.generate_content_async(prompt)
+            
+            # Registrar el uso total de la llamada en el presupuesto
+            result_text = response.text
+            completion_tokens = self._estimate_tokens(result_text)
             await budget_manager.record_usage(
                 agent_id=agent_id,
-                prompt_tokens=0,  # Ya contabilizados antes
+                prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
-                model=self.model_name
+                model=selected_model
             )
             
-            result_text = response.text
-            
             # Guardar en caché si está habilitado
             if self.use_cache:
                 await domain_cache.set(
@@ -201,7 +298,7 @@ class GeminiClient(BaseClient):
                     ttl=self.cache_ttl,
                     strategy=CacheStrategy.EXACT_MATCH,
                     metadata={
-                        "model": self.model_name,
+                        "model": selected_model,
                         "agent_id": agent_id,
                         "prompt_tokens": prompt_tokens,
                         "completion_tokens": completion_tokens
@@ -218,7 +315,8 @@ class GeminiClient(BaseClient):
         self, 
         messages: List[Dict[str, str]], 
         temperature: float = 0.7,
-        max_output_tokens: int = 1024
+        max_output_tokens: int = 1024,
+        model_name: Optional[str] = None
     ) -> str:
         """
         Mantiene una conversación con el modelo.
@@ -227,6 +325,7 @@ class GeminiClient(BaseClient):
             messages: Lista de mensajes en formato [{"role": "user|model", "content": "texto"}]
             temperature: Control de aleatoriedad (0.0-1.0)
             max_output_tokens: Longitud máxima de la respuesta
+            model_name: Modelo a usar en esta llamada (por defecto el del cliente)
             
         Returns:
             Respuesta del modelo a la conversación
@@ -236,9 +335,16 @@ class GeminiClient(BaseClient):
         
         self._record_call("chat")
         
-        # Verificar caché primero si está habilitado
-        agent_id = getattr(self, "current_agent_id", "default")
-        cache_domain = f"gemini_chat:{agent_id}"
+        generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens
+        }
+        
+        # Verificar caché primero si está habilitado; la clave incluye el modelo
+        # y la configuración, que también determinan la respuesta
+        agent_id = self.current_agent_id
+        selected_model = model_name or self.model_name
+        cache_domain = self._cache_domain("gemini_chat", agent_id, selected_model, generation_config)
         
         # Crear una clave de caché basada en los mensajes
         import json
@@ -273,14 +379,8 @@ class GeminiClient(BaseClient):
         # Estimar tokens de entrada (aproximado)
         prompt_tokens = sum(self._estimate_tokens(msg.get("content", "")) for msg in messages)
         
-        # Verificar presupuesto antes de la llamada
-        agent_id = getattr(self, "current_agent_id", "default")
-        allowed, fallback_model = await budget_manager.record_usage(
-            agent_id=agent_id,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=0,  # Se actualizará después
-            model=self.model_name
-        )
+        # Verificar presupuesto antes de la llamada (lectura sin lock)
+        allowed, fallback_model = budget_manager.check_budget(agent_id, prompt_tokens)
         
         if not allowed:
             logger.warning(f"Llamada de chat bloqueada por límite de presupuesto para agente {agent_id}")
@@ -288,42 +388,37 @@ class GeminiClient(BaseClient):
         
         # Si se debe degradar a un modelo más económico
         if fallback_model:
-            logger.info(f"Cambiando de {self.model_name} a {fallback_model} por restricciones de presupuesto")
-            original_model = self.model
-            self.model = genai.GenerativeModel(fallback_model)
-            
-            chat = self.model.start_chat(history=[])
-            
-            # Agregar mensajes previos al historial
-            for msg in messages[:-1]:
-                if msg["role"] == "user":
-                    chat.send_message(msg["content"])
-                # Los mensajes del modelo se agregan automáticamente
-            
-            # Enviar el último mensaje y obtener respuesta
-            response = await chat.send_message_async(messages[-1]["content"])
-            
-            # Restaurar modelo original para futuras llamadas
-            self.model = original_model
-        else:
-            chat = self.model.start_chat(history=[])
-            
-            # Agregar mensajes previos al historial
-            for msg in messages[:-1]:
-                if msg["role"] == "user":
-                    chat.send_message(msg["content"])
-                # Los mensajes del modelo se agregan automáticamente
-            
-            # Enviar el último mensaje y obtener respuesta
-            response = await chat.send_message_async(messages[-1]["content"])
+            logger.info(f"Cambiando de {selected_model} a {fallback_model} por restricciones de presupuesto")
+            selected_model = fallback_model
+            cache_domain = self._cache_domain("gemini_chat", agent_id, selected_model, generation_config)
+            if self.use_cache:
+                cached_result = await domain_cache.get(
+                    prompt=cache_key,
+                    domain=cache_domain,
+                    strategy=CacheStrategy.EXACT_MATCH
+                )
+                if cached_result is not None:
+                    logger.info(f"Resultado de chat obtenido de caché para agente {agent_id} con {selected_model}")
+                    return cached_result
+        
+        chat = self.models.get(selected_model, generation_config).start_chat(history=[])
+        
+        # Agregar mensajes previos al historial
+        for msg in messages[:-1]:
+            if msg["role"] == "user":
+                chat.send_message(msg["content"])
+            # Los mensajes del modelo se agregan automáticamente
+        
+        # Enviar el último mensaje y obtener respuesta
+        response = await chat.send_message_async(messages[-1]["content"])
         
-        # Estimar tokens de salida y actualizar presupuesto
+        # Registrar el uso total de la llamada en el presupuesto
         completion_tokens = self._estimate_tokens(response.text)
         await budget_manager.record_usage(
             agent_id=agent_id,
-            prompt_tokens=0,  # Ya contabilizados antes
+            prompt_tokens=prompt_tokens,
             completion_tokens=completion_tokens,
-            model=self.model_name
+            model=selected_model
         )
         
         result_text = response.text
@@ -337,7 +432,7 @@ class GeminiClient(BaseClient):
                 ttl=self.cache_ttl,
                 strategy=CacheStrategy.EXACT_MATCH,
                 metadata={
-                    "model": self.model_name,
+                    "model": selected_model,
                     "agent_id": agent_id,
                     "prompt_tokens": prompt_tokens,
                     "completion_tokens": completion_tokens,
@@ -381,7 +476,85 @@ class GeminiClient(BaseClient):
         except Exception as e:
             logger.error(f"Error al parsear la respuesta de análisis de intención: {str(e)}")
             return {"agents": [], "confidence": 0.0, "intent": "unknown"}
-    
+
+    @retry_with_backoff()
+    async def generate_structured_output(
+        self,
+        prompt: str,
+        response_schema: Optional[Dict[str, Any]] = None,
+        response_mime_type: str = "application/json",
+        temperature: float = 0.2,
+        max_output_tokens: int = 2048,
+        model_name: Optional[str] = None,
+        prompt_prefix: Optional[str] = None,
+        prefix_hash: Optional[str] = None
+    ) -> Any:
+        """
+        Genera una respuesta JSON restringida por un esquema.
+
+        El esquema y el tipo MIME se pasan en la configuración de generación,
+        de modo que el modelo devuelve directamente JSON con la forma pedida.
+        Si se indica un prefijo estable, se envía al principio del prompt (la
+        parte que Gemini puede reutilizar entre llamadas) y se registra su uso.
+
+        Args:
+            prompt: Texto de entrada
+            response_schema: Esquema de la respuesta (formato de Gemini)
+            response_mime_type: Tipo MIME de la respuesta
+            temperature: Control de aleatoriedad (0.0-1.0)
+            max_output_tokens: Longitud máxima de la respuesta
+            model_name: Modelo a usar en esta llamada (por defecto el del cliente)
+            prompt_prefix: Prefijo estable que precede al prompt (opcional)
+            prefix_hash: Hash del prefijo; si se omite se calcula a partir de ``prompt_prefix``
+
+        Returns:
+            Respuesta decodificada, o None si el presupuesto no lo permite o la
+            respuesta no es JSON válido
+        """
+        if not self.model:
+            await self.initialize()
+
+        self._record_call("generate_structured_output")
+
+        generation_config: Dict[str, Any] = {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "response_mime_type": response_mime_type
+        }
+        if response_schema is not None:
+            generation_config["response_schema"] = response_schema
+
+        if prompt_prefix:
+            self._register_prefix(prefix_hash or hash_prefix(prompt_prefix), prompt_prefix)
+            prompt = f"{prompt_prefix}{PREFIX_SEPARATOR}{prompt}"
+
+        agent_id = self.current_agent_id
+        prompt_tokens = self._estimate_tokens(prompt)
+        selected_model = model_name or self.model_name
+        allowed, fallback_model = budget_manager.check_budget(agent_id, prompt_tokens)
+        if not allowed:
+            logger.warning(f"Llamada estructurada bloqueada por límite de presupuesto para agente {agent_id}")
+            return None
+        if fallback_model:
+            selected_model = fallback_model
+
+        model = self.models.get(selected_model, generation_config)
+        response = await model.generate_content_async(prompt)
+        result_text = response.text
+        await budget_manager.record_usage(
+            agent_id=agent_id,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=self._estimate_tokens(result_text),
+            model=selected_model
+        )
+
+        try:
+            import json
+            return json.loads(result_text)
+        except ValueError as e:
+            logger.error(f"Respuesta estructurada no válida: {str(e)}")
+            return None
+
     @retry_with_backoff()
     async def summarize(self, text: str, max_words: int = 100) -> str:
         """
@@ -605,15 +778,86 @@ class GeminiClient(BaseClient):
             }
 
 
+    @property
+    def current_agent_id(self) -> str:
+        """Agente al que se atribuyen las llamadas en el contexto actual."""
+        return _current_agent_id.get()
+    
+    @current_agent_id.setter
+    def current_agent_id(self, agent_id: str) -> None:
+        _current_agent_id.set(agent_id)
+    
     def set_current_agent(self, agent_id: str) -> None:
         """
         Establece el agente actual para el seguimiento de presupuesto.
         
+        El valor se guarda en una variable de contexto, por lo que solo afecta
+        a la tarea asyncio actual (y a las tareas que cree a partir de ella).
+        
         Args:
             agent_id: ID del agente que está realizando la llamada
         """
-        self.current_agent_id = agent_id
+        _current_agent_id.set(agent_id)
+    
+    @contextmanager
+    def agent_context(self, agent_id: str) -> Iterator[None]:
+        """
+        Atribuye al agente indicado las llamadas realizadas dentro del bloque.
+        
+        Args:
+            agent_id: ID del agente que está realizando las llamadas
+        """
+        token = _current_agent_id.set(agent_id)
+        try:
+            yield
+        finally:
+            _current_agent_id.reset(token)
+    
+    @staticmethod
+    def _cache_domain(
+        kind: str,
+        agent_id: str,
+        model_name: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        safety_settings: Optional[Any] = None
+    ) -> str:
+        """
+        Construye el dominio de caché de una llamada.
+        
+        Args:
+            kind: Tipo de llamada (``gemini`` o ``gemini_chat``)
+            agent_id: ID del agente que realiza la llamada
+            model_name: Modelo que genera la respuesta
+            generation_config: Parámetros de generación
+            safety_settings: Configuración de filtros de seguridad
+            
+        Returns:
+            str: Dominio con el agente, el modelo y el hash de la configuración
+        """
+        config = GeminiModelRegistry._freeze((generation_config, safety_settings))
+        config_hash = hashlib.sha256(repr(config).encode("utf-8")).hexdigest()[:16]
+        return f"{kind}:{agent_id}:{model_name}:{config_hash}"
     
+    def _register_prefix(self, prefix_hash: str, prompt_prefix: str) -> None:
+        """
+        Registra el uso de un prefijo de prompt.
+
+        Args:
+            prefix_hash: Hash del prefijo
+            prompt_prefix: Texto del prefijo
+        """
+        tokens = self._prefix_registry.get(prefix_hash)
+        if tokens is not None:
+            self._prefix_registry.move_to_end(prefix_hash)
+            self.prefix_stats["hits"] += 1
+            self.prefix_stats["reused_prefix_tokens"] += tokens
+            return
+
+        self._prefix_registry[prefix_hash] = estimate_tokens(prompt_prefix)
+        self.prefix_stats["misses"] += 1
+        while len(self._prefix_registry) > self.prefix_registry_size:
+            self._prefix_registry.popitem(last=False)
+
     def _estimate_tokens(self, text: str) -> int:
         """
         Estima el número de tokens en un texto.
@@ -9,6 +9,10 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Union
 
 from .supabase_client import SupabaseClient
+from .supabase_write_buffer import SupabaseWriteBuffer, supabase_write_buffer
+
+# Tabla de mensajes de conversación
+CONVERSATION_TABLE = "conversations"
 
 
 class PersistenceClient:
@@ -18,14 +22,16 @@ class PersistenceClient:
     Proporciona métodos para gestionar usuarios y conversaciones.
     """
     
-    def __init__(self, supabase_client: SupabaseClient):
+    def __init__(self, supabase_client: SupabaseClient, write_buffer: Optional[SupabaseWriteBuffer] = None):
         """
         Inicializa el cliente de persistencia.
         
         Args:
             supabase_client: Cliente de Supabase
+            write_buffer: Búfer de escritura diferida (por defecto el global)
         """
         self.supabase_client = supabase_client
+        self.write_buffer = write_buffer or supabase_write_buffer
         
         # Para modo mock
         self.is_mock = False
@@ -90,6 +96,34 @@ class PersistenceClient:
             # Implementación real (asíncrona)
             raise NotImplementedError("Implementación real no disponible en modo sincrónico")
     
+    async def log_conversation_message_async(self, user_id: str, role: str, message: str) -> bool:
+        """
+        Registra un mensaje de conversación sin esperar a la base de datos.
+        
+        En modo real la fila se encola en el búfer de escritura diferida y se
+        inserta en lote junto con el resto de mensajes pendientes.
+        
+        Args:
+            user_id: ID del usuario
+            role: Rol del mensaje (user, agent, system)
+            message: Contenido del mensaje
+            
+        Returns:
+            True si se registró (o encoló) correctamente
+        """
+        if self.is_mock:
+            return self.log_conversation_message(user_id, role, message)
+        
+        message_data = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "role": role,
+            "message": message,
+            "created_at": datetime.now().isoformat()
+        }
+        await self.write_buffer.insert(CONVERSATION_TABLE, [message_data], upsert=True)
+        return True
+    
     def get_conversation_history(
         self, user_id: str, limit: Optional[int] = None, offset: int = 0
     ) -> List[Dict[str, Any]]:
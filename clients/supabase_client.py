@@ -9,6 +9,8 @@ interactuar con la base de datos.
 import os
 import logging
 import time
+import uuid
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional, List, Union
 import asyncio
 from contextlib import asynccontextmanager
@@ -28,6 +30,9 @@ from core.logging_config import get_logger
 # Configurar logger
 logger = get_logger(__name__)
 
+# Tabla de registro de actividad de los agentes
+ACTIVITY_TABLE = "agent_activities"
+
 class SupabaseClient:
     """
     Cliente Singleton para Supabase.
@@ -198,6 +203,74 @@ class SupabaseClient:
         except Exception as e:
             logger.error(f"Error al ejecutar consulta en Supabase: {e}")
             raise
+    
+    async def insert(self, table_name: str, data: Union[Dict[str, Any], List[Dict[str, Any]]],
+                     upsert: bool = False) -> List[Dict[str, Any]]:
+        """
+        Inserta una o varias filas en una sola llamada.
+        
+        Args:
+            table_name: Nombre de la tabla
+            data: Fila o lista de filas
+            upsert: Si es True, actualiza las filas existentes con la misma clave
+            
+        Returns:
+            List[Dict[str, Any]]: Filas escritas
+        """
+        client = await self.get_client()
+        query = client.table(table_name)
+        query = query.upsert(data) if upsert else query.insert(data)
+        result = await query.execute()
+        return result.data or []
+    
+    async def update(self, table_name: str, data: Dict[str, Any], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Actualiza las filas que cumplen filtros de igualdad.
+        
+        Args:
+            table_name: Nombre de la tabla
+            data: Campos a actualizar
+            filters: Filtros de igualdad por columna
+            
+        Returns:
+            List[Dict[str, Any]]: Filas actualizadas
+        """
+        client = await self.get_client()
+        query = client.table(table_name).update(data)
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        result = await query.execute()
+        return result.data or []
+    
+    async def log_agent_activity(self, agent_id: str, activity_type: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Registra una actividad de un agente.
+        
+        Con ``SUPABASE_WRITE_BEHIND`` la fila se encola en el búfer de escritura
+        diferida y se vuelca en lote; el ID se genera en cliente para que el
+        llamante lo tenga sin esperar a la base de datos.
+        
+        Args:
+            agent_id: ID del agente
+            activity_type: Tipo de actividad
+            details: Detalles de la actividad
+            
+        Returns:
+            Dict[str, Any]: Fila registrada (incluye ``id``)
+        """
+        row = {
+            "id": str(uuid.uuid4()),
+            "agent_id": agent_id,
+            "activity_type": activity_type,
+            "details": details,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        if settings.supabase_write_behind:
+            from clients.supabase_write_buffer import supabase_write_buffer
+            await supabase_write_buffer.insert(ACTIVITY_TABLE, [row], upsert=True)
+        else:
+            await self.insert(ACTIVITY_TABLE, row, upsert=True)
+        return row
 
 
 class MockSupabaseClient:
@@ -280,15 +353,53 @@ class MockSupabaseClient:
         """
         return self
     
+    def insert(self, data: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """
+        Inserta filas.
+        
+        Args:
+            data: Fila o lista de filas
+            
+        Returns:
+            self: Instancia del cliente para encadenar métodos
+        """
+        self.current_data = data if isinstance(data, list) else [data]
+        return self
+    
+    def upsert(self, data: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """
+        Inserta o actualiza filas.
+        
+        Args:
+            data: Fila o lista de filas
+            
+        Returns:
+            self: Instancia del cliente para encadenar métodos
+        """
+        return self.insert(data)
+    
+    def update(self, data: Dict[str, Any]):
+        """
+        Actualiza filas.
+        
+        Args:
+            data: Campos a actualizar
+            
+        Returns:
+            self: Instancia del cliente para encadenar métodos
+        """
+        self.current_data = []
+        return self
+    
     async def execute(self):
         """
         Ejecuta la consulta.
         
         Returns:
-            MockSupabaseResult: Resultado mock
+            MockSupabaseResult: Resultado mock (las filas escritas, si las hay)
         """
-        # Devolver resultado mock
-        return MockSupabaseResult([])
+        data, self.current_data = getattr(self, "current_data", []), []
+        return MockSupabaseResult(data)
 
 
 class MockSupabaseResult:
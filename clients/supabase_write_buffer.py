@@ -0,0 +1,514 @@
+"""
+Búfer de escritura diferida (write-behind) para Supabase.
+
+Las inserciones y actualizaciones que no necesitan su resultado en la ruta de
+la petición (registro de actividad, estado, eventos) se encolan y se vuelcan
+en lotes por tabla:
+
+- las inserciones de una tabla se agrupan en una única llamada ``insert``/
+  ``upsert`` de hasta ``batch_size`` filas;
+- las actualizaciones con los mismos filtros se fusionan (los campos más
+  recientes prevalecen) y se envían una sola vez;
+- dentro de una tabla las inserciones se vuelcan antes que las actualizaciones.
+
+El volcado se dispara por tamaño (``batch_size`` filas pendientes en una
+tabla) o por antigüedad (``max_age`` segundos). Los lotes que fallan se
+reintentan con espera exponencial y, si se agotan los reintentos, vuelven al
+búfer. Cuando hay ``max_pending`` escrituras pendientes los productores esperan
+(contrapresión) y, si no se libera espacio a tiempo, reciben
+``asyncio.QueueFull``.
+
+Con ``wal_path`` cada escritura se añade a un fichero JSON Lines antes de
+confirmarse al llamante y el fichero se compacta tras cada volcado; al
+arrancar se reproducen las escrituras pendientes. La entrega es "al menos una
+vez": si el proceso cae durante un volcado, las filas de ese lote se reenvían,
+por lo que conviene usar ``upsert`` con identificadores generados en cliente.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.logging_config import get_logger
+from core.settings import settings
+
+logger = get_logger(__name__)
+
+InsertKey = Tuple[str, bool]
+UpdateKey = Tuple[str, str]
+
+
+class InMemoryWriteStore:
+    """
+    Almacén de escritura en memoria con la interfaz de ``SupabaseWriteStore``.
+
+    Útil para pruebas: registra cada llamada y permite simular fallos.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: List[Tuple[str, str, int]] = []
+        self.failures_remaining = 0
+
+    def _maybe_fail(self) -> None:
+        if self.failures_remaining > 0:
+            self.failures_remaining -= 1
+            raise ConnectionError("Fallo simulado del almacén")
+
+    async def insert(self, table: str, rows: List[Dict[str, Any]], upsert: bool = False) -> List[Dict[str, Any]]:
+        """
+        Inserta (o actualiza por ``id`` si ``upsert``) un lote de filas.
+
+        Args:
+            table: Nombre de la tabla
+            rows: Filas a insertar
+            upsert: Si las filas con el mismo ``id`` se sustituyen
+
+        Returns:
+            List[Dict[str, Any]]: Filas escritas
+        """
+        self._maybe_fail()
+        self.calls.append(("upsert" if upsert else "insert", table, len(rows)))
+        stored = self.tables.setdefault(table, [])
+        for row in rows:
+            if upsert and "id" in row:
+                existing = next((item for item in stored if item.get("id") == row["id"]), None)
+                if existing is not None:
+                    existing.update(row)
+                    continue
+            stored.append(dict(row))
+        return rows
+
+    async def update(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Actualiza las filas que cumplen los filtros de igualdad.
+
+        Args:
+            table: Nombre de la tabla
+            data: Campos a actualizar
+            filters: Filtros de igualdad por columna
+
+        Returns:
+            List[Dict[str, Any]]: Filas actualizadas
+        """
+        self._maybe_fail()
+        self.calls.append(("update", table, 1))
+        updated = []
+        for row in self.tables.get(table, []):
+            if all(row.get(column) == value for column, value in filters.items()):
+                row.update(data)
+                updated.append(row)
+        return updated
+
+
+class SupabaseWriteStore:
+    """Almacén de escritura que envía los lotes al cliente de Supabase."""
+
+    def __init__(self, client: Optional[Any] = None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            client: Cliente de Supabase (por defecto el global)
+        """
+        self.client = client
+
+    def _get_client(self) -> Any:
+        if self.client is None:
+            from clients.supabase_client import supabase_client
+            self.client = supabase_client
+        return self.client
+
+    async def insert(self, table: str, rows: List[Dict[str, Any]], upsert: bool = False) -> List[Dict[str, Any]]:
+        return await self._get_client().insert(table_name=table, data=rows, upsert=upsert)
+
+    async def update(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._get_client().update(table_name=table, data=data, filters=filters)
+
+
+class SupabaseWriteBuffer:
+    """
+    Búfer de escritura diferida con volcado por lotes, reintentos,
+    contrapresión y WAL local opcional.
+    """
+
+    def __init__(
+        self,
+        store: Optional[Any] = None,
+        batch_size: Optional[int] = None,
+        max_age: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: float = 0.5,
+        enqueue_timeout: float = 30.0,
+        wal_path: Optional[str] = None
+    ):
+        """
+        Inicializa el búfer.
+
+        Args:
+            store: Almacén con ``insert`` y ``update`` asíncronos (por defecto Supabase)
+            batch_size: Filas pendientes de una tabla que disparan su volcado
+            max_age: Segundos máximos que una escritura espera en el búfer
+            max_pending: Escrituras pendientes a partir de las cuales se aplica contrapresión
+            max_retries: Reintentos por lote antes de devolverlo al búfer
+            retry_delay: Espera base entre reintentos en segundos (exponencial)
+            enqueue_timeout: Espera máxima de un productor por espacio libre
+            wal_path: Fichero WAL (None usa ``SUPABASE_WRITE_WAL_PATH``; "" lo desactiva)
+        """
+        self.store = store or SupabaseWriteStore()
+        self.batch_size = batch_size or settings.supabase_write_batch_size
+        self.max_age = max_age if max_age is not None else settings.supabase_write_max_age
+        self.max_pending = max_pending or settings.supabase_write_max_pending
+        self.max_retries = max_retries if max_retries is not None else settings.supabase_write_max_retries
+        self.retry_delay = retry_delay
+        self.enqueue_timeout = enqueue_timeout
+        self.wal_path = wal_path if wal_path is not None else (settings.supabase_write_wal_path or "")
+
+        self._inserts: Dict[InsertKey, List[Dict[str, Any]]] = {}
+        self._updates: Dict[UpdateKey, Dict[str, Any]] = {}
+        self._oldest: Dict[str, float] = {}
+        self._in_flight = 0
+
+        # Primitivas asyncio ligadas al bucle de eventos en curso
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        self._flush_tasks: Dict[str, asyncio.Task] = {}
+
+        self._wal_lock = threading.Lock()
+        self._wal_file = None
+        self._recovered = False
+
+        self.stats = {
+            "enqueued_rows": 0,
+            "enqueued_updates": 0,
+            "coalesced_updates": 0,
+            "written_rows": 0,
+            "written_updates": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "backpressure_waits": 0,
+            "rejected": 0,
+            "recovered": 0,
+        }
+
+    # Estado ligado al bucle de eventos
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._flush_lock = asyncio.Lock()
+            self._space = asyncio.Condition()
+            self._flusher_task = None
+            self._flush_tasks = {}
+
+    @property
+    def pending(self) -> int:
+        """Escrituras pendientes (filas, actualizaciones fusionadas y lote en curso)."""
+        return sum(len(rows) for rows in self._inserts.values()) + len(self._updates) + self._in_flight
+
+    # API de encolado
+
+    async def insert(self, table: str, rows: List[Dict[str, Any]], upsert: bool = False) -> None:
+        """
+        Encola filas para insertarlas en lote.
+
+        Args:
+            table: Nombre de la tabla
+            rows: Filas a insertar
+            upsert: Si el volcado usa ``upsert`` en lugar de ``insert``
+
+        Raises:
+            asyncio.QueueFull: Si no se libera espacio antes de ``enqueue_timeout``
+        """
+        if not rows:
+            return
+        await self.start()
+        await self._wait_for_space(len(rows))
+        record = {"op": "insert", "table": table, "rows": rows, "upsert": upsert}
+        self._wal_append(record)
+        self._apply(record)
+        self.stats["enqueued_rows"] += len(rows)
+        self._maybe_flush(table)
+
+    async def update(self, table: str, data: Dict[str, Any], filters: Dict[str, Any]) -> None:
+        """
+        Encola una actualización; las pendientes con los mismos filtros se fusionan.
+
+        Args:
+            table: Nombre de la tabla
+            data: Campos a actualizar
+            filters: Filtros de igualdad por columna
+
+        Raises:
+            asyncio.QueueFull: Si no se libera espacio antes de ``enqueue_timeout``
+        """
+        await self.start()
+        await self._wait_for_space(1)
+        record = {"op": "update", "table": table, "data": data, "filters": filters}
+        self._wal_append(record)
+        self._apply(record)
+        self.stats["enqueued_updates"] += 1
+        self._maybe_flush(table)
+
+    def _apply(self, record: Dict[str, Any], front: bool = False) -> None:
+        """Incorpora una escritura al búfer (al principio si se reencola)."""
+        table = record["table"]
+        self._oldest.setdefault(table, time.monotonic())
+        if record["op"] == "insert":
+            rows = self._inserts.setdefault((table, bool(record.get("upsert"))), [])
+            if front:
+                rows[:0] = record["rows"]
+            else:
+                rows.extend(record["rows"])
+            return
+
+        key = (table, json.dumps(record["filters"], sort_keys=True, default=str))
+        entry = self._updates.get(key)
+        if entry is None:
+            self._updates[key] = {"filters": record["filters"], "data": dict(record["data"])}
+            return
+        self.stats["coalesced_updates"] += 1
+        if front:
+            # Un lote reencolado es más antiguo que lo que se haya encolado después
+            entry["data"] = {**record["data"], **entry["data"]}
+        else:
+            entry["data"].update(record["data"])
+
+    async def _wait_for_space(self, size: int) -> None:
+        """Aplica contrapresión hasta que quepan ``size`` escrituras."""
+        if self.pending + size <= self.max_pending or self.pending == 0:
+            return
+
+        self.stats["backpressure_waits"] += 1
+        self._schedule_flush(None)
+        try:
+            async with self._space:
+                await asyncio.wait_for(
+                    self._space.wait_for(lambda: self.pending + size <= self.max_pending or self.pending == 0),
+                    timeout=self.enqueue_timeout
+                )
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise asyncio.QueueFull(f"Búfer de escritura lleno ({self.pending} escrituras pendientes)")
+
+    # Volcado
+
+    def _maybe_flush(self, table: str) -> None:
+        """Programa el volcado de la tabla si alcanzó el tamaño de lote."""
+        rows = sum(len(rows) for (name, _), rows in self._inserts.items() if name == table)
+        updates = sum(1 for (name, _) in self._updates if name == table)
+        if rows + updates >= self.batch_size:
+            self._schedule_flush(table)
+
+    def _schedule_flush(self, table: Optional[str]) -> None:
+        """Lanza un volcado en segundo plano si no hay uno en curso para la tabla."""
+        key = table or "*"
+        task = self._flush_tasks.get(key)
+        if task is not None and not task.done():
+            return
+        self._flush_tasks[key] = asyncio.get_running_loop().create_task(self.flush(table))
+
+    def _take(self, table: Optional[str]) -> List[Dict[str, Any]]:
+        """Extrae del búfer las escrituras de una tabla (o de todas) como lotes."""
+        tables = [table] if table is not None else sorted(self._oldest, key=self._oldest.get)
+        batches: List[Dict[str, Any]] = []
+        for name in tables:
+            for key in [key for key in self._inserts if key[0] == name]:
+                rows = self._inserts.pop(key)
+                for start in range(0, len(rows), self.batch_size):
+                    batches.append({"op": "insert", "table": name, "rows": rows[start:start + self.batch_size], "upsert": key[1]})
+            for key in [key for key in self._updates if key[0] == name]:
+                entry = self._updates.pop(key)
+                batches.append({"op": "update", "table": name, "data": entry["data"], "filters": entry["filters"]})
+            self._oldest.pop(name, None)
+        return batches
+
+    @staticmethod
+    def _size(batch: Dict[str, Any]) -> int:
+        return len(batch["rows"]) if batch["op"] == "insert" else 1
+
+    async def _write(self, batch: Dict[str, Any]) -> bool:
+        """Escribe un lote con reintentos exponenciales."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if batch["op"] == "insert":
+                    await self.store.insert(batch["table"], batch["rows"], upsert=batch["upsert"])
+                    self.stats["written_rows"] += len(batch["rows"])
+                else:
+                    await self.store.update(batch["table"], batch["data"], batch["filters"])
+                    self.stats["written_updates"] += 1
+                self.stats["batches"] += 1
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Error al volcar lote en {batch['table']} tras {attempt + 1} intentos: {e}")
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.retry_delay * (2 ** attempt))
+        self.stats["failed_batches"] += 1
+        return False
+
+    async def flush(self, table: Optional[str] = None) -> int:
+        """
+        Vuelca las escrituras pendientes.
+
+        Args:
+            table: Tabla a volcar (None para todas)
+
+        Returns:
+            int: Número de escrituras confirmadas por el almacén
+        """
+        self._bind_loop()
+        async with self._flush_lock:
+            batches = self._take(table)
+            if not batches:
+                return 0
+
+            self._in_flight = sum(self._size(batch) for batch in batches)
+            written = 0
+            failed: List[Dict[str, Any]] = []
+            try:
+                for batch in batches:
+                    # Si una tabla falla, sus lotes posteriores esperan para no reordenar
+                    if any(item["table"] == batch["table"] for item in failed) or not await self._write(batch):
+                        failed.append(batch)
+                    else:
+                        written += self._size(batch)
+            finally:
+                for batch in reversed(failed):
+                    self._apply(batch, front=True)
+                self._in_flight = 0
+
+            self._wal_checkpoint()
+            async with self._space:
+                self._space.notify_all()
+            return written
+
+    async def _flusher_loop(self) -> None:
+        """Vuelca periódicamente las tablas cuya escritura más antigua superó ``max_age``."""
+        interval = max(0.05, self.max_age / 2)
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            for table, oldest in list(self._oldest.items()):
+                if now - oldest >= self.max_age:
+                    try:
+                        await self.flush(table)
+                    except Exception as e:
+                        logger.error(f"Error en el volcado periódico de {table}: {e}")
+
+    async def start(self) -> None:
+        """Recupera el WAL (la primera vez) e inicia el volcado periódico."""
+        self._bind_loop()
+        if not self._recovered:
+            self._recovered = True
+            self._wal_recover()
+        if self._flusher_task is None or self._flusher_task.done():
+            self._flusher_task = asyncio.get_running_loop().create_task(self._flusher_loop())
+
+    async def stop(self) -> None:
+        """Detiene el volcado periódico y vuelca todo lo pendiente."""
+        if self._loop is asyncio.get_running_loop() and self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        await self.flush()
+        with self._wal_lock:
+            if self._wal_file is not None:
+                self._wal_file.close()
+                self._wal_file = None
+
+    # WAL
+
+    def _wal_append(self, record: Dict[str, Any]) -> None:
+        """Añade una escritura al WAL antes de aceptarla."""
+        if not self.wal_path:
+            return
+        line = json.dumps(record, default=str) + "\n"
+        with self._wal_lock:
+            if self._wal_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.wal_path)), exist_ok=True)
+                self._wal_file = open(self.wal_path, "a", encoding="utf-8")
+            self._wal_file.write(line)
+            self._wal_file.flush()
+
+    def _snapshot(self) -> List[Dict[str, Any]]:
+        """Escrituras pendientes en el formato del WAL."""
+        records = [
+            {"op": "insert", "table": table, "rows": rows, "upsert": upsert}
+            for (table, upsert), rows in self._inserts.items() if rows
+        ]
+        records.extend(
+            {"op": "update", "table": table, "data": entry["data"], "filters": entry["filters"]}
+            for (table, _), entry in self._updates.items()
+        )
+        return records
+
+    def _wal_checkpoint(self) -> None:
+        """Reescribe el WAL con solo las escrituras pendientes."""
+        if not self.wal_path:
+            return
+        tmp_path = f"{self.wal_path}.tmp"
+        with self._wal_lock:
+            if self._wal_file is not None:
+                self._wal_file.close()
+                self._wal_file = None
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in self._snapshot():
+                    f.write(json.dumps(record, default=str) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.wal_path)
+
+    def _wal_recover(self) -> None:
+        """Reproduce en el búfer las escrituras pendientes del WAL."""
+        if not self.wal_path or not os.path.exists(self.wal_path):
+            return
+        recovered = 0
+        with open(self.wal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Última línea incompleta tras una caída
+                    logger.warning(f"Línea del WAL de escritura descartada: {line[:80]!r}")
+                    continue
+                self._apply(record)
+                recovered += self._size(record)
+        self.stats["recovered"] += recovered
+        if recovered:
+            logger.info(f"Recuperadas {recovered} escrituras pendientes del WAL {self.wal_path}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del búfer.
+
+        Returns:
+            Dict[str, Any]: Contadores, escrituras pendientes y configuración
+        """
+        return {
+            **self.stats,
+            "pending": self.pending,
+            "tables": sorted(self._oldest),
+            "batch_size": self.batch_size,
+            "max_age": self.max_age,
+            "max_pending": self.max_pending,
+            "wal_enabled": bool(self.wal_path),
+        }
+
+
+# Búfer global de escritura diferida
+supabase_write_buffer = SupabaseWriteBuffer()
@@ -9,6 +9,7 @@ con caché avanzado, pooling de conexiones y telemetría detallada.
 from .cache import CacheManager
 from .connection import ConnectionPool, VERTEX_AI_AVAILABLE
 from .decorators import with_retries, measure_execution_time
+from .media import MediaFetcher, MediaFetchError, MediaTooLargeError, media_fetcher
 from .client import (
     VertexAIClient, 
     vertex_ai_client,  # Instancia global pre-configurada
@@ -18,6 +19,10 @@ from .client import (
 __all__ = [
     'CacheManager',
     'ConnectionPool',
+    'MediaFetcher',
+    'MediaFetchError',
+    'MediaTooLargeError',
+    'media_fetcher',
     'VertexAIClient',
     'vertex_ai_client',
     'check_vertex_ai_connection',
@@ -0,0 +1,544 @@
+"""
+Pipeline de transcripción en streaming para audio largo.
+
+Antes el cliente de voz leía el archivo entero, lo codificaba en base64 y lo
+transcribía en una sola llamada, de modo que la memoria y la latencia crecían
+con la duración de la grabación. ``AudioStreamPipeline``:
+
+- lee el audio por bloques (archivo, URL, base64 o bytes) sin cargarlo entero;
+- en audio WAV PCM de 16 bits corta segmentos por actividad de voz (energía
+  RMS por trama), descartando los silencios largos y con una duración máxima
+  por segmento;
+- transcribe los segmentos de forma concurrente (con un máximo de segmentos en
+  curso, que limita también la memoria) y los reensambla en orden;
+- guarda cada transcripción en una caché LRU por hash de contenido, de modo que
+  el audio ya transcrito (por ejemplo, el que ``analyze_audio`` vuelve a
+  transcribir) no llama de nuevo al modelo.
+
+Los formatos comprimidos (MP3, OGG...) no se pueden segmentar sin
+decodificarlos: se transcriben en un único segmento, como antes, aunque
+también pasan por la caché.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+import os
+import struct
+import wave
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Union
+
+import numpy as np
+
+from core.logging_config import get_logger
+from core.settings import settings
+
+logger = get_logger(__name__)
+
+# Corrutina que transcribe un segmento (audio en base64) y devuelve text/confidence
+SegmentTranscriber = Callable[[str], Awaitable[Dict[str, Any]]]
+
+# Cabecera máxima que se examina buscando el bloque "data" de un WAV
+MAX_WAV_HEADER_BYTES = 64 * 1024
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass
+class AudioFormat:
+    """Formato PCM de un WAV."""
+
+    sample_rate: int
+    channels: int
+    sample_width: int
+
+
+@dataclass
+class _InflightCall:
+    """Llamada al modelo en curso compartida por las solicitudes del mismo segmento."""
+
+    task: asyncio.Task
+    waiters: int = 0
+
+
+@dataclass
+class AudioSegment:
+    """Segmento de audio listo para transcribir."""
+
+    index: int
+    start_ms: float
+    end_ms: float
+    content: bytes
+
+
+async def iter_audio_chunks(audio_data: Union[str, bytes, Dict[str, Any]], chunk_size: int,
+                            max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+    """
+    Lee una entrada de audio por bloques.
+
+    Args:
+        audio_data: Bytes, base64, data URI, URL, ruta o dict con ``base64``, ``url`` o ``path``
+        chunk_size: Tamaño aproximado de cada bloque
+        max_bytes: Tamaño máximo del audio
+
+    Yields:
+        bytes: Bloques del audio
+    """
+    limit = max_bytes or settings.speech_max_audio_bytes
+
+    if isinstance(audio_data, (bytes, bytearray)):
+        view = memoryview(audio_data)
+        for offset in range(0, len(view), chunk_size):
+            yield bytes(view[offset:offset + chunk_size])
+        return
+
+    if isinstance(audio_data, dict):
+        if "base64" in audio_data:
+            source = _iter_base64(audio_data["base64"], chunk_size)
+        elif "url" in audio_data:
+            source = _iter_url(audio_data["url"], chunk_size, limit)
+        elif "path" in audio_data:
+            source = _iter_file(audio_data["path"], chunk_size, limit)
+        else:
+            raise ValueError("Formato de audio no válido. Debe contener 'url', 'path' o 'base64'.")
+    elif isinstance(audio_data, str):
+        if audio_data.startswith("data:audio"):
+            source = _iter_base64(audio_data.split(",", 1)[1], chunk_size)
+        elif audio_data.startswith("http"):
+            source = _iter_url(audio_data, chunk_size, limit)
+        else:
+            source = _iter_file(audio_data, chunk_size, limit)
+    else:
+        raise ValueError("Formato de audio no soportado")
+
+    async for chunk in source:
+        yield chunk
+
+
+async def _iter_base64(encoded: str, chunk_size: int) -> AsyncIterator[bytes]:
+    # Cada 4 caracteres base64 son 3 bytes: los cortes múltiplos de 4 se decodifican por separado
+    step = max(4, chunk_size // 3 * 4)
+    for offset in range(0, len(encoded), step):
+        yield base64.b64decode(encoded[offset:offset + step])
+
+
+async def _iter_url(url: str, chunk_size: int, limit: int) -> AsyncIterator[bytes]:
+    from clients.vertex_ai.media import media_fetcher
+    async for chunk in media_fetcher.stream(url, chunk_size=chunk_size, max_bytes=limit):
+        yield chunk
+
+
+async def _iter_file(path: str, chunk_size: int, limit: int) -> AsyncIterator[bytes]:
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No se encontró el archivo de audio: {path}")
+    size = os.path.getsize(path)
+    if size > limit:
+        raise ValueError(f"El archivo de audio ocupa {size} bytes (máximo {limit})")
+
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+def parse_wav_header(header: bytes) -> Optional[tuple]:
+    """
+    Busca el formato y el inicio de los datos en la cabecera de un WAV.
+
+    Args:
+        header: Primeros bytes del audio
+
+    Returns:
+        Optional[tuple]: (AudioFormat o None si no es PCM de 16 bits, offset y
+        tamaño de los datos; None si el tamaño no está fijado) o None si todavía
+        no se ha leído el bloque "data"
+
+    Raises:
+        ValueError: Si los bytes no son un WAV
+    """
+    if len(header) < 12:
+        return None
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise ValueError("No es un archivo WAV")
+
+    audio_format = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack("<I", header[offset + 4:offset + 8])[0]
+        if chunk_id == b"data":
+            # Los WAV grabados en streaming dejan el tamaño a 0 o al máximo
+            data_size = chunk_size if 0 < chunk_size < 0xFFFFFFFF else None
+            return audio_format, offset + 8, data_size
+        if chunk_id == b"fmt ":
+            if offset + 24 > len(header):
+                return None
+            tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", header[offset + 8:offset + 24])
+            if tag in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) and bits == 16:
+                audio_format = AudioFormat(sample_rate=sample_rate, channels=channels, sample_width=2)
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def encode_wav(pcm: bytes, audio_format: AudioFormat) -> bytes:
+    """Envuelve PCM en un WAV completo."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(audio_format.channels)
+        wav.setsampwidth(audio_format.sample_width)
+        wav.setframerate(audio_format.sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+class VoiceActivitySegmenter:
+    """
+    Corta PCM de 16 bits en segmentos de voz según la energía de cada trama.
+
+    Un segmento empieza en la primera trama con voz (más un margen previo) y
+    termina tras ``min_silence_ms`` de silencio o al alcanzar la duración
+    máxima. Solo se retiene en memoria el segmento en curso.
+    """
+
+    def __init__(self, audio_format: AudioFormat, threshold: float, min_silence_ms: int,
+                 max_segment_ms: float, frame_ms: int = 30, padding_ms: int = 150):
+        """
+        Inicializa el segmentador.
+
+        Args:
+            audio_format: Formato PCM del audio
+            threshold: Umbral RMS relativo a la escala completa (0-1)
+            min_silence_ms: Silencio que cierra un segmento
+            max_segment_ms: Duración máxima de un segmento
+            frame_ms: Duración de cada trama analizada
+            padding_ms: Margen de audio conservado antes y después de la voz
+        """
+        self.audio_format = audio_format
+        self.frame_ms = frame_ms
+        self.frame_bytes = int(audio_format.sample_rate * frame_ms / 1000) * audio_format.channels * 2
+        self.threshold = threshold * 32768
+        self.silence_frames = max(1, int(min_silence_ms / frame_ms))
+        self.max_frames = max(1, int(max_segment_ms / frame_ms))
+        self.padding_frames = max(0, int(padding_ms / frame_ms))
+
+        self._pending = bytearray()
+        self._preroll: Deque[bytes] = deque(maxlen=self.padding_frames or None)
+        self._frames: List[bytes] = []
+        self._start_frame = 0
+        self._trailing_silence = 0
+        self._frame_index = 0
+        self._next_index = 0
+
+    def feed(self, pcm: bytes) -> List[AudioSegment]:
+        """
+        Procesa un bloque de PCM.
+
+        Args:
+            pcm: Bytes de audio PCM
+
+        Returns:
+            List[AudioSegment]: Segmentos completados con este bloque
+        """
+        self._pending.extend(pcm)
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        if not usable:
+            return []
+
+        data = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32).reshape(-1, self.frame_bytes // 2)
+        voiced = np.sqrt(np.mean(samples * samples, axis=1)) >= self.threshold
+
+        completed = []
+        for position, is_voiced in enumerate(voiced):
+            frame = data[position * self.frame_bytes:(position + 1) * self.frame_bytes]
+            segment = self._push(frame, bool(is_voiced))
+            if segment is not None:
+                completed.append(segment)
+        return completed
+
+    def finish(self) -> List[AudioSegment]:
+        """
+        Cierra el segmento en curso al terminar el audio.
+
+        Returns:
+            List[AudioSegment]: Último segmento, si lo hay
+        """
+        if self._pending and self._frames:
+            self._frames.append(bytes(self._pending))
+        self._pending.clear()
+        segment = self._close()
+        return [segment] if segment is not None else []
+
+    def _push(self, frame: bytes, voiced: bool) -> Optional[AudioSegment]:
+        frame_index = self._frame_index
+        self._frame_index += 1
+
+        if not self._frames:
+            if not voiced:
+                if self.padding_frames:
+                    self._preroll.append(frame)
+                return None
+            self._frames = list(self._preroll) + [frame]
+            self._start_frame = frame_index - len(self._preroll)
+            self._preroll.clear()
+            self._trailing_silence = 0
+            return None
+
+        self._frames.append(frame)
+        self._trailing_silence = 0 if voiced else self._trailing_silence + 1
+        if self._trailing_silence >= self.silence_frames or len(self._frames) >= self.max_frames:
+            return self._close()
+        return None
+
+    def _close(self) -> Optional[AudioSegment]:
+        if not self._frames:
+            return None
+        # Se recorta el silencio final, salvo el margen
+        keep = len(self._frames) - max(0, self._trailing_silence - self.padding_frames)
+        frames = self._frames[:keep]
+        segment = AudioSegment(
+            index=self._next_index,
+            start_ms=self._start_frame * self.frame_ms,
+            end_ms=(self._start_frame + len(frames)) * self.frame_ms,
+            content=encode_wav(b"".join(frames), self.audio_format),
+        )
+        self._next_index += 1
+        self._frames = []
+        self._trailing_silence = 0
+        return segment
+
+
+class AudioStreamPipeline:
+    """Transcripción por segmentos con lectura en streaming y caché por contenido."""
+
+    def __init__(self, chunk_size: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 vad_threshold: Optional[float] = None, min_silence_ms: Optional[int] = None,
+                 max_segment_seconds: Optional[float] = None, cache_size: Optional[int] = None,
+                 max_audio_bytes: Optional[int] = None):
+        """
+        Inicializa el pipeline (los valores omitidos se toman de la configuración).
+
+        Args:
+            chunk_size: Tamaño de los bloques leídos
+            max_concurrency: Segmentos transcribiéndose a la vez como máximo
+            vad_threshold: Umbral RMS de actividad de voz (0-1)
+            min_silence_ms: Silencio que separa dos segmentos
+            max_segment_seconds: Duración máxima de un segmento
+            cache_size: Transcripciones de segmentos conservadas en caché
+            max_audio_bytes: Tamaño máximo de un audio leído desde archivo o URL
+        """
+        self.chunk_size = chunk_size or settings.speech_chunk_bytes
+        self.max_concurrency = max_concurrency or settings.speech_transcribe_concurrency
+        self.vad_threshold = vad_threshold or settings.speech_vad_threshold
+        self.min_silence_ms = min_silence_ms or settings.speech_min_silence_ms
+        self.max_segment_seconds = max_segment_seconds or settings.speech_max_segment_seconds
+        self.cache_size = cache_size if cache_size is not None else settings.speech_transcript_cache_size
+        self.max_audio_bytes = max_audio_bytes or settings.speech_max_audio_bytes
+
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._inflight: Dict[str, _InflightCall] = {}
+        self.stats = {
+            "transcriptions": 0,
+            "streamed": 0,
+            "single_segment": 0,
+            "segments": 0,
+            "segment_calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "bytes_read": 0,
+        }
+
+    async def transcribe(self, audio_data: Union[str, bytes, Dict[str, Any]],
+                         transcribe_segment: SegmentTranscriber, cache_namespace: str = "") -> Dict[str, Any]:
+        """
+        Transcribe un audio por segmentos y reensambla el texto en orden.
+
+        Args:
+            audio_data: Bytes, base64, data URI, URL, ruta o dict con ``base64``, ``url`` o ``path``
+            transcribe_segment: Corrutina que transcribe un segmento en base64
+            cache_namespace: Prefijo de la caché (modelo e idioma)
+
+        Returns:
+            Dict[str, Any]: text, confidence, segments y bytes leídos
+        """
+        self.stats["transcriptions"] += 1
+        slots = asyncio.Semaphore(self.max_concurrency)
+        tasks: List[asyncio.Task] = []
+
+        async def run(segment: AudioSegment) -> Dict[str, Any]:
+            try:
+                return await self._transcribe_segment(segment, transcribe_segment, cache_namespace)
+            finally:
+                slots.release()
+
+        async def submit(segment: AudioSegment) -> None:
+            # Como máximo max_concurrency segmentos en memoria a la vez
+            await slots.acquire()
+            tasks.append(asyncio.create_task(run(segment)))
+
+        header = bytearray()
+        segmenter: Optional[VoiceActivitySegmenter] = None
+        whole: Optional[bytearray] = None
+        remaining: Optional[int] = None
+        bytes_read = 0
+
+        async def feed(pcm: bytes) -> None:
+            nonlocal remaining
+            if remaining is not None:
+                # Los bloques posteriores a los datos (LIST, id3...) no son audio
+                pcm, remaining = pcm[:remaining], max(0, remaining - len(pcm))
+            for segment in segmenter.feed(pcm):
+                await submit(segment)
+
+        try:
+            async for chunk in iter_audio_chunks(audio_data, self.chunk_size, self.max_audio_bytes):
+                bytes_read += len(chunk)
+                if segmenter is not None:
+                    await feed(chunk)
+                    continue
+                if whole is not None:
+                    whole.extend(chunk)
+                    continue
+
+                header.extend(chunk)
+                segmenter, data_offset, remaining, whole = self._detect_format(header)
+                if segmenter is not None:
+                    await feed(bytes(header[data_offset:]))
+                    header.clear()
+
+            if segmenter is not None:
+                for segment in segmenter.finish():
+                    await submit(segment)
+                self.stats["streamed"] += 1
+            else:
+                content = bytes(whole if whole is not None else header)
+                if content:
+                    await submit(AudioSegment(index=0, start_ms=0.0, end_ms=0.0, content=content))
+                self.stats["single_segment"] += 1
+
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.stats["bytes_read"] += bytes_read
+
+        self.stats["segments"] += len(results)
+        return self._assemble(results, bytes_read)
+
+    def _detect_format(self, header: bytearray) -> tuple:
+        """Decide, con los primeros bytes, si el audio se segmenta o se transcribe entero."""
+        try:
+            parsed = parse_wav_header(bytes(header))
+        except ValueError:
+            parsed = (None, 0, None)
+        if parsed is None:
+            if len(header) > MAX_WAV_HEADER_BYTES:
+                return None, 0, None, header
+            return None, 0, None, None
+
+        audio_format, data_offset, data_size = parsed
+        if audio_format is None:
+            return None, 0, None, header
+        segmenter = VoiceActivitySegmenter(
+            audio_format,
+            threshold=self.vad_threshold,
+            min_silence_ms=self.min_silence_ms,
+            max_segment_ms=self.max_segment_seconds * 1000,
+        )
+        return segmenter, data_offset, data_size, None
+
+    async def _transcribe_segment(self, segment: AudioSegment, transcribe_segment: SegmentTranscriber,
+                                  cache_namespace: str) -> Dict[str, Any]:
+        key = hashlib.sha256(cache_namespace.encode("utf-8") + b"\0" + segment.content).hexdigest()
+        entry = {"index": segment.index, "start_ms": segment.start_ms, "end_ms": segment.end_ms}
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return {**entry, **cached, "cached": True}
+
+        # La llamada al modelo es una tarea del pipeline: cancelar una solicitud
+        # no cancela a las demás que esperan el mismo segmento
+        call = self._inflight.get(key)
+        coalesced = call is not None
+        if coalesced:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["segment_calls"] += 1
+            call = _InflightCall(asyncio.create_task(self._call_model(key, segment.content, transcribe_segment)))
+            self._inflight[key] = call
+            call.task.add_done_callback(lambda task: self._release(key, call))
+
+        call.waiters += 1
+        try:
+            transcript = await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            # Si nadie más espera el segmento, la llamada deja de tener sentido
+            if call.waiters == 1 and not call.task.done():
+                self._release(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+        return {**entry, **transcript, "cached": coalesced}
+
+    async def _call_model(self, key: str, content: bytes, transcribe_segment: SegmentTranscriber) -> Dict[str, Any]:
+        response = await transcribe_segment(base64.b64encode(content).decode("utf-8"))
+        transcript = {
+            "text": (response.get("text") or "").strip(),
+            "confidence": float(response.get("confidence") or 0.0),
+        }
+        if self.cache_size:
+            self._cache[key] = transcript
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return transcript
+
+    def _release(self, key: str, call: _InflightCall) -> None:
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
+
+    @staticmethod
+    def _assemble(results: List[Dict[str, Any]], bytes_read: int) -> Dict[str, Any]:
+        """Une los segmentos en orden; la confianza se pondera por duración."""
+        results = sorted(results, key=lambda result: result["index"])
+        spoken = [result for result in results if result["text"]]
+        weights = [max(result["end_ms"] - result["start_ms"], 1.0) for result in spoken]
+        confidence = (
+            sum(result["confidence"] * weight for result, weight in zip(spoken, weights)) / sum(weights)
+            if spoken else 0.0
+        )
+        return {
+            "text": " ".join(result["text"] for result in spoken),
+            "confidence": round(confidence, 4),
+            "segments": results,
+            "bytes_read": bytes_read,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del pipeline.
+
+        Returns:
+            Dict[str, Any]: Contadores de transcripciones, segmentos y caché
+        """
+        return {**self.stats, "cached_transcripts": len(self._cache)}
+
+
+# Instancia global usada por el cliente de voz
+audio_stream_pipeline = AudioStreamPipeline()
@@ -8,14 +8,18 @@ procesamiento multimodal con caché avanzado, pooling de conexiones y telemetrí
 
 import asyncio
 import base64
+import datetime
 import hashlib
 import json
 import logging
 import os
 import time
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from core.latency_histogram import latency_registry
 from core.logging_config import get_logger
+from core.prompt_builder import PREFIX_SEPARATOR, PromptParts, estimate_tokens, hash_prefix, prefix_cache
 from infrastructure.adapters.telemetry_adapter import get_telemetry_adapter, measure_execution_time
 
 # Configurar logger
@@ -61,6 +65,9 @@ from .cache import CacheManager
 from .connection import ConnectionPool
 from .decorators import with_retries
 
+# Métrica del registro de latencias para las llamadas del cliente
+LATENCY_METRIC = "vertex_ai.client"
+
 class VertexAIClient:
     """
     Cliente Vertex AI optimizado con telemetría integrada, pool de conexiones,
@@ -78,7 +85,11 @@ class VertexAIClient:
                  l1_size_ratio=0.2,
                  prefetch_threshold=0.8,
                  compression_threshold=1024,
-                 compression_level=6):
+                 compression_level=6,
+                 prefix_registry_size=512,
+                 context_cache_min_tokens=0,
+                 context_cache_ttl=3600,
+                 context_cache_model="gemini-1.5-pro-002"):
         """
         Inicializa el cliente con soporte para estrategias avanzadas de caché.
         
@@ -94,6 +105,11 @@ class VertexAIClient:
             prefetch_threshold: Umbral de accesos para precarga
             compression_threshold: Tamaño mínimo para comprimir valores (bytes)
             compression_level: Nivel de compresión (1-9, 9 es máximo)
+            prefix_registry_size: Número de prefijos de prompt registrados para medir su reutilización
+            context_cache_min_tokens: Tokens mínimos de un prefijo para crear una caché de
+                contexto en Vertex AI (0 la desactiva)
+            context_cache_ttl: Tiempo de vida de las cachés de contexto (segundos)
+            context_cache_model: Modelo (versionado) usado para las cachés de contexto
         """
         self._initialized = False
         self.is_initialized = False
@@ -136,6 +152,15 @@ class VertexAIClient:
         # Lock para inicialización
         self._init_lock = asyncio.Lock()
         
+        # Registro de prefijos de prompt (hash -> tokens) y cachés de contexto de Vertex AI
+        self.prefix_registry_size = prefix_registry_size
+        self.context_cache_min_tokens = context_cache_min_tokens
+        self.context_cache_ttl = context_cache_ttl
+        self.context_cache_model = context_cache_model
+        self._prefix_registry: "OrderedDict[str, int]" = OrderedDict()
+        self._context_caches: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._context_cache_lock = asyncio.Lock()
+        
         # Estadísticas
         self.stats = {
             "content_requests": 0,
@@ -143,11 +168,17 @@ class VertexAIClient:
             "multimodal_requests": 0,
             "batch_embedding_requests": 0,
             "document_requests": 0,
-            "latency_ms": {},
             "tokens": {
                 "prompt": 0,
                 "completion": 0,
-                "total": 0
+                "total": 0,
+                "prefix_reused": 0
+            },
+            "prefix_cache": {
+                "hits": 0,
+                "misses": 0,
+                "context_caches_created": 0,
+                "context_cache_errors": 0
             },
             "errors": {}
         }
@@ -230,24 +261,113 @@ class VertexAIClient:
             
         return f"{prefix}:{content_hash}"
 
+    def _register_prefix(self, prefix_hash: Optional[str], prompt_prefix: Optional[str]) -> int:
+        """
+        Registra el uso de un prefijo de prompt.
+        
+        Args:
+            prefix_hash: Hash del prefijo
+            prompt_prefix: Texto del prefijo
+            
+        Returns:
+            int: Tokens del prefijo si ya se había enviado antes (reutilizado), o 0
+        """
+        if not prefix_hash or not prompt_prefix:
+            return 0
+        
+        tokens = self._prefix_registry.get(prefix_hash)
+        if tokens is not None:
+            self._prefix_registry.move_to_end(prefix_hash)
+            self.stats["prefix_cache"]["hits"] += 1
+            return tokens
+        
+        self._prefix_registry[prefix_hash] = estimate_tokens(prompt_prefix)
+        self.stats["prefix_cache"]["misses"] += 1
+        while len(self._prefix_registry) > self.prefix_registry_size:
+            self._prefix_registry.popitem(last=False)
+        return 0
+    
+    async def _get_context_cached_model(
+        self,
+        prefix_hash: Optional[str],
+        prompt_prefix: Optional[str],
+        system_instruction: Optional[str]
+    ) -> Optional[Any]:
+        """
+        Obtiene un modelo asociado a una caché de contexto de Vertex AI para el prefijo.
+        
+        La caché se crea la segunda vez que se usa un prefijo con al menos
+        ``context_cache_min_tokens`` tokens y se renueva al caducar. Si la creación
+        falla, el prefijo se envía completo en cada llamada.
+        
+        Args:
+            prefix_hash: Hash del prefijo
+            prompt_prefix: Texto del prefijo
+            system_instruction: Instrucción de sistema (forma parte de la caché)
+            
+        Returns:
+            Optional[Any]: Modelo que usa la caché de contexto, o None
+        """
+        if not self.context_cache_min_tokens or not prefix_hash or not prompt_prefix:
+            return None
+        tokens = self._prefix_registry.get(prefix_hash)
+        if tokens is None or tokens < self.context_cache_min_tokens:
+            return None
+        
+        key = (prefix_hash, system_instruction)
+        entry = self._context_caches.get(key)
+        if entry is not None and (entry["failed"] or entry["expires_at"] > time.time()):
+            return entry["model"]
+        
+        async with self._context_cache_lock:
+            entry = self._context_caches.get(key)
+            if entry is not None and (entry["failed"] or entry["expires_at"] > time.time()):
+                return entry["model"]
+            try:
+                from vertexai.preview import caching
+                
+                cached_content = await asyncio.to_thread(
+                    caching.CachedContent.create,
+                    model_name=self.context_cache_model,
+                    system_instruction=system_instruction,
+                    contents=[prompt_prefix],
+                    ttl=datetime.timedelta(seconds=self.context_cache_ttl)
+                )
+                model = GenerativeModel.from_cached_content(cached_content=cached_content)
+                self._context_caches[key] = {
+                    "model": model,
+                    "failed": False,
+                    # Renovar con margen antes de que caduque en Vertex AI
+                    "expires_at": time.time() + self.context_cache_ttl * 0.9
+                }
+                self.stats["prefix_cache"]["context_caches_created"] += 1
+                return model
+            except Exception as e:
+                logger.warning(f"No se pudo crear la caché de contexto para el prefijo {prefix_hash}: {e}")
+                self._context_caches[key] = {"model": None, "failed": True, "expires_at": 0.0}
+                self.stats["prefix_cache"]["context_cache_errors"] += 1
+                return None
+    
     @measure_execution_time("vertex_ai.client.generate_content")
     @with_retries(max_retries=3, base_delay=1.0, backoff_factor=2)
     async def generate_content(
         self,
-        prompt: str,
+        prompt: Union[str, PromptParts],
         system_instruction: Optional[str] = None,
         temperature: float = 0.7,
         max_output_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
         top_k: Optional[int] = None,
         cache_namespace: Optional[str] = None,
-        skip_cache: bool = False
+        skip_cache: bool = False,
+        prompt_prefix: Optional[str] = None,
+        prefix_hash: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Genera contenido de texto usando el modelo de lenguaje con soporte para caché avanzado.
         
         Args:
-            prompt: Prompt para el modelo
+            prompt: Prompt para el modelo, o ``PromptParts`` de ``core.prompt_builder``
             system_instruction: Instrucción de sistema (opcional)
             temperature: Temperatura para la generación (0.0-1.0)
             max_output_tokens: Límite de tokens de salida
@@ -255,20 +375,30 @@ class VertexAIClient:
             top_k: Parámetro top_k para muestreo
             cache_namespace: Espacio de nombres para agrupar claves relacionadas (opcional)
             skip_cache: Si es True, omite la caché y siempre realiza la llamada a la API
+            prompt_prefix: Prefijo estable que precede al prompt (opcional)
+            prefix_hash: Hash del prefijo; si se omite se calcula a partir de ``prompt_prefix``
             
         Returns:
             Dict[str, Any]: Respuesta generada y metadatos
         """
         await self._ensure_initialized()
         
+        # Separar el prefijo estable del sufijo variable
+        if isinstance(prompt, PromptParts):
+            prompt_prefix, prefix_hash, prompt = prompt.prefix or None, prompt.prefix_hash or None, prompt.suffix
+        if prompt_prefix and not prefix_hash:
+            prefix_hash = hash_prefix(prompt_prefix)
+        full_prompt = f"{prompt_prefix}{PREFIX_SEPARATOR}{prompt}" if prompt_prefix else prompt
+        
         span_attributes = {
-            "client.prompt_length": len(prompt),
+            "client.prompt_length": len(full_prompt),
             "client.temperature": temperature,
             "client.has_system_instruction": system_instruction is not None,
         }
         if max_output_tokens is not None: span_attributes["client.max_output_tokens"] = max_output_tokens
         if top_p is not None: span_attributes["client.top_p"] = top_p
         if top_k is not None: span_attributes["client.top_k"] = top_k
+        if prefix_hash: span_attributes["client.prefix_hash"] = prefix_hash
         
         span = telemetry_adapter.start_span("VertexAIClient.generate_content", attributes=span_attributes)
         
@@ -279,9 +409,11 @@ class VertexAIClient:
             # Verificar caché
             await self._ensure_initialized()
         
-            # Preparar datos para caché
+            # Preparar datos para caché; el prefijo se identifica por su hash para no
+            # volver a serializarlo en cada llamada
             cache_data = {
                 "prompt": prompt,
+                "prefix_hash": prefix_hash,
                 "system_instruction": system_instruction,
                 "temperature": temperature,
                 "max_output_tokens": max_output_tokens,
@@ -300,7 +432,7 @@ class VertexAIClient:
             if not skip_cache:
                 cached_response = await self.cache_manager.get(cache_key)
                 if cached_response:
-                    self.stats["latency_ms"].setdefault("content_generation", []).append(0)  # 0ms desde caché
+                    latency_registry.record(LATENCY_METRIC, 0, operation="content_generation_cached")
                     # Usar set_span_attribute en lugar de record_event para compatibilidad
                     telemetry_adapter.set_span_attribute(span, "cache.hit", True)
                     telemetry_adapter.set_span_attribute(span, "cache.operation", "generate_content")
@@ -313,6 +445,8 @@ class VertexAIClient:
             telemetry_adapter.set_span_attribute(span, "client.cache", "miss")
             telemetry_adapter.record_metric("vertex_ai.client.cache_misses", 1, {"operation": "content"})
             
+            prefix_tokens_reused = self._register_prefix(prefix_hash, prompt_prefix)
+            
             start_time = time.time()
             
             # Adquirir cliente del pool
@@ -324,12 +458,12 @@ class VertexAIClient:
                     await asyncio.sleep(0.2)  # Simular latencia
                     
                     mock_response = {
-                        "text": f"[MOCK] Respuesta simulada para: {prompt[:50]}...",
+                        "text": f"[MOCK] Respuesta simulada para: {full_prompt[:50]}...",
                         "finish_reason": "STOP",
                         "usage": {
-                            "prompt_tokens": len(prompt) // 4,
+                            "prompt_tokens": len(full_prompt) // 4,
                             "completion_tokens": 20,
-                            "total_tokens": (len(prompt) // 4) + 20
+                            "total_tokens": (len(full_prompt) // 4) + 20
                         }
                     }
                     
@@ -343,18 +477,27 @@ class VertexAIClient:
                     if top_p is not None: generation_config["top_p"] = top_p
                     if top_k is not None: generation_config["top_k"] = top_k
                     
-                    # Generar contenido
+                    # Generar contenido; si el prefijo tiene una caché de contexto en
+                    # Vertex AI solo se envía el sufijo
+                    cached_model = await self._get_context_cached_model(
+                        prefix_hash, prompt_prefix, system_instruction
+                    )
                     model = client["text_model"]
                     
-                    if system_instruction:
-                        result = model.generate_content(
+                    if cached_model is not None:
+                        result = cached_model.generate_content(
                             prompt,
+                            generation_config=generation_config
+                        )
+                    elif system_instruction:
+                        result = model.generate_content(
+                            full_prompt,
                             generation_config=generation_config,
                             system_instruction=system_instruction
                         )
                     else:
                         result = model.generate_content(
-                            prompt,
+                            full_prompt,
                             generation_config=generation_config
                         )
                     
@@ -365,7 +508,8 @@ class VertexAIClient:
                         "usage": {
                             "prompt_tokens": result.usage_metadata.prompt_token_count if hasattr(result, "usage_metadata") else 0,
                             "completion_tokens": result.usage_metadata.candidates_token_count if hasattr(result, "usage_metadata") else 0,
-                            "total_tokens": result.usage_metadata.total_token_count if hasattr(result, "usage_metadata") else 0
+                            "total_tokens": result.usage_metadata.total_token_count if hasattr(result, "usage_metadata") else 0,
+                            "cached_tokens": getattr(getattr(result, "usage_metadata", None), "cached_content_token_count", 0) or 0
                         }
                     }
                     
@@ -379,15 +523,20 @@ class VertexAIClient:
             # Actualizar estadísticas
             latency_ms = (end_time - start_time) * 1000
             
-            op_latencies = self.stats["latency_ms"].setdefault("content_generation", [])
-            op_latencies.append(latency_ms)
-            if len(op_latencies) > 100:
-                op_latencies.pop(0)
+            latency_registry.record(LATENCY_METRIC, latency_ms, operation="content_generation")
 
             self.stats["tokens"]["prompt"] += response["usage"]["prompt_tokens"]
             self.stats["tokens"]["completion"] += response["usage"]["completion_tokens"]
             self.stats["tokens"]["total"] += response["usage"]["total_tokens"]
             
+            # Tokens de prefijo reutilizados (facturados desde la caché de contexto si existe)
+            response["usage"]["prefix_tokens_reused"] = max(
+                prefix_tokens_reused, response["usage"].get("cached_tokens", 0)
+            )
+            self.stats["tokens"]["prefix_reused"] += response["usage"]["prefix_tokens_reused"]
+            if prefix_hash:
+                response["prefix_hash"] = prefix_hash
+            
             # Guardar en caché
             await self.cache_manager.set(cache_key, response)
             
@@ -507,10 +656,7 @@ class VertexAIClient:
             # Actualizar estadísticas
             latency_ms = (end_time - start_time) * 1000
             
-            op_latencies = self.stats["latency_ms"].setdefault("embedding", [])
-            op_latencies.append(latency_ms)
-            if len(op_latencies) > 100:
-                op_latencies.pop(0)
+            latency_registry.record(LATENCY_METRIC, latency_ms, operation="embedding")
             
             # Guardar en caché
             await self.cache_manager.set(cache_key, response)
@@ -613,10 +759,7 @@ class VertexAIClient:
             # Actualizar estadísticas
             latency_ms = (end_time - start_time) * 1000
             
-            op_latencies = self.stats["latency_ms"].setdefault("batch_embedding", [])
-            op_latencies.append(latency_ms)
-            if len(op_latencies) > 100:
-                op_latencies.pop(0)
+            latency_registry.record(LATENCY_METRIC, latency_ms, operation="batch_embedding")
             
             # Registrar métricas de telemetría
             telemetry_adapter.set_span_attribute(span, "client.latency_ms", latency_ms)
@@ -777,10 +920,7 @@ class VertexAIClient:
             # Actualizar estadísticas
             latency_ms = (end_time - start_time) * 1000
             
-            op_latencies = self.stats["latency_ms"].setdefault("multimodal", [])
-            op_latencies.append(latency_ms)
-            if len(op_latencies) > 100:
-                op_latencies.pop(0)
+            latency_registry.record(LATENCY_METRIC, latency_ms, operation="multimodal")
                 
             self.stats["tokens"]["prompt"] += response["usage"]["prompt_tokens"]
             self.stats["tokens"]["completion"] += response["usage"]["completion_tokens"]
@@ -951,10 +1091,7 @@ class VertexAIClient:
             # Actualizar estadísticas
             latency_ms = (end_time - start_time) * 1000
             
-            op_latencies = self.stats["latency_ms"].setdefault("document", [])
-            op_latencies.append(latency_ms)
-            if len(op_latencies) > 100:
-                op_latencies.pop(0)
+            latency_registry.record(LATENCY_METRIC, latency_ms, operation="document")
             
             # Guardar en caché
             await self.cache_manager.set(cache_key, response)
@@ -998,11 +1135,9 @@ class VertexAIClient:
         # Obtener estadísticas de caché
         cache_stats = await self.cache_manager.get_stats()
         
-        # Calcular promedios de latencia
-        latency_avg = {}
-        for operation, latencies in self.stats["latency_ms"].items():
-            if latencies:
-                latency_avg[operation] = sum(latencies) / len(latencies)
+        # Percentiles de latencia por operación (histogramas compartidos)
+        latency = latency_registry.summary(LATENCY_METRIC, group_by="operation")
+        latency_avg = {operation: summary["mean_ms"] for operation, summary in latency.items()}
         
         # Obtener estadísticas del pool de conexiones
         pool_stats = {
@@ -1014,9 +1149,11 @@ class VertexAIClient:
         
         return {
             **self.stats,
+            "latency_ms": latency,
             "latency_avg_ms": latency_avg,
             "cache": cache_stats,
             "connection_pool": pool_stats,
+            "prompt_prefixes": prefix_cache.get_stats(),
             "initialized": self.is_initialized
         }
     
@@ -1064,7 +1201,13 @@ vertex_ai_client = VertexAIClient(
     l1_size_ratio=float(os.environ.get("VERTEX_L1_SIZE_RATIO", "0.3")),
     prefetch_threshold=float(os.environ.get("VERTEX_PREFETCH_THRESHOLD", "0.7")),
     compression_threshold=get_env_int("VERTEX_COMPRESSION_THRESHOLD", 1024),
-    compression_level=get_env_int("VERTEX_COMPRESSION_LEVEL", 6)
+    compression_level=get_env_int("VERTEX_COMPRESSION_LEVEL", 6),
+    
+    # Reutilización de prefijos de prompt y cachés de contexto de Vertex AI
+    prefix_registry_size=get_env_int("VERTEX_PREFIX_REGISTRY_SIZE", 512),
+    context_cache_min_tokens=get_env_int("VERTEX_CONTEXT_CACHE_MIN_TOKENS", 32768),
+    context_cache_ttl=get_env_int("VERTEX_CONTEXT_CACHE_TTL", 3600),
+    context_cache_model=os.environ.get("VERTEX_CONTEXT_CACHE_MODEL", "gemini-1.5-pro-002")
 )
 
 
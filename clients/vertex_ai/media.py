@@ -0,0 +1,461 @@
+"""
+Obtención de recursos multimedia para los clientes de Vertex AI.
+
+Centraliza la descarga de imágenes y audio desde URLs y la lectura desde
+archivo para los clientes de visión, multimodal y voz:
+
+- Una única sesión HTTP compartida con keep-alive y límites por host, en lugar
+  de una sesión (y un handshake TCP/TLS) por descarga.
+- Lecturas en streaming con un tamaño máximo configurable.
+- E/S de archivos fuera del bucle de eventos.
+- Caché local direccionada por contenido, de modo que las URLs repetidas (por
+  ejemplo, las fotos de progreso de un mismo usuario) se descargan una sola vez
+  y las descargas concurrentes de la misma URL se combinan.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from core.logging_config import get_logger
+from core.settings import settings
+
+logger = get_logger(__name__)
+
+
+class MediaFetchError(Exception):
+    """Error al obtener un recurso multimedia."""
+
+
+class MediaTooLargeError(MediaFetchError):
+    """El recurso supera el tamaño máximo permitido."""
+
+
+@dataclass
+class _InflightDownload:
+    """Descarga en curso compartida por las solicitudes de la misma URL."""
+
+    task: asyncio.Task
+    limit: int
+    waiters: int = 0
+
+
+class MediaFetcher:
+    """
+    Descarga y lee recursos multimedia con una sesión HTTP compartida y caché local.
+
+    La sesión se crea de forma perezosa en el bucle de eventos activo y debe
+    cerrarse con ``close()`` al apagar la aplicación.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        cache_dir: Optional[str] = None,
+        max_cache_bytes: Optional[int] = None,
+        url_ttl: float = 24 * 3600,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        keepalive_timeout: float = 30.0,
+        timeout: float = 30.0,
+        chunk_size: int = 64 * 1024,
+        max_index_entries: int = 1024
+    ):
+        """
+        Inicializa el gestor de recursos multimedia.
+
+        Args:
+            max_bytes: Tamaño máximo de un recurso (por defecto ``MEDIA_MAX_BYTES``)
+            cache_dir: Directorio de la caché local (por defecto ``MEDIA_CACHE_DIR``);
+                una cadena vacía desactiva la caché
+            max_cache_bytes: Tamaño máximo de la caché en disco
+            url_ttl: Segundos durante los que una URL se considera inmutable
+            limit: Conexiones simultáneas máximas del pool
+            limit_per_host: Conexiones simultáneas máximas por host
+            keepalive_timeout: Segundos que se mantiene abierta una conexión ociosa
+            timeout: Tiempo máximo de una descarga (segundos)
+            chunk_size: Tamaño de los bloques leídos en streaming
+            max_index_entries: Entradas URL -> contenido mantenidas en memoria
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else settings.media_max_bytes
+        if cache_dir is None:
+            cache_dir = settings.media_cache_dir or os.path.join(tempfile.gettempdir(), "ngx_media_cache")
+        self.cache_dir = cache_dir or None
+        self.max_cache_bytes = max_cache_bytes if max_cache_bytes is not None else settings.media_cache_max_bytes
+        self.url_ttl = url_ttl
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_index_entries = max_index_entries
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._index: "OrderedDict[str, tuple]" = OrderedDict()  # url -> (digest, timestamp)
+        self._inflight: Dict[str, _InflightDownload] = {}
+        self._bytes_since_prune = 0
+
+        self.stats = {
+            "downloads": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "bytes_downloaded": 0,
+            "files_read": 0,
+            "rejected_too_large": 0,
+        }
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        Obtiene la sesión HTTP compartida, creándola si es necesario.
+
+        Returns:
+            aiohttp.ClientSession: Sesión asociada al bucle de eventos activo
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self) -> None:
+        """Cierra la sesión HTTP compartida."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def fetch(self, url: str, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Obtiene el contenido de una URL, usando la caché si es posible.
+
+        Args:
+            url: URL del recurso
+            max_bytes: Tamaño máximo permitido (por defecto el del gestor)
+
+        Returns:
+            bytes: Contenido del recurso
+
+        Raises:
+            MediaTooLargeError: Si el recurso supera el tamaño máximo
+            MediaFetchError: Si la descarga falla
+        """
+        limit = max_bytes or self.max_bytes
+
+        cached = await self._load_cached(url)
+        if cached is not None and len(cached) <= limit:
+            self.stats["cache_hits"] += 1
+            return cached
+
+        # Combinar descargas concurrentes de la misma URL. La descarga es una
+        # tarea del gestor: cancelar una solicitud no cancela a las demás. Solo
+        # se combina con una descarga cuyo límite cubre el de esta solicitud.
+        download = self._inflight.get(url)
+        if download is not None and download.limit >= limit:
+            self.stats["coalesced"] += 1
+        else:
+            download = _InflightDownload(asyncio.create_task(self._download_and_store(url, limit)), limit)
+            self._inflight[url] = download
+            download.task.add_done_callback(lambda task: self._release(url, download))
+
+        download.waiters += 1
+        try:
+            data = await asyncio.shield(download.task)
+        except asyncio.CancelledError:
+            # Si nadie más espera la descarga, deja de tener sentido
+            if download.waiters == 1 and not download.task.done():
+                self._release(url, download)
+                download.task.cancel()
+            raise
+        finally:
+            download.waiters -= 1
+
+        if len(data) > limit:
+            raise MediaTooLargeError(f"El recurso supera el tamaño máximo de {limit} bytes")
+        return data
+
+    async def _download_and_store(self, url: str, limit: int) -> bytes:
+        data = await self._download(url, limit)
+        await self._store_cached(url, data)
+        return data
+
+    def _release(self, url: str, download: _InflightDownload) -> None:
+        if self._inflight.get(url) is download:
+            del self._inflight[url]
+
+    async def fetch_base64(self, url: str, max_bytes: Optional[int] = None) -> str:
+        """
+        Obtiene el contenido de una URL codificado en base64.
+
+        Args:
+            url: URL del recurso
+            max_bytes: Tamaño máximo permitido (por defecto el del gestor)
+
+        Returns:
+            str: Contenido en base64
+        """
+        return self._encode(await self.fetch(url, max_bytes))
+
+    async def stream(self, url: str, chunk_size: Optional[int] = None,
+                     max_bytes: Optional[int] = None) -> AsyncIterator[bytes]:
+        """
+        Descarga una URL por bloques sin acumular el contenido en memoria.
+
+        El contenido no pasa por la caché local (guardarlo exigiría tenerlo
+        entero); se usa para audio largo que se procesa a medida que llega.
+
+        Args:
+            url: URL del recurso
+            chunk_size: Tamaño de los bloques (por defecto el del gestor)
+            max_bytes: Tamaño máximo permitido (por defecto el del gestor)
+
+        Yields:
+            bytes: Bloques del recurso
+
+        Raises:
+            MediaTooLargeError: Si el recurso supera el tamaño máximo
+            MediaFetchError: Si la descarga falla
+        """
+        limit = max_bytes or self.max_bytes
+        session = await self.get_session()
+        received = 0
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise MediaFetchError(f"Error al descargar recurso: {response.status}")
+
+            if response.content_length is not None and response.content_length > limit:
+                self.stats["rejected_too_large"] += 1
+                raise MediaTooLargeError(
+                    f"El recurso ocupa {response.content_length} bytes (máximo {limit})"
+                )
+
+            async for chunk in response.content.iter_chunked(chunk_size or self.chunk_size):
+                received += len(chunk)
+                if received > limit:
+                    self.stats["rejected_too_large"] += 1
+                    raise MediaTooLargeError(f"El recurso supera el tamaño máximo de {limit} bytes")
+                yield chunk
+
+        self.stats["downloads"] += 1
+        self.stats["bytes_downloaded"] += received
+
+    async def read_file(self, path: str, max_bytes: Optional[int] = None) -> bytes:
+        """
+        Lee un archivo sin bloquear el bucle de eventos.
+
+        Args:
+            path: Ruta del archivo
+            max_bytes: Tamaño máximo permitido (por defecto el del gestor)
+
+        Returns:
+            bytes: Contenido del archivo
+
+        Raises:
+            MediaTooLargeError: Si el archivo supera el tamaño máximo
+        """
+        limit = max_bytes or self.max_bytes
+        data = await asyncio.to_thread(self._read_file_sync, path, limit)
+        self.stats["files_read"] += 1
+        return data
+
+    async def read_file_base64(self, path: str, max_bytes: Optional[int] = None) -> str:
+        """
+        Lee un archivo y devuelve su contenido codificado en base64.
+
+        Args:
+            path: Ruta del archivo
+            max_bytes: Tamaño máximo permitido (por defecto el del gestor)
+
+        Returns:
+            str: Contenido en base64
+        """
+        return self._encode(await self.read_file(path, max_bytes))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas de uso.
+
+        Returns:
+            Dict[str, Any]: Contadores de descargas, aciertos de caché y lecturas
+        """
+        return {**self.stats, "indexed_urls": len(self._index), "cache_dir": self.cache_dir}
+
+    async def _download(self, url: str, limit: int) -> bytes:
+        """Descarga una URL en streaming respetando el tamaño máximo."""
+        session = await self.get_session()
+        async with session.get(url) as response:
+            if response.status != 200:
+                raise MediaFetchError(f"Error al descargar recurso: {response.status}")
+
+            if response.content_length is not None and response.content_length > limit:
+                self.stats["rejected_too_large"] += 1
+                raise MediaTooLargeError(
+                    f"El recurso ocupa {response.content_length} bytes (máximo {limit})"
+                )
+
+            buffer = bytearray()
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                buffer.extend(chunk)
+                if len(buffer) > limit:
+                    self.stats["rejected_too_large"] += 1
+                    raise MediaTooLargeError(f"El recurso supera el tamaño máximo de {limit} bytes")
+
+        self.stats["downloads"] += 1
+        self.stats["bytes_downloaded"] += len(buffer)
+        return bytes(buffer)
+
+    @staticmethod
+    def _read_file_sync(path: str, limit: int) -> bytes:
+        """Lee un archivo comprobando antes su tamaño."""
+        size = os.path.getsize(path)
+        if size > limit:
+            raise MediaTooLargeError(f"El archivo ocupa {size} bytes (máximo {limit})")
+        with open(path, "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _encode(data: bytes) -> str:
+        return base64.b64encode(data).decode("utf-8")
+
+    # Caché direccionada por contenido: blobs/<sha256 del contenido> y
+    # urls/<sha256 de la URL> con el digest del contenido al que apunta.
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "blobs", digest[:2], digest)
+
+    def _alias_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, "urls", hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    async def _load_cached(self, url: str) -> Optional[bytes]:
+        """Devuelve el contenido en caché de una URL, si existe y no ha caducado."""
+        if not self.cache_dir:
+            return None
+
+        now = time.time()
+        entry = self._index.get(url)
+        if entry is not None:
+            digest, stored_at = entry
+            if now - stored_at > self.url_ttl:
+                del self._index[url]
+                return None
+            self._index.move_to_end(url)
+        else:
+            digest, stored_at = None, None
+
+        try:
+            data, digest, stored_at = await asyncio.to_thread(self._load_cached_sync, url, digest, stored_at, now)
+        except Exception as e:
+            logger.warning(f"Error al leer la caché de recursos multimedia: {e}")
+            return None
+
+        if data is not None:
+            self._remember(url, digest, stored_at)
+        return data
+
+    def _load_cached_sync(self, url: str, digest: Optional[str], stored_at: Optional[float], now: float):
+        if digest is None:
+            alias = self._alias_path(url)
+            if not os.path.exists(alias):
+                return None, None, None
+            stored_at = os.path.getmtime(alias)
+            if now - stored_at > self.url_ttl:
+                return None, None, None
+            with open(alias, "r") as f:
+                digest = f.read().strip()
+
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            return None, None, None
+        with open(blob, "rb") as f:
+            data = f.read()
+        # Descartar blobs corruptos o truncados
+        if hashlib.sha256(data).hexdigest() != digest:
+            return None, None, None
+        return data, digest, stored_at
+
+    async def _store_cached(self, url: str, data: bytes) -> None:
+        """Guarda el contenido de una URL en la caché."""
+        if not self.cache_dir:
+            return
+
+        digest = hashlib.sha256(data).hexdigest()
+        try:
+            await asyncio.to_thread(self._store_cached_sync, url, digest, data)
+        except Exception as e:
+            logger.warning(f"Error al escribir en la caché de recursos multimedia: {e}")
+            return
+
+        self._remember(url, digest, time.time())
+        self._bytes_since_prune += len(data)
+        if self._bytes_since_prune > self.max_cache_bytes // 10:
+            self._bytes_since_prune = 0
+            try:
+                await asyncio.to_thread(self._prune_sync)
+            except Exception as e:
+                logger.warning(f"Error al limpiar la caché de recursos multimedia: {e}")
+
+    def _store_cached_sync(self, url: str, digest: str, data: bytes) -> None:
+        blob = self._blob_path(digest)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            tmp = f"{blob}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, blob)
+
+        alias = self._alias_path(url)
+        os.makedirs(os.path.dirname(alias), exist_ok=True)
+        tmp = f"{alias}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(digest)
+        os.replace(tmp, alias)
+
+    def _prune_sync(self) -> None:
+        """Elimina los blobs más antiguos hasta respetar el tamaño máximo de la caché."""
+        blobs_dir = os.path.join(self.cache_dir, "blobs")
+        entries = []
+        total = 0
+        for root, _, files in os.walk(blobs_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        if total <= self.max_cache_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_cache_bytes:
+                break
+            os.remove(path)
+            total -= size
+        logger.info(f"Caché de recursos multimedia reducida a {total} bytes")
+
+    def _remember(self, url: str, digest: str, stored_at: float) -> None:
+        self._index[url] = (digest, stored_at)
+        self._index.move_to_end(url)
+        while len(self._index) > self.max_index_entries:
+            self._index.popitem(last=False)
+
+
+# Instancia global compartida por los clientes de Vertex AI
+media_fetcher = MediaFetcher()
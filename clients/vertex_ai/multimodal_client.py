@@ -6,17 +6,16 @@ multimodales de Vertex AI, permitiendo procesar entradas combinadas de texto e i
 y realizar análisis que requieren comprensión de múltiples modalidades.
 """
 import logging
-import base64
 import os
 import json
 import asyncio
 import time
 from typing import Dict, Any, Optional, Union, List
-import aiohttp
 from google.cloud import aiplatform
 from google.cloud.aiplatform import VertexAI
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
+from clients.vertex_ai.media import media_fetcher
 
 # Configurar logger
 logger = get_logger(__name__)
@@ -446,13 +445,7 @@ class VertexAIMultimodalClient:
             str: Imagen en formato base64
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        return base64.b64encode(image_data).decode("utf-8")
-                    else:
-                        raise Exception(f"Error al descargar imagen: {response.status}")
+            return await media_fetcher.fetch_base64(url)
         except Exception as e:
             logger.error(f"Error al descargar imagen desde URL: {e}", exc_info=True)
             raise
@@ -468,9 +461,7 @@ class VertexAIMultimodalClient:
             str: Imagen en formato base64
         """
         try:
-            with open(path, "rb") as image_file:
-                image_data = image_file.read()
-                return base64.b64encode(image_data).decode("utf-8")
+            return await media_fetcher.read_file_base64(path)
         except Exception as e:
             logger.error(f"Error al leer imagen desde archivo: {e}", exc_info=True)
             raise
\ No newline at end of file
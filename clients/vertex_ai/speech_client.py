@@ -12,11 +12,12 @@ import json
 import asyncio
 import time
 from typing import Dict, Any, Optional, Union, List
-import aiohttp
 from google.cloud import aiplatform
 from google.cloud.aiplatform import VertexAI
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
+from clients.vertex_ai.audio_stream import audio_stream_pipeline
+from clients.vertex_ai.media import media_fetcher
 
 # Configurar logger
 logger = get_logger(__name__)
@@ -53,13 +54,13 @@ class VertexAISpeechClient:
         except Exception as e:
             logger.error(f"Error al inicializar Vertex AI para VertexAISpeechClient: {e}", exc_info=True)
     
-    async def transcribe_audio(self, audio_data: Union[str, Dict[str, Any]], 
+    async def transcribe_audio(self, audio_data: Union[str, bytes, Dict[str, Any]], 
                              language_code: str = "es-ES") -> Dict[str, Any]:
         """
         Transcribe audio a texto utilizando Vertex AI.
         
         Args:
-            audio_data: Datos del audio (base64, URL o ruta de archivo)
+            audio_data: Datos del audio (bytes, base64, URL o ruta de archivo)
             language_code: Código de idioma para la transcripción
             
         Returns:
@@ -75,9 +76,6 @@ class VertexAISpeechClient:
             self.telemetry.add_span_attribute(span, "language_code", language_code)
         
         try:
-            # Procesar el audio según el formato proporcionado
-            processed_audio = await self._process_audio_input(audio_data)
-            
             # Llamar a Vertex AI para la transcripción
             if self.vertex_ai_initialized:
                 # Usar el cliente de Vertex AI
@@ -89,38 +87,39 @@ class VertexAISpeechClient:
                     "model": self.model
                 }
                 
-                # Crear la solicitud
-                request = {
-                    "audio": {
-                        "content": processed_audio
-                    },
-                    "config": config
-                }
+                async def transcribe_segment(content: str) -> Dict[str, Any]:
+                    response = await vertex_ai.speech.transcribe_async(audio={"content": content}, config=config)
+                    if not response.results:
+                        return {"text": "", "confidence": 0.0}
+                    best = response.results[0].alternatives[0]
+                    return {"text": best.transcript, "confidence": best.confidence}
                 
-                # Enviar la solicitud
-                response = await vertex_ai.speech.transcribe_async(**request)
+                # El audio se lee por bloques y se transcribe por segmentos de voz
+                transcript = await audio_stream_pipeline.transcribe(
+                    audio_data, transcribe_segment, cache_namespace=f"{self.model}:{language_code}"
+                )
                 
                 # Procesar la respuesta
                 result = {
-                    "text": response.results[0].alternatives[0].transcript if response.results else "",
-                    "confidence": response.results[0].alternatives[0].confidence if response.results else 0.0,
+                    "text": transcript["text"],
+                    "confidence": transcript["confidence"],
                     "language_code": language_code,
                     "model": self.model,
-                    "status": "success"
+                    "status": "success",
+                    "segments": [
+                        {key: segment[key] for key in ("start_ms", "end_ms", "text", "confidence")}
+                        for segment in transcript["segments"]
+                    ]
                 }
                 
-                # Añadir alternativas si existen
-                if response.results and len(response.results[0].alternatives) > 1:
-                    result["alternatives"] = [
-                        {
-                            "text": alt.transcript,
-                            "confidence": alt.confidence
-                        }
-                        for alt in response.results[0].alternatives[1:]
-                    ]
+                if self.telemetry and span:
+                    self.telemetry.add_span_attribute(span, "segments", len(transcript["segments"]))
+                    self.telemetry.add_span_attribute(span, "cached_segments",
+                                                      sum(1 for segment in transcript["segments"] if segment["cached"]))
             else:
                 # Simulación para desarrollo/pruebas
                 logger.warning("Vertex AI no inicializado. Usando transcripción simulada.")
+                await self._process_audio_input(audio_data)
                 result = {
                     "text": "Texto simulado transcrito del audio. Vertex AI no está inicializado correctamente.",
                     "confidence": 0.8,
@@ -260,7 +259,7 @@ class VertexAISpeechClient:
                 "status": "error"
             }
     
-    async def analyze_audio(self, audio_data: Union[str, Dict[str, Any]], 
+    async def analyze_audio(self, audio_data: Union[str, bytes, Dict[str, Any]], 
                           analysis_type: str = "emotion",
                           language_code: str = "es-ES") -> Dict[str, Any]:
         """
@@ -284,9 +283,6 @@ class VertexAISpeechClient:
             self.telemetry.add_span_attribute(span, "language_code", language_code)
         
         try:
-            # Procesar el audio según el formato proporcionado
-            processed_audio = await self._process_audio_input(audio_data)
-            
             # Llamar a Vertex AI para el análisis
             if self.vertex_ai_initialized:
                 # Usar el cliente de Vertex AI
@@ -336,7 +332,7 @@ class VertexAISpeechClient:
                     # Análisis genérico
                     prompt = f"Analiza el audio y proporciona información detallada sobre {analysis_type}."
                 
-                # Primero transcribir el audio
+                # Primero transcribir el audio (los segmentos ya transcritos salen de la caché)
                 transcription_result = await self.transcribe_audio(audio_data, language_code)
                 
                 if transcription_result["status"] != "success":
@@ -387,6 +383,7 @@ class VertexAISpeechClient:
             else:
                 # Simulación para desarrollo/pruebas
                 logger.warning("Vertex AI no inicializado. Usando análisis de audio simulado.")
+                await self._process_audio_input(audio_data)
                 result = {
                     "transcription": "Texto simulado transcrito del audio.",
                     "analysis_type": analysis_type,
@@ -429,7 +426,7 @@ class VertexAISpeechClient:
                 "status": "error"
             }
     
-    async def _process_audio_input(self, audio_data: Union[str, Dict[str, Any]]) -> str:
+    async def _process_audio_input(self, audio_data: Union[str, bytes, Dict[str, Any]]) -> str:
         """
         Procesa los datos de entrada del audio en el formato requerido por Vertex AI.
         
@@ -439,6 +436,10 @@ class VertexAISpeechClient:
         Returns:
             str: Datos del audio en formato base64
         """
+        # Bytes leídos por el llamador
+        if isinstance(audio_data, (bytes, bytearray)):
+            return base64.b64encode(audio_data).decode("utf-8")
+        
         # Si ya es un diccionario con formato específico
         if isinstance(audio_data, dict):
             if "base64" in audio_data:
@@ -477,13 +478,7 @@ class VertexAISpeechClient:
             str: Audio en formato base64
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        audio_data = await response.read()
-                        return base64.b64encode(audio_data).decode("utf-8")
-                    else:
-                        raise Exception(f"Error al descargar audio: {response.status}")
+            return await media_fetcher.fetch_base64(url)
         except Exception as e:
             logger.error(f"Error al descargar audio desde URL: {e}", exc_info=True)
             raise
@@ -499,9 +494,7 @@ class VertexAISpeechClient:
             str: Audio en formato base64
         """
         try:
-            with open(path, "rb") as audio_file:
-                audio_data = audio_file.read()
-                return base64.b64encode(audio_data).decode("utf-8")
+            return await media_fetcher.read_file_base64(path)
         except Exception as e:
             logger.error(f"Error al leer audio desde archivo: {e}", exc_info=True)
             raise
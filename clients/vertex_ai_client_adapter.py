@@ -74,18 +74,22 @@ class VertexAIClientAdapter:
         temperature: float = 0.7,
         max_output_tokens: Optional[int] = None,
         top_p: Optional[float] = None,
-        top_k: Optional[int] = None
+        top_k: Optional[int] = None,
+        prompt_prefix: Optional[str] = None,
+        prefix_hash: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Genera contenido de texto usando el modelo de lenguaje.
         
         Args:
-            prompt: Prompt para el modelo
+            prompt: Prompt para el modelo (también acepta ``PromptParts``)
             system_instruction: Instrucción de sistema (opcional)
             temperature: Temperatura para la generación (0.0-1.0)
             max_output_tokens: Máximo de tokens a generar
             top_p: Parámetro top_p para muestreo
             top_k: Parámetro top_k para muestreo
+            prompt_prefix: Prefijo estable que precede al prompt (opcional)
+            prefix_hash: Hash del prefijo (opcional)
             
         Returns:
             Dict[str, Any]: Respuesta generada
@@ -98,7 +102,9 @@ class VertexAIClientAdapter:
             temperature=temperature,
             max_output_tokens=max_output_tokens,
             top_p=top_p,
-            top_k=top_k
+            top_k=top_k,
+            prompt_prefix=prompt_prefix,
+            prefix_hash=prefix_hash
         )
     
     async def generate_embedding(self, text: str) -> List[float]:
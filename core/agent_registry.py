@@ -0,0 +1,292 @@
+"""
+Registro de agentes basado en un manifiesto.
+
+El manifiesto (``config/agents.json``) describe cada agente (módulo, clase,
+nombre, descripción, capacidades y dependencias del constructor) sin importar
+su código. Así se pueden listar los agentes sin cargar aiplatform, matplotlib,
+scipy o PIL, y cada agente se importa y se construye la primera vez que se
+usa. Opcionalmente, algunos agentes pueden precalentarse en segundo plano al
+iniciar la aplicación.
+"""
+
+import asyncio
+import importlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from core.logging_config import get_logger
+from core.settings import settings
+
+logger = get_logger(__name__)
+
+
+class AgentManifestEntry(BaseModel):
+    """Metadatos de un agente tal como aparecen en el manifiesto."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    agent_id: str
+    module: str
+    class_name: str = Field(alias="class")
+    name: str
+    description: str = ""
+    capabilities: List[str] = Field(default_factory=list)
+    dependencies: List[str] = Field(default_factory=list)
+    kwargs: Dict[str, Any] = Field(default_factory=dict)
+
+
+class AgentRegistry:
+    """
+    Registro perezoso de agentes.
+
+    Los metadatos se leen del manifiesto; las instancias se crean bajo demanda
+    con ``get`` y se memorizan. Las dependencias compartidas (gestor de estado,
+    toolkit MCP, URL A2A...) se obtienen de ``providers`` una sola vez.
+    """
+
+    def __init__(
+        self,
+        manifest_path: Optional[str] = None,
+        providers: Optional[Dict[str, Callable[[], Any]]] = None,
+    ):
+        """
+        Inicializa el registro.
+
+        Args:
+            manifest_path: Ruta del manifiesto (por defecto ``settings.agent_manifest_path``)
+            providers: Funciones que construyen las dependencias de los agentes por nombre
+        """
+        self.manifest_path = manifest_path or settings.agent_manifest_path
+        self._providers: Dict[str, Callable[[], Any]] = dict(providers or {})
+        self._dependencies: Dict[str, Any] = {}
+        self._manifest: Optional[Dict[str, AgentManifestEntry]] = None
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._agent_locks: Dict[str, threading.Lock] = {}
+        self.stats = {
+            "loads": 0,
+            "load_errors": 0,
+            "load_times": {},
+        }
+
+    def register_provider(self, name: str, provider: Callable[[], Any]) -> None:
+        """
+        Registra la función que construye una dependencia de los agentes.
+
+        Args:
+            name: Nombre de la dependencia (argumento del constructor)
+            provider: Función sin argumentos que devuelve la dependencia
+        """
+        with self._lock:
+            self._providers[name] = provider
+            self._dependencies.pop(name, None)
+
+    def _load_manifest(self) -> Dict[str, AgentManifestEntry]:
+        if self._manifest is not None:
+            return self._manifest
+
+        with self._lock:
+            if self._manifest is not None:
+                return self._manifest
+
+            manifest: Dict[str, AgentManifestEntry] = {}
+            if not os.path.exists(self.manifest_path):
+                logger.warning(f"Manifiesto de agentes no encontrado: {self.manifest_path}")
+            else:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+                for agent_id, entry in config.get("agents", {}).items():
+                    manifest[agent_id] = AgentManifestEntry(agent_id=agent_id, **entry)
+                logger.info(f"Manifiesto de agentes cargado: {len(manifest)} agentes")
+
+            self._manifest = manifest
+            return manifest
+
+    def list_agents(self) -> List[AgentManifestEntry]:
+        """
+        Lista los agentes del manifiesto sin importarlos.
+
+        Returns:
+            List[AgentManifestEntry]: Metadatos de los agentes
+        """
+        return list(self._load_manifest().values())
+
+    def get_entry(self, agent_id: str) -> AgentManifestEntry:
+        """
+        Obtiene los metadatos de un agente.
+
+        Args:
+            agent_id: ID del agente
+
+        Returns:
+            AgentManifestEntry: Metadatos del agente
+
+        Raises:
+            KeyError: Si el agente no está en el manifiesto
+        """
+        manifest = self._load_manifest()
+        if agent_id not in manifest:
+            raise KeyError(f"Agente {agent_id} no registrado en el manifiesto")
+        return manifest[agent_id]
+
+    def has(self, agent_id: str) -> bool:
+        """Indica si el agente está en el manifiesto."""
+        return agent_id in self._load_manifest()
+
+    def is_loaded(self, agent_id: str) -> bool:
+        """Indica si el agente ya se ha construido."""
+        return agent_id in self._instances
+
+    def loaded_agents(self) -> Dict[str, Any]:
+        """
+        Obtiene los agentes ya construidos.
+
+        Returns:
+            Dict[str, Any]: Instancias por ID de agente
+        """
+        return dict(self._instances)
+
+    def _resolve_dependency(self, name: str) -> Any:
+        with self._lock:
+            if name in self._dependencies:
+                return self._dependencies[name]
+            provider = self._providers.get(name)
+        if provider is None:
+            raise KeyError(f"Dependencia de agente no registrada: {name}")
+
+        value = provider()
+        with self._lock:
+            return self._dependencies.setdefault(name, value)
+
+    def _agent_lock(self, agent_id: str) -> threading.Lock:
+        with self._lock:
+            return self._agent_locks.setdefault(agent_id, threading.Lock())
+
+    def get(self, agent_id: str) -> Any:
+        """
+        Obtiene un agente, importándolo y construyéndolo en el primer uso.
+
+        La construcción está protegida por un bloqueo por agente, de modo que
+        una petición y el precalentamiento no crean dos instancias.
+
+        Args:
+            agent_id: ID del agente
+
+        Returns:
+            Any: Instancia del agente
+
+        Raises:
+            KeyError: Si el agente no está en el manifiesto
+        """
+        instance = self._instances.get(agent_id)
+        if instance is not None:
+            return instance
+
+        entry = self.get_entry(agent_id)
+        with self._agent_lock(agent_id):
+            instance = self._instances.get(agent_id)
+            if instance is not None:
+                return instance
+
+            start_time = time.time()
+            try:
+                module = importlib.import_module(entry.module)
+                agent_class = getattr(module, entry.class_name)
+                kwargs = {name: self._resolve_dependency(name) for name in entry.dependencies}
+                kwargs.update(entry.kwargs)
+                instance = agent_class(**kwargs)
+            except Exception:
+                self.stats["load_errors"] += 1
+                raise
+
+            elapsed = time.time() - start_time
+            self._instances[agent_id] = instance
+            self.stats["loads"] += 1
+            self.stats["load_times"][agent_id] = elapsed
+            logger.info(f"Agente {agent_id} construido bajo demanda en {elapsed:.3f}s")
+            return instance
+
+    def load_all(self) -> Dict[str, Any]:
+        """
+        Construye todos los agentes del manifiesto (modo no perezoso).
+
+        Los agentes que fallan se registran en el log y se omiten.
+
+        Returns:
+            Dict[str, Any]: Instancias por ID de agente
+        """
+        for entry in self.list_agents():
+            try:
+                self.get(entry.agent_id)
+            except Exception as e:
+                logger.error(f"Error al cargar o instanciar agente {entry.agent_id}: {e}", exc_info=True)
+        return self.loaded_agents()
+
+    def parse_agent_ids(self, value: str) -> List[str]:
+        """
+        Interpreta una lista de IDs separados por comas ("*" para todos).
+
+        Args:
+            value: Lista de IDs (p. ej. el valor de ``settings.agent_prewarm``)
+
+        Returns:
+            List[str]: IDs de agentes presentes en el manifiesto
+        """
+        ids = [item.strip() for item in (value or "").split(",") if item.strip()]
+        if "*" in ids:
+            return [entry.agent_id for entry in self.list_agents()]
+        unknown = [agent_id for agent_id in ids if not self.has(agent_id)]
+        if unknown:
+            logger.warning(f"Agentes a precalentar no registrados: {unknown}")
+        return [agent_id for agent_id in ids if self.has(agent_id)]
+
+    async def prewarm(self, agent_ids: Iterable[str]) -> Dict[str, bool]:
+        """
+        Construye agentes en segundo plano sin bloquear el bucle de eventos.
+
+        Args:
+            agent_ids: IDs de los agentes a precalentar
+
+        Returns:
+            Dict[str, bool]: Si cada agente se construyó correctamente
+        """
+        results: Dict[str, bool] = {}
+        for agent_id in agent_ids:
+            try:
+                await asyncio.to_thread(self.get, agent_id)
+                results[agent_id] = True
+            except Exception as e:
+                logger.error(f"Error al precalentar agente {agent_id}: {e}", exc_info=True)
+                results[agent_id] = False
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del registro.
+
+        Returns:
+            Dict[str, Any]: Agentes registrados, construidos y tiempos de carga
+        """
+        return {
+            "registered": len(self._load_manifest()),
+            "loaded": sorted(self._instances),
+            "loads": self.stats["loads"],
+            "load_errors": self.stats["load_errors"],
+            "load_times": dict(self.stats["load_times"]),
+        }
+
+    def clear(self) -> None:
+        """Descarta las instancias y dependencias construidas y recarga el manifiesto."""
+        with self._lock:
+            self._instances.clear()
+            self._dependencies.clear()
+            self._manifest = None
+
+
+# Instancia global del registro de agentes
+agent_registry = AgentRegistry()
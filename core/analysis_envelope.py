@@ -0,0 +1,266 @@
+"""
+Sobre de análisis compartido entre el orquestador y los agentes especializados.
+
+El orquestador ya clasifica la intención y extrae las entidades de cada turno
+del usuario. ``AnalysisEnvelope`` empaqueta ese resultado en un objeto tipado y
+versionado que viaja en el contexto de la tarea A2A (``A2ATaskContext.analysis``
+o la clave ``"analysis"`` del contexto), de modo que los agentes especializados
+pueden reutilizarlo en lugar de volver a clasificar el mismo texto.
+
+Un agente solo confía en el sobre si es de la versión actual, no ha caducado y
+corresponde al mismo texto que recibe (mediante un hash del texto normalizado).
+En cualquier otro caso el agente realiza su propia clasificación como antes.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Mapping, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+
+from core.logging_config import get_logger
+from core.settings import settings
+
+logger = get_logger(__name__)
+
+ANALYSIS_ENVELOPE_VERSION = 1
+ANALYSIS_CONTEXT_KEY = "analysis"
+
+
+def hash_query(text: str) -> str:
+    """
+    Calcula el hash del texto normalizado (espacios y mayúsculas).
+
+    Args:
+        text: Texto del usuario
+
+    Returns:
+        str: Hash hexadecimal del texto
+    """
+    normalized = " ".join((text or "").split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def _normalize_entities(entities: Any) -> Dict[str, Any]:
+    """
+    Convierte las entidades reconocidas a un diccionario ``tipo -> valor``.
+
+    Acepta un diccionario, una lista de ``IntentEntity`` o una lista de
+    diccionarios con ``entity_type``/``type`` y ``value``. Si un tipo aparece
+    varias veces, su valor es la lista de valores.
+    """
+    if not entities:
+        return {}
+    if isinstance(entities, Mapping):
+        return dict(entities)
+
+    normalized: Dict[str, Any] = {}
+    for entity in entities:
+        if isinstance(entity, Mapping):
+            entity_type = entity.get("entity_type") or entity.get("type")
+            value = entity.get("value")
+        else:
+            entity_type = getattr(entity, "entity_type", None)
+            value = getattr(entity, "value", None)
+        if not entity_type:
+            continue
+        if entity_type in normalized:
+            current = normalized[entity_type]
+            normalized[entity_type] = (current if isinstance(current, list) else [current]) + [value]
+        else:
+            normalized[entity_type] = value
+    return normalized
+
+
+class AnalysisEnvelope(BaseModel):
+    """Resultado del análisis de intención de un turno, listo para compartirse entre agentes."""
+
+    version: int = ANALYSIS_ENVELOPE_VERSION
+    query_hash: str
+    primary_intent: str = "general"
+    secondary_intents: List[str] = Field(default_factory=list)
+    confidence: float = 0.0
+    entities: Dict[str, Any] = Field(default_factory=dict)
+    target_agents: List[str] = Field(default_factory=list)
+    source: str = "orchestrator"
+    created_at: float = Field(default_factory=time.time)
+
+    @classmethod
+    def build(
+        cls,
+        query: str,
+        primary_intent: str,
+        secondary_intents: Optional[List[str]] = None,
+        confidence: float = 0.0,
+        entities: Any = None,
+        target_agents: Optional[List[str]] = None,
+        source: str = "orchestrator",
+    ) -> "AnalysisEnvelope":
+        """
+        Crea un sobre para el texto indicado.
+
+        Args:
+            query: Texto analizado
+            primary_intent: Intención principal
+            secondary_intents: Intenciones secundarias
+            confidence: Confianza de la intención principal (0.0-1.0)
+            entities: Entidades reconocidas (diccionario o lista de entidades)
+            target_agents: Agentes a los que se enruta el turno
+            source: Componente que realizó el análisis
+
+        Returns:
+            AnalysisEnvelope: Sobre de análisis
+        """
+        return cls(
+            query_hash=hash_query(query),
+            primary_intent=(primary_intent or "general").lower(),
+            secondary_intents=[intent.lower() for intent in secondary_intents or []],
+            confidence=float(confidence or 0.0),
+            entities=_normalize_entities(entities),
+            target_agents=list(target_agents or []),
+            source=source,
+        )
+
+    def age(self, now: Optional[float] = None) -> float:
+        """Segundos transcurridos desde la creación del sobre."""
+        return (now if now is not None else time.time()) - self.created_at
+
+    def is_fresh(self, max_age: Optional[float] = None, now: Optional[float] = None) -> bool:
+        """
+        Indica si el sobre sigue vigente.
+
+        Args:
+            max_age: Antigüedad máxima en segundos (por defecto ``ANALYSIS_ENVELOPE_MAX_AGE``)
+            now: Marca de tiempo de referencia
+
+        Returns:
+            bool: True si el sobre no ha caducado
+        """
+        if max_age is None:
+            max_age = float(settings.analysis_envelope_max_age)
+        return 0.0 <= self.age(now) <= max_age
+
+    def applies_to(self, query: str, max_age: Optional[float] = None) -> bool:
+        """
+        Indica si un agente puede reutilizar el sobre para el texto recibido.
+
+        Args:
+            query: Texto que recibe el agente
+            max_age: Antigüedad máxima en segundos
+
+        Returns:
+            bool: True si la versión es compatible, el sobre es reciente y el texto coincide
+        """
+        return (
+            self.version == ANALYSIS_ENVELOPE_VERSION
+            and self.is_fresh(max_age)
+            and self.query_hash == hash_query(query)
+        )
+
+    @property
+    def intents(self) -> List[str]:
+        """Intención principal seguida de las secundarias."""
+        return [self.primary_intent] + [i for i in self.secondary_intents if i != self.primary_intent]
+
+    def score_for(self, agent_id: str) -> Optional[float]:
+        """
+        Puntuación de clasificación del turno para un agente.
+
+        Args:
+            agent_id: ID del agente
+
+        Returns:
+            Optional[float]: La confianza si el agente es destinatario, 0.0 si no lo es,
+            o None si el sobre no indica destinatarios
+        """
+        if not self.target_agents:
+            return None
+        return self.confidence if agent_id in self.target_agents else 0.0
+
+    def to_intents(self) -> List[Any]:
+        """
+        Convierte el sobre a la lista de ``Intent`` que devuelve el analizador de intenciones.
+
+        Returns:
+            List[Intent]: Intención principal (con las entidades) y secundarias
+        """
+        from core.intent_analyzer import Intent, IntentEntity
+
+        entities = []
+        for entity_type, value in self.entities.items():
+            for item in value if isinstance(value, list) else [value]:
+                entities.append(IntentEntity(entity_type, item, self.confidence))
+
+        return [
+            Intent(
+                intent_type=intent,
+                confidence=self.confidence,
+                agents=list(self.target_agents),
+                entities=entities if index == 0 else None,
+                metadata={"source": self.source, "from_envelope": True},
+            )
+            for index, intent in enumerate(self.intents)
+        ]
+
+    def to_payload(self) -> Dict[str, Any]:
+        """Representación serializable para el contexto A2A."""
+        return self.model_dump(mode="json")
+
+
+def attach_analysis(context: Optional[Dict[str, Any]], envelope: Optional[AnalysisEnvelope]) -> Dict[str, Any]:
+    """
+    Devuelve una copia del contexto con el sobre de análisis adjunto.
+
+    Args:
+        context: Contexto de la tarea
+        envelope: Sobre de análisis (si es None, el contexto se copia sin cambios)
+
+    Returns:
+        Dict[str, Any]: Contexto con la clave ``"analysis"``
+    """
+    task_context = dict(context or {})
+    if envelope is not None:
+        task_context[ANALYSIS_CONTEXT_KEY] = envelope.to_payload()
+    return task_context
+
+
+def extract_analysis(context: Any, query: str, max_age: Optional[float] = None) -> Optional[AnalysisEnvelope]:
+    """
+    Obtiene el sobre de análisis de un contexto A2A si se puede reutilizar para el texto.
+
+    Busca el sobre en ``context["analysis"]`` y en ``context["additional_context"]["analysis"]``.
+    El contexto puede ser un diccionario o un ``A2ATaskContext``.
+
+    Args:
+        context: Contexto recibido por el agente
+        query: Texto que recibe el agente
+        max_age: Antigüedad máxima en segundos
+
+    Returns:
+        Optional[AnalysisEnvelope]: El sobre, o None si no hay uno válido y vigente
+    """
+    if context is None:
+        return None
+    if isinstance(context, BaseModel):
+        context = context.model_dump()
+    if not isinstance(context, Mapping):
+        return None
+
+    payload = context.get(ANALYSIS_CONTEXT_KEY)
+    if payload is None and isinstance(context.get("additional_context"), Mapping):
+        payload = context["additional_context"].get(ANALYSIS_CONTEXT_KEY)
+    if payload is None:
+        return None
+
+    try:
+        envelope = payload if isinstance(payload, AnalysisEnvelope) else AnalysisEnvelope.model_validate(payload)
+    except ValidationError as e:
+        logger.warning(f"Sobre de análisis inválido, se ignora: {e}")
+        return None
+
+    if not envelope.applies_to(query, max_age):
+        logger.debug(
+            f"Sobre de análisis descartado (versión {envelope.version}, antigüedad {envelope.age():.1f}s)"
+        )
+        return None
+    return envelope
@@ -9,9 +9,12 @@ cuando se alcanzan los límites.
 import logging
 import time
 import os
-from typing import Dict, Optional, Any, List, Tuple
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Any, List, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import contextvars
+import functools
 import json
 from enum import Enum
 from pydantic import BaseModel, Field
@@ -55,6 +58,135 @@ class AgentBudget(BaseModel):
     class Config:
         use_enum_values = True
 
+class UsageDelta:
+    """
+    Incremento de uso pendiente de sincronizar con el almacén compartido.
+    
+    Es un contador ligero (sin validación) que se actualiza en el camino
+    crítico de cada llamada y se vuelca por lotes en ``BudgetManager.flush``.
+    """
+    
+    __slots__ = ("prompt_tokens", "completion_tokens", "estimated_cost_usd")
+    
+    def __init__(self, prompt_tokens: int = 0, completion_tokens: int = 0, estimated_cost_usd: float = 0.0):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.estimated_cost_usd = estimated_cost_usd
+    
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+    
+    def merge(self, other: "UsageDelta") -> None:
+        """Acumula otro incremento en este."""
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.estimated_cost_usd += other.estimated_cost_usd
+
+
+class InMemoryBudgetStore:
+    """
+    Almacén de uso en memoria.
+    
+    Útil para pruebas y para compartir contadores entre varias instancias de
+    ``BudgetManager`` dentro del mismo proceso.
+    """
+    
+    def __init__(self):
+        self.totals: Dict[Tuple[str, str], TokenUsage] = {}
+        self.increment_calls = 0
+    
+    async def increment(self, batch: Dict[Tuple[str, str], UsageDelta]) -> Dict[Tuple[str, str], int]:
+        """
+        Aplica un lote de incrementos y devuelve los totales globales.
+        
+        Args:
+            batch: Incrementos por (agent_id, period_key)
+            
+        Returns:
+            Total de tokens global por (agent_id, period_key)
+        """
+        self.increment_calls += 1
+        result = {}
+        for key, delta in batch.items():
+            usage = self.totals.setdefault(key, TokenUsage())
+            usage.prompt_tokens += delta.prompt_tokens
+            usage.completion_tokens += delta.completion_tokens
+            usage.total_tokens += delta.total_tokens
+            usage.estimated_cost_usd += delta.estimated_cost_usd
+            result[key] = usage.total_tokens
+        return result
+
+
+class RedisBudgetStore:
+    """
+    Almacén de uso compartido entre réplicas basado en Redis.
+    
+    Cada (agente, período) es un hash con contadores que se actualizan con
+    ``HINCRBY``/``HINCRBYFLOAT`` en un único pipeline por lote, de modo que
+    los incrementos de varias réplicas se combinan de forma atómica.
+    """
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        redis_client=None,
+        key_prefix: str = "ngx:budget",
+        ttl_seconds: int = 400 * 24 * 3600
+    ):
+        """
+        Inicializa el almacén.
+        
+        Args:
+            redis_url: URL de conexión a Redis (por defecto ``REDIS_URL``)
+            redis_client: Cliente de Redis ya creado (opcional)
+            key_prefix: Prefijo de las claves
+            ttl_seconds: Tiempo de vida de los contadores de cada período
+        """
+        self.redis_url = redis_url or os.environ.get("REDIS_URL")
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.ttl_seconds = ttl_seconds
+    
+    def _get_client(self):
+        """Obtiene el cliente de Redis, creándolo si es necesario."""
+        if self.redis_client is None:
+            import redis.asyncio as redis
+            self.redis_client = redis.from_url(self.redis_url, decode_responses=True)
+        return self.redis_client
+    
+    def _key(self, agent_id: str, period_key: str) -> str:
+        return f"{self.key_prefix}:{agent_id}:{period_key}"
+    
+    async def increment(self, batch: Dict[Tuple[str, str], UsageDelta]) -> Dict[Tuple[str, str], int]:
+        """
+        Aplica un lote de incrementos y devuelve los totales globales.
+        
+        Args:
+            batch: Incrementos por (agent_id, period_key)
+            
+        Returns:
+            Total de tokens global por (agent_id, period_key)
+        """
+        if not batch:
+            return {}
+        
+        pipe = self._get_client().pipeline(transaction=False)
+        keys = list(batch.keys())
+        for agent_id, period_key in keys:
+            delta = batch[(agent_id, period_key)]
+            key = self._key(agent_id, period_key)
+            pipe.hincrby(key, "prompt_tokens", delta.prompt_tokens)
+            pipe.hincrby(key, "completion_tokens", delta.completion_tokens)
+            pipe.hincrby(key, "total_tokens", delta.total_tokens)
+            pipe.hincrbyfloat(key, "estimated_cost_usd", delta.estimated_cost_usd)
+            pipe.expire(key, self.ttl_seconds)
+        results = await pipe.execute()
+        
+        # 5 comandos por clave; el tercero devuelve el total de tokens
+        return {key: int(results[i * 5 + 2]) for i, key in enumerate(keys)}
+
+
 class BudgetManager:
     """
     Gestor de presupuestos para agentes NGX.
@@ -74,12 +206,27 @@ class BudgetManager:
             cls._instance._initialized = False
         return cls._instance
     
-    def __init__(self, persistence_client=None):
+    def __init__(
+        self,
+        persistence_client=None,
+        usage_store=None,
+        flush_interval: Optional[float] = None,
+        lease_fraction: Optional[float] = None,
+        max_deferred_per_agent: int = 1000,
+        deferred_batch_size: int = 10
+    ):
         """
         Inicializa el gestor de presupuestos.
         
         Args:
             persistence_client: Cliente para persistencia de datos (opcional)
+            usage_store: Almacén compartido de uso entre réplicas (opcional). Si no
+                se indica y existe ``REDIS_URL``, se usa ``RedisBudgetStore``.
+            flush_interval: Segundos entre volcados periódicos al almacén
+            lease_fraction: Fracción del presupuesto que una réplica puede consumir
+                localmente antes de forzar un volcado
+            max_deferred_per_agent: Máximo de ejecuciones en cola (acción QUEUE) por agente
+            deferred_batch_size: Ejecuciones en cola que se liberan por agente en cada ciclo
         """
         # Evitar reinicialización en el patrón Singleton
         if getattr(self, "_initialized", False):
@@ -89,7 +236,25 @@ class BudgetManager:
         self.budgets: Dict[str, AgentBudget] = {}
         self.usage: Dict[str, Dict[str, TokenUsage]] = {}  # agent_id -> {period_key -> usage}
         self.last_reset: Dict[str, datetime] = {}
-        self._lock = asyncio.Lock()
+        self._lock = asyncio.Lock()  # Solo protege los volcados, no el registro de uso
+        
+        # Contabilidad compartida entre réplicas
+        if usage_store is None and settings.enable_budgets and os.environ.get("REDIS_URL"):
+            usage_store = RedisBudgetStore()
+        self.usage_store = usage_store
+        self.flush_interval = flush_interval if flush_interval is not None else settings.budget_flush_interval
+        self.lease_fraction = lease_fraction if lease_fraction is not None else settings.budget_lease_fraction
+        self._pending: Dict[Tuple[str, str], UsageDelta] = {}
+        self._global_totals: Dict[Tuple[str, str], int] = {}
+        self._period_cache: Dict[str, Tuple[str, float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flusher_task: Optional[asyncio.Task] = None
+        
+        # Cola de ejecuciones diferidas (acción QUEUE)
+        self.max_deferred_per_agent = max_deferred_per_agent
+        self.deferred_batch_size = deferred_batch_size
+        self._deferred: Dict[str, Deque[Tuple[Callable[[], Awaitable[Any]], contextvars.Context, asyncio.Future]]] = {}
+        
         self._initialized = True
         
         # Cargar configuraciones de presupuesto
@@ -153,6 +318,7 @@ class BudgetManager:
             budget: Configuración de presupuesto
         """
         self.budgets[budget.agent_id] = budget
+        self._period_cache.pop(budget.agent_id, None)
         logger.info(f"Presupuesto establecido para agente {budget.agent_id}: {budget.max_tokens} tokens/{budget.period}")
     
     def get_budget(self, agent_id: str) -> Optional[AgentBudget]:
@@ -195,6 +361,33 @@ class BudgetManager:
         else:  # INFINITE
             return "infinite"
     
+    def _current_period(self, agent_id: str) -> str:
+        """
+        Obtiene la clave del período actual usando una caché diaria.
+        
+        La clave del período y la comprobación de reset solo cambian al cambiar
+        de día, así que se recalculan como mucho una vez al día por agente en
+        lugar de en cada llamada.
+        
+        Args:
+            agent_id: ID del agente
+            
+        Returns:
+            Clave del período actual
+        """
+        cached = self._period_cache.get(agent_id)
+        now = time.time()
+        if cached is not None and now < cached[1]:
+            return cached[0]
+        
+        if self._should_reset(agent_id):
+            self._reset_usage(agent_id)
+        
+        period_key = self._get_period_key(agent_id)
+        tomorrow = datetime.combine(datetime.now().date() + timedelta(days=1), datetime.min.time())
+        self._period_cache[agent_id] = (period_key, tomorrow.timestamp())
+        return period_key
+    
     def _should_reset(self, agent_id: str) -> bool:
         """
         Determina si se debe resetear el contador de tokens para un agente.
@@ -256,6 +449,12 @@ class BudgetManager:
             if period_key in self.usage[agent_id]:
                 del self.usage[agent_id][period_key]
         
+        # Los contadores del almacén compartido se indexan por período, por lo
+        # que solo se descarta el estado local de la réplica
+        key = (agent_id, period_key)
+        self._pending.pop(key, None)
+        self._global_totals.pop(key, None)
+        
         self.last_reset[agent_id] = datetime.now()
         logger.info(f"Uso de tokens reseteado para agente {agent_id}")
     
@@ -267,6 +466,10 @@ class BudgetManager:
         """
         Registra el uso de tokens para un agente y verifica si se ha excedido el presupuesto.
         
+        El registro no toma ningún lock: cada agente tiene sus propios contadores
+        y los incrementos se hacen sin puntos de suspensión. Si hay un almacén
+        compartido, el uso se acumula como pendiente y se vuelca por lotes.
+        
         Args:
             agent_id: ID del agente
             prompt_tokens: Número de tokens en el prompt
@@ -278,55 +481,306 @@ class BudgetManager:
             - allowed: True si la operación está permitida, False si se ha excedido el presupuesto
             - fallback_model: Modelo alternativo si se debe degradar, None en caso contrario
         """
+        # Verificar si existe un presupuesto para este agente
+        budget = self.budgets.get(agent_id)
+        if not budget:
+            # Si no hay presupuesto definido, permitir la operación
+            return True, None
+        
+        # Obtener el período actual (incluye la comprobación de reset)
+        period_key = self._current_period(agent_id)
+        
+        # Inicializar estructura si no existe
+        agent_usage = self.usage.get(agent_id)
+        if agent_usage is None:
+            agent_usage = self.usage[agent_id] = {}
+        usage = agent_usage.get(period_key)
+        if usage is None:
+            usage = agent_usage[period_key] = TokenUsage()
+        
+        # Calcular costo estimado
+        cost = self._estimate_cost(prompt_tokens, completion_tokens, model)
+        
+        # Actualizar uso
+        usage.prompt_tokens += prompt_tokens
+        usage.completion_tokens += completion_tokens
+        usage.total_tokens += (prompt_tokens + completion_tokens)
+        usage.estimated_cost_usd += cost
+        
+        # Acumular el incremento pendiente de volcar al almacén compartido
+        if self.usage_store is not None:
+            key = (agent_id, period_key)
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = UsageDelta()
+            pending.prompt_tokens += prompt_tokens
+            pending.completion_tokens += completion_tokens
+            pending.estimated_cost_usd += cost
+            
+            # Superada la concesión local, sincronizar en segundo plano
+            if pending.total_tokens >= self._lease_tokens(budget, key):
+                self._schedule_flush()
+        
+        # Verificar si se ha excedido el presupuesto
+        total_tokens = self._effective_total(agent_id, period_key)
+        if total_tokens > budget.max_tokens:
+            logger.warning(
+                f"Presupuesto excedido para agente {agent_id}: "
+                f"{total_tokens}/{budget.max_tokens} tokens"
+            )
+            return self._action_on_limit(budget)
+        
+        return True, None
+    
+    def check_budget(self, agent_id: str, prompt_tokens: int = 0) -> Tuple[bool, Optional[str]]:
+        """
+        Comprueba el presupuesto de un agente sin registrar uso.
+        
+        Es una lectura sin lock pensada para el camino crítico de las llamadas
+        al modelo: decide si la llamada está permitida (y si debe degradarse)
+        con el uso acumulado más los tokens estimados del prompt. El uso real
+        se registra después con una única llamada a ``record_usage``.
+        
+        Args:
+            agent_id: ID del agente
+            prompt_tokens: Tokens estimados del prompt que se va a enviar
+            
+        Returns:
+            Tupla (allowed, fallback_model) con la misma semántica que ``record_usage``
+        """
+        budget = self.budgets.get(agent_id)
+        if not budget:
+            return True, None
+        
+        period_key = self._current_period(agent_id)
+        if self._effective_total(agent_id, period_key) + prompt_tokens > budget.max_tokens:
+            return self._action_on_limit(budget)
+        
+        return True, None
+    
+    def _effective_total(self, agent_id: str, period_key: str) -> int:
+        """
+        Calcula el total de tokens a considerar para un agente.
+        
+        Con almacén compartido es el último total global conocido más el uso
+        local todavía no volcado; sin él, el uso local del proceso.
+        """
+        usage = self.usage.get(agent_id, {}).get(period_key)
+        local_total = usage.total_tokens if usage else 0
+        if self.usage_store is None:
+            return local_total
+        
+        key = (agent_id, period_key)
+        pending = self._pending.get(key)
+        pending_total = pending.total_tokens if pending else 0
+        return max(local_total, self._global_totals.get(key, 0) + pending_total)
+    
+    def _lease_tokens(self, budget: AgentBudget, key: Tuple[str, str]) -> int:
+        """
+        Calcula cuántos tokens puede consumir la réplica antes de sincronizar.
+        
+        La concesión es una fracción del presupuesto, pero nunca más de la mitad
+        de lo que queda globalmente, de modo que cerca del límite las réplicas
+        sincronizan con más frecuencia y el límite global se respeta.
+        """
+        pending = self._pending.get(key)
+        consumed = self._global_totals.get(key, 0) + (pending.total_tokens if pending else 0)
+        remaining = budget.max_tokens - consumed
+        if remaining <= 0:
+            return 1
+        return max(1, min(int(budget.max_tokens * self.lease_fraction), remaining // 2))
+    
+    def should_queue(self, agent_id: str) -> bool:
+        """
+        Indica si las llamadas rechazadas de un agente deben ponerse en cola.
+        
+        Args:
+            agent_id: ID del agente
+            
+        Returns:
+            True si el presupuesto del agente usa la acción QUEUE
+        """
+        budget = self.budgets.get(agent_id)
+        return budget is not None and budget.action_on_limit == BudgetAction.QUEUE
+    
+    def defer(self, agent_id: str, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> asyncio.Future:
+        """
+        Pone en cola una ejecución hasta que el agente vuelva a tener presupuesto.
+        
+        La ejecución se lanza con el contexto (``contextvars``) del momento en que
+        se puso en cola, de modo que conserva la atribución al agente.
+        
+        Args:
+            agent_id: ID del agente
+            func: Función asíncrona a ejecutar
+            *args: Argumentos posicionales
+            **kwargs: Argumentos con nombre
+            
+        Returns:
+            Future con el resultado de la ejecución diferida
+            
+        Raises:
+            asyncio.QueueFull: Si la cola del agente está llena
+        """
+        queue = self._deferred.setdefault(agent_id, deque())
+        if len(queue) >= self.max_deferred_per_agent:
+            raise asyncio.QueueFull(f"Cola de ejecuciones diferidas llena para agente {agent_id}")
+        
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(self._log_deferred_result)
+        queue.append((functools.partial(func, *args, **kwargs), contextvars.copy_context(), future))
+        logger.info(f"Ejecución diferida en cola para agente {agent_id} ({len(queue)} pendientes)")
+        return future
+    
+    def process_deferred(self) -> int:
+        """
+        Lanza las ejecuciones en cola de los agentes que vuelven a tener presupuesto.
+        
+        Returns:
+            Número de ejecuciones lanzadas
+        """
+        launched = 0
+        for agent_id, queue in self._deferred.items():
+            released = 0
+            while queue and released < self.deferred_batch_size:
+                allowed, _ = self.check_budget(agent_id)
+                if not allowed:
+                    break
+                func, context, future = queue.popleft()
+                if future.done():
+                    continue
+                task = context.run(asyncio.ensure_future, func())
+                task.add_done_callback(functools.partial(self._resolve_deferred, future))
+                released += 1
+            launched += released
+        return launched
+    
+    @staticmethod
+    def _resolve_deferred(future: asyncio.Future, task: asyncio.Task) -> None:
+        """Propaga el resultado de una ejecución diferida a su future."""
+        if future.done():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+    
+    @staticmethod
+    def _log_deferred_result(future: asyncio.Future) -> None:
+        """Registra los errores de ejecuciones diferidas cuyo resultado nadie espera."""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"Error en ejecución diferida: {future.exception()}")
+    
+    async def flush(self) -> int:
+        """
+        Vuelca el uso pendiente al almacén compartido en un único lote.
+        
+        También refresca el total global de los agentes activos, por lo que tras
+        un reinicio o con varias réplicas cada proceso conoce el uso global.
+        
+        Returns:
+            Número de contadores con uso pendiente volcados
+        """
+        if self.usage_store is None:
+            return 0
+        
         async with self._lock:
-            # Verificar si existe un presupuesto para este agente
-            budget = self.get_budget(agent_id)
-            if not budget:
-                # Si no hay presupuesto definido, permitir la operación
-                return True, None
-            
-            # Verificar si se debe resetear el contador
-            if self._should_reset(agent_id):
-                self._reset_usage(agent_id)
-            
-            # Obtener el período actual
-            period_key = self._get_period_key(agent_id)
-            
-            # Inicializar estructura si no existe
-            if agent_id not in self.usage:
-                self.usage[agent_id] = {}
-            if period_key not in self.usage[agent_id]:
-                self.usage[agent_id][period_key] = TokenUsage()
-            
-            # Calcular costo estimado
-            cost = self._estimate_cost(prompt_tokens, completion_tokens, model)
-            
-            # Actualizar uso
-            usage = self.usage[agent_id][period_key]
-            usage.prompt_tokens += prompt_tokens
-            usage.completion_tokens += completion_tokens
-            usage.total_tokens += (prompt_tokens + completion_tokens)
-            usage.estimated_cost_usd += cost
-            
-            # Verificar si se ha excedido el presupuesto
-            if usage.total_tokens > budget.max_tokens:
-                logger.warning(
-                    f"Presupuesto excedido para agente {agent_id}: "
-                    f"{usage.total_tokens}/{budget.max_tokens} tokens"
-                )
-                
-                # Determinar acción según la configuración
-                if budget.action_on_limit == BudgetAction.BLOCK:
-                    return False, None
-                elif budget.action_on_limit == BudgetAction.DEGRADE and budget.fallback_model:
-                    return True, budget.fallback_model
-                elif budget.action_on_limit == BudgetAction.WARN:
-                    return True, None
-                elif budget.action_on_limit == BudgetAction.QUEUE:
-                    # TODO: Implementar sistema de cola
-                    return False, None
+            pending, self._pending = self._pending, {}
+            batch = dict(pending)
+            for agent_id in self.budgets:
+                key = (agent_id, self._current_period(agent_id))
+                if key not in batch and (agent_id in self.usage or key in self._global_totals):
+                    batch[key] = UsageDelta()
+            
+            try:
+                totals = await self.usage_store.increment(batch)
+            except Exception as e:
+                logger.error(f"Error al volcar uso de tokens al almacén compartido: {e}")
+                # Devolver el uso a pendiente para el próximo intento
+                for key, delta in pending.items():
+                    self._pending.setdefault(key, UsageDelta()).merge(delta)
+                return 0
             
+            self._global_totals.update(totals)
+            return len(pending)
+    
+    async def start_flusher(self) -> None:
+        """
+        Inicia la tarea periódica de volcado y de liberación de la cola diferida.
+        """
+        if self._flusher_task is not None and not self._flusher_task.done():
+            return
+        
+        # Cargar los totales globales de todos los agentes con presupuesto
+        if self.usage_store is not None:
+            async with self._lock:
+                try:
+                    batch = {(agent_id, self._current_period(agent_id)): UsageDelta() for agent_id in self.budgets}
+                    self._global_totals.update(await self.usage_store.increment(batch))
+                except Exception as e:
+                    logger.error(f"Error al cargar uso de tokens del almacén compartido: {e}")
+        
+        self._flusher_task = asyncio.create_task(self._flusher_loop())
+        logger.info(f"Volcado periódico de presupuestos iniciado (intervalo: {self.flush_interval}s)")
+    
+    async def stop_flusher(self) -> None:
+        """Detiene la tarea periódica y vuelca el uso pendiente."""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            try:
+                await self._flusher_task
+            except asyncio.CancelledError:
+                pass
+            self._flusher_task = None
+        await self.flush()
+    
+    async def _flusher_loop(self) -> None:
+        """Bucle de volcado periódico."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                self.process_deferred()
+            except Exception as e:
+                logger.error(f"Error en el volcado periódico de presupuestos: {e}")
+    
+    def _schedule_flush(self) -> None:
+        """Programa un volcado en segundo plano si no hay uno en curso."""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        self._flush_task = self._schedule(self.flush())
+    
+    @staticmethod
+    def _schedule(coro: Awaitable[Any]) -> Optional[asyncio.Task]:
+        """Lanza una corrutina en segundo plano si hay un bucle de eventos activo."""
+        try:
+            return asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+            return None
+    
+    def _action_on_limit(self, budget: AgentBudget) -> Tuple[bool, Optional[str]]:
+        """
+        Determina la acción a tomar cuando un agente excede su presupuesto.
+        
+        Args:
+            budget: Configuración de presupuesto del agente
+            
+        Returns:
+            Tupla (allowed, fallback_model)
+        """
+        if budget.action_on_limit == BudgetAction.BLOCK:
+            return False, None
+        elif budget.action_on_limit == BudgetAction.DEGRADE and budget.fallback_model:
+            return True, budget.fallback_model
+        elif budget.action_on_limit == BudgetAction.WARN:
             return True, None
+        elif budget.action_on_limit == BudgetAction.QUEUE:
+            # La llamada no se ejecuta ahora; el llamador puede diferirla con defer()
+            return False, None
+        return True, None
     
     def _estimate_cost(self, prompt_tokens: int, completion_tokens: int, model: str) -> float:
         """
@@ -423,7 +877,8 @@ class BudgetManager:
             "percentage": percentage,
             "remaining": max(0, budget.max_tokens - usage.total_tokens),
             "period": self._get_period_key(agent_id),
-            "next_reset": self._get_next_reset_date(agent_id)
+            "next_reset": self._get_next_reset_date(agent_id),
+            "deferred_requests": len(self._deferred.get(agent_id, ()))
         }
     
     def _get_next_reset_date(self, agent_id: str) -> Optional[datetime]:
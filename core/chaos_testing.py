@@ -8,17 +8,15 @@ que permiten verificar la resiliencia del sistema ante fallos inesperados.
 import logging
 import time
 import asyncio
-import random
-from typing import Dict, List, Any, Optional, Callable, Set, Union, Tuple
+from typing import Dict, List, Any, Optional, Callable
 from enum import Enum
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
 import signal
 import os
-import sys
 import gc
-import socket
-import resource
+
+from core.fault_injection import Fault, LatencyDistribution, fault_injector
 
 # Configurar logger
 logger = logging.getLogger(__name__)
@@ -430,6 +428,9 @@ class ChaosTestingManager:
         """
         Maneja un evento de latencia de red.
         
+        La latencia se inyecta en las fronteras de los clientes con
+        ``asyncio.sleep``: solo esperan las llamadas al objetivo, no el bucle.
+        
         Args:
             event: Evento a manejar
             
@@ -441,45 +442,48 @@ class ChaosTestingManager:
         latency_ms = int(event.parameters.get("latency_ms", 100 * event.intensity))
         jitter_ms = int(event.parameters.get("jitter_ms", 20 * event.intensity))
         
-        # Crear función de interceptación para simular latencia
-        original_socket_connect = socket.socket.connect
+        if "latency" in event.parameters:
+            latency = LatencyDistribution.parse(event.parameters["latency"])
+        else:
+            # Compatibilidad con latency_ms ± jitter_ms
+            latency = LatencyDistribution(
+                kind="uniform",
+                median_ms=max(1, latency_ms),
+                spread=jitter_ms / max(1, latency_ms)
+            )
+        
+        fault = Fault(
+            boundary=event.parameters.get("boundary", "*"),
+            targets=tuple(event.parameters.get("targets", [target_host])),
+            latency=latency,
+            error_rate=float(event.parameters.get("error_rate", 0.0)),
+            error_kind=event.parameters.get("error_kind", "connection"),
+            fault_id=event.event_id
+        )
         
-        def delayed_connect(self, address):
-            # Solo aplicar latencia al host objetivo
-            if isinstance(address, tuple) and address[0] == target_host:
-                # Calcular latencia con jitter
-                delay = latency_ms + random.randint(-jitter_ms, jitter_ms)
-                delay = max(1, delay)  # Asegurar que la latencia sea positiva
-                time.sleep(delay / 1000.0)  # Convertir a segundos
+        with fault_injector.injected(fault):
+            logger.info(f"Latencia de red aplicada a {target_host}: {latency} (evento {event.event_id})")
             
-            # Llamar a la función original
-            return original_socket_connect(self, address)
-        
-        # Aplicar monkey patch
-        socket.socket.connect = delayed_connect
-        
-        logger.info(f"Latencia de red aplicada a {target_host}: {latency_ms}ms ±{jitter_ms}ms (evento {event.event_id})")
-        
-        try:
             # Esperar la duración del evento
             await asyncio.sleep(event.duration)
-        finally:
-            # Restaurar función original
-            socket.socket.connect = original_socket_connect
-            
-            logger.info(f"Latencia de red eliminada para {target_host} (evento {event.event_id})")
+        
+        logger.info(f"Latencia de red eliminada para {target_host} (evento {event.event_id})")
         
         return {
             "target_host": target_host,
             "latency_ms": latency_ms,
             "jitter_ms": jitter_ms,
-            "duration": event.duration
+            "duration": event.duration,
+            "fault": fault.to_dict()
         }
     
     async def _handle_network_partition(self, event: ChaosEvent) -> Dict[str, Any]:
         """
         Maneja un evento de partición de red.
         
+        Las llamadas descartadas esperan ``timeout_ms`` sin bloquear el bucle y
+        fallan con el error de timeout nativo de cada cliente.
+        
         Args:
             event: Evento a manejar
             
@@ -489,40 +493,30 @@ class ChaosTestingManager:
         # Obtener parámetros
         target_hosts = event.parameters.get("target_hosts", [event.target])
         drop_rate = event.parameters.get("drop_rate", event.intensity)
+        timeout_ms = float(event.parameters.get("timeout_ms", 2000))
+        
+        fault = Fault(
+            boundary=event.parameters.get("boundary", "*"),
+            targets=tuple(target_hosts),
+            error_rate=min(1.0, max(0.0, float(drop_rate))),
+            error_kind="timeout",
+            error_latency_ms=timeout_ms,
+            fault_id=event.event_id
+        )
         
-        # Crear función de interceptación para simular partición
-        original_socket_connect = socket.socket.connect
-        
-        def partitioned_connect(self, address):
-            # Verificar si el host está en la lista de objetivos
-            if isinstance(address, tuple) and address[0] in target_hosts:
-                # Simular pérdida de paquetes según la tasa de drop
-                if random.random() < drop_rate:
-                    # Simular timeout
-                    time.sleep(2)  # Esperar un tiempo antes de fallar
-                    raise socket.timeout("Simulated timeout by chaos test")
+        with fault_injector.injected(fault):
+            logger.info(f"Partición de red aplicada a {target_hosts} con tasa de pérdida {drop_rate} (evento {event.event_id})")
             
-            # Llamar a la función original
-            return original_socket_connect(self, address)
-        
-        # Aplicar monkey patch
-        socket.socket.connect = partitioned_connect
-        
-        logger.info(f"Partición de red aplicada a {target_hosts} con tasa de pérdida {drop_rate} (evento {event.event_id})")
-        
-        try:
             # Esperar la duración del evento
             await asyncio.sleep(event.duration)
-        finally:
-            # Restaurar función original
-            socket.socket.connect = original_socket_connect
-            
-            logger.info(f"Partición de red eliminada (evento {event.event_id})")
+        
+        logger.info(f"Partición de red eliminada (evento {event.event_id})")
         
         return {
             "target_hosts": target_hosts,
             "drop_rate": drop_rate,
-            "duration": event.duration
+            "duration": event.duration,
+            "fault": fault.to_dict()
         }
     
     async def _handle_resource_exhaustion(self, event: ChaosEvent) -> Dict[str, Any]:
@@ -578,7 +572,8 @@ class ChaosTestingManager:
             if _ % 10 == 0:
                 await asyncio.sleep(0.01)
         
-        logger.info(f"Presión de memoria aplicada: {len(memory_hogs)}MB (evento {event.event_id})")
+        actual_mb = len(memory_hogs)
+        logger.info(f"Presión de memoria aplicada: {actual_mb}MB (evento {event.event_id})")
         
         try:
             # Esperar la duración del evento
@@ -592,7 +587,7 @@ class ChaosTestingManager:
         
         return {
             "target_mb": target_mb,
-            "actual_mb": len(memory_hogs),
+            "actual_mb": actual_mb,
             "duration": event.duration
         }
     
@@ -820,10 +815,6 @@ class ChaosTestingManager:
         # Lanzar excepción
         logger.warning(f"Lanzando excepción {exception_type}: {message} (evento {event.event_id})")
         raise exception_class(message)
-
-
-# Instancia global para uso en toda la aplicación
-chaos_testing_manager = ChaosTestingManager()
     
     async def _notify_event_update(self, event: ChaosEvent) -> None:
         """
@@ -837,5 +828,7 @@ chaos_testing_manager = ChaosTestingManager()
                 callback(event)
             except Exception as e:
                 logger.error(f"Error en callback de notificación: {e}")
-            "error": self.error
-        }
\ No newline at end of file
+
+
+# Instancia global para uso en toda la aplicación
+chaos_testing_manager = ChaosTestingManager()
@@ -15,6 +15,8 @@ from datetime import datetime, timedelta
 from functools import wraps
 import random
 
+from core.latency_histogram import latency_registry
+
 # Configurar logger
 logger = logging.getLogger(__name__)
 
@@ -29,27 +31,33 @@ class CircuitBreakerConfig:
     
     def __init__(
         self,
-        failure_threshold: int = 5,           # Número de fallos para abrir el circuito
+        failure_threshold: int = 5,           # Número de fallos en la ventana para abrir el circuito
         success_threshold: int = 2,           # Número de éxitos para cerrar el circuito
         timeout: int = 60,                    # Tiempo en segundos que el circuito permanece abierto
         fallback_function: Optional[Callable] = None,  # Función a llamar cuando el circuito está abierto
         exclude_exceptions: Optional[List[type]] = None,  # Excepciones que no cuentan como fallos
         include_exceptions: Optional[List[type]] = None,  # Solo estas excepciones cuentan como fallos
-        window_size: int = 10,                # Tamaño de la ventana para calcular la tasa de fallos
-        error_threshold_percentage: float = 50.0  # Porcentaje de fallos para abrir el circuito
+        window_size: int = 10,                # Llamadas mínimas en la ventana para evaluar la tasa de fallos
+        error_threshold_percentage: float = 50.0,  # Porcentaje de fallos para abrir el circuito
+        window_duration: float = 60.0,        # Duración en segundos de la ventana deslizante
+        window_buckets: int = 10,             # Cubetas temporales en las que se divide la ventana
+        half_open_max_calls: int = 1          # Sondas simultáneas permitidas en estado half-open
     ):
         """
         Inicializa la configuración del circuit breaker.
         
         Args:
-            failure_threshold: Número de fallos para abrir el circuito
+            failure_threshold: Número de fallos en la ventana para abrir el circuito
             success_threshold: Número de éxitos para cerrar el circuito
             timeout: Tiempo en segundos que el circuito permanece abierto
             fallback_function: Función a llamar cuando el circuito está abierto
             exclude_exceptions: Excepciones que no cuentan como fallos
             include_exceptions: Solo estas excepciones cuentan como fallos
-            window_size: Tamaño de la ventana para calcular la tasa de fallos
+            window_size: Llamadas mínimas en la ventana para evaluar la tasa de fallos
             error_threshold_percentage: Porcentaje de fallos para abrir el circuito
+            window_duration: Duración en segundos de la ventana deslizante
+            window_buckets: Cubetas temporales en las que se divide la ventana
+            half_open_max_calls: Sondas simultáneas permitidas en estado half-open
         """
         self.failure_threshold = failure_threshold
         self.success_threshold = success_threshold
@@ -59,6 +67,9 @@ class CircuitBreakerConfig:
         self.include_exceptions = include_exceptions
         self.window_size = window_size
         self.error_threshold_percentage = error_threshold_percentage
+        self.window_duration = window_duration
+        self.window_buckets = max(1, window_buckets)
+        self.half_open_max_calls = max(1, half_open_max_calls)
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -75,9 +86,87 @@ class CircuitBreakerConfig:
             "exclude_exceptions": [exc.__name__ for exc in self.exclude_exceptions],
             "include_exceptions": [exc.__name__ for exc in self.include_exceptions] if self.include_exceptions else None,
             "window_size": self.window_size,
-            "error_threshold_percentage": self.error_threshold_percentage
+            "error_threshold_percentage": self.error_threshold_percentage,
+            "window_duration": self.window_duration,
+            "window_buckets": self.window_buckets,
+            "half_open_max_calls": self.half_open_max_calls
         }
 
+class RollingWindow:
+    """
+    Ventana deslizante de éxitos y fallos dividida en cubetas temporales.
+    
+    Usa un anillo de tamaño fijo: registrar un resultado es O(1) amortizado
+    (solo se vacían las cubetas que han caducado desde la última llamada) y
+    los totales se mantienen incrementalmente, sin recorrer el historial.
+    """
+    
+    def __init__(self, duration: float, buckets: int):
+        """
+        Inicializa la ventana.
+        
+        Args:
+            duration: Duración de la ventana en segundos
+            buckets: Número de cubetas del anillo
+        """
+        self.buckets = buckets
+        self.bucket_width = duration / buckets
+        self._successes = [0] * buckets
+        self._failures = [0] * buckets
+        self._head = 0  # Época (índice absoluto) de la cubeta más reciente
+        self.successes = 0
+        self.failures = 0
+    
+    def _advance(self, now: float) -> int:
+        """Vacía las cubetas caducadas y devuelve la posición de la actual."""
+        epoch = int(now / self.bucket_width)
+        if epoch > self._head:
+            # Como mucho se recorre el anillo una vez
+            for stale in range(max(self._head + 1, epoch - self.buckets + 1), epoch + 1):
+                index = stale % self.buckets
+                self.successes -= self._successes[index]
+                self.failures -= self._failures[index]
+                self._successes[index] = 0
+                self._failures[index] = 0
+            self._head = epoch
+        return self._head % self.buckets
+    
+    def record(self, success: bool, now: float) -> None:
+        """
+        Registra el resultado de una llamada.
+        
+        Args:
+            success: Si la llamada tuvo éxito
+            now: Instante monotónico de la llamada
+        """
+        index = self._advance(now)
+        if success:
+            self._successes[index] += 1
+            self.successes += 1
+        else:
+            self._failures[index] += 1
+            self.failures += 1
+    
+    def totals(self, now: float) -> Tuple[int, int]:
+        """
+        Obtiene los totales vigentes.
+        
+        Args:
+            now: Instante monotónico de referencia
+            
+        Returns:
+            Tuple[int, int]: Éxitos y fallos dentro de la ventana
+        """
+        self._advance(now)
+        return self.successes, self.failures
+    
+    def reset(self) -> None:
+        """Vacía la ventana."""
+        self._successes = [0] * self.buckets
+        self._failures = [0] * self.buckets
+        self.successes = 0
+        self.failures = 0
+
 class CircuitBreaker:
     """
     Implementación del patrón circuit breaker.
@@ -85,6 +174,11 @@ class CircuitBreaker:
     Esta clase proporciona funcionalidades para implementar el patrón circuit breaker,
     que permite detectar fallos en servicios externos y evitar llamadas innecesarias
     cuando un servicio está caído.
+    
+    Todas las transiciones ocurren en el bucle de eventos sin ceder el control,
+    por lo que el camino de cada llamada no necesita locks. En estado half-open
+    solo ``half_open_max_calls`` llamadas simultáneas actúan como sondas; el
+    resto se rechaza como si el circuito siguiera abierto.
     """
     
     def __init__(
@@ -103,16 +197,16 @@ class CircuitBreaker:
         self.config = config or CircuitBreakerConfig()
         
         self.state = CircuitState.CLOSED
-        self.failure_count = 0
         self.success_count = 0
         self.last_failure_time = None
         self.last_state_change_time = datetime.now()
+        self._opened_at = 0.0
         
-        # Historial de resultados para calcular la tasa de fallos
-        self.results_window: List[bool] = []  # True = éxito, False = fallo
+        # Éxitos y fallos recientes en cubetas temporales
+        self.window = RollingWindow(self.config.window_duration, self.config.window_buckets)
         
-        # Lock para operaciones concurrentes
-        self.lock = asyncio.Lock()
+        # Sondas en curso durante el estado half-open
+        self.half_open_in_flight = 0
         
         # Estadísticas
         self.stats = {
@@ -122,11 +216,20 @@ class CircuitBreaker:
             "rejected_calls": 0,
             "fallback_calls": 0,
             "state_changes": 0,
+            "probe_calls": 0,
             "avg_response_time": 0.0
         }
         
+        # Histograma de latencia de las llamadas exitosas (registro compartido)
+        self.latency = latency_registry.histogram("circuit_breaker.call", breaker=name)
+        
         logger.info(f"Circuit breaker '{name}' inicializado en estado {self.state}")
     
+    @property
+    def failure_count(self) -> int:
+        """Número de fallos dentro de la ventana actual."""
+        return self.window.totals(time.monotonic())[1]
+    
     async def execute(
         self,
         func: Callable[..., Awaitable[Any]],
@@ -148,115 +251,121 @@ class CircuitBreaker:
             CircuitBreakerOpenError: Si el circuito está abierto
             Exception: Cualquier excepción lanzada por la función
         """
-        async with self.lock:
-            # Verificar si el circuito está abierto
-            if self.state == CircuitState.OPEN:
-                # Verificar si ha pasado el tiempo de timeout
-                if self._should_attempt_reset():
-                    # Cambiar a estado half-open
-                    await self._transition_to_half_open()
-                else:
-                    # Rechazar la llamada
-                    self.stats["rejected_calls"] += 1
-                    self.stats["total_calls"] += 1
-                    
-                    # Llamar a la función de fallback si existe
-                    if self.config.fallback_function:
-                        self.stats["fallback_calls"] += 1
-                        return await self.config.fallback_function(*args, **kwargs)
-                    
-                    raise CircuitBreakerOpenError(f"Circuit breaker '{self.name}' está abierto")
-        
-        # Ejecutar la función
-        start_time = time.time()
-        try:
-            result = await func(*args, **kwargs)
+        probe = False
+        if self.state != CircuitState.CLOSED:
+            # Verificar si ha pasado el tiempo de timeout
+            if self.state == CircuitState.OPEN and self._should_attempt_reset():
+                self._transition_to_half_open()
             
-            # Registrar éxito
-            async with self.lock:
-                self.stats["successful_calls"] += 1
+            if self.state == CircuitState.HALF_OPEN and self.half_open_in_flight < self.config.half_open_max_calls:
+                # Tomar un permiso de sonda
+                probe = True
+                self.half_open_in_flight += 1
+                self.stats["probe_calls"] += 1
+            else:
+                # Rechazar la llamada
+                self.stats["rejected_calls"] += 1
                 self.stats["total_calls"] += 1
                 
-                # Actualizar tiempo de respuesta promedio
-                execution_time = time.time() - start_time
-                self.stats["avg_response_time"] = (
-                    (self.stats["avg_response_time"] * (self.stats["successful_calls"] - 1) + execution_time) / 
-                    self.stats["successful_calls"]
-                )
-                
-                # Actualizar historial de resultados
-                self.results_window.append(True)
-                if len(self.results_window) > self.config.window_size:
-                    self.results_window.pop(0)
+                # Llamar a la función de fallback si existe
+                if self.config.fallback_function:
+                    self.stats["fallback_calls"] += 1
+                    return await self.config.fallback_function(*args, **kwargs)
                 
-                # Actualizar contador de éxitos en estado half-open
-                if self.state == CircuitState.HALF_OPEN:
-                    self.success_count += 1
-                    
-                    # Verificar si se debe cerrar el circuito
-                    if self.success_count >= self.config.success_threshold:
-                        await self._transition_to_closed()
-            
-            return result
-            
+                raise CircuitBreakerOpenError(f"Circuit breaker '{self.name}' está abierto")
+        
+        # Ejecutar la función
+        start_time = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
         except Exception as e:
-            # Verificar si la excepción debe ser ignorada
-            is_failure = True
+            if probe:
+                self.half_open_in_flight -= 1
             
-            if self.config.exclude_exceptions and any(isinstance(e, exc) for exc in self.config.exclude_exceptions):
-                is_failure = False
-                
-            if self.config.include_exceptions and not any(isinstance(e, exc) for exc in self.config.include_exceptions):
-                is_failure = False
+            # Verificar si la excepción debe ser ignorada
+            is_failure = self._is_failure(e)
+            self.stats["total_calls"] += 1
             
-            # Registrar fallo
-            async with self.lock:
-                self.stats["total_calls"] += 1
+            if is_failure:
+                self._record_failure(probe)
                 
-                if is_failure:
-                    self.stats["failed_calls"] += 1
-                    self.last_failure_time = datetime.now()
-                    
-                    # Actualizar historial de resultados
-                    self.results_window.append(False)
-                    if len(self.results_window) > self.config.window_size:
-                        self.results_window.pop(0)
-                    
-                    # Actualizar contador de fallos
-                    if self.state == CircuitState.CLOSED:
-                        self.failure_count += 1
-                        
-                        # Verificar si se debe abrir el circuito
-                        if self._should_trip():
-                            await self._transition_to_open()
-                    
-                    # En estado half-open, un solo fallo abre el circuito
-                    elif self.state == CircuitState.HALF_OPEN:
-                        await self._transition_to_open()
+                # Llamar a la función de fallback si existe
+                if self.config.fallback_function:
+                    self.stats["fallback_calls"] += 1
+                    return await self.config.fallback_function(*args, **kwargs)
             
-            # Llamar a la función de fallback si existe
-            if is_failure and self.config.fallback_function:
-                self.stats["fallback_calls"] += 1
-                return await self.config.fallback_function(*args, **kwargs)
-                
             # Relanzar la excepción
             raise
+        except BaseException:
+            # Cancelaciones: liberar el permiso sin contar resultado
+            if probe:
+                self.half_open_in_flight -= 1
+            raise
+        
+        if probe:
+            self.half_open_in_flight -= 1
+        self._record_success(probe, start_time)
+        return result
+    
+    def _is_failure(self, error: Exception) -> bool:
+        """Indica si una excepción cuenta como fallo según la configuración."""
+        if self.config.exclude_exceptions and isinstance(error, tuple(self.config.exclude_exceptions)):
+            return False
+        if self.config.include_exceptions and not isinstance(error, tuple(self.config.include_exceptions)):
+            return False
+        return True
+    
+    def _record_success(self, probe: bool, start_time: float) -> None:
+        """Registra una llamada exitosa y cierra el circuito si procede."""
+        self.stats["successful_calls"] += 1
+        self.stats["total_calls"] += 1
+        
+        # Actualizar histograma (el promedio se deriva de él al consultar el estado)
+        now = time.monotonic()
+        self.latency.record((now - start_time) * 1000)
+        self.window.record(True, now)
+        
+        # Solo las sondas deciden el cierre del circuito en estado half-open
+        if probe and self.state == CircuitState.HALF_OPEN:
+            self.success_count += 1
+            if self.success_count >= self.config.success_threshold:
+                self._transition_to_closed()
     
-    def _should_trip(self) -> bool:
+    def _record_failure(self, probe: bool) -> None:
+        """Registra un fallo y abre el circuito si procede."""
+        self.stats["failed_calls"] += 1
+        self.last_failure_time = datetime.now()
+        
+        now = time.monotonic()
+        self.window.record(False, now)
+        
+        if self.state == CircuitState.CLOSED:
+            if self._should_trip(now):
+                self._transition_to_open()
+        # En estado half-open, un solo fallo de una sonda abre el circuito
+        elif probe and self.state == CircuitState.HALF_OPEN:
+            self._transition_to_open()
+    
+    def _should_trip(self, now: Optional[float] = None) -> bool:
         """
         Determina si el circuito debe abrirse.
         
+        Args:
+            now: Instante monotónico de referencia (por defecto el actual)
+        
         Returns:
             True si el circuito debe abrirse, False en caso contrario
         """
+        successes, failures = self.window.totals(time.monotonic() if now is None else now)
+        
         # Verificar si se ha alcanzado el umbral de fallos
-        if self.failure_count >= self.config.failure_threshold:
+        if failures >= self.config.failure_threshold:
             return True
             
         # Verificar la tasa de fallos en la ventana
-        if len(self.results_window) >= self.config.window_size:
-            failure_rate = (self.results_window.count(False) / len(self.results_window)) * 100
-            return failure_rate >= self.config.error_threshold_percentage
+        total = successes + failures
+        if total >= self.config.window_size:
+            return (failures / total) * 100 >= self.config.error_threshold_percentage
             
         return False
     
@@ -267,22 +376,18 @@ class CircuitBreaker:
         Returns:
             True si se debe intentar resetear el circuito, False en caso contrario
         """
-        if not self.last_state_change_time:
-            return False
-            
-        # Verificar si ha pasado el tiempo de timeout
-        elapsed = (datetime.now() - self.last_state_change_time).total_seconds()
-        return elapsed >= self.config.timeout
+        return time.monotonic() - self._opened_at >= self.config.timeout
     
-    async def _transition_to_open(self) -> None:
+    def _transition_to_open(self) -> None:
         """Cambia el estado del circuito a abierto."""
         if self.state != CircuitState.OPEN:
             self.state = CircuitState.OPEN
+            self._opened_at = time.monotonic()
             self.last_state_change_time = datetime.now()
             self.stats["state_changes"] += 1
             logger.warning(f"Circuit breaker '{self.name}' cambiado a estado OPEN")
     
-    async def _transition_to_half_open(self) -> None:
+    def _transition_to_half_open(self) -> None:
         """Cambia el estado del circuito a medio abierto."""
         if self.state != CircuitState.HALF_OPEN:
             self.state = CircuitState.HALF_OPEN
@@ -291,25 +396,24 @@ class CircuitBreaker:
             self.stats["state_changes"] += 1
             logger.info(f"Circuit breaker '{self.name}' cambiado a estado HALF_OPEN")
     
-    async def _transition_to_closed(self) -> None:
+    def _transition_to_closed(self) -> None:
         """Cambia el estado del circuito a cerrado."""
         if self.state != CircuitState.CLOSED:
             self.state = CircuitState.CLOSED
             self.last_state_change_time = datetime.now()
-            self.failure_count = 0
+            # Los fallos que abrieron el circuito no deben volver a abrirlo
+            self.window.reset()
             self.stats["state_changes"] += 1
             logger.info(f"Circuit breaker '{self.name}' cambiado a estado CLOSED")
     
     async def reset(self) -> None:
         """Resetea el circuit breaker a su estado inicial."""
-        async with self.lock:
-            self.state = CircuitState.CLOSED
-            self.failure_count = 0
-            self.success_count = 0
-            self.last_failure_time = None
-            self.last_state_change_time = datetime.now()
-            self.results_window = []
-            logger.info(f"Circuit breaker '{self.name}' reseteado")
+        self.state = CircuitState.CLOSED
+        self.success_count = 0
+        self.last_failure_time = None
+        self.last_state_change_time = datetime.now()
+        self.window.reset()
+        logger.info(f"Circuit breaker '{self.name}' reseteado")
     
     def get_state(self) -> Dict[str, Any]:
         """
@@ -318,17 +422,26 @@ class CircuitBreaker:
         Returns:
             Diccionario con el estado actual
         """
+        successes, failures = self.window.totals(time.monotonic())
+        total = successes + failures
+        self.stats["avg_response_time"] = self.latency.mean_ms / 1000
         return {
             "name": self.name,
             "state": self.state.value,
-            "failure_count": self.failure_count,
+            "failure_count": failures,
             "success_count": self.success_count,
             "last_failure_time": self.last_failure_time.isoformat() if self.last_failure_time else None,
             "last_state_change_time": self.last_state_change_time.isoformat(),
-            "results_window": self.results_window,
-            "failure_rate": (self.results_window.count(False) / len(self.results_window)) * 100 if self.results_window else 0,
+            "window": {
+                "successes": successes,
+                "failures": failures,
+                "duration": self.config.window_duration,
+                "buckets": self.config.window_buckets
+            },
+            "failure_rate": (failures / total) * 100 if total else 0,
+            "half_open_in_flight": self.half_open_in_flight,
             "config": self.config.to_dict(),
-            "stats": self.stats
+            "stats": {**self.stats, "latency_ms": self.latency.summary()}
         }
 
 class CircuitBreakerOpenError(Exception):
@@ -379,6 +492,10 @@ class CircuitBreakerRegistry:
         Returns:
             Circuit breaker
         """
+        circuit_breaker = self.circuit_breakers.get(name)
+        if circuit_breaker is not None:
+            return circuit_breaker
+        
         async with self._lock:
             if name not in self.circuit_breakers:
                 self.circuit_breakers[name] = CircuitBreaker(name, config)
@@ -438,41 +555,50 @@ def circuit_breaker(
     exclude_exceptions: Optional[List[type]] = None,
     include_exceptions: Optional[List[type]] = None,
     window_size: int = 10,
-    error_threshold_percentage: float = 50.0
+    error_threshold_percentage: float = 50.0,
+    window_duration: float = 60.0,
+    window_buckets: int = 10,
+    half_open_max_calls: int = 1
 ):
     """
     Decorador para proteger funciones con circuit breaker.
     
     Args:
         name: Nombre del circuit breaker
-        failure_threshold: Número de fallos para abrir el circuito
+        failure_threshold: Número de fallos en la ventana para abrir el circuito
         success_threshold: Número de éxitos para cerrar el circuito
         timeout: Tiempo en segundos que el circuito permanece abierto
         fallback_function: Función a llamar cuando el circuito está abierto
         exclude_exceptions: Excepciones que no cuentan como fallos
         include_exceptions: Solo estas excepciones cuentan como fallos
-        window_size: Tamaño de la ventana para calcular la tasa de fallos
+        window_size: Llamadas mínimas en la ventana para evaluar la tasa de fallos
         error_threshold_percentage: Porcentaje de fallos para abrir el circuito
+        window_duration: Duración en segundos de la ventana deslizante
+        window_buckets: Cubetas temporales en las que se divide la ventana
+        half_open_max_calls: Sondas simultáneas permitidas en estado half-open
         
     Returns:
         Decorador configurado
     """
+    config = CircuitBreakerConfig(
+        failure_threshold=failure_threshold,
+        success_threshold=success_threshold,
+        timeout=timeout,
+        fallback_function=fallback_function,
+        exclude_exceptions=exclude_exceptions,
+        include_exceptions=include_exceptions,
+        window_size=window_size,
+        error_threshold_percentage=error_threshold_percentage,
+        window_duration=window_duration,
+        window_buckets=window_buckets,
+        half_open_max_calls=half_open_max_calls
+    )
+    
     def decorator(func):
         @wraps(func)
         async def wrapper_async(*args, **kwargs):
             # Obtener o crear circuit breaker
-            registry = CircuitBreakerRegistry()
-            config = CircuitBreakerConfig(
-                failure_threshold=failure_threshold,
-                success_threshold=success_threshold,
-                timeout=timeout,
-                fallback_function=fallback_function,
-                exclude_exceptions=exclude_exceptions,
-                include_exceptions=include_exceptions,
-                window_size=window_size,
-                error_threshold_percentage=error_threshold_percentage
-            )
-            circuit_breaker = await registry.get_or_create(name, config)
+            circuit_breaker = await CircuitBreakerRegistry().get_or_create(name, config)
             
             # Ejecutar función protegida
             return await circuit_breaker.execute(func, *args, **kwargs)
@@ -482,18 +608,7 @@ def circuit_breaker(
             # Para funciones síncronas, crear una versión asíncrona y ejecutarla
             async def async_wrapper():
                 # Obtener o crear circuit breaker
-                registry = CircuitBreakerRegistry()
-                config = CircuitBreakerConfig(
-                    failure_threshold=failure_threshold,
-                    success_threshold=success_threshold,
-                    timeout=timeout,
-                    fallback_function=fallback_function,
-                    exclude_exceptions=exclude_exceptions,
-                    include_exceptions=include_exceptions,
-                    window_size=window_size,
-                    error_threshold_percentage=error_threshold_percentage
-                )
-                circuit_breaker = await registry.get_or_create(name, config)
+                circuit_breaker = await CircuitBreakerRegistry().get_or_create(name, config)
                 
                 # Ejecutar función protegida
                 return await circuit_breaker.execute(
@@ -502,7 +617,6 @@ def circuit_breaker(
                 )
             
             # Ejecutar la versión asíncrona
-            import asyncio
             loop = asyncio.get_event_loop()
             return loop.run_until_complete(async_wrapper())
         
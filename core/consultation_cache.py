@@ -0,0 +1,362 @@
+"""
+Memoización por turno de las consultas entre agentes.
+
+Dentro de un mismo turno orquestado varios agentes especializados suelen
+consultar al mismo agente con casi la misma pregunta, y cada consulta es una
+ejecución completa del agente con sus llamadas al modelo. ``ConsultationCache``
+mantiene un ámbito por turno (``turn()``) en el que las consultas se indexan
+por agente destino, texto normalizado y contexto relevante:
+
+- una consulta repetida devuelve la respuesta ya obtenida;
+- una consulta idéntica a otra en curso espera a esa misma ejecución (una
+  tarea del turno, que sigue en marcha aunque se cancele quien la inició),
+  salvo que sea una de las consultas de las que ella misma depende (la cadena
+  de consultas activa), en cuyo caso se ejecuta para no esperarse a sí misma;
+- la profundidad de consultas anidadas está acotada (``max_depth`` saltos A2A).
+
+El ámbito y la cadena de consultas viajan en el contexto del mensaje A2A
+(``CONSULTATION_CONTEXT_KEY``) para que las consultas que hace el agente
+consultado se asocien al mismo turno.
+Fuera de un turno las consultas se ejecutan siempre, como antes. Al cerrar el
+turno se registran en telemetría las llamadas ahorradas.
+"""
+
+import asyncio
+import contextvars
+import copy
+import hashlib
+import json
+import re
+import unicodedata
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+from core.logging_config import get_logger
+from core.settings import settings
+from core.telemetry_adapter import telemetry_adapter
+
+logger = get_logger(__name__)
+
+CONSULTATION_CONTEXT_KEY = "_consultation"
+
+# Claves del contexto que no cambian el resultado de la consulta
+IGNORED_CONTEXT_KEYS = frozenset({
+    CONSULTATION_CONTEXT_KEY, "analysis", "timestamp", "message_id", "request_id", "trace_id", "span_id",
+})
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+_current: contextvars.ContextVar[Optional[Tuple[str, int]]] = contextvars.ContextVar(
+    "consultation_scope", default=None
+)
+
+# Claves de las consultas en curso de las que depende la tarea actual
+_chain: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("consultation_chain", default=())
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normaliza el texto de una consulta: mayúsculas, acentos, puntuación y espacios.
+
+    Args:
+        text: Texto de la consulta
+
+    Returns:
+        str: Texto normalizado
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    without_accents = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_PUNCTUATION.sub(" ", without_accents.casefold()).split())
+
+
+def _relevant_context(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {
+            str(key): _relevant_context(item)
+            for key, item in value.items()
+            if key not in IGNORED_CONTEXT_KEYS and item not in (None, {}, [])
+        }
+    if isinstance(value, (list, tuple)):
+        return [_relevant_context(item) for item in value]
+    return value
+
+
+def consultation_key(agent_id: str, query: str, context: Any = None) -> str:
+    """
+    Clave de una consulta: agente destino, texto normalizado y contexto relevante.
+
+    Args:
+        agent_id: Agente consultado
+        query: Texto de la consulta
+        context: Contexto de la consulta
+
+    Returns:
+        str: Hash de la consulta
+    """
+    payload = json.dumps(
+        [agent_id, normalize_query(query), _relevant_context(context or {})],
+        sort_keys=True, default=str, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _error_response(agent_id: str, error: str) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error": error,
+        "output": f"Error: {error}",
+        "agent_id": agent_id,
+        "agent_name": agent_id,
+    }
+
+
+@dataclass
+class _InflightConsult:
+    """Consulta en curso compartida por las consultas idénticas del turno."""
+
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class ConsultationScope:
+    """Respuestas y consultas en curso de un turno."""
+
+    def __init__(self, scope_id: str, max_depth: int):
+        self.scope_id = scope_id
+        self.max_depth = max_depth
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.inflight: Dict[str, _InflightConsult] = {}
+        self.stats = {
+            "consultations": 0,
+            "calls": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "depth_limited": 0,
+        }
+
+    @property
+    def saved_calls(self) -> int:
+        """Ejecuciones de agentes evitadas en el turno."""
+        return self.stats["cache_hits"] + self.stats["coalesced"] + self.stats["depth_limited"]
+
+
+class ConsultationCache:
+    """Gestor de los ámbitos de consulta por turno."""
+
+    def __init__(self, max_depth: Optional[int] = None):
+        """
+        Inicializa el gestor.
+
+        Args:
+            max_depth: Saltos A2A anidados permitidos por turno (por defecto, configuración)
+        """
+        self.max_depth = max_depth if max_depth is not None else settings.consultation_max_depth
+        self._scopes: Dict[str, ConsultationScope] = {}
+        self.stats = {
+            "turns": 0,
+            "consultations": 0,
+            "calls": 0,
+            "saved_calls": 0,
+            "depth_limited": 0,
+        }
+
+    @asynccontextmanager
+    async def turn(self, scope_id: Optional[str] = None, max_depth: Optional[int] = None) -> AsyncIterator[ConsultationScope]:
+        """
+        Abre un ámbito de consultas para un turno.
+
+        Si ya hay un turno activo en el contexto se reutiliza, de modo que un
+        orquestador invocado dentro de otro turno no abre uno nuevo.
+
+        Args:
+            scope_id: Identificador del turno (se genera uno si no se indica)
+            max_depth: Saltos A2A anidados permitidos en este turno
+
+        Yields:
+            ConsultationScope: Ámbito del turno
+        """
+        current = self.current()
+        if current is not None:
+            yield current[0]
+            return
+
+        scope = ConsultationScope(scope_id or uuid.uuid4().hex, max_depth if max_depth is not None else self.max_depth)
+        self._scopes[scope.scope_id] = scope
+        token = _current.set((scope.scope_id, 0))
+        try:
+            yield scope
+        finally:
+            _current.reset(token)
+            self._scopes.pop(scope.scope_id, None)
+            self._close(scope)
+
+    @contextmanager
+    def resume(self, context: Any) -> Iterator[Optional[ConsultationScope]]:
+        """
+        Reanuda en el receptor de un mensaje A2A el turno que viaja en su contexto.
+
+        Args:
+            context: Contexto del mensaje A2A
+
+        Yields:
+            Optional[ConsultationScope]: Ámbito reanudado o None si no hay turno activo
+        """
+        marker = context.get(CONSULTATION_CONTEXT_KEY) if isinstance(context, dict) else None
+        scope = self._scopes.get(marker.get("scope_id")) if isinstance(marker, dict) else None
+        if scope is None:
+            yield None
+            return
+
+        token = _current.set((scope.scope_id, int(marker.get("depth", 0))))
+        chain_token = _chain.set(tuple(marker.get("chain", ())))
+        try:
+            yield scope
+        finally:
+            _chain.reset(chain_token)
+            _current.reset(token)
+
+    def current(self) -> Optional[Tuple[ConsultationScope, int]]:
+        """Ámbito activo y profundidad actual, o None fuera de un turno."""
+        marker = _current.get()
+        if marker is None:
+            return None
+        scope = self._scopes.get(marker[0])
+        return (scope, marker[1]) if scope is not None else None
+
+    def propagate(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Añade al contexto de un mensaje saliente el turno y la profundidad del receptor.
+
+        Args:
+            context: Contexto del mensaje A2A
+
+        Returns:
+            Dict[str, Any]: Copia del contexto con el marcador del turno
+        """
+        current = self.current()
+        if current is None:
+            return context
+        scope, depth = current
+        return {
+            **context,
+            CONSULTATION_CONTEXT_KEY: {"scope_id": scope.scope_id, "depth": depth + 1, "chain": list(_chain.get())},
+        }
+
+    async def consult(
+        self,
+        agent_id: str,
+        query: str,
+        context: Any,
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta una consulta a otro agente reutilizando las del mismo turno.
+
+        Las respuestas con error no se memorizan (una consulta posterior lo
+        vuelve a intentar), aunque sí se entregan a las consultas coalescidas.
+        Una consulta anidada igual a una de sus ancestras se ejecuta sin
+        coalescer: esperar a la ancestra sería esperar a su propio resultado.
+
+        Args:
+            agent_id: Agente consultado
+            query: Texto de la consulta
+            context: Contexto de la consulta
+            call: Corrutina que realiza la llamada A2A
+
+        Returns:
+            Dict[str, Any]: Respuesta del agente
+        """
+        current = self.current()
+        if current is None:
+            return await call()
+
+        scope, depth = current
+        scope.stats["consultations"] += 1
+        if depth >= scope.max_depth:
+            scope.stats["depth_limited"] += 1
+            logger.warning(f"Consulta a {agent_id} descartada: profundidad máxima ({scope.max_depth}) alcanzada")
+            return _error_response(agent_id, f"Profundidad máxima de consultas alcanzada ({scope.max_depth})")
+
+        key = consultation_key(agent_id, query, context)
+        if key in scope.results:
+            scope.stats["cache_hits"] += 1
+            return copy.deepcopy(scope.results[key])
+
+        chain = _chain.get()
+        if key in chain:
+            scope.stats["calls"] += 1
+            return await call()
+
+        # La consulta es una tarea del turno: cancelar a quien la inició no
+        # cancela a las consultas coalescidas sobre ella
+        consult = scope.inflight.get(key)
+        coalesced = consult is not None
+        if coalesced:
+            scope.stats["coalesced"] += 1
+        else:
+            scope.stats["calls"] += 1
+            consult = _InflightConsult(asyncio.create_task(self._run(scope, key, chain + (key,), call)))
+            scope.inflight[key] = consult
+            consult.task.add_done_callback(lambda task: self._release(scope, key, consult))
+
+        consult.waiters += 1
+        try:
+            response = await asyncio.shield(consult.task)
+        except asyncio.CancelledError:
+            # Si nadie más espera la consulta, deja de tener sentido
+            if consult.waiters == 1 and not consult.task.done():
+                self._release(scope, key, consult)
+                consult.task.cancel()
+            raise
+        finally:
+            consult.waiters -= 1
+
+        return copy.deepcopy(response) if coalesced else response
+
+    @staticmethod
+    async def _run(
+        scope: ConsultationScope,
+        key: str,
+        chain: Tuple[str, ...],
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        # La tarea tiene su propia copia del contexto: la cadena no hay que restaurarla
+        _chain.set(chain)
+        response = await call()
+        if isinstance(response, dict) and response.get("status") != "error":
+            scope.results[key] = copy.deepcopy(response)
+        return response
+
+    @staticmethod
+    def _release(scope: ConsultationScope, key: str, consult: _InflightConsult) -> None:
+        if scope.inflight.get(key) is consult:
+            del scope.inflight[key]
+
+    def _close(self, scope: ConsultationScope) -> None:
+        self.stats["turns"] += 1
+        self.stats["consultations"] += scope.stats["consultations"]
+        self.stats["calls"] += scope.stats["calls"]
+        self.stats["saved_calls"] += scope.saved_calls
+        self.stats["depth_limited"] += scope.stats["depth_limited"]
+        if scope.stats["consultations"]:
+            telemetry_adapter.record_counter("a2a.consultations", scope.stats["consultations"])
+            telemetry_adapter.record_counter("a2a.consultations.saved_calls", scope.saved_calls)
+            if scope.stats["depth_limited"]:
+                telemetry_adapter.record_counter("a2a.consultations.depth_limited", scope.stats["depth_limited"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas acumuladas de los turnos cerrados.
+
+        Returns:
+            Dict[str, Any]: Contadores y turnos activos
+        """
+        return {**self.stats, "active_turns": len(self._scopes), "max_depth": self.max_depth}
+
+
+# Instancia global
+consultation_cache = ConsultationCache()
@@ -6,10 +6,11 @@ que permiten al sistema seguir funcionando con capacidades reducidas
 cuando hay problemas con servicios externos o recursos.
 """
 
+import heapq
 import logging
 import time
 import asyncio
-from typing import Dict, List, Any, Optional, Callable, Set, Union
+from typing import Dict, List, Any, Optional, Callable, Set, Tuple, Union
 from enum import Enum
 from datetime import datetime, timedelta
 from functools import wraps
@@ -62,6 +63,7 @@ class ServiceStatus:
         self.is_critical = is_critical
         self.dependencies = dependencies or []
         
+        # Estado efectivo (propio y de las dependencias)
         self.is_available = True
         self.degradation_level = DegradationLevel.NONE
         self.degradation_reason = None
@@ -70,6 +72,12 @@ class ServiceStatus:
         self.failure_count = 0
         self.success_count = 0
         self.metadata: Dict[str, Any] = {}
+        
+        # Estado propio del servicio, con independencia de sus dependencias
+        self.self_available = True
+        self.self_level = DegradationLevel.NONE
+        self.self_reason: Optional[DegradationReason] = None
+        self.unavailable_dependencies: List[str] = []
     
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -91,6 +99,7 @@ class ServiceStatus:
             "last_check": self.last_check.isoformat(),
             "failure_count": self.failure_count,
             "success_count": self.success_count,
+            "unavailable_dependencies": self.unavailable_dependencies,
             "metadata": self.metadata
         }
 
@@ -101,6 +110,12 @@ class DegradedModeManager:
     Esta clase proporciona funcionalidades para gestionar modos degradados
     que permiten al sistema seguir funcionando con capacidades reducidas
     cuando hay problemas con servicios externos o recursos.
+    
+    Los servicios forman un grafo de dependencias con un rango topológico
+    mantenido de forma incremental al registrar servicios. Cada cambio de
+    estado se propaga en una sola pasada, en orden topológico, a todos los
+    servicios y funcionalidades dependientes, y el resultado se publica como
+    una instantánea inmutable que ``feature_enabled`` lee sin locks.
     """
     
     # Instancia única (patrón Singleton)
@@ -128,13 +143,22 @@ class DegradedModeManager:
         # Registro de servicios
         self.services: Dict[str, ServiceStatus] = {}
         
-        # Registro de funcionalidades
+        # Grafo de dependencias: aristas inversas y rango topológico
+        self._dependents: Dict[str, Set[str]] = {}
+        self._rank: Dict[str, int] = {}
+        
+        # Registro de funcionalidades (valor manual) y servicios de los que dependen
         self.features: Dict[str, bool] = {}
+        self.feature_dependencies: Dict[str, List[str]] = {}
+        self._feature_dependents: Dict[str, Set[str]] = {}
+        
+        # Instantánea publicada: (nivel del sistema, funcionalidad -> habilitada)
+        self._snapshot: Tuple[DegradationLevel, Dict[str, bool]] = (DegradationLevel.NONE, {})
         
         # Registro de callbacks para notificaciones
         self.callbacks: List[Callable[[DegradationLevel, Optional[DegradationReason], Optional[str]], None]] = []
         
-        # Lock para operaciones concurrentes
+        # Lock para serializar las modificaciones (las lecturas no lo usan)
         self.lock = asyncio.Lock()
         
         # Tarea de monitorización
@@ -174,16 +198,18 @@ class DegradedModeManager:
         logger.info("Monitorización de servicios detenida")
     
     async def _monitor_services(self) -> None:
-        """Tarea de monitorización de servicios."""
+        """
+        Tarea de monitorización de servicios.
+        
+        La propagación entre dependencias es inmediata; este bucle solo se
+        encarga de la recuperación automática de los servicios con fallo propio.
+        """
         while True:
             try:
                 # Comprobar servicios
-                for service_id, service in self.services.items():
+                for service_id in list(self.services):
                     await self._check_service(service_id)
                 
-                # Actualizar estado global del sistema
-                await self._update_system_status()
-                
                 # Esperar hasta la próxima comprobación
                 await asyncio.sleep(self.check_interval)
                 
@@ -207,21 +233,10 @@ class DegradedModeManager:
         # Actualizar timestamp de última comprobación
         service.last_check = datetime.now()
         
-        # Comprobar dependencias
-        for dependency_id in service.dependencies:
-            dependency = self.services.get(dependency_id)
-            if dependency and not dependency.is_available:
-                # Si una dependencia no está disponible, este servicio tampoco
-                await self._set_service_unavailable(
-                    service_id,
-                    DegradationReason.EXTERNAL_SERVICE,
-                    f"Dependencia no disponible: {dependency.name}"
-                )
-                return
-        
-        # Aquí se podrían añadir comprobaciones específicas para cada servicio
-        # Por ahora, asumimos que el servicio está disponible si sus dependencias lo están
-        if not service.is_available and self.auto_recovery:
+        # Aquí se podrían añadir comprobaciones específicas para cada servicio.
+        # Por ahora, un fallo propio se da por resuelto tras varias comprobaciones
+        # con las dependencias disponibles.
+        if not service.self_available and not service.unavailable_dependencies and self.auto_recovery:
             service.success_count += 1
             if service.success_count >= self.recovery_threshold:
                 await self._set_service_available(service_id)
@@ -249,19 +264,19 @@ class DegradedModeManager:
             if not service:
                 return
                 
-            if service.is_available:
-                service.is_available = False
-                service.degradation_level = level
-                service.degradation_reason = reason
-                service.last_status_change = datetime.now()
-                service.failure_count += 1
-                service.success_count = 0
+            if service.self_available or service.self_level != level:
+                service.self_available = False
+                service.self_level = level
+                service.self_reason = reason
                 service.metadata["last_failure_message"] = message
                 
                 logger.warning(f"Servicio {service.name} no disponible: {message}")
                 
-                # Actualizar estado global del sistema
-                await self._update_system_status()
+                old_level = self._propagate([service_id])
+            else:
+                return
+        
+        await self._notify_status_change(old_level, self.system_degradation_level)
     
     async def _set_service_available(self, service_id: str) -> None:
         """
@@ -272,51 +287,226 @@ class DegradedModeManager:
         """
         async with self.lock:
             service = self.services.get(service_id)
-            if not service:
+            if not service or service.self_available:
                 return
                 
-            if not service.is_available:
-                service.is_available = True
-                service.degradation_level = DegradationLevel.NONE
-                service.degradation_reason = None
-                service.last_status_change = datetime.now()
+            service.self_available = True
+            service.self_level = DegradationLevel.NONE
+            service.self_reason = None
+            service.success_count = 0
+            
+            old_level = self._propagate([service_id])
+        
+        await self._notify_status_change(old_level, self.system_degradation_level)
+    
+    # ------------------------------------------------------------------
+    # Grafo de dependencias
+    # ------------------------------------------------------------------
+    def _link_service(self, service_id: str, dependencies: List[str]) -> None:
+        """
+        Añade las aristas de un servicio y actualiza los rangos afectados.
+        
+        Args:
+            service_id: ID del servicio
+            dependencies: IDs de sus dependencias
+            
+        Raises:
+            ValueError: Si las dependencias forman un ciclo
+        """
+        # Un ciclo aparece si alguna dependencia es descendiente del servicio
+        if service_id in dependencies or self._reaches(service_id, set(dependencies)):
+            raise ValueError(f"Las dependencias de {service_id} forman un ciclo")
+        
+        for dependency_id in dependencies:
+            self._dependents.setdefault(dependency_id, set()).add(service_id)
+        
+        self._rank[service_id] = 1 + max(
+            (self._rank[dependency_id] for dependency_id in dependencies if dependency_id in self._rank),
+            default=-1
+        )
+        
+        # Subir el rango solo de los descendientes que quedan por debajo
+        pending = [service_id]
+        while pending:
+            parent = pending.pop()
+            for child in self._dependents.get(parent, ()):
+                if child in self._rank and self._rank[child] <= self._rank[parent]:
+                    self._rank[child] = self._rank[parent] + 1
+                    pending.append(child)
+    
+    def _unlink_service(self, service_id: str) -> None:
+        """Elimina las aristas salientes de un servicio (los rangos siguen siendo válidos)."""
+        service = self.services.get(service_id)
+        if service:
+            for dependency_id in service.dependencies:
+                dependents = self._dependents.get(dependency_id)
+                if dependents:
+                    dependents.discard(service_id)
+                    if not dependents:
+                        del self._dependents[dependency_id]
+        self._rank.pop(service_id, None)
+    
+    def _reaches(self, source: str, targets: Set[str]) -> bool:
+        """Indica si algún objetivo es descendiente de ``source`` en el grafo."""
+        stack = [source]
+        seen = {source}
+        while stack:
+            for child in self._dependents.get(stack.pop(), ()):
+                if child in targets:
+                    return True
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        return False
+    
+    def _propagate(self, changed: List[str]) -> DegradationLevel:
+        """
+        Propaga cambios de estado a los dependientes en una sola pasada.
+        
+        Los servicios se procesan en orden de rango topológico, de modo que al
+        recalcular uno sus dependencias ya tienen el estado definitivo. Solo se
+        visitan los descendientes cuyo estado efectivo cambia.
+        
+        Args:
+            changed: IDs de servicios cuyo estado propio o dependencias han cambiado
+            
+        Returns:
+            DegradationLevel: Nivel del sistema antes del cambio
+        """
+        heap = [(self._rank.get(service_id, 0), service_id) for service_id in changed if service_id in self.services]
+        heapq.heapify(heap)
+        visited: Set[str] = set()
+        updated: Set[str] = set()
+        
+        while heap:
+            _, service_id = heapq.heappop(heap)
+            if service_id in visited:
+                continue
+            visited.add(service_id)
+            
+            if self._refresh_service(self.services[service_id]):
+                updated.add(service_id)
+                for child in self._dependents.get(service_id, ()):
+                    if child in self.services and child not in visited:
+                        heapq.heappush(heap, (self._rank[child], child))
+        
+        features = set()
+        for service_id in updated:
+            features.update(self._feature_dependents.get(service_id, ()))
+        
+        old_level = self.system_degradation_level
+        self._update_system_status_locked()
+        self._publish_snapshot(features)
+        return old_level
+    
+    def _refresh_service(self, service: ServiceStatus) -> bool:
+        """
+        Recalcula el estado efectivo de un servicio a partir de sus dependencias.
+        
+        Args:
+            service: Servicio a recalcular
+            
+        Returns:
+            bool: True si el estado efectivo ha cambiado
+        """
+        blocked = [
+            self.services[dependency_id] for dependency_id in service.dependencies
+            if dependency_id in self.services and not self.services[dependency_id].is_available
+        ]
+        available = service.self_available and not blocked
+        
+        if available:
+            level, reason = DegradationLevel.NONE, None
+        else:
+            # Un servicio degradado por dependencias hereda el peor nivel de ellas
+            level = max([dependency.degradation_level for dependency in blocked] + [service.self_level])
+            reason = service.self_reason if not service.self_available else DegradationReason.EXTERNAL_SERVICE
+        
+        service.unavailable_dependencies = [dependency.service_id for dependency in blocked]
+        if (available, level, reason) == (service.is_available, service.degradation_level, service.degradation_reason):
+            return False
+        
+        was_available = service.is_available
+        service.is_available = available
+        service.degradation_level = level
+        service.degradation_reason = reason
+        
+        if was_available != available:
+            service.last_status_change = datetime.now()
+            if available:
                 service.failure_count = 0
-                
                 logger.info(f"Servicio {service.name} disponible nuevamente")
-                
-                # Actualizar estado global del sistema
-                await self._update_system_status()
+            else:
+                service.failure_count += 1
+                service.success_count = 0
+                if blocked and service.self_available:
+                    names = ", ".join(dependency.name for dependency in blocked)
+                    service.metadata["last_failure_message"] = f"Dependencia no disponible: {names}"
+                    logger.warning(f"Servicio {service.name} no disponible: dependencia no disponible: {names}")
+        return True
+    
+    def _feature_available(self, feature_id: str) -> bool:
+        """Valor efectivo de una funcionalidad: manual y con sus servicios disponibles."""
+        if not self.features.get(feature_id, True):
+            return False
+        return all(
+            self.services[service_id].is_available
+            for service_id in self.feature_dependencies.get(feature_id, ())
+            if service_id in self.services
+        )
+    
+    def _publish_snapshot(self, features: Set[str]) -> None:
+        """
+        Publica una nueva instantánea con las funcionalidades indicadas recalculadas.
+        
+        Args:
+            features: IDs de funcionalidades cuyo valor puede haber cambiado
+        """
+        level, values = self._snapshot
+        if features:
+            values = dict(values)
+            for feature_id in features:
+                if feature_id in self.features or feature_id in self.feature_dependencies:
+                    values[feature_id] = self._feature_available(feature_id)
+                else:
+                    values.pop(feature_id, None)
+        # Sustitución atómica: los lectores ven la instantánea anterior o la nueva
+        self._snapshot = (self.system_degradation_level, values)
     
     async def _update_system_status(self) -> None:
         """Actualiza el estado global del sistema basado en los servicios."""
         async with self.lock:
-            # Determinar el nivel de degradación más alto entre los servicios críticos
-            max_level = DegradationLevel.NONE
-            critical_reason = None
-            critical_service = None
-            
-            for service in self.services.values():
-                if service.is_critical and not service.is_available:
-                    if service.degradation_level.value > max_level.value:
-                        max_level = service.degradation_level
-                        critical_reason = service.degradation_reason
-                        critical_service = service
-            
-            # Actualizar estado global si ha cambiado
-            if max_level != self.system_degradation_level:
-                old_level = self.system_degradation_level
-                self.system_degradation_level = max_level
-                self.system_degradation_reason = critical_reason
-                
-                if max_level != DegradationLevel.NONE:
-                    self.system_degradation_start = datetime.now()
-                    self.system_degradation_message = f"Sistema en modo degradado debido a problemas con el servicio {critical_service.name}" if critical_service else "Sistema en modo degradado"
-                else:
-                    self.system_degradation_start = None
-                    self.system_degradation_message = None
-                
-                # Notificar cambio de estado
-                await self._notify_status_change(old_level, max_level)
+            old_level = self.system_degradation_level
+            self._update_system_status_locked()
+            self._publish_snapshot(set())
+        
+        await self._notify_status_change(old_level, self.system_degradation_level)
+    
+    def _update_system_status_locked(self) -> None:
+        """Recalcula el estado global; debe llamarse con el lock adquirido."""
+        # Determinar el nivel de degradación más alto entre los servicios críticos
+        max_level = DegradationLevel.NONE
+        critical_reason = None
+        critical_service = None
+        
+        for service in self.services.values():
+            if service.is_critical and not service.is_available:
+                if service.degradation_level.value > max_level.value:
+                    max_level = service.degradation_level
+                    critical_reason = service.degradation_reason
+                    critical_service = service
+        
+        # Actualizar estado global si ha cambiado
+        if max_level != self.system_degradation_level:
+            self.system_degradation_level = max_level
+            self.system_degradation_reason = critical_reason
+            
+            if max_level != DegradationLevel.NONE:
+                self.system_degradation_start = datetime.now()
+                self.system_degradation_message = f"Sistema en modo degradado debido a problemas con el servicio {critical_service.name}" if critical_service else "Sistema en modo degradado"
+            else:
+                self.system_degradation_start = None
+                self.system_degradation_message = None
     
     async def _notify_status_change(self, old_level: DegradationLevel, new_level: DegradationLevel) -> None:
         """
@@ -361,6 +551,9 @@ class DegradedModeManager:
             
         Returns:
             Estado del servicio
+            
+        Raises:
+            ValueError: Si las dependencias forman un ciclo
         """
         async with self.lock:
             service = ServiceStatus(
@@ -371,10 +564,23 @@ class DegradedModeManager:
                 dependencies=dependencies
             )
             
+            previous = self.services.get(service_id)
+            self._unlink_service(service_id)
+            try:
+                self._link_service(service_id, service.dependencies)
+            except ValueError:
+                if previous:
+                    self._link_service(service_id, previous.dependencies)
+                raise
+            
             self.services[service_id] = service
             logger.info(f"Servicio registrado: {name} (ID: {service_id})")
             
-            return service
+            # El servicio nuevo puede desbloquear o bloquear a dependientes ya registrados
+            old_level = self._propagate([service_id] + sorted(self._dependents.get(service_id, ())))
+        
+        await self._notify_status_change(old_level, self.system_degradation_level)
+        return service
     
     async def unregister_service(self, service_id: str) -> bool:
         """
@@ -387,17 +593,19 @@ class DegradedModeManager:
             True si se ha eliminado, False si no existía
         """
         async with self.lock:
-            if service_id in self.services:
-                del self.services[service_id]
-                logger.info(f"Servicio eliminado: {service_id}")
-                
-                # Actualizar estado global del sistema
-                await self._update_system_status()
-                
-                return True
-                
-            return False
-    
+            if service_id not in self.services:
+                return False
+            
+            self._unlink_service(service_id)
+            del self.services[service_id]
+            logger.info(f"Servicio eliminado: {service_id}")
+            
+            # Sus dependientes dejan de estar bloqueados por él
+            old_level = self._propagate(sorted(self._dependents.get(service_id, ())))
+            self._publish_snapshot(set(self._feature_dependents.get(service_id, ())))
+        
+        await self._notify_status_change(old_level, self.system_degradation_level)
+        return True
     async def set_service_unavailable(
         self,
         service_id: str,
@@ -486,21 +694,41 @@ class DegradedModeManager:
             "critical_services_unavailable": sum(1 for service in self.services.values() if service.is_critical and not service.is_available)
         }
     
-    async def set_feature_enabled(self, feature_id: str, enabled: bool) -> None:
+    async def set_feature_enabled(
+        self,
+        feature_id: str,
+        enabled: bool,
+        depends_on: Optional[List[str]] = None
+    ) -> None:
         """
         Establece si una funcionalidad está habilitada.
         
         Args:
             feature_id: ID de la funcionalidad
             enabled: Si está habilitada
+            depends_on: IDs de servicios de los que depende; la funcionalidad se
+                deshabilita mientras alguno no esté disponible (None conserva
+                las dependencias actuales)
         """
         async with self.lock:
             self.features[feature_id] = enabled
+            if depends_on is not None:
+                for service_id in self.feature_dependencies.get(feature_id, ()):
+                    dependents = self._feature_dependents.get(service_id)
+                    if dependents:
+                        dependents.discard(feature_id)
+                self.feature_dependencies[feature_id] = list(depends_on)
+                for service_id in depends_on:
+                    self._feature_dependents.setdefault(service_id, set()).add(feature_id)
+            self._publish_snapshot({feature_id})
             logger.info(f"Funcionalidad {feature_id} {'habilitada' if enabled else 'deshabilitada'}")
     
-    async def is_feature_enabled(self, feature_id: str, default: bool = True) -> bool:
+    def feature_enabled(self, feature_id: str, default: bool = True) -> bool:
         """
-        Comprueba si una funcionalidad está habilitada.
+        Comprueba si una funcionalidad está habilitada leyendo la instantánea publicada.
+        
+        No usa locks ni cede el control, por lo que puede llamarse desde
+        código síncrono en el camino de cada petición.
         
         Args:
             feature_id: ID de la funcionalidad
@@ -509,15 +737,30 @@ class DegradedModeManager:
         Returns:
             True si la funcionalidad está habilitada, False en caso contrario
         """
+        level, features = self._snapshot
+        
         # Si el sistema está en modo degradado crítico, deshabilitar funcionalidades no esenciales
-        if self.system_degradation_level == DegradationLevel.CRITICAL and not feature_id.startswith("essential:"):
+        if level == DegradationLevel.CRITICAL and not feature_id.startswith("essential:"):
             return False
             
         # Si el sistema está en modo degradado alto, deshabilitar funcionalidades avanzadas
-        if self.system_degradation_level == DegradationLevel.HIGH and feature_id.startswith("advanced:"):
+        if level == DegradationLevel.HIGH and feature_id.startswith("advanced:"):
             return False
             
-        return self.features.get(feature_id, default)
+        return features.get(feature_id, default)
+    
+    async def is_feature_enabled(self, feature_id: str, default: bool = True) -> bool:
+        """
+        Comprueba si una funcionalidad está habilitada.
+        
+        Args:
+            feature_id: ID de la funcionalidad
+            default: Valor por defecto si la funcionalidad no está registrada
+            
+        Returns:
+            True si la funcionalidad está habilitada, False en caso contrario
+        """
+        return self.feature_enabled(feature_id, default)
     
     async def register_callback(
         self,
@@ -566,8 +809,7 @@ def feature_check(feature_id: str, default: bool = True):
         @wraps(func)
         async def wrapper_async(*args, **kwargs):
             # Comprobar si la funcionalidad está habilitada
-            manager = DegradedModeManager()
-            if not await manager.is_feature_enabled(feature_id, default):
+            if not DegradedModeManager().feature_enabled(feature_id, default):
                 raise FeatureDisabledException(f"Funcionalidad {feature_id} deshabilitada")
                 
             # Ejecutar función
@@ -575,20 +817,12 @@ def feature_check(feature_id: str, default: bool = True):
             
         @wraps(func)
         def wrapper_sync(*args, **kwargs):
-            # Para funciones síncronas, crear una versión asíncrona y ejecutarla
-            async def async_wrapper():
-                # Comprobar si la funcionalidad está habilitada
-                manager = DegradedModeManager()
-                if not await manager.is_feature_enabled(feature_id, default):
-                    raise FeatureDisabledException(f"Funcionalidad {feature_id} deshabilitada")
-                    
-                # Ejecutar función
-                return func(*args, **kwargs)
-            
-            # Ejecutar la versión asíncrona
-            import asyncio
-            loop = asyncio.get_event_loop()
-            return loop.run_until_complete(async_wrapper())
+            # La lectura de la instantánea es síncrona: no hace falta un bucle de eventos
+            if not DegradedModeManager().feature_enabled(feature_id, default):
+                raise FeatureDisabledException(f"Funcionalidad {feature_id} deshabilitada")
+                
+            # Ejecutar función
+            return func(*args, **kwargs)
         
         # Determinar si la función original es asíncrona
         if asyncio.iscoroutinefunction(func):
@@ -7,22 +7,19 @@ con estructura definida.
 """
 
 import asyncio
-import base64
-import io
 import json
 import logging
-import os
 import re
 import time
-from typing import Dict, Any, Optional, Union, List, Tuple
+from typing import Dict, Any, Optional, Union, List
 
 import numpy as np
 import pandas as pd
-from PIL import Image
 
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
 from core.image_cache import image_cache
+from core.image_handle import ImageHandle
 from core.vision_metrics import vision_metrics
 
 # Configurar logger
@@ -57,14 +54,14 @@ class DocumentProcessor:
         
         logger.info("DocumentProcessor inicializado")
     
-    async def extract_tables(self, image_data: Union[str, bytes, Dict[str, Any]], 
+    async def extract_tables(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]], 
                            language_code: str = "es-ES", 
                            agent_id: str = "unknown") -> Dict[str, Any]:
         """
         Extrae tablas de un documento o imagen.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             language_code: Código de idioma para el OCR
             agent_id: ID del agente que realiza la solicitud (para métricas)
             
@@ -80,11 +77,11 @@ class DocumentProcessor:
             self.telemetry.add_span_attribute(span, "agent_id", agent_id)
         
         try:
-            # Procesar la entrada de imagen
-            processed_image, image_format, image_size = await self._process_image_input(image_data)
+            # Resolver la imagen (un handle compartido se reutiliza sin volver a leerla)
+            image = await ImageHandle.resolve(image_data)
             
             # Generar clave para caché
-            cache_key = await image_cache.generate_key(processed_image, {
+            cache_key = await image_cache.generate_key(image, {
                 "operation": "extract_tables",
                 "language_code": language_code
             })
@@ -114,7 +111,7 @@ class DocumentProcessor:
             # usando OCR y algoritmos de detección de estructuras
             
             # Simulación de extracción de tablas para este ejemplo
-            tables = await self._detect_and_extract_tables(processed_image, language_code)
+            tables = await self._detect_and_extract_tables(image, language_code)
             
             # Preparar resultado
             result = {
@@ -127,7 +124,7 @@ class DocumentProcessor:
             }
             
             # Guardar en caché
-            await image_cache.set(cache_key, result, image_size, "extract_tables")
+            await image_cache.set(cache_key, result, image.size, "extract_tables")
             
             # Actualizar estadísticas
             async with self.lock:
@@ -184,14 +181,14 @@ class DocumentProcessor:
             if self.telemetry and span:
                 self.telemetry.end_span(span)
     
-    async def extract_forms(self, image_data: Union[str, bytes, Dict[str, Any]], 
+    async def extract_forms(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]], 
                           language_code: str = "es-ES", 
                           agent_id: str = "unknown") -> Dict[str, Any]:
         """
         Extrae datos de formularios de un documento o imagen.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             language_code: Código de idioma para el OCR
             agent_id: ID del agente que realiza la solicitud (para métricas)
             
@@ -207,11 +204,11 @@ class DocumentProcessor:
             self.telemetry.add_span_attribute(span, "agent_id", agent_id)
         
         try:
-            # Procesar la entrada de imagen
-            processed_image, image_format, image_size = await self._process_image_input(image_data)
+            # Resolver la imagen (un handle compartido se reutiliza sin volver a leerla)
+            image = await ImageHandle.resolve(image_data)
             
             # Generar clave para caché
-            cache_key = await image_cache.generate_key(processed_image, {
+            cache_key = await image_cache.generate_key(image, {
                 "operation": "extract_forms",
                 "language_code": language_code
             })
@@ -240,7 +237,7 @@ class DocumentProcessor:
             # Aquí se implementaría la lógica para detectar y extraer datos de formularios
             
             # Simulación de extracción de formularios para este ejemplo
-            form_fields = await self._detect_and_extract_form_fields(processed_image, language_code)
+            form_fields = await self._detect_and_extract_form_fields(image, language_code)
             
             # Preparar resultado
             result = {
@@ -253,7 +250,7 @@ class DocumentProcessor:
             }
             
             # Guardar en caché
-            await image_cache.set(cache_key, result, image_size, "extract_forms")
+            await image_cache.set(cache_key, result, image.size, "extract_forms")
             
             # Actualizar estadísticas
             async with self.lock:
@@ -310,88 +307,12 @@ class DocumentProcessor:
             if self.telemetry and span:
                 self.telemetry.end_span(span)
     
-    async def _process_image_input(self, image_data: Union[str, bytes, Dict[str, Any]]) -> Tuple[bytes, str, int]:
-        """
-        Procesa la entrada de imagen en diferentes formatos.
-        
-        Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
-            
-        Returns:
-            Tuple[bytes, str, int]: Bytes de la imagen, formato detectado y tamaño
-        """
-        # Si ya es bytes, devolver directamente
-        if isinstance(image_data, bytes):
-            return image_data, "unknown", len(image_data)
-        
-        # Si es una cadena base64, decodificar
-        if isinstance(image_data, str) and image_data.startswith(("data:image", "base64:")):
-            # Extraer la parte base64 si tiene prefijo
-            if "base64," in image_data:
-                image_data = image_data.split("base64,")[1]
-            elif image_data.startswith("base64:"):
-                image_data = image_data[7:]
-                
-            # Decodificar
-            image_bytes = base64.b64decode(image_data)
-            return image_bytes, "unknown", len(image_bytes)
-        
-        # Si es un diccionario, procesar según las claves
-        if isinstance(image_data, dict):
-            # Si tiene URL, descargar la imagen
-            if "url" in image_data:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(image_data["url"]) as response:
-                        if response.status == 200:
-                            data = await response.read()
-                            format_detected = os.path.splitext(image_data["url"])[1].lower().replace(".", "")
-                            if not format_detected:
-                                format_detected = "jpeg"  # Asumir JPEG
-                            return data, format_detected, len(data)
-                        else:
-                            raise ValueError(f"Error al descargar imagen de URL: {response.status}")
-            
-            # Si tiene path, leer el archivo
-            elif "path" in image_data:
-                path = image_data["path"]
-                if not os.path.exists(path):
-                    raise FileNotFoundError(f"No se encontró el archivo de imagen: {path}")
-                
-                with open(path, "rb") as f:
-                    data = f.read()
-                format_detected = os.path.splitext(path)[1].lower().replace(".", "")
-                if not format_detected:
-                    format_detected = "jpeg"  # Asumir JPEG
-                return data, format_detected, len(data)
-            
-            # Si tiene base64, extraer
-            elif "base64" in image_data:
-                base64_data = image_data["base64"]
-                format_detected = image_data.get("format", "jpeg")  # Usar formato proporcionado o asumir JPEG
-                image_bytes = base64.b64decode(base64_data)
-                return image_bytes, format_detected, len(image_bytes)
-        
-        # Si es una cadena que no es base64, asumir que es una ruta de archivo
-        if isinstance(image_data, str):
-            if not os.path.exists(image_data):
-                raise FileNotFoundError(f"No se encontró el archivo de imagen: {image_data}")
-            
-            with open(image_data, "rb") as f:
-                data = f.read()
-            format_detected = os.path.splitext(image_data)[1].lower().replace(".", "")
-            if not format_detected:
-                format_detected = "jpeg"  # Asumir JPEG
-            return data, format_detected, len(data)
-        
-        raise ValueError("Formato de imagen no soportado")
-    
-    async def _detect_and_extract_tables(self, image_bytes: bytes, language_code: str) -> List[Dict[str, Any]]:
+    async def _detect_and_extract_tables(self, image: ImageHandle, language_code: str) -> List[Dict[str, Any]]:
         """
         Detecta y extrae tablas de una imagen.
         
         Args:
-            image_bytes: Bytes de la imagen
+            image: Imagen resuelta de la solicitud
             language_code: Código de idioma para el OCR
             
         Returns:
@@ -401,8 +322,8 @@ class DocumentProcessor:
         # En una implementación real, se utilizaría un modelo de ML para detectar tablas
         # y extraer su estructura y contenido
         
-        # Abrir la imagen con PIL
-        img = Image.open(io.BytesIO(image_bytes))
+        # Imagen PIL compartida por los análisis de la solicitud
+        img = image.image
         
         # Simulación de detección de tablas
         # En una implementación real, aquí se utilizaría un modelo de visión por computadora
@@ -445,12 +366,12 @@ class DocumentProcessor:
         
         return tables
     
-    async def _detect_and_extract_form_fields(self, image_bytes: bytes, language_code: str) -> List[Dict[str, Any]]:
+    async def _detect_and_extract_form_fields(self, image: ImageHandle, language_code: str) -> List[Dict[str, Any]]:
         """
         Detecta y extrae campos de formularios de una imagen.
         
         Args:
-            image_bytes: Bytes de la imagen
+            image: Imagen resuelta de la solicitud
             language_code: Código de idioma para el OCR
             
         Returns:
@@ -459,8 +380,8 @@ class DocumentProcessor:
         # Implementación simulada para este ejemplo
         # En una implementación real, se utilizaría un modelo de ML para detectar campos de formulario
         
-        # Abrir la imagen con PIL
-        img = Image.open(io.BytesIO(image_bytes))
+        # Imagen PIL compartida por los análisis de la solicitud
+        img = image.image
         
         # Simulación de detección de campos de formulario
         # En una implementación real, aquí se utilizaría un modelo de visión por computadora
@@ -0,0 +1,536 @@
+"""
+Inyección de fallos asíncrona en las fronteras de los clientes.
+
+Las pruebas de caos de red deben simular una dependencia lenta o caída, no un
+proceso congelado. En lugar de parchear ``socket.socket.connect`` con
+``time.sleep`` (que detiene todo el bucle de eventos), este módulo envuelve
+los métodos asíncronos por los que el código cruza la frontera con cada
+dependencia y espera con ``asyncio.sleep``: solo la corrutina que hace la
+llamada sufre la latencia o el error, el resto de peticiones sigue su curso.
+
+Fronteras soportadas y objetivo (``target``) contra el que se filtra cada fallo:
+
+- ``gemini``: ``GeminiClient.generate_text``, ``chat`` y ``analyze_image``
+  (nombre del modelo)
+- ``vertex``: operaciones públicas de ``VertexAIClient`` (nombre de la operación)
+- ``redis``: ``redis.asyncio.Redis.execute_command`` (host del servidor)
+- ``http``: ``httpx.AsyncClient.send`` y ``aiohttp.ClientSession._request``
+  (host de la URL)
+- ``a2a``: ``A2AAdapter.send_message`` (agente destino)
+
+Los envoltorios solo están instalados mientras hay algún fallo activo en su
+frontera, de modo que fuera de los experimentos no añaden ningún coste.
+"""
+
+import asyncio
+import fnmatch
+import functools
+import importlib
+import math
+import random
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+ERROR_KINDS = ("connection", "timeout")
+
+
+class FaultInjectedError(ConnectionError):
+    """Error de conexión inyectado por una prueba de caos."""
+
+
+class FaultInjectedTimeout(TimeoutError):
+    """Timeout inyectado por una prueba de caos."""
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    Distribución de latencia de una llamada.
+
+    Attributes:
+        kind: "constant", "uniform" o "lognormal"
+        median_ms: Mediana de la latencia en milisegundos
+        spread: Semiancho relativo (uniform) o sigma (lognormal)
+    """
+
+    kind: str = "lognormal"
+    median_ms: float = 400.0
+    spread: float = 0.5
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Construye una distribución a partir de "tipo:mediana_ms[:dispersión]".
+
+        Args:
+            spec: Especificación, p. ej. "lognormal:400:0.5" o "constant:50"
+
+        Returns:
+            LatencyDistribution: Distribución configurada
+
+        Raises:
+            ValueError: Si el tipo no es válido
+        """
+        parts = spec.split(":")
+        kind = parts[0].strip().lower()
+        if kind not in ("constant", "uniform", "lognormal"):
+            raise ValueError(f"Distribución de latencia desconocida: {kind}")
+        median_ms = float(parts[1]) if len(parts) > 1 else cls.median_ms
+        spread = float(parts[2]) if len(parts) > 2 else (0.0 if kind == "constant" else cls.spread)
+        return cls(kind=kind, median_ms=median_ms, spread=spread)
+
+    def sample_ms(self, rng: random.Random) -> float:
+        """
+        Sortea una latencia.
+
+        Args:
+            rng: Generador de números aleatorios
+
+        Returns:
+            float: Latencia en milisegundos
+        """
+        if self.kind == "constant" or self.spread <= 0:
+            return self.median_ms
+        if self.kind == "uniform":
+            return max(0.0, self.median_ms * (1 + rng.uniform(-self.spread, self.spread)))
+        return rng.lognormvariate(math.log(self.median_ms), self.spread)
+
+
+@dataclass
+class Fault:
+    """
+    Fallo a inyectar en una frontera.
+
+    Attributes:
+        boundary: Frontera afectada ("gemini", "vertex", "redis", "http", "a2a" o "*")
+        targets: Patrones ``fnmatch`` de los objetivos afectados
+        latency: Distribución de la latencia añadida a cada llamada afectada
+        error_rate: Probabilidad de que una llamada afectada falle (0.0-1.0)
+        error_kind: "connection" o "timeout"
+        error_latency_ms: Espera antes de lanzar el error (simula un timeout)
+        fault_id: Identificador del fallo
+    """
+
+    boundary: str
+    targets: Tuple[str, ...] = ("*",)
+    latency: Optional[LatencyDistribution] = None
+    error_rate: float = 0.0
+    error_kind: str = "connection"
+    error_latency_ms: float = 0.0
+    fault_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    stats: Dict[str, Any] = field(default_factory=lambda: {
+        "calls": 0,
+        "delayed": 0,
+        "failed": 0,
+        "delay_ms_total": 0.0,
+        "max_delay_ms": 0.0,
+    })
+
+    def __post_init__(self) -> None:
+        if isinstance(self.targets, str):
+            self.targets = (self.targets,)
+        self.targets = tuple(self.targets) or ("*",)
+        if self.boundary != "*" and self.boundary not in BOUNDARIES:
+            raise ValueError(f"Frontera desconocida: {self.boundary}")
+        if not 0.0 <= self.error_rate <= 1.0:
+            raise ValueError(f"La tasa de error debe estar entre 0 y 1: {self.error_rate}")
+        if self.error_kind not in ERROR_KINDS:
+            raise ValueError(f"Tipo de error desconocido: {self.error_kind}")
+
+    @classmethod
+    def parse(cls, spec: str) -> "Fault":
+        """
+        Construye un fallo a partir de una lista "clave=valor" separada por comas.
+
+        Claves: ``boundary``, ``target`` (patrones separados por "|"),
+        ``latency`` (especificación de ``LatencyDistribution``), ``error_rate``,
+        ``error_kind`` y ``error_latency_ms``.
+
+        Args:
+            spec: Especificación, p. ej. "boundary=a2a,target=elite_*,latency=lognormal:200:0.5,error_rate=0.05"
+
+        Returns:
+            Fault: Fallo configurado
+
+        Raises:
+            ValueError: Si la especificación no es válida
+        """
+        options: Dict[str, str] = {}
+        for item in spec.split(","):
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"Elemento sin valor en la especificación de fallo: {item}")
+            options[key.strip()] = value.strip()
+        unknown = set(options) - {"boundary", "target", "latency", "error_rate", "error_kind", "error_latency_ms"}
+        if unknown:
+            raise ValueError(f"Claves desconocidas en la especificación de fallo: {sorted(unknown)}")
+        return cls(
+            boundary=options.pop("boundary", "*"),
+            targets=tuple(options.pop("target", "*").split("|")),
+            latency=LatencyDistribution.parse(options.pop("latency")) if "latency" in options else None,
+            error_rate=float(options.pop("error_rate", 0.0)),
+            error_kind=options.pop("error_kind", "connection"),
+            error_latency_ms=float(options.pop("error_latency_ms", 0.0)),
+        )
+
+    def matches(self, target: str) -> bool:
+        """
+        Indica si el fallo afecta a un objetivo.
+
+        Args:
+            target: Objetivo de la llamada
+
+        Returns:
+            bool: True si algún patrón coincide
+        """
+        return any(fnmatch.fnmatchcase(target, pattern) for pattern in self.targets)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convierte el fallo a un diccionario.
+
+        Returns:
+            Dict[str, Any]: Configuración y estadísticas del fallo
+        """
+        return {
+            "fault_id": self.fault_id,
+            "boundary": self.boundary,
+            "targets": list(self.targets),
+            "latency": (
+                {"kind": self.latency.kind, "median_ms": self.latency.median_ms, "spread": self.latency.spread}
+                if self.latency else None
+            ),
+            "error_rate": self.error_rate,
+            "error_kind": self.error_kind,
+            "error_latency_ms": self.error_latency_ms,
+            "stats": {**self.stats, "delay_ms_total": round(self.stats["delay_ms_total"], 3),
+                      "max_delay_ms": round(self.stats["max_delay_ms"], 3)},
+        }
+
+
+# --- Fronteras ---------------------------------------------------------------
+
+def _default_error(kind: str, message: str, args: tuple, kwargs: dict) -> BaseException:
+    return FaultInjectedTimeout(message) if kind == "timeout" else FaultInjectedError(message)
+
+
+def _httpx_error(kind: str, message: str, args: tuple, kwargs: dict) -> BaseException:
+    import httpx
+    request = args[1] if len(args) > 1 else kwargs.get("request")
+    error_class = httpx.ConnectTimeout if kind == "timeout" else httpx.ConnectError
+    return error_class(message, request=request)
+
+
+def _aiohttp_error(kind: str, message: str, args: tuple, kwargs: dict) -> BaseException:
+    import aiohttp
+    error_class = aiohttp.ServerTimeoutError if kind == "timeout" else aiohttp.ClientConnectionError
+    return error_class(message)
+
+
+def _redis_error(kind: str, message: str, args: tuple, kwargs: dict) -> BaseException:
+    from redis import exceptions
+    error_class = exceptions.TimeoutError if kind == "timeout" else exceptions.ConnectionError
+    return error_class(message)
+
+
+def _httpx_target(method: str, args: tuple, kwargs: dict) -> str:
+    request = args[1] if len(args) > 1 else kwargs.get("request")
+    return request.url.host if request is not None else ""
+
+
+def _aiohttp_target(method: str, args: tuple, kwargs: dict) -> str:
+    from yarl import URL
+    session = args[0]
+    url = URL(str(args[2] if len(args) > 2 else kwargs.get("str_or_url", "")))
+    base_url = getattr(session, "_base_url", None)
+    if not url.is_absolute() and base_url is not None:
+        url = base_url.join(url)
+    return url.host or ""
+
+
+def _redis_target(method: str, args: tuple, kwargs: dict) -> str:
+    pool = getattr(args[0], "connection_pool", None)
+    return str(getattr(pool, "connection_kwargs", {}).get("host", ""))
+
+
+def _a2a_target(method: str, args: tuple, kwargs: dict) -> str:
+    return str(kwargs["to_agent_id"] if "to_agent_id" in kwargs else (args[2] if len(args) > 2 else ""))
+
+
+def _gemini_target(method: str, args: tuple, kwargs: dict) -> str:
+    return str(getattr(args[0], "model_name", "") or "")
+
+
+def _method_target(method: str, args: tuple, kwargs: dict) -> str:
+    return method
+
+
+@dataclass(frozen=True)
+class BoundaryMethod:
+    """
+    Método asíncrono que cruza la frontera con una dependencia.
+
+    Attributes:
+        module: Módulo que define la clase
+        owner: Nombre de la clase
+        method: Nombre del método
+        target: Función que extrae el objetivo de los argumentos de la llamada
+        error: Función que construye la excepción nativa del cliente
+    """
+
+    module: str
+    owner: str
+    method: str
+    target: Callable[[str, tuple, dict], str]
+    error: Callable[[str, str, tuple, dict], BaseException] = _default_error
+
+
+BOUNDARIES: Dict[str, Tuple[BoundaryMethod, ...]] = {
+    "gemini": tuple(
+        BoundaryMethod("clients.gemini_client", "GeminiClient", method, _gemini_target)
+        for method in ("generate_text", "chat", "analyze_image")
+    ),
+    "vertex": tuple(
+        BoundaryMethod("clients.vertex_ai.client", "VertexAIClient", method, _method_target)
+        for method in ("generate_content", "generate_embedding", "batch_embeddings",
+                       "process_multimodal", "process_document")
+    ),
+    "redis": (
+        BoundaryMethod("redis.asyncio.client", "Redis", "execute_command", _redis_target, _redis_error),
+    ),
+    "http": (
+        BoundaryMethod("httpx", "AsyncClient", "send", _httpx_target, _httpx_error),
+        BoundaryMethod("aiohttp", "ClientSession", "_request", _aiohttp_target, _aiohttp_error),
+    ),
+    "a2a": (
+        BoundaryMethod("infrastructure.adapters.a2a_adapter", "A2AAdapter", "send_message", _a2a_target),
+    ),
+}
+
+
+class FaultInjector:
+    """
+    Registro de fallos activos que instala y retira los envoltorios de frontera.
+
+    Todas las operaciones son síncronas y no ceden el control, así que se
+    pueden llamar desde cualquier corrutina del bucle sin bloqueo adicional.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        """
+        Inicializa el inyector.
+
+        Args:
+            seed: Semilla de los sorteos (None para no determinista)
+        """
+        self._rng = random.Random(seed)
+        self._faults: Dict[str, Fault] = {}
+        self._by_boundary: Dict[str, List[Fault]] = {}
+        # Frontera -> [(clase, método, atributo original propio o None)]
+        self._installed: Dict[str, List[Tuple[type, str, Any]]] = {}
+        self.stats: Dict[str, Any] = {
+            "faults_added": 0,
+            "faults_removed": 0,
+            "calls_affected": 0,
+            "unavailable_boundaries": [],
+        }
+
+    def seed(self, seed: Optional[int]) -> None:
+        """
+        Reinicia el generador de sorteos.
+
+        Args:
+            seed: Nueva semilla
+        """
+        self._rng.seed(seed)
+
+    def add(self, fault: Fault) -> str:
+        """
+        Activa un fallo e instala los envoltorios de sus fronteras.
+
+        Args:
+            fault: Fallo a activar
+
+        Returns:
+            str: ID del fallo
+        """
+        self._faults[fault.fault_id] = fault
+        boundaries = BOUNDARIES if fault.boundary == "*" else (fault.boundary,)
+        for boundary in boundaries:
+            # Listas nuevas en cada cambio: las llamadas en curso iteran una copia estable
+            self._by_boundary[boundary] = [*self._by_boundary.get(boundary, []), fault]
+            if boundary not in self._installed:
+                self._install(boundary)
+        self.stats["faults_added"] += 1
+        logger.info(f"Fallo {fault.fault_id} activo en {fault.boundary} para {list(fault.targets)}")
+        return fault.fault_id
+
+    def remove(self, fault_id: str) -> Optional[Fault]:
+        """
+        Desactiva un fallo y retira los envoltorios que ya no se necesitan.
+
+        Args:
+            fault_id: ID del fallo
+
+        Returns:
+            Optional[Fault]: Fallo retirado o None si no estaba activo
+        """
+        fault = self._faults.pop(fault_id, None)
+        if fault is None:
+            return None
+        for boundary in list(self._by_boundary):
+            remaining = [active for active in self._by_boundary[boundary] if active.fault_id != fault_id]
+            if remaining:
+                self._by_boundary[boundary] = remaining
+            else:
+                del self._by_boundary[boundary]
+                self._uninstall(boundary)
+        self.stats["faults_removed"] += 1
+        logger.info(f"Fallo {fault_id} retirado")
+        return fault
+
+    def clear(self) -> None:
+        """Desactiva todos los fallos."""
+        for fault_id in list(self._faults):
+            self.remove(fault_id)
+
+    @contextmanager
+    def injected(self, *faults: Fault) -> Iterator[List[Fault]]:
+        """
+        Mantiene activos unos fallos durante un bloque.
+
+        Args:
+            faults: Fallos a activar
+
+        Yields:
+            List[Fault]: Los fallos activos (sus estadísticas se actualizan en vivo)
+        """
+        for fault in faults:
+            self.add(fault)
+        try:
+            yield list(faults)
+        finally:
+            for fault in faults:
+                self.remove(fault.fault_id)
+
+    def active_faults(self) -> List[Fault]:
+        """
+        Obtiene los fallos activos.
+
+        Returns:
+            List[Fault]: Fallos activos
+        """
+        return list(self._faults.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del inyector.
+
+        Returns:
+            Dict[str, Any]: Contadores globales, fronteras instaladas y fallos activos
+        """
+        return {
+            **self.stats,
+            "installed_boundaries": sorted(self._installed),
+            "faults": [fault.to_dict() for fault in self._faults.values()],
+        }
+
+    async def inject(self, boundary: str, target: str,
+                     make_error: Optional[Callable[[str, str], BaseException]] = None) -> None:
+        """
+        Aplica a una llamada los fallos activos que le afecten.
+
+        Las latencias de los fallos coincidentes se suman; si alguno decide
+        fallar, se espera su ``error_latency_ms`` y se lanza el error.
+
+        Args:
+            boundary: Frontera de la llamada
+            target: Objetivo de la llamada
+            make_error: Constructor de la excepción (tipo, mensaje); por defecto
+                ``FaultInjectedError`` o ``FaultInjectedTimeout``
+
+        Raises:
+            Exception: El error inyectado
+        """
+        faults = self._by_boundary.get(boundary)
+        if not faults:
+            return
+        delay_ms = 0.0
+        failing: Optional[Fault] = None
+        for fault in faults:
+            if not fault.matches(target):
+                continue
+            stats = fault.stats
+            stats["calls"] += 1
+            if fault.latency is not None:
+                sample = fault.latency.sample_ms(self._rng)
+                delay_ms += sample
+                stats["delayed"] += 1
+                stats["delay_ms_total"] += sample
+                stats["max_delay_ms"] = max(stats["max_delay_ms"], sample)
+            if failing is None and fault.error_rate and self._rng.random() < fault.error_rate:
+                failing = fault
+                stats["failed"] += 1
+        if failing is None and delay_ms == 0.0:
+            return
+
+        self.stats["calls_affected"] += 1
+        if failing is not None:
+            delay_ms += failing.error_latency_ms
+        if delay_ms > 0:
+            # Solo suspende la corrutina que llama; el bucle sigue atendiendo al resto
+            await asyncio.sleep(delay_ms / 1000.0)
+        if failing is not None:
+            message = f"Fallo inyectado por prueba de caos en {boundary}:{target} (fallo {failing.fault_id})"
+            if make_error is None:
+                raise _default_error(failing.error_kind, message, (), {})
+            raise make_error(failing.error_kind, message)
+
+    def _wrap(self, boundary: str, spec: BoundaryMethod, original: Callable[..., Any]) -> Callable[..., Any]:
+        injector = self
+
+        @functools.wraps(original)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if injector._by_boundary.get(boundary):
+                await injector.inject(
+                    boundary,
+                    spec.target(spec.method, args, kwargs),
+                    lambda kind, message: spec.error(kind, message, args, kwargs),
+                )
+            return await original(*args, **kwargs)
+
+        wrapper.__fault_boundary__ = boundary
+        return wrapper
+
+    def _install(self, boundary: str) -> None:
+        installed: List[Tuple[type, str, Any]] = []
+        for spec in BOUNDARIES[boundary]:
+            try:
+                owner = getattr(importlib.import_module(spec.module), spec.owner)
+            except Exception as e:
+                # Cliente no instalado o no importable en este entorno
+                logger.debug(f"Frontera {boundary} no disponible en {spec.module}.{spec.owner}: {e}")
+                if f"{spec.module}.{spec.owner}" not in self.stats["unavailable_boundaries"]:
+                    self.stats["unavailable_boundaries"].append(f"{spec.module}.{spec.owner}")
+                continue
+            own = owner.__dict__.get(spec.method)
+            setattr(owner, spec.method, self._wrap(boundary, spec, getattr(owner, spec.method)))
+            installed.append((owner, spec.method, own))
+        self._installed[boundary] = installed
+
+    def _uninstall(self, boundary: str) -> None:
+        for owner, method, own in self._installed.pop(boundary, []):
+            if own is None:
+                delattr(owner, method)
+            else:
+                setattr(owner, method, own)
+
+
+# Instancia global para uso en toda la aplicación
+fault_injector = FaultInjector()
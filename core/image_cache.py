@@ -14,6 +14,7 @@ import time
 from typing import Dict, Any, Optional, Union
 from datetime import datetime, timedelta
 
+from core.image_handle import ImageHandle
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
 
@@ -189,17 +190,21 @@ class ImageCache:
             if self.telemetry and span:
                 self.telemetry.end_span(span)
     
-    async def generate_key(self, image_data: Union[str, bytes], params: Optional[Dict[str, Any]] = None) -> str:
+    async def generate_key(self, image_data: Union[ImageHandle, str, bytes], params: Optional[Dict[str, Any]] = None) -> str:
         """
         Genera una clave única para la caché basada en la imagen y los parámetros.
         
         Args:
-            image_data: Datos de la imagen (base64 o bytes)
+            image_data: Datos de la imagen (ImageHandle, base64 o bytes)
             params: Parámetros adicionales que afectan al resultado
             
         Returns:
             str: Clave única para la caché
         """
+        # Un handle reutiliza el hash ya calculado para la solicitud
+        if isinstance(image_data, ImageHandle):
+            return image_data.cache_key(params)
+        
         # Convertir imagen a bytes si es necesario
         if isinstance(image_data, str):
             if image_data.startswith("data:image"):
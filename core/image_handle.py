@@ -0,0 +1,243 @@
+"""
+Imagen decodificada compartida entre análisis de visión.
+
+Una misma solicitud suele ejecutar varios análisis sobre una imagen (tablas,
+formularios, objetos, descripción...). Antes cada análisis leía o descargaba la
+imagen, decodificaba el base64, la abría con PIL y calculaba su hash por su
+cuenta. ``ImageHandle`` resuelve la entrada una sola vez y conserva, bajo
+demanda, los bytes, el base64, la imagen decodificada, los píxeles, el hash de
+contenido y las miniaturas derivadas.
+
+Los puntos de entrada de visión aceptan tanto los formatos de siempre (bytes,
+base64, data URI, URL, ruta o dict con ``url``/``path``/``base64``) como un
+``ImageHandle`` ya resuelto::
+
+    image = await ImageHandle.resolve(image_data)
+    tables, forms, objects = await asyncio.gather(
+        document_processor.extract_tables(image),
+        document_processor.extract_forms(image),
+        object_recognition.recognize_objects(image),
+    )
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import os
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Firmas de los formatos más comunes
+_MAGIC_NUMBERS = (
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8", "jpeg"),
+    (b"GIF8", "gif"),
+    (b"BM", "bmp"),
+)
+
+
+def _sniff_format(data: bytes) -> str:
+    """Detecta el formato a partir de los primeros bytes."""
+    for magic, image_format in _MAGIC_NUMBERS:
+        if data.startswith(magic):
+            return image_format
+    if data[0:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "unknown"
+
+
+def _format_from_name(name: str) -> str:
+    """Formato a partir de la extensión de una ruta o URL (JPEG si no tiene)."""
+    extension = os.path.splitext(name.split("?")[0])[1].lower().replace(".", "")
+    return extension or "jpeg"
+
+
+class ImageHandle:
+    """
+    Imagen resuelta una vez por solicitud con sus derivados en caché.
+
+    Todos los derivados se calculan de forma perezosa y síncrona la primera
+    vez que se piden, por lo que varias corrutinas pueden compartir el mismo
+    handle sin volver a decodificar.
+    """
+
+    def __init__(self, data: Optional[bytes] = None, base64_data: Optional[str] = None,
+                 image_format: str = "unknown", source: str = "bytes"):
+        """
+        Inicializa el handle a partir de los bytes o del base64 de la imagen.
+
+        Args:
+            data: Bytes de la imagen
+            base64_data: Imagen en base64 (se decodifica solo si se necesitan los bytes)
+            image_format: Formato conocido de la imagen
+            source: Origen de la imagen (bytes, base64, url o path)
+        """
+        if data is None and base64_data is None:
+            raise ValueError("ImageHandle necesita los bytes o el base64 de la imagen")
+        self._data = data
+        self._base64 = base64_data
+        self._format = image_format
+        self.source = source
+        self._content_hash: Optional[str] = None
+        self._image: Optional[Image.Image] = None
+        self._pixels: Optional[np.ndarray] = None
+        self._thumbnails: Dict[Tuple[int, int, str], bytes] = {}
+
+    @classmethod
+    async def resolve(cls, image_data: Union["ImageHandle", str, bytes, Dict[str, Any]]) -> "ImageHandle":
+        """
+        Obtiene el handle de una entrada de imagen, leyendo o descargando una sola vez.
+
+        Args:
+            image_data: Handle existente, bytes, base64, data URI, URL, ruta o
+                dict con ``url``, ``path`` o ``base64``
+
+        Returns:
+            ImageHandle: El mismo handle si ya lo era, o uno nuevo
+        """
+        if isinstance(image_data, ImageHandle):
+            return image_data
+
+        if isinstance(image_data, (bytes, bytearray)):
+            return cls(data=bytes(image_data))
+
+        if isinstance(image_data, dict):
+            if "url" in image_data:
+                return await cls._download(image_data["url"])
+            if "path" in image_data:
+                return cls._read_file(image_data["path"])
+            if "base64" in image_data:
+                return cls(base64_data=image_data["base64"], image_format=image_data.get("format", "jpeg"),
+                           source="base64")
+            raise ValueError("Formato de imagen no válido. Debe contener 'url', 'path' o 'base64'.")
+
+        if isinstance(image_data, str):
+            if image_data.startswith("data:image"):
+                header, _, encoded = image_data.partition(",")
+                image_format = header.split(";")[0].split("/")[-1] or "unknown"
+                return cls(base64_data=encoded, image_format=image_format, source="base64")
+            if image_data.startswith("base64:"):
+                return cls(base64_data=image_data[7:], source="base64")
+            if image_data.startswith(("http://", "https://")):
+                return await cls._download(image_data)
+            return cls._read_file(image_data)
+
+        raise ValueError("Formato de imagen no soportado")
+
+    @classmethod
+    async def _download(cls, url: str) -> "ImageHandle":
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise ValueError(f"Error al descargar imagen de URL: {response.status}")
+                data = await response.read()
+        return cls(data=data, image_format=_format_from_name(url), source="url")
+
+    @classmethod
+    def _read_file(cls, path: str) -> "ImageHandle":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No se encontró el archivo de imagen: {path}")
+        with open(path, "rb") as f:
+            data = f.read()
+        return cls(data=data, image_format=_format_from_name(path), source="path")
+
+    @property
+    def data(self) -> bytes:
+        """Bytes de la imagen."""
+        if self._data is None:
+            try:
+                self._data = base64.b64decode(self._base64)
+            except (binascii.Error, ValueError) as e:
+                raise ValueError(f"Base64 de imagen no válido: {e}") from e
+        return self._data
+
+    @property
+    def base64(self) -> str:
+        """Imagen codificada en base64."""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self._data).decode("utf-8")
+        return self._base64
+
+    @property
+    def size(self) -> int:
+        """Tamaño de la imagen en bytes."""
+        return len(self.data)
+
+    @property
+    def format(self) -> str:
+        """Formato de la imagen (detectado por su firma si no se conocía)."""
+        if self._format == "unknown":
+            self._format = _sniff_format(self.data)
+        return self._format
+
+    @property
+    def mime_type(self) -> str:
+        """Tipo MIME de la imagen."""
+        image_format = self.format
+        return f"image/{'jpeg' if image_format in ('unknown', 'jpg') else image_format}"
+
+    @property
+    def content_hash(self) -> str:
+        """Hash MD5 del contenido (el mismo que usa ``image_cache``)."""
+        if self._content_hash is None:
+            self._content_hash = hashlib.md5(self.data).hexdigest()
+        return self._content_hash
+
+    @property
+    def image(self) -> Image.Image:
+        """Imagen PIL abierta una sola vez (sus píxeles se decodifican al primer acceso)."""
+        if self._image is None:
+            self._image = Image.open(io.BytesIO(self.data))
+        return self._image
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """Píxeles decodificados de la imagen."""
+        if self._pixels is None:
+            self._pixels = np.asarray(self.image)
+        return self._pixels
+
+    def cache_key(self, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Clave de caché de un análisis, compatible con ``image_cache.generate_key``.
+
+        Args:
+            params: Parámetros que afectan al resultado del análisis
+
+        Returns:
+            str: Clave única para la caché
+        """
+        if not params:
+            return self.content_hash
+        params_hash = hashlib.md5(str(sorted(params.items())).encode("utf-8")).hexdigest()
+        return f"{self.content_hash}_{params_hash}"
+
+    def thumbnail(self, max_size: Tuple[int, int] = (256, 256), output_format: str = "JPEG") -> bytes:
+        """
+        Miniatura codificada de la imagen, calculada una vez por tamaño y formato.
+
+        Args:
+            max_size: Ancho y alto máximos de la miniatura
+            output_format: Formato de salida de PIL
+
+        Returns:
+            bytes: Miniatura codificada
+        """
+        key = (int(max_size[0]), int(max_size[1]), output_format.upper())
+        if key not in self._thumbnails:
+            thumbnail = self.image.copy()
+            thumbnail.thumbnail(key[:2])
+            if key[2] == "JPEG" and thumbnail.mode not in ("RGB", "L"):
+                thumbnail = thumbnail.convert("RGB")
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, format=key[2])
+            self._thumbnails[key] = buffer.getvalue()
+        return self._thumbnails[key]
@@ -10,26 +10,209 @@ import asyncio
 import base64
 import io
 import logging
+import multiprocessing
 import os
-from typing import Dict, Any, Optional, Union, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Dict, Any, Optional, Union, Tuple
 from PIL import Image, ImageOps
 
+from core.image_handle import ImageHandle
 from core.logging_config import get_logger
-from core.telemetry import Telemetry
+from core.settings import settings
+
+if TYPE_CHECKING:
+    # Solo para anotaciones: los procesos del pool importan este módulo y no
+    # deben cargar OpenTelemetry
+    from core.telemetry import Telemetry
 
 # Configurar logger
 logger = get_logger(__name__)
 
+# Tamaño máximo conservado para imágenes con texto
+TEXT_MAX_SIZE = 1600
+
+# La decodificación draft de JPEG se usa si el origen es al menos este factor
+# mayor que el tamaño objetivo en ambas dimensiones
+DRAFT_MIN_FACTOR = 2
+
+
+def _normalize_output_format(output_format: str) -> str:
+    """Normaliza el formato de salida al nombre que usa PIL."""
+    output_format = output_format.lower()
+    if output_format in ['jpg', 'jpeg']:
+        return 'JPEG'
+    if output_format == 'png':
+        return 'PNG'
+    if output_format == 'webp':
+        return 'WEBP'
+    return 'JPEG'  # Formato por defecto
+
+
+def _detect_text(img: Image.Image) -> bool:
+    """
+    Aplica una heurística simple para detectar si una imagen contiene texto.
+    
+    Args:
+        img: Imagen PIL
+        
+    Returns:
+        bool: True si se detecta que la imagen probablemente contiene texto
+    """
+    # Convertir a escala de grises
+    gray_img = img.convert('L')
+    
+    # Redimensionar para análisis más rápido si es necesario
+    if gray_img.width > 1000 or gray_img.height > 1000:
+        ratio = min(1000 / gray_img.width, 1000 / gray_img.height)
+        analysis_img = gray_img.resize((int(gray_img.width * ratio), int(gray_img.height * ratio)), Image.LANCZOS)
+    else:
+        analysis_img = gray_img
+    
+    # Aplicar detección de bordes
+    edges = ImageOps.equalize(analysis_img)
+    
+    # Convertir a array para análisis
+    import numpy as np
+    img_array = np.array(edges)
+    
+    # Calcular varianza local (alta en áreas con texto)
+    from scipy.ndimage import uniform_filter
+    
+    # Calcular media local
+    mean = uniform_filter(img_array, size=3)
+    
+    # Calcular varianza local
+    var = uniform_filter(img_array**2, size=3) - mean**2
+    
+    # Umbral para considerar que hay texto
+    text_threshold = np.percentile(var, 95)  # Ajustar según necesidad
+    high_var_ratio = np.sum(var > text_threshold) / var.size
+    
+    # Detección de líneas horizontales (común en texto)
+    h_edges = np.abs(np.diff(img_array, axis=1))
+    h_lines = np.sum(h_edges > np.percentile(h_edges, 90), axis=1)
+    h_line_pattern = np.sum(np.diff(h_lines > np.percentile(h_lines, 75)) != 0)
+    
+    # Heurística combinada
+    return bool(high_var_ratio > 0.15 or h_line_pattern > img_array.shape[0] * 0.1)
+
+
+def _optimize_image_bytes(image_bytes: bytes, input_format: str,
+                          params: Dict[str, Any]) -> Tuple[Optional[bytes], Dict[str, Any]]:
+    """
+    Decodifica, analiza, redimensiona y recodifica una imagen.
+    
+    Se ejecuta en un proceso del pool, por lo que solo recibe y devuelve tipos
+    serializables. Si el resultado no es más pequeño que el original devuelve
+    ``None`` en lugar de reenviar los bytes originales al proceso principal.
+    
+    Args:
+        image_bytes: Bytes de la imagen original
+        input_format: Formato detectado de la entrada
+        params: max_width, max_height, quality, force_format y preserve_text_quality
+        
+    Returns:
+        Tuple[Optional[bytes], Dict[str, Any]]: Imagen optimizada (o None) y metadatos
+    """
+    max_width = params["max_width"]
+    max_height = params["max_height"]
+    quality = params["quality"]
+    preserve_text_quality = params["preserve_text_quality"]
+    original_size = len(image_bytes)
+    
+    img = Image.open(io.BytesIO(image_bytes))
+    original_width, original_height = img.size
+    
+    # Decodificación draft: el decodificador JPEG escala por 1/2, 1/4 u 1/8 al
+    # leer, sin decodificar la resolución completa. El tamaño pedido es el mayor
+    # que podría conservarse (imágenes con texto), así que no se pierde calidad.
+    draft_used = False
+    if img.format == 'JPEG':
+        draft_width = max(max_width, TEXT_MAX_SIZE) if preserve_text_quality else max_width
+        draft_height = max(max_height, TEXT_MAX_SIZE) if preserve_text_quality else max_height
+        if (original_width >= draft_width * DRAFT_MIN_FACTOR
+                and original_height >= draft_height * DRAFT_MIN_FACTOR):
+            img.draft('RGB', (draft_width, draft_height))
+            draft_used = img.size != (original_width, original_height)
+    
+    # Determinar si la imagen contiene texto (heurística simple)
+    contains_text = _detect_text(img) if preserve_text_quality else False
+    
+    # Ajustar parámetros de optimización si contiene texto
+    if contains_text:
+        # Preservar más calidad para imágenes con texto
+        max_width = min(TEXT_MAX_SIZE, original_width)
+        max_height = min(TEXT_MAX_SIZE, original_height)
+        quality = min(92, quality + 7)
+    
+    # Determinar el formato de salida
+    output_format = _normalize_output_format(params.get("force_format") or input_format)
+    
+    # Redimensionar si es necesario (con draft, img ya puede ser menor que el original)
+    resized = False
+    if original_width > max_width or original_height > max_height:
+        ratio = min(max_width / original_width, max_height / original_height)
+        new_size = (int(original_width * ratio), int(original_height * ratio))
+        img = img.resize(new_size, Image.LANCZOS)
+        resized = True
+    
+    # Convertir a RGB si es necesario para JPEG
+    if output_format == 'JPEG' and img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    # Ajustar parámetros según el formato
+    save_params = {}
+    if output_format == 'JPEG':
+        save_params = {'quality': quality, 'optimize': True}
+    elif output_format == 'PNG':
+        save_params = {'optimize': True}
+    elif output_format == 'WEBP':
+        save_params = {'quality': quality}
+    
+    output_buffer = io.BytesIO()
+    img.save(output_buffer, format=output_format, **save_params)
+    optimized_bytes: Optional[bytes] = output_buffer.getvalue()
+    optimized_size = len(optimized_bytes)
+    
+    # Si la imagen optimizada es más grande, se usará la original
+    reverted = optimized_size >= original_size
+    if reverted:
+        optimized_bytes = None
+        optimized_size = original_size
+    
+    metadata = {
+        "original_size": original_size,
+        "optimized_size": optimized_size,
+        "bytes_saved": original_size - optimized_size,
+        "compression_ratio": original_size / optimized_size if optimized_size > 0 else 1.0,
+        "original_width": original_width,
+        "original_height": original_height,
+        "new_width": img.width,
+        "new_height": img.height,
+        "format": output_format,
+        "contains_text": contains_text,
+        "resized": resized,
+        "draft_decoded": draft_used,
+        "optimization_reverted": reverted
+    }
+    return optimized_bytes, metadata
+
 class ImageOptimizer:
     """
     Optimizador de imágenes para reducir el tamaño y la resolución.
     
     Proporciona métodos para redimensionar, comprimir y optimizar imágenes
-    antes de enviarlas a las APIs de visión.
+    antes de enviarlas a las APIs de visión. La decodificación, el análisis y
+    la recodificación se ejecutan en un ``ProcessPoolExecutor`` acotado para no
+    bloquear el bucle de eventos: como máximo ``max_pending`` imágenes están en
+    curso a la vez (el resto espera su turno) y cada tarea tiene un plazo.
     """
     
     def __init__(self, max_width: int = 1024, max_height: int = 1024, 
-                quality: int = 85, telemetry: Optional[Telemetry] = None):
+                quality: int = 85, telemetry: Optional["Telemetry"] = None,
+                max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                task_timeout: Optional[float] = None, use_process_pool: bool = True):
         """
         Inicializa el optimizador de imágenes.
         
@@ -38,11 +221,24 @@ class ImageOptimizer:
             max_height: Alto máximo de la imagen optimizada
             quality: Calidad de compresión JPEG (0-100)
             telemetry: Instancia de Telemetry para métricas y trazas (opcional)
+            max_workers: Procesos del pool (por defecto settings.image_pool_workers)
+            max_pending: Imágenes en curso como máximo (por defecto settings.image_pool_max_pending)
+            task_timeout: Plazo en segundos de cada imagen, incluida la espera (por defecto settings.image_task_timeout)
+            use_process_pool: Si es False, el trabajo se ejecuta en un hilo en lugar de un proceso
         """
         self.max_width = max_width
         self.max_height = max_height
         self.quality = quality
         self.telemetry = telemetry
+        self.max_workers = max_workers or settings.image_pool_workers
+        self.max_pending = max_pending or settings.image_pool_max_pending
+        self.task_timeout = task_timeout or settings.image_task_timeout
+        self.use_process_pool = use_process_pool
+        
+        # El pool y el semáforo se crean en el primer uso
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
         
         # Estadísticas
         self.stats = {
@@ -50,12 +246,91 @@ class ImageOptimizer:
             "bytes_before": 0,
             "bytes_after": 0,
             "bytes_saved": 0,
-            "errors": 0
+            "errors": 0,
+            "timeouts": 0,
+            "draft_decodes": 0,
+            "pending": 0
         }
         
         logger.info(f"ImageOptimizer inicializado con max_width={max_width}, max_height={max_height}, quality={quality}")
     
-    async def optimize_image(self, image_data: Union[str, bytes, Dict[str, Any]], 
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Obtiene el pool de procesos, creándolo si no existe."""
+        if self._executor is None:
+            # spawn evita heredar hilos y bucles de eventos del proceso principal
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Pool de procesos de imágenes iniciado con {self.max_workers} procesos")
+        return self._executor
+    
+    def _get_slots(self) -> asyncio.Semaphore:
+        """Obtiene el semáforo de imágenes en curso del bucle de eventos actual."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._slots_loop = loop
+        return self._slots
+    
+    async def _run_in_pool(self, image_bytes: bytes, input_format: str,
+                           params: Dict[str, Any]) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        """
+        Ejecuta la optimización en el pool respetando el límite de tareas en curso
+        y el plazo de la tarea.
+        
+        Args:
+            image_bytes: Bytes de la imagen original
+            input_format: Formato detectado de la entrada
+            params: Parámetros de optimización
+            
+        Returns:
+            Tuple[Optional[bytes], Dict[str, Any]]: Imagen optimizada (o None) y metadatos
+            
+        Raises:
+            asyncio.TimeoutError: Si la imagen no se procesa dentro del plazo
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.task_timeout
+        slots = self._get_slots()
+        
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.task_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise
+        
+        self.stats["pending"] += 1
+        try:
+            if self.use_process_pool:
+                try:
+                    future = loop.run_in_executor(
+                        self._get_executor(), _optimize_image_bytes, image_bytes, input_format, params
+                    )
+                except BrokenProcessPool:
+                    # Un proceso murió (p. ej. por memoria): recrear el pool
+                    logger.warning("Pool de procesos de imágenes roto, recreándolo")
+                    self._executor = None
+                    future = loop.run_in_executor(
+                        self._get_executor(), _optimize_image_bytes, image_bytes, input_format, params
+                    )
+            else:
+                future = loop.run_in_executor(None, _optimize_image_bytes, image_bytes, input_format, params)
+            
+            return await asyncio.wait_for(future, timeout=max(0.0, deadline - loop.time()))
+        except BrokenProcessPool:
+            # El pool se recreará en la siguiente imagen
+            self._executor = None
+            raise
+        except asyncio.TimeoutError:
+            # La tarea sigue ocupando su proceso hasta terminar, pero ya no se espera
+            self.stats["timeouts"] += 1
+            raise
+        finally:
+            self.stats["pending"] -= 1
+            slots.release()
+    
+    async def optimize_image(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]], 
                            force_format: Optional[str] = None,
                            preserve_text_quality: bool = True) -> Tuple[Union[str, bytes], Dict[str, Any]]:
         """
@@ -77,7 +352,7 @@ class ImageOptimizer:
                 self.telemetry.add_span_attribute(span, "force_format", force_format)
         
         try:
-            # Procesar la entrada de imagen
+            # Procesar la entrada de imagen (el base64 se decodifica una sola vez)
             image_bytes, input_format = await self._process_input(image_data)
             original_size = len(image_bytes)
             
@@ -88,109 +363,37 @@ class ImageOptimizer:
                 self.telemetry.add_span_attribute(span, "original_size", original_size)
                 self.telemetry.add_span_attribute(span, "input_format", input_format)
             
-            # Abrir la imagen con PIL
-            img = Image.open(io.BytesIO(image_bytes))
-            original_width, original_height = img.size
-            
-            # Determinar si la imagen contiene texto (heurística simple)
-            contains_text = False
-            if preserve_text_quality:
-                # Implementar una heurística simple para detectar texto
-                # Esta es una aproximación básica, se podría mejorar con ML
-                contains_text = await self._detect_text_heuristic(img)
-            
-            # Ajustar parámetros de optimización si contiene texto
-            max_width = self.max_width
-            max_height = self.max_height
-            quality = self.quality
-            
-            if contains_text:
-                # Preservar más calidad para imágenes con texto
-                max_width = min(1600, original_width)
-                max_height = min(1600, original_height)
-                quality = min(92, self.quality + 7)
-                
-                if self.telemetry:
-                    self.telemetry.add_span_attribute(span, "contains_text", True)
-            
-            # Determinar el formato de salida
-            output_format = force_format if force_format else input_format
-            if output_format.lower() not in ['jpg', 'jpeg', 'png', 'webp']:
-                output_format = 'jpeg'  # Formato por defecto
-            
-            # Normalizar formato
-            if output_format.lower() in ['jpg', 'jpeg']:
-                output_format = 'JPEG'
-            elif output_format.lower() == 'png':
-                output_format = 'PNG'
-            elif output_format.lower() == 'webp':
-                output_format = 'WEBP'
-            
-            # Redimensionar si es necesario
-            if original_width > max_width or original_height > max_height:
-                # Calcular nueva dimensión manteniendo la relación de aspecto
-                ratio = min(max_width / original_width, max_height / original_height)
-                new_width = int(original_width * ratio)
-                new_height = int(original_height * ratio)
-                
-                # Redimensionar
-                img = img.resize((new_width, new_height), Image.LANCZOS)
-                
-                if self.telemetry:
-                    self.telemetry.add_span_attribute(span, "resized", True)
-                    self.telemetry.add_span_attribute(span, "new_width", new_width)
-                    self.telemetry.add_span_attribute(span, "new_height", new_height)
-            
-            # Convertir a RGB si es necesario para JPEG
-            if output_format == 'JPEG' and img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Guardar la imagen optimizada
-            output_buffer = io.BytesIO()
-            
-            # Ajustar parámetros según el formato
-            save_params = {}
-            if output_format == 'JPEG':
-                save_params = {'quality': quality, 'optimize': True}
-            elif output_format == 'PNG':
-                save_params = {'optimize': True}
-            elif output_format == 'WEBP':
-                save_params = {'quality': quality}
-            
-            img.save(output_buffer, format=output_format, **save_params)
-            optimized_bytes = output_buffer.getvalue()
-            optimized_size = len(optimized_bytes)
+            params = {
+                "max_width": self.max_width,
+                "max_height": self.max_height,
+                "quality": self.quality,
+                "force_format": force_format,
+                "preserve_text_quality": preserve_text_quality
+            }
+            optimized_bytes, metadata = await self._run_in_pool(image_bytes, input_format, params)
             
-            # Si la imagen optimizada es más grande, usar la original
-            if optimized_size >= original_size:
+            if optimized_bytes is None:
                 logger.debug("La imagen optimizada es más grande que la original, usando la original")
                 optimized_bytes = image_bytes
-                optimized_size = original_size
-                
-                if self.telemetry:
-                    self.telemetry.add_span_attribute(span, "optimization_reverted", True)
+            
+            optimized_size = metadata["optimized_size"]
+            bytes_saved = metadata["bytes_saved"]
+            output_format = metadata["format"]
             
             # Actualizar estadísticas
             self.stats["images_processed"] += 1
             self.stats["bytes_after"] += optimized_size
-            bytes_saved = original_size - optimized_size
             self.stats["bytes_saved"] += bytes_saved
-            
-            # Preparar metadatos
-            metadata = {
-                "original_size": original_size,
-                "optimized_size": optimized_size,
-                "bytes_saved": bytes_saved,
-                "compression_ratio": original_size / optimized_size if optimized_size > 0 else 1.0,
-                "original_width": original_width,
-                "original_height": original_height,
-                "new_width": img.width,
-                "new_height": img.height,
-                "format": output_format,
-                "contains_text": contains_text
-            }
+            if metadata["draft_decoded"]:
+                self.stats["draft_decodes"] += 1
             
             if self.telemetry:
+                for attribute in ("contains_text", "resized", "optimization_reverted", "draft_decoded"):
+                    if metadata[attribute]:
+                        self.telemetry.add_span_attribute(span, attribute, True)
+                if metadata["resized"]:
+                    self.telemetry.add_span_attribute(span, "new_width", metadata["new_width"])
+                    self.telemetry.add_span_attribute(span, "new_height", metadata["new_height"])
                 self.telemetry.add_span_attribute(span, "optimized_size", optimized_size)
                 self.telemetry.add_span_attribute(span, "bytes_saved", bytes_saved)
                 self.telemetry.add_span_attribute(span, "compression_ratio", metadata["compression_ratio"])
@@ -214,21 +417,28 @@ class ImageOptimizer:
             return result, metadata
             
         except Exception as e:
-            logger.error(f"Error al optimizar imagen: {e}", exc_info=True)
+            if isinstance(e, asyncio.TimeoutError):
+                logger.warning(f"Optimización de imagen cancelada: superado el plazo de {self.task_timeout}s")
+            else:
+                logger.error(f"Error al optimizar imagen: {e}", exc_info=True)
             self.stats["errors"] += 1
             
             if self.telemetry and span:
                 self.telemetry.record_exception(span, e)
             
             # Devolver la imagen original en caso de error
-            if isinstance(image_data, (str, bytes)):
-                return image_data, {"error": str(e)}
-            else:
-                return image_data, {"error": str(e)}
+            return image_data, {"error": str(e) or type(e).__name__}
         finally:
             if self.telemetry and span:
                 self.telemetry.end_span(span)
     
+    async def shutdown(self) -> None:
+        """Detiene el pool de procesos de imágenes."""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+            logger.info("Pool de procesos de imágenes detenido")
+    
     async def _process_input(self, image_data: Union[str, bytes, Dict[str, Any]]) -> Tuple[bytes, str]:
         """
         Procesa la entrada de imagen en diferentes formatos.
@@ -239,6 +449,11 @@ class ImageOptimizer:
         Returns:
             Tuple[bytes, str]: Bytes de la imagen y formato detectado
         """
+        # Un handle ya resuelto comparte sus bytes con los demás análisis
+        if isinstance(image_data, ImageHandle):
+            image_format = image_data.format
+            return image_data.data, "jpeg" if image_format == "unknown" else image_format
+        
         # Si ya es bytes, devolver directamente
         if isinstance(image_data, bytes):
             # Intentar detectar el formato
@@ -329,45 +544,7 @@ class ImageOptimizer:
         Returns:
             bool: True si se detecta que la imagen probablemente contiene texto
         """
-        # Convertir a escala de grises
-        gray_img = img.convert('L')
-        
-        # Redimensionar para análisis más rápido si es necesario
-        if gray_img.width > 1000 or gray_img.height > 1000:
-            ratio = min(1000 / gray_img.width, 1000 / gray_img.height)
-            analysis_img = gray_img.resize((int(gray_img.width * ratio), int(gray_img.height * ratio)), Image.LANCZOS)
-        else:
-            analysis_img = gray_img
-        
-        # Aplicar detección de bordes
-        edges = ImageOps.equalize(analysis_img)
-        
-        # Convertir a array para análisis
-        import numpy as np
-        img_array = np.array(edges)
-        
-        # Calcular varianza local (alta en áreas con texto)
-        from scipy.ndimage import uniform_filter, uniform_filter1d
-        
-        # Calcular media local
-        mean = uniform_filter(img_array, size=3)
-        
-        # Calcular varianza local
-        var = uniform_filter(img_array**2, size=3) - mean**2
-        
-        # Umbral para considerar que hay texto
-        text_threshold = np.percentile(var, 95)  # Ajustar según necesidad
-        high_var_ratio = np.sum(var > text_threshold) / var.size
-        
-        # Detección de líneas horizontales (común en texto)
-        h_edges = np.abs(np.diff(img_array, axis=1))
-        h_lines = np.sum(h_edges > np.percentile(h_edges, 90), axis=1)
-        h_line_pattern = np.sum(np.diff(h_lines > np.percentile(h_lines, 75)) != 0)
-        
-        # Heurística combinada
-        has_text = high_var_ratio > 0.15 or h_line_pattern > img_array.shape[0] * 0.1
-        
-        return has_text
+        return await asyncio.to_thread(_detect_text, img)
     
     async def get_stats(self) -> Dict[str, Any]:
         """
@@ -378,6 +555,8 @@ class ImageOptimizer:
         """
         return {
             **self.stats,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
             "compression_ratio": self.stats["bytes_before"] / self.stats["bytes_after"] 
                 if self.stats["bytes_after"] > 0 else 1.0,
             "average_saving_per_image": self.stats["bytes_saved"] / self.stats["images_processed"] 
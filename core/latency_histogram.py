@@ -0,0 +1,362 @@
+"""
+Histogramas de latencia de memoria fija y registro compartido.
+
+Sustituye las listas recortadas con ``pop(0)`` y los promedios acumulados que
+mantenían por separado ``VisionMetrics``, ``VertexAIClient`` y
+``CircuitBreaker``. Cada ``LatencyHistogram`` usa cubetas log-lineales al
+estilo HDR: registrar un valor es O(1), la memoria está acotada por el número
+de cubetas (independiente del número de muestras) y los percentiles tienen un
+error relativo máximo igual a la precisión configurada. Los histogramas con la
+misma configuración se pueden fusionar, lo que permite agregar por operación o
+por agente a partir de las mismas series.
+"""
+
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Percentiles incluidos en los resúmenes
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class LatencyHistogram:
+    """
+    Histograma log-lineal de latencias en milisegundos.
+
+    Los valores menores que ``lowest_ms`` van a una cubeta de ceros y los
+    mayores que ``highest_ms`` se acumulan en la última cubeta (el máximo exacto
+    se conserva aparte).
+    """
+
+    def __init__(self, precision: float = 0.01, lowest_ms: float = 0.001, highest_ms: float = 3_600_000.0):
+        """
+        Inicializa el histograma.
+
+        Args:
+            precision: Error relativo máximo de los percentiles (0.01 = 1%)
+            lowest_ms: Menor latencia distinguible en milisegundos
+            highest_ms: Mayor latencia distinguible en milisegundos
+        """
+        self.precision = precision
+        self.lowest_ms = lowest_ms
+        self.highest_ms = highest_ms
+        self._log_base = math.log1p(2 * precision)
+        self._max_index = self._index(highest_ms)
+        self._counts: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+
+    def _index(self, value_ms: float) -> int:
+        if value_ms < self.lowest_ms:
+            return 0
+        return int(math.log(value_ms / self.lowest_ms) / self._log_base) + 1
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return 0.0
+        # Punto medio geométrico de la cubeta
+        return self.lowest_ms * math.exp((index - 0.5) * self._log_base)
+
+    def record(self, value_ms: float, count: int = 1) -> None:
+        """
+        Registra una latencia.
+
+        Args:
+            value_ms: Latencia en milisegundos
+            count: Número de veces que se observó el valor
+        """
+        value_ms = max(0.0, float(value_ms))
+        index = min(self._index(value_ms), self._max_index)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + count
+            self.count += count
+            self.total_ms += value_ms * count
+            if value_ms < self.min_ms:
+                self.min_ms = value_ms
+            if value_ms > self.max_ms:
+                self.max_ms = value_ms
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        """
+        Añade las muestras de otro histograma con la misma configuración.
+
+        Args:
+            other: Histograma a fusionar
+
+        Returns:
+            LatencyHistogram: El propio histograma
+
+        Raises:
+            ValueError: Si la configuración de cubetas es distinta
+        """
+        if (other.precision, other.lowest_ms, other.highest_ms) != (self.precision, self.lowest_ms, self.highest_ms):
+            raise ValueError("Solo se pueden fusionar histogramas con la misma configuración")
+
+        with other._lock:
+            counts = dict(other._counts)
+            count, total_ms, min_ms, max_ms = other.count, other.total_ms, other.min_ms, other.max_ms
+        with self._lock:
+            for index, bucket_count in counts.items():
+                self._counts[index] = self._counts.get(index, 0) + bucket_count
+            self.count += count
+            self.total_ms += total_ms
+            self.min_ms = min(self.min_ms, min_ms)
+            self.max_ms = max(self.max_ms, max_ms)
+        return self
+
+    def copy(self) -> "LatencyHistogram":
+        """Devuelve una copia independiente del histograma."""
+        return LatencyHistogram(self.precision, self.lowest_ms, self.highest_ms).merge(self)
+
+    @property
+    def mean_ms(self) -> float:
+        """Latencia media en milisegundos."""
+        return self.total_ms / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Calcula un percentil.
+
+        Args:
+            percentile: Percentil entre 0 y 100
+
+        Returns:
+            float: Latencia del percentil en milisegundos (0 si no hay muestras)
+        """
+        return self.percentiles([percentile])[percentile]
+
+    def percentiles(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[float, float]:
+        """
+        Calcula varios percentiles en una sola pasada por las cubetas.
+
+        Args:
+            percentiles: Percentiles entre 0 y 100
+
+        Returns:
+            Dict[float, float]: Latencia en milisegundos por percentil
+        """
+        with self._lock:
+            counts = sorted(self._counts.items())
+            total, min_ms, max_ms = self.count, self.min_ms, self.max_ms
+
+        wanted = sorted(percentiles)
+        result = {percentile: 0.0 for percentile in wanted}
+        if not total:
+            return result
+
+        position = 0
+        seen = 0
+        for percentile in wanted:
+            rank = max(1, math.ceil(percentile / 100 * total))
+            while seen < rank and position < len(counts):
+                seen += counts[position][1]
+                position += 1
+            value = self._bucket_value(counts[position - 1][0])
+            result[percentile] = min(max(value, min_ms), max_ms)
+        return result
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """
+        Cubetas no vacías del histograma.
+
+        Returns:
+            List[Tuple[float, int]]: Límite superior en milisegundos y número de
+            muestras de cada cubeta, en orden creciente
+        """
+        with self._lock:
+            counts = sorted(self._counts.items())
+        return [(self.lowest_ms * math.exp(index * self._log_base), count) for index, count in counts]
+
+    def summary(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Any]:
+        """
+        Resume el histograma.
+
+        Args:
+            percentiles: Percentiles a incluir
+
+        Returns:
+            Dict[str, Any]: count, mean_ms, min_ms, max_ms y pNN_ms
+        """
+        values = self.percentiles(percentiles)
+        summary = {
+            "count": self.count,
+            "mean_ms": round(self.mean_ms, 3),
+            "min_ms": round(self.min_ms, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+        for percentile, value in values.items():
+            summary[f"p{percentile:g}_ms"] = round(value, 3)
+        return summary
+
+    def reset(self) -> None:
+        """Elimina todas las muestras."""
+        with self._lock:
+            self._counts.clear()
+            self.count = 0
+            self.total_ms = 0.0
+            self.min_ms = math.inf
+            self.max_ms = 0.0
+
+
+class LatencyRegistry:
+    """
+    Registro compartido de histogramas por métrica y etiquetas.
+
+    Cada combinación de métrica y etiquetas (p. ej. ``operation`` y
+    ``agent_id``) es una serie con su propio histograma. Los resúmenes por
+    operación o por agente se obtienen fusionando las series. El número de
+    series está acotado: las que superan ``max_series`` se agregan en una serie
+    de desbordamiento por métrica.
+    """
+
+    def __init__(self, max_series: int = 2000, precision: float = 0.01):
+        """
+        Inicializa el registro.
+
+        Args:
+            max_series: Número máximo de series
+            precision: Error relativo de los percentiles de cada histograma
+        """
+        self.max_series = max_series
+        self.precision = precision
+        self._series: Dict[Tuple[str, LabelKey], LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self.stats = {"overflowed_series": 0}
+
+    @staticmethod
+    def _label_key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+    def histogram(self, metric: str, **labels: Any) -> LatencyHistogram:
+        """
+        Obtiene (o crea) el histograma de una serie.
+
+        Conservar la referencia devuelta evita buscar la serie en cada registro.
+
+        Args:
+            metric: Nombre de la métrica (p. ej. "vertex_ai.client")
+            **labels: Etiquetas de la serie
+
+        Returns:
+            LatencyHistogram: Histograma de la serie
+        """
+        key = (metric, self._label_key(labels))
+        histogram = self._series.get(key)
+        if histogram is not None:
+            return histogram
+
+        with self._lock:
+            histogram = self._series.get(key)
+            if histogram is None:
+                if len(self._series) >= self.max_series:
+                    self.stats["overflowed_series"] += 1
+                    key = (metric, (("overflow", "true"),))
+                    histogram = self._series.get(key)
+                if histogram is None:
+                    histogram = LatencyHistogram(precision=self.precision)
+                    self._series[key] = histogram
+            return histogram
+
+    def record(self, metric: str, value_ms: float, **labels: Any) -> None:
+        """
+        Registra una latencia en la serie indicada.
+
+        Args:
+            metric: Nombre de la métrica
+            value_ms: Latencia en milisegundos
+            **labels: Etiquetas de la serie
+        """
+        self.histogram(metric, **labels).record(value_ms)
+
+    def _matching(self, metric: str, labels: Dict[str, Any]) -> List[Tuple[Dict[str, str], LatencyHistogram]]:
+        wanted = set(self._label_key(labels))
+        with self._lock:
+            items = list(self._series.items())
+        return [
+            (dict(label_key), histogram)
+            for (series_metric, label_key), histogram in items
+            if series_metric == metric and wanted.issubset(label_key)
+        ]
+
+    def merged(self, metric: str, **labels: Any) -> LatencyHistogram:
+        """
+        Fusiona todas las series de una métrica que tienen las etiquetas dadas.
+
+        Args:
+            metric: Nombre de la métrica
+            **labels: Etiquetas que deben coincidir
+
+        Returns:
+            LatencyHistogram: Histograma agregado (copia)
+        """
+        merged = LatencyHistogram(precision=self.precision)
+        for _, histogram in self._matching(metric, labels):
+            merged.merge(histogram)
+        return merged
+
+    def summary(self, metric: str, group_by: Optional[str] = None, **labels: Any) -> Dict[str, Any]:
+        """
+        Resume una métrica, opcionalmente agrupada por una etiqueta.
+
+        Args:
+            metric: Nombre de la métrica
+            group_by: Etiqueta por la que agrupar (p. ej. "operation" o "agent_id")
+            **labels: Etiquetas que deben coincidir
+
+        Returns:
+            Dict[str, Any]: Resumen agregado o resúmenes por valor de la etiqueta
+        """
+        if group_by is None:
+            return self.merged(metric, **labels).summary()
+
+        groups: Dict[str, LatencyHistogram] = {}
+        for series_labels, histogram in self._matching(metric, labels):
+            value = series_labels.get(group_by)
+            if value is None:
+                continue
+            groups.setdefault(value, LatencyHistogram(precision=self.precision)).merge(histogram)
+        return {value: histogram.summary() for value, histogram in groups.items()}
+
+    def clear(self, metric: Optional[str] = None) -> None:
+        """
+        Elimina las series de una métrica (o todas).
+
+        Las referencias a histogramas obtenidas antes se reinician en lugar de
+        quedar huérfanas.
+
+        Args:
+            metric: Métrica a eliminar (None para todas)
+        """
+        with self._lock:
+            for (series_metric, _), histogram in self._series.items():
+                if metric is None or series_metric == metric:
+                    histogram.reset()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene el resumen de todas las métricas registradas.
+
+        Returns:
+            Dict[str, Any]: Resumen agregado por métrica y estadísticas del registro
+        """
+        with self._lock:
+            metrics = sorted({metric for metric, _ in self._series})
+            series = len(self._series)
+        return {
+            "series": series,
+            "overflowed_series": self.stats["overflowed_series"],
+            "metrics": {metric: self.summary(metric) for metric in metrics},
+        }
+
+
+# Registro global de latencias
+latency_registry = LatencyRegistry()
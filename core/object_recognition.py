@@ -7,20 +7,17 @@ para dominios particulares.
 """
 
 import asyncio
-import base64
-import io
 import json
 import logging
-import os
 import time
-from typing import Dict, Any, Optional, Union, List, Tuple
+from typing import Dict, Any, Optional, Union, List
 
 import numpy as np
-from PIL import Image
 
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
 from core.image_cache import image_cache
+from core.image_handle import ImageHandle
 from core.vision_metrics import vision_metrics
 
 # Configurar logger
@@ -117,7 +114,7 @@ class ObjectRecognition:
         
         logger.info("ObjectRecognition inicializado")
     
-    async def recognize_objects(self, image_data: Union[str, bytes, Dict[str, Any]], 
+    async def recognize_objects(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]], 
                               domain: str = "general",
                               confidence_threshold: float = 0.5,
                               agent_id: str = "unknown") -> Dict[str, Any]:
@@ -125,7 +122,7 @@ class ObjectRecognition:
         Reconoce objetos en una imagen para un dominio específico.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             domain: Dominio de objetos a reconocer (general, medical, industrial, retail, custom)
             confidence_threshold: Umbral de confianza para incluir detecciones (0.0-1.0)
             agent_id: ID del agente que realiza la solicitud (para métricas)
@@ -147,11 +144,11 @@ class ObjectRecognition:
             if domain not in self.domains:
                 raise ValueError(f"Dominio no válido: {domain}. Dominios disponibles: {', '.join(self.domains.keys())}")
             
-            # Procesar la entrada de imagen
-            processed_image, image_format, image_size = await self._process_image_input(image_data)
+            # Resolver la imagen (un handle compartido se reutiliza sin volver a leerla)
+            image = await ImageHandle.resolve(image_data)
             
             # Generar clave para caché
-            cache_key = await image_cache.generate_key(processed_image, {
+            cache_key = await image_cache.generate_key(image, {
                 "operation": "recognize_objects",
                 "domain": domain,
                 "confidence_threshold": confidence_threshold
@@ -182,7 +179,7 @@ class ObjectRecognition:
             # usando modelos de ML entrenados para cada dominio
             
             # Simulación de reconocimiento de objetos para este ejemplo
-            detections = await self._detect_objects(processed_image, domain, confidence_threshold)
+            detections = await self._detect_objects(image, domain, confidence_threshold)
             
             # Preparar resultado
             result = {
@@ -197,7 +194,7 @@ class ObjectRecognition:
             }
             
             # Guardar en caché
-            await image_cache.set(cache_key, result, image_size, "recognize_objects")
+            await image_cache.set(cache_key, result, image.size, "recognize_objects")
             
             # Actualizar estadísticas
             async with self.lock:
@@ -332,88 +329,12 @@ class ObjectRecognition:
             if self.telemetry and span:
                 self.telemetry.end_span(span)
     
-    async def _process_image_input(self, image_data: Union[str, bytes, Dict[str, Any]]) -> Tuple[bytes, str, int]:
-        """
-        Procesa la entrada de imagen en diferentes formatos.
-        
-        Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
-            
-        Returns:
-            Tuple[bytes, str, int]: Bytes de la imagen, formato detectado y tamaño
-        """
-        # Si ya es bytes, devolver directamente
-        if isinstance(image_data, bytes):
-            return image_data, "unknown", len(image_data)
-        
-        # Si es una cadena base64, decodificar
-        if isinstance(image_data, str) and image_data.startswith(("data:image", "base64:")):
-            # Extraer la parte base64 si tiene prefijo
-            if "base64," in image_data:
-                image_data = image_data.split("base64,")[1]
-            elif image_data.startswith("base64:"):
-                image_data = image_data[7:]
-                
-            # Decodificar
-            image_bytes = base64.b64decode(image_data)
-            return image_bytes, "unknown", len(image_bytes)
-        
-        # Si es un diccionario, procesar según las claves
-        if isinstance(image_data, dict):
-            # Si tiene URL, descargar la imagen
-            if "url" in image_data:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(image_data["url"]) as response:
-                        if response.status == 200:
-                            data = await response.read()
-                            format_detected = os.path.splitext(image_data["url"])[1].lower().replace(".", "")
-                            if not format_detected:
-                                format_detected = "jpeg"  # Asumir JPEG
-                            return data, format_detected, len(data)
-                        else:
-                            raise ValueError(f"Error al descargar imagen de URL: {response.status}")
-            
-            # Si tiene path, leer el archivo
-            elif "path" in image_data:
-                path = image_data["path"]
-                if not os.path.exists(path):
-                    raise FileNotFoundError(f"No se encontró el archivo de imagen: {path}")
-                
-                with open(path, "rb") as f:
-                    data = f.read()
-                format_detected = os.path.splitext(path)[1].lower().replace(".", "")
-                if not format_detected:
-                    format_detected = "jpeg"  # Asumir JPEG
-                return data, format_detected, len(data)
-            
-            # Si tiene base64, extraer
-            elif "base64" in image_data:
-                base64_data = image_data["base64"]
-                format_detected = image_data.get("format", "jpeg")  # Usar formato proporcionado o asumir JPEG
-                image_bytes = base64.b64decode(base64_data)
-                return image_bytes, format_detected, len(image_bytes)
-        
-        # Si es una cadena que no es base64, asumir que es una ruta de archivo
-        if isinstance(image_data, str):
-            if not os.path.exists(image_data):
-                raise FileNotFoundError(f"No se encontró el archivo de imagen: {image_data}")
-            
-            with open(image_data, "rb") as f:
-                data = f.read()
-            format_detected = os.path.splitext(image_data)[1].lower().replace(".", "")
-            if not format_detected:
-                format_detected = "jpeg"  # Asumir JPEG
-            return data, format_detected, len(data)
-        
-        raise ValueError("Formato de imagen no soportado")
-    
-    async def _detect_objects(self, image_bytes: bytes, domain: str, confidence_threshold: float) -> List[Dict[str, Any]]:
+    async def _detect_objects(self, image: ImageHandle, domain: str, confidence_threshold: float) -> List[Dict[str, Any]]:
         """
         Detecta objetos en una imagen para un dominio específico.
         
         Args:
-            image_bytes: Bytes de la imagen
+            image: Imagen resuelta de la solicitud
             domain: Dominio de objetos a reconocer
             confidence_threshold: Umbral de confianza para incluir detecciones
             
@@ -423,8 +344,8 @@ class ObjectRecognition:
         # Implementación simulada para este ejemplo
         # En una implementación real, se utilizaría un modelo de ML para detectar objetos
         
-        # Abrir la imagen con PIL
-        img = Image.open(io.BytesIO(image_bytes))
+        # Imagen PIL compartida por los análisis de la solicitud
+        img = image.image
         
         # Obtener lista de objetos posibles para este dominio
         possible_objects = self.domains[domain]["objects"]
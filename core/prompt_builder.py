@@ -0,0 +1,260 @@
+"""
+Construcción de prompts con prefijo estable y sufijo variable.
+
+Los agentes añaden a cada prompt bloques estáticos de gran tamaño (definiciones
+de programas, instrucciones del agente, resúmenes de perfil) y los vuelven a
+construir en cada llamada. ``PromptBuilder`` separa el prompt en:
+
+- un prefijo estable, formado por secciones identificadas por clave, que se
+  renderiza una sola vez y se memoriza en ``PrefixCache`` junto con su hash;
+- un sufijo variable (la consulta del usuario y los datos del turno).
+
+El hash del prefijo se pasa a ``VertexAIClient.generate_content`` para que la
+caché de contexto de Vertex AI o la caché local de prefijos lo reutilicen, y
+las estadísticas indican cuántos tokens de prefijo se han reutilizado.
+"""
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PREFIX_SEPARATOR = "\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estima el número de tokens de un texto (aproximadamente 4 caracteres por token).
+
+    Args:
+        text: Texto a estimar
+
+    Returns:
+        int: Número estimado de tokens
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+def hash_prefix(prefix: str) -> str:
+    """
+    Calcula el hash que identifica un prefijo.
+
+    Args:
+        prefix: Prefijo renderizado
+
+    Returns:
+        str: Hash hexadecimal del prefijo
+    """
+    return hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass(frozen=True)
+class PromptParts:
+    """Prompt dividido en prefijo estable y sufijo variable."""
+
+    prefix: str
+    suffix: str
+    prefix_hash: str
+    prefix_tokens: int
+    prefix_reused: bool = False
+
+    @property
+    def text(self) -> str:
+        """Prompt completo (prefijo seguido del sufijo)."""
+        if not self.prefix:
+            return self.suffix
+        return f"{self.prefix}{PREFIX_SEPARATOR}{self.suffix}" if self.suffix else self.prefix
+
+    def __str__(self) -> str:
+        return self.text
+
+
+@dataclass(frozen=True)
+class _RenderedPrefix:
+    text: str
+    prefix_hash: str
+    tokens: int
+
+
+class PrefixCache:
+    """
+    Caché LRU de prefijos renderizados.
+
+    La clave de cada prefijo es la tupla de claves de sus secciones, de modo que
+    un prefijo ya renderizado se reutiliza sin volver a construir ni a calcular
+    el hash de su texto.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_entries: Número máximo de prefijos memorizados
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Any, ...], _RenderedPrefix]" = OrderedDict()
+        self._lock = Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "reused_prefix_tokens": 0,
+            "rendered_prefix_tokens": 0,
+        }
+
+    def get_or_render(
+        self, key: Tuple[Any, ...], render: Callable[[], str]
+    ) -> Tuple[_RenderedPrefix, bool]:
+        """
+        Obtiene un prefijo memorizado o lo renderiza.
+
+        Args:
+            key: Clave que identifica las secciones del prefijo
+            render: Función que construye el texto del prefijo
+
+        Returns:
+            Tuple[_RenderedPrefix, bool]: Prefijo y si se reutilizó de la caché
+        """
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["reused_prefix_tokens"] += rendered.tokens
+                return rendered, True
+
+        text = render()
+        rendered = _RenderedPrefix(text, hash_prefix(text), estimate_tokens(text))
+
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["rendered_prefix_tokens"] += rendered.tokens
+            self._entries[key] = rendered
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return rendered, False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas de la caché.
+
+        Returns:
+            Dict[str, Any]: Aciertos, fallos, tokens reutilizados y tamaño actual
+        """
+        total = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_ratio": self.stats["hits"] / total if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        """Elimina todos los prefijos memorizados."""
+        with self._lock:
+            self._entries.clear()
+
+
+class PromptBuilder:
+    """
+    Ensambla un prompt a partir de secciones estáticas y dinámicas.
+
+    Ejemplo:
+        parts = (
+            PromptBuilder()
+            .static("role", "Eres un especialista en recuperación.")
+            .static(("program", "PRIME"), lambda: format_program_context("PRIME"))
+            .dynamic(f'Consulta: "{query}"')
+            .build()
+        )
+        await vertex_ai_client.generate_content(parts)
+
+    Las secciones estáticas forman el prefijo y deben ir antes que cualquier
+    dato del turno; su clave debe identificar por completo su contenido.
+    """
+
+    def __init__(self, cache: Optional[PrefixCache] = None):
+        """
+        Inicializa el constructor.
+
+        Args:
+            cache: Caché de prefijos (por defecto la caché global ``prefix_cache``)
+        """
+        self.cache = cache if cache is not None else prefix_cache
+        self._static: List[Tuple[Any, Union[str, Callable[[], str]]]] = []
+        self._dynamic: List[str] = []
+
+    def static(self, key: Any, content: Union[str, Callable[[], str]]) -> "PromptBuilder":
+        """
+        Añade una sección al prefijo estable.
+
+        Args:
+            key: Identificador de la sección. Si el contenido es texto, el propio
+                texto forma parte de la clave; si es una función, la clave debe
+                identificar por completo el resultado (p. ej. ``("program", "PRIME")``)
+            content: Texto de la sección o función que lo construye
+
+        Returns:
+            PromptBuilder: El propio constructor
+        """
+        self._static.append((key, content))
+        return self
+
+    def dynamic(self, text: str) -> "PromptBuilder":
+        """
+        Añade una sección al sufijo variable.
+
+        Args:
+            text: Texto de la sección
+
+        Returns:
+            PromptBuilder: El propio constructor
+        """
+        if text:
+            self._dynamic.append(text)
+        return self
+
+    def _prefix_key(self) -> Tuple[Any, ...]:
+        return tuple(
+            (key, content) if isinstance(content, str) else key
+            for key, content in self._static
+        )
+
+    def _render_prefix(self) -> str:
+        sections = []
+        for _, content in self._static:
+            text = content if isinstance(content, str) else content()
+            if text:
+                sections.append(text.strip())
+        return PREFIX_SEPARATOR.join(sections)
+
+    def build(self) -> PromptParts:
+        """
+        Construye el prompt.
+
+        Returns:
+            PromptParts: Prefijo (memorizado), hash del prefijo y sufijo
+        """
+        suffix = PREFIX_SEPARATOR.join(text.strip() for text in self._dynamic)
+        if not self._static:
+            return PromptParts(prefix="", suffix=suffix, prefix_hash="", prefix_tokens=0)
+
+        rendered, reused = self.cache.get_or_render(self._prefix_key(), self._render_prefix)
+        return PromptParts(
+            prefix=rendered.text,
+            suffix=suffix,
+            prefix_hash=rendered.prefix_hash,
+            prefix_tokens=rendered.tokens,
+            prefix_reused=reused,
+        )
+
+
+# Caché global de prefijos compartida por los agentes
+prefix_cache = PrefixCache()
@@ -29,17 +29,73 @@ class Settings(BaseSettings):
     # Configuración de Supabase
     supabase_url: Optional[AnyUrl] = Field(default=None, json_schema_extra={"env": "SUPABASE_URL"})
     supabase_anon_key: Optional[str] = Field(default=None, json_schema_extra={"env": "SUPABASE_ANON_KEY"})
+    supabase_write_behind: bool = Field(default=True, json_schema_extra={"env": "SUPABASE_WRITE_BEHIND"})
+    supabase_write_batch_size: int = Field(default=200, gt=0, json_schema_extra={"env": "SUPABASE_WRITE_BATCH_SIZE"})
+    supabase_write_max_age: float = Field(default=1.0, gt=0.0, json_schema_extra={"env": "SUPABASE_WRITE_MAX_AGE"})
+    supabase_write_max_pending: int = Field(default=10000, gt=0, json_schema_extra={"env": "SUPABASE_WRITE_MAX_PENDING"})
+    supabase_write_max_retries: int = Field(default=3, ge=0, json_schema_extra={"env": "SUPABASE_WRITE_MAX_RETRIES"})
+    supabase_write_wal_path: Optional[str] = Field(default=None, json_schema_extra={"env": "SUPABASE_WRITE_WAL_PATH"})
     
     # Configuración de Gemini
     gemini_api_key: str = Field(default="", json_schema_extra={"env": "GEMINI_API_KEY"})
     
     # Configuración de A2A
     a2a_server_url: AnyUrl = Field(default="http://localhost:9000", json_schema_extra={"env": "A2A_SERVER_URL"})
+    analysis_envelope_max_age: float = Field(default=30.0, gt=0.0, json_schema_extra={"env": "ANALYSIS_ENVELOPE_MAX_AGE"})
+    consultation_max_depth: int = Field(default=3, ge=1, json_schema_extra={"env": "CONSULTATION_MAX_DEPTH"})
+    
+    # Configuración del registro de tareas de skills
+    skill_task_max_entries: int = Field(default=10000, gt=0, json_schema_extra={"env": "SKILL_TASK_MAX_ENTRIES"})
+    skill_task_ttl: float = Field(default=3600.0, gt=0.0, json_schema_extra={"env": "SKILL_TASK_TTL"})
+    skill_task_store_path: Optional[str] = Field(default=None, json_schema_extra={"env": "SKILL_TASK_STORE_PATH"})
+    skill_task_store_ttl: float = Field(default=86400.0, gt=0.0, json_schema_extra={"env": "SKILL_TASK_STORE_TTL"})
+    
+    # Configuración del cliente MCP
+    mcp_max_connections: int = Field(default=20, gt=0, json_schema_extra={"env": "MCP_MAX_CONNECTIONS"})
+    mcp_max_concurrency_per_server: int = Field(default=8, gt=0, json_schema_extra={"env": "MCP_MAX_CONCURRENCY_PER_SERVER"})
+    mcp_tools_cache_ttl: float = Field(default=300.0, ge=0.0, json_schema_extra={"env": "MCP_TOOLS_CACHE_TTL"})
+    mcp_request_timeout: float = Field(default=15.0, gt=0.0, json_schema_extra={"env": "MCP_REQUEST_TIMEOUT"})
+    
+    # Configuración de los health checks
+    health_check_timeout: float = Field(default=2.0, gt=0.0, json_schema_extra={"env": "HEALTH_CHECK_TIMEOUT"})
+    health_refresh_interval: float = Field(default=10.0, gt=0.0, json_schema_extra={"env": "HEALTH_REFRESH_INTERVAL"})
+    health_max_staleness: float = Field(default=30.0, gt=0.0, json_schema_extra={"env": "HEALTH_MAX_STALENESS"})
+    
+    # Configuración del procesamiento de alertas
+    alert_workers: int = Field(default=4, gt=0, json_schema_extra={"env": "ALERT_WORKERS"})
+    alert_runbook_concurrency: int = Field(default=1, gt=0, json_schema_extra={"env": "ALERT_RUNBOOK_CONCURRENCY"})
+    alert_dedup_window: float = Field(default=300.0, ge=0.0, json_schema_extra={"env": "ALERT_DEDUP_WINDOW"})
+    
+    # Configuración del registro de agentes
+    agent_manifest_path: str = Field(default="config/agents.json", json_schema_extra={"env": "AGENT_MANIFEST_PATH"})
+    agent_lazy_loading: bool = Field(default=True, json_schema_extra={"env": "AGENT_LAZY_LOADING"})
+    agent_prewarm: str = Field(default="", json_schema_extra={"env": "AGENT_PREWARM"})
     
     # Configuración de presupuestos
     enable_budgets: bool = Field(default=False, json_schema_extra={"env": "ENABLE_BUDGETS"})
     budget_config_path: Optional[str] = Field(default="config/budgets.json", json_schema_extra={"env": "BUDGET_CONFIG_PATH"})
     default_budget_action: str = Field(default="warn", json_schema_extra={"env": "DEFAULT_BUDGET_ACTION"})
+    budget_flush_interval: float = Field(default=5.0, gt=0.0, json_schema_extra={"env": "BUDGET_FLUSH_INTERVAL"})
+    budget_lease_fraction: float = Field(default=0.01, gt=0.0, le=1.0, json_schema_extra={"env": "BUDGET_LEASE_FRACTION"})
+    
+    # Configuración de recursos multimedia (imágenes y audio)
+    media_max_bytes: int = Field(default=20 * 1024 * 1024, gt=0, json_schema_extra={"env": "MEDIA_MAX_BYTES"})
+    media_cache_dir: Optional[str] = Field(default=None, json_schema_extra={"env": "MEDIA_CACHE_DIR"})
+    media_cache_max_bytes: int = Field(default=512 * 1024 * 1024, gt=0, json_schema_extra={"env": "MEDIA_CACHE_MAX_BYTES"})
+    
+    # Configuración del pipeline de transcripción en streaming
+    speech_chunk_bytes: int = Field(default=64 * 1024, gt=0, json_schema_extra={"env": "SPEECH_CHUNK_BYTES"})
+    speech_max_audio_bytes: int = Field(default=1024 * 1024 * 1024, gt=0, json_schema_extra={"env": "SPEECH_MAX_AUDIO_BYTES"})
+    speech_transcribe_concurrency: int = Field(default=4, gt=0, json_schema_extra={"env": "SPEECH_TRANSCRIBE_CONCURRENCY"})
+    speech_vad_threshold: float = Field(default=0.02, gt=0.0, lt=1.0, json_schema_extra={"env": "SPEECH_VAD_THRESHOLD"})
+    speech_min_silence_ms: int = Field(default=500, gt=0, json_schema_extra={"env": "SPEECH_MIN_SILENCE_MS"})
+    speech_max_segment_seconds: float = Field(default=30.0, gt=0.0, json_schema_extra={"env": "SPEECH_MAX_SEGMENT_SECONDS"})
+    speech_transcript_cache_size: int = Field(default=512, ge=0, json_schema_extra={"env": "SPEECH_TRANSCRIPT_CACHE_SIZE"})
+    
+    # Configuración del pool de procesamiento de imágenes
+    image_pool_workers: int = Field(default=2, gt=0, json_schema_extra={"env": "IMAGE_POOL_WORKERS"})
+    image_pool_max_pending: int = Field(default=8, gt=0, json_schema_extra={"env": "IMAGE_POOL_MAX_PENDING"})
+    image_task_timeout: float = Field(default=30.0, gt=0.0, json_schema_extra={"env": "IMAGE_TASK_TIMEOUT"})
     
     # Configuración de JWT (Eliminadas ya que Supabase maneja los tokens)
     # jwt_secret: str = Field(..., json_schema_extra={"env": "JWT_SECRET"})
@@ -55,6 +111,11 @@ class Settings(BaseSettings):
     # Configuración de telemetría
     telemetry_enabled: bool = Field(default=False, json_schema_extra={"env": "ENABLE_TELEMETRY"})
     gcp_project_id: Optional[str] = Field(default=None, json_schema_extra={"env": "GCP_PROJECT_ID"})
+    telemetry_trace_sample_rate: float = Field(default=1.0, ge=0.0, le=1.0, json_schema_extra={"env": "TELEMETRY_TRACE_SAMPLE_RATE"})
+    telemetry_slow_span_ms: float = Field(default=1000.0, gt=0.0, json_schema_extra={"env": "TELEMETRY_SLOW_SPAN_MS"})
+    telemetry_export_buffer_size: int = Field(default=4096, gt=0, json_schema_extra={"env": "TELEMETRY_EXPORT_BUFFER_SIZE"})
+    telemetry_export_batch_size: int = Field(default=256, gt=0, json_schema_extra={"env": "TELEMETRY_EXPORT_BATCH_SIZE"})
+    telemetry_export_interval: float = Field(default=5.0, gt=0.0, json_schema_extra={"env": "TELEMETRY_EXPORT_INTERVAL"})
     
     # Configuración del entorno de la aplicación
     environment: str = Field(default="development", json_schema_extra={"env": "ENVIRONMENT"})
@@ -17,6 +17,8 @@ from typing import Any, Callable, Dict, List, Optional, Type, Union, get_type_hi
 
 from pydantic import BaseModel, Field, create_model
 
+from core.skill_tasks import SkillTaskRegistry
+
 logger = logging.getLogger(__name__)
 
 
@@ -82,7 +84,8 @@ class Skill(abc.ABC):
         self.categories = categories or []
         self.requires_auth = requires_auth
         self.is_async = is_async
-        self.tasks: Dict[str, Dict[str, Any]] = {}
+        # Registro acotado de ejecuciones (las terminadas caducan o se descargan a disco)
+        self.tasks = SkillTaskRegistry(self.id)
         
         # Inferir esquemas de entrada/salida si no se proporcionan
         if not self.input_schema or not self.output_schema:
@@ -200,7 +203,7 @@ class Skill(abc.ABC):
             "result": None,
             "error": None
         }
-        self.tasks[task_id] = task
+        self.tasks.add(task_id, task)
         
         # Validar entrada
         try:
@@ -210,11 +213,12 @@ class Skill(abc.ABC):
             execution_time = (end_time - start_time).total_seconds()
             
             # Actualizar registro de tarea
-            self.tasks[task_id].update({
-                "status": SkillStatus.FAILED,
-                "end_time": end_time,
-                "error": str(e)
-            })
+            self.tasks.update(
+                task_id,
+                status=SkillStatus.FAILED,
+                end_time=end_time,
+                error=str(e)
+            )
             
             return SkillResult(
                 skill_id=self.id,
@@ -227,7 +231,7 @@ class Skill(abc.ABC):
             )
         
         # Actualizar estado a RUNNING
-        self.tasks[task_id]["status"] = SkillStatus.RUNNING
+        self.tasks.update(task_id, status=SkillStatus.RUNNING)
         
         try:
             # Ejecutar la skill
@@ -243,11 +247,12 @@ class Skill(abc.ABC):
             execution_time = (end_time - start_time).total_seconds()
             
             # Actualizar registro de tarea
-            self.tasks[task_id].update({
-                "status": SkillStatus.COMPLETED,
-                "end_time": end_time,
-                "result": result
-            })
+            self.tasks.update(
+                task_id,
+                status=SkillStatus.COMPLETED,
+                end_time=end_time,
+                result=result
+            )
             
             return SkillResult(
                 skill_id=self.id,
@@ -266,11 +271,12 @@ class Skill(abc.ABC):
             execution_time = (end_time - start_time).total_seconds()
             
             # Actualizar registro de tarea
-            self.tasks[task_id].update({
-                "status": SkillStatus.FAILED,
-                "end_time": end_time,
-                "error": str(e)
-            })
+            self.tasks.update(
+                task_id,
+                status=SkillStatus.FAILED,
+                end_time=end_time,
+                error=str(e)
+            )
             
             return SkillResult(
                 skill_id=self.id,
@@ -286,6 +292,9 @@ class Skill(abc.ABC):
         """
         Obtiene el estado de una tarea.
         
+        Las tareas terminadas dejan de estar disponibles al caducar; si se
+        expulsaron por capacidad, se recuperan del almacén en disco.
+        
         Args:
             task_id: ID de la tarea
             
@@ -0,0 +1,362 @@
+"""
+Registro acotado de tareas de ejecución de skills.
+
+Cada skill guarda el estado de sus ejecuciones para consultarlo después con
+``get_task_status``. Este módulo mantiene esos registros en memoria con un
+número máximo de entradas y una caducidad (TTL) para las tareas terminadas.
+Las tareas terminadas se indexan en un montículo ordenado por instante de
+finalización, de modo que la poda cuesta O(log n) por tarea retirada. Las
+tareas expulsadas por capacidad pueden descargarse a un almacén SQLite en
+disco del que se recuperan de forma transparente al consultarlas.
+"""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Estados que cierran una tarea (coinciden con los valores de SkillStatus)
+FINISHED_STATUSES = frozenset({"completed", "failed", "cancelled"})
+
+_DATETIME_FIELDS = ("start_time", "end_time")
+
+
+class SkillTaskStore:
+    """
+    Almacén compacto en disco para tareas terminadas.
+
+    Guarda cada tarea como una fila SQLite con su carga serializada en JSON
+    compacto. Las escrituras se agrupan en transacciones de ``batch_size``
+    filas y las filas más antiguas que ``ttl`` se eliminan al volcar.
+    """
+
+    def __init__(self, path: str, ttl: Optional[float] = None, batch_size: int = 256):
+        """
+        Inicializa el almacén.
+
+        Args:
+            path: Ruta del archivo SQLite
+            ttl: Segundos que se conserva una tarea en disco (None sin límite)
+            batch_size: Filas acumuladas antes de escribir una transacción
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS skill_tasks ("
+            "skill_id TEXT NOT NULL, task_id TEXT NOT NULL, finished_at REAL NOT NULL, "
+            "payload TEXT NOT NULL, PRIMARY KEY (skill_id, task_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS skill_tasks_finished ON skill_tasks (finished_at)")
+
+    @staticmethod
+    def _encode(task: Dict[str, Any]) -> str:
+        """Serializa una tarea a JSON compacto."""
+        data = dict(task)
+        for field in _DATETIME_FIELDS:
+            if isinstance(data.get(field), datetime):
+                data[field] = data[field].isoformat()
+        return json.dumps(data, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def _decode(payload: str) -> Dict[str, Any]:
+        """Reconstruye una tarea desde su JSON."""
+        from core.skill import SkillStatus
+
+        data = json.loads(payload)
+        for field in _DATETIME_FIELDS:
+            if data.get(field):
+                data[field] = datetime.fromisoformat(data[field])
+        if data.get("status") is not None:
+            data["status"] = SkillStatus(data["status"])
+        return data
+
+    def put(self, skill_id: str, task: Dict[str, Any]) -> None:
+        """
+        Encola una tarea terminada para guardarla en disco.
+
+        Args:
+            skill_id: ID de la skill propietaria
+            task: Registro de la tarea
+        """
+        with self._lock:
+            self._pending[(skill_id, task["task_id"])] = (time.time(), self._encode(task))
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+    def get(self, skill_id: str, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Recupera una tarea guardada.
+
+        Args:
+            skill_id: ID de la skill propietaria
+            task_id: ID de la tarea
+
+        Returns:
+            Registro de la tarea o None si no existe o ha caducado
+        """
+        with self._lock:
+            pending = self._pending.get((skill_id, task_id))
+            if pending is not None:
+                return self._decode(pending[1])
+            row = self._conn.execute(
+                "SELECT finished_at, payload FROM skill_tasks WHERE skill_id = ? AND task_id = ?",
+                (skill_id, task_id),
+            ).fetchone()
+        if row is None or (self.ttl is not None and row[0] < time.time() - self.ttl):
+            return None
+        return self._decode(row[1])
+
+    def flush(self) -> int:
+        """
+        Escribe las tareas encoladas y elimina las caducadas.
+
+        Returns:
+            int: Número de tareas escritas
+        """
+        with self._lock:
+            return self._flush_locked()
+
+    def _flush_locked(self) -> int:
+        rows = [(skill_id, task_id, finished_at, payload)
+                for (skill_id, task_id), (finished_at, payload) in self._pending.items()]
+        self._pending.clear()
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany("INSERT OR REPLACE INTO skill_tasks VALUES (?, ?, ?, ?)", rows)
+            if self.ttl is not None:
+                self._conn.execute("DELETE FROM skill_tasks WHERE finished_at < ?", (time.time() - self.ttl,))
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._conn.execute("ROLLBACK")
+            logger.error(f"Error al descargar tareas de skills a disco: {e}")
+            return 0
+        return len(rows)
+
+    def count(self) -> int:
+        """Número de tareas en disco (incluidas las encoladas)."""
+        with self._lock:
+            self._flush_locked()
+            return self._conn.execute("SELECT COUNT(*) FROM skill_tasks").fetchone()[0]
+
+    def close(self) -> None:
+        """Vuelca las tareas encoladas y cierra la conexión."""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+class SkillTaskRegistry:
+    """
+    Registro acotado y con caducidad de las tareas de una skill.
+
+    Las tareas en curso nunca se retiran. Las terminadas caducan ``ttl``
+    segundos después de finalizar y, si el registro supera ``max_entries``,
+    se retiran las terminadas más antiguas; estas últimas se descargan al
+    almacén en disco si hay uno configurado.
+    """
+
+    def __init__(
+        self,
+        skill_id: str,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        store: Optional[SkillTaskStore] = None,
+    ):
+        """
+        Inicializa el registro.
+
+        Args:
+            skill_id: ID de la skill propietaria
+            max_entries: Tareas máximas en memoria (por defecto ``SKILL_TASK_MAX_ENTRIES``)
+            ttl: Segundos que se conserva una tarea terminada (por defecto ``SKILL_TASK_TTL``)
+            store: Almacén en disco para las tareas expulsadas (por defecto el
+                configurado en ``SKILL_TASK_STORE_PATH``)
+        """
+        self.skill_id = skill_id
+        self.max_entries = max_entries or settings.skill_task_max_entries
+        self.ttl = ttl if ttl is not None else settings.skill_task_ttl
+        self.store = store if store is not None else get_default_task_store()
+
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        # Índice temporal de tareas terminadas: (instante de finalización, task_id)
+        self._finished_index: List[Tuple[float, str]] = []
+        self._finished_at: Dict[str, float] = {}
+
+        self.stats = {
+            "added": 0,
+            "expired": 0,
+            "evicted": 0,
+            "offloaded": 0,
+            "store_hits": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._tasks
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._tasks)
+
+    def __getitem__(self, task_id: str) -> Dict[str, Any]:
+        return self._tasks[task_id]
+
+    def __setitem__(self, task_id: str, task: Dict[str, Any]) -> None:
+        self.add(task_id, task)
+
+    def add(self, task_id: str, task: Dict[str, Any]) -> None:
+        """
+        Registra una tarea nueva y poda las entradas sobrantes.
+
+        Args:
+            task_id: ID de la tarea
+            task: Registro de la tarea
+        """
+        self._finished_at.pop(task_id, None)
+        self._tasks[task_id] = task
+        self.stats["added"] += 1
+        if self._status(task) in FINISHED_STATUSES:
+            self._index_finished(task_id)
+        self.prune()
+
+    def update(self, task_id: str, **fields: Any) -> None:
+        """
+        Actualiza los campos de una tarea e indexa su finalización.
+
+        Args:
+            task_id: ID de la tarea
+            **fields: Campos a actualizar
+        """
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        task.update(fields)
+        if task_id not in self._finished_at and self._status(task) in FINISHED_STATUSES:
+            self._index_finished(task_id)
+
+    def get(self, task_id: str, default: Any = None) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene una tarea, buscándola en disco si ya no está en memoria.
+
+        Args:
+            task_id: ID de la tarea
+            default: Valor devuelto si la tarea no existe
+
+        Returns:
+            Registro de la tarea o ``default``
+        """
+        task = self._tasks.get(task_id)
+        if task is not None:
+            finished_at = self._finished_at.get(task_id)
+            if finished_at is None or finished_at + self.ttl > time.monotonic():
+                return task
+            return default
+        if self.store is not None:
+            task = self.store.get(self.skill_id, task_id)
+            if task is not None:
+                self.stats["store_hits"] += 1
+                return task
+        return default
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Retira las tareas caducadas y las terminadas que exceden la capacidad.
+
+        Args:
+            now: Instante monotónico de referencia (por defecto el actual)
+
+        Returns:
+            int: Número de tareas retiradas
+        """
+        now = time.monotonic() if now is None else now
+        removed = 0
+        index = self._finished_index
+
+        while index and index[0][0] + self.ttl <= now:
+            finished_at, task_id = heapq.heappop(index)
+            if self._finished_at.get(task_id) == finished_at:
+                self._remove(task_id)
+                self.stats["expired"] += 1
+                removed += 1
+
+        while len(self._tasks) > self.max_entries and index:
+            finished_at, task_id = heapq.heappop(index)
+            if self._finished_at.get(task_id) == finished_at:
+                task = self._remove(task_id)
+                self.stats["evicted"] += 1
+                removed += 1
+                if self.store is not None:
+                    self.store.put(self.skill_id, task)
+                    self.stats["offloaded"] += 1
+
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del registro.
+
+        Returns:
+            Dict[str, Any]: Contadores, tamaño actual y configuración
+        """
+        return {
+            **self.stats,
+            "size": len(self._tasks),
+            "finished": len(self._finished_at),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "offload_enabled": self.store is not None,
+        }
+
+    @staticmethod
+    def _status(task: Dict[str, Any]) -> Optional[str]:
+        status = task.get("status")
+        return getattr(status, "value", status)
+
+    def _index_finished(self, task_id: str) -> None:
+        finished_at = time.monotonic()
+        self._finished_at[task_id] = finished_at
+        heapq.heappush(self._finished_index, (finished_at, task_id))
+
+    def _remove(self, task_id: str) -> Dict[str, Any]:
+        self._finished_at.pop(task_id, None)
+        return self._tasks.pop(task_id)
+
+
+_default_store: Optional[SkillTaskStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_task_store() -> Optional[SkillTaskStore]:
+    """
+    Obtiene el almacén en disco compartido por todas las skills.
+
+    Returns:
+        Optional[SkillTaskStore]: Almacén configurado o None si la descarga
+        a disco está desactivada
+    """
+    global _default_store
+    if not settings.skill_task_store_path:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SkillTaskStore(settings.skill_task_store_path, ttl=settings.skill_task_store_ttl)
+        return _default_store
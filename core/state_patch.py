@@ -0,0 +1,211 @@
+"""
+Parches de estado por campo al estilo JSON Patch.
+
+Los agentes guardaban su contexto de sesión completo después de cada turno,
+aunque solo hubieran añadido un elemento a ``conversation_history`` o a
+``meal_plans``. Este módulo calcula el delta entre el contexto cargado y el
+actualizado como operaciones JSON Patch (RFC 6902: ``add``, ``replace`` y
+``remove``; ``/campo/-`` añade al final de una lista) y las aplica sobre el
+documento almacenado. El primer segmento de cada ruta es el espacio de nombres
+(campo de primer nivel) que se usa para el control de versiones optimista.
+
+Cada carga devuelve un ``VersionedState`` propio del llamador, con la copia
+base y la versión sobre las que se calculará su delta, de modo que varios
+escritores de la misma sesión no comparten la referencia del conflicto.
+"""
+
+import copy
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+PatchOperation = Dict[str, Any]
+
+
+class StateVersionConflict(Exception):
+    """El parche toca campos modificados después de la versión esperada."""
+
+    def __init__(self, key: str, expected_version: int, current_version: int, fields: Iterable[str]):
+        self.key = key
+        self.expected_version = expected_version
+        self.current_version = current_version
+        self.fields = sorted(fields)
+        super().__init__(
+            f"Conflicto de versión en {key}: esperada {expected_version}, actual {current_version} "
+            f"(campos: {', '.join(self.fields)})"
+        )
+
+
+class StatePatchError(ValueError):
+    """Operación de parche mal formada o no aplicable al documento."""
+
+
+class VersionedState(dict):
+    """
+    Estado de sesión cargado, con la versión y la copia base de esa carga.
+
+    Se comporta como un diccionario normal; ``base`` y ``version`` permiten
+    calcular después el delta y detectar si otro escritor tocó los mismos
+    campos desde la carga.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, version: int = 0):
+        """
+        Inicializa el estado.
+
+        Args:
+            data: Contenido del estado (se usa tal cual, sin copiar)
+            version: Versión del documento almacenado que representa
+        """
+        super().__init__(data or {})
+        self.version = version
+        self.base: Dict[str, Any] = copy.deepcopy(dict(self))
+
+    def rebase(self, version: int, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Fija una nueva versión base tras guardar el estado.
+
+        Args:
+            version: Versión del documento almacenado
+            data: Contenido almacenado, si difiere del local (otros escritores)
+        """
+        if data is not None:
+            self.clear()
+            self.update(copy.deepcopy(data))
+        self.version = version
+        self.base = copy.deepcopy(dict(self))
+
+
+def _escape(token: str) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _split_path(path: str) -> List[str]:
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise StatePatchError(f"Ruta de parche inválida: {path!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in path[1:].split("/")]
+
+
+def patch_namespace(operation: PatchOperation) -> str:
+    """
+    Espacio de nombres (campo de primer nivel) que modifica una operación.
+
+    Args:
+        operation: Operación del parche
+
+    Returns:
+        str: Nombre del campo de primer nivel
+    """
+    return _split_path(operation.get("path"))[0]
+
+
+def patch_namespaces(operations: Iterable[PatchOperation]) -> Set[str]:
+    """Campos de primer nivel que modifica un parche."""
+    return {patch_namespace(operation) for operation in operations}
+
+
+def _resolve_parent(document: Any, tokens: List[str], path: str) -> Any:
+    target = document
+    for token in tokens[:-1]:
+        if isinstance(target, dict) and token in target:
+            target = target[token]
+        elif isinstance(target, list) and token.isdigit() and int(token) < len(target):
+            target = target[int(token)]
+        else:
+            raise StatePatchError(f"Ruta inexistente: {path}")
+    return target
+
+
+def apply_patch(document: Dict[str, Any], operations: Iterable[PatchOperation]) -> Dict[str, Any]:
+    """
+    Aplica un parche sobre el documento, modificándolo en sitio.
+
+    Los valores se copian antes de insertarse para que el documento almacenado
+    no comparta objetos mutables con quien generó el parche.
+
+    Args:
+        document: Documento a modificar
+        operations: Operaciones ``add``, ``replace`` o ``remove``
+
+    Returns:
+        Dict[str, Any]: El mismo documento, ya modificado
+
+    Raises:
+        StatePatchError: Si una operación no es válida para el documento
+    """
+    for operation in operations:
+        op = operation.get("op")
+        path = operation.get("path")
+        tokens = _split_path(path)
+        parent = _resolve_parent(document, tokens, path)
+        token = tokens[-1]
+
+        if op in ("add", "replace"):
+            if "value" not in operation:
+                raise StatePatchError(f"La operación {op} en {path} no tiene valor")
+            value = copy.deepcopy(operation["value"])
+            if isinstance(parent, list):
+                if token == "-" and op == "add":
+                    parent.append(value)
+                elif token.isdigit() and int(token) < len(parent) + (op == "add"):
+                    if op == "add":
+                        parent.insert(int(token), value)
+                    else:
+                        parent[int(token)] = value
+                else:
+                    raise StatePatchError(f"Índice inválido: {path}")
+            elif isinstance(parent, dict):
+                if op == "replace" and token not in parent:
+                    raise StatePatchError(f"Ruta inexistente: {path}")
+                parent[token] = value
+            else:
+                raise StatePatchError(f"Ruta inexistente: {path}")
+        elif op == "remove":
+            if isinstance(parent, list) and token.isdigit() and int(token) < len(parent):
+                del parent[int(token)]
+            elif isinstance(parent, dict) and token in parent:
+                del parent[token]
+            else:
+                raise StatePatchError(f"Ruta inexistente: {path}")
+        else:
+            raise StatePatchError(f"Operación no soportada: {op!r}")
+    return document
+
+
+def diff_state(base: Dict[str, Any], updated: Dict[str, Any]) -> List[PatchOperation]:
+    """
+    Calcula el parche que transforma ``base`` en ``updated``.
+
+    Compara campo a campo: los campos iguales no generan operaciones, las
+    listas que solo crecen por el final se expresan como ``add`` en
+    ``/campo/-`` y los diccionarios se recorren recursivamente. Cualquier otro
+    cambio reemplaza el valor completo.
+
+    Args:
+        base: Documento de partida (el que se cargó)
+        updated: Documento modificado
+
+    Returns:
+        List[PatchOperation]: Operaciones del parche (vacía si no hay cambios)
+    """
+    return _diff_dict(base, updated, "")
+
+
+def _diff_dict(base: Dict[str, Any], updated: Dict[str, Any], prefix: str) -> List[PatchOperation]:
+    operations: List[PatchOperation] = []
+    for key in base:
+        if key not in updated:
+            operations.append({"op": "remove", "path": f"{prefix}/{_escape(key)}"})
+    for key, value in updated.items():
+        path = f"{prefix}/{_escape(key)}"
+        if key not in base:
+            operations.append({"op": "add", "path": path, "value": value})
+            continue
+        old = base[key]
+        if old == value:
+            continue
+        if isinstance(old, list) and isinstance(value, list) and len(value) > len(old) and value[:len(old)] == old:
+            operations.extend({"op": "add", "path": f"{path}/-", "value": item} for item in value[len(old):])
+        elif isinstance(old, dict) and isinstance(value, dict):
+            operations.extend(_diff_dict(old, value, path))
+        else:
+            operations.append({"op": "replace", "path": path, "value": value})
+    return operations
@@ -13,12 +13,16 @@ import time
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Union, List, Callable
 
+from core.latency_histogram import LatencyHistogram, LatencyRegistry, latency_registry as shared_latency_registry
 from core.logging_config import get_logger
 from core.telemetry import Telemetry
 
 # Configurar logger
 logger = get_logger(__name__)
 
+# Métrica del registro de latencias para las llamadas de visión
+LATENCY_METRIC = "vision.api_call"
+
 class VisionMetrics:
     """
     Sistema de monitoreo y métricas para capacidades de visión y multimodales.
@@ -27,16 +31,23 @@ class VisionMetrics:
     y multimodales, permitiendo la detección de problemas y la optimización del rendimiento.
     """
     
-    def __init__(self, telemetry: Optional[Telemetry] = None):
+    def __init__(self, telemetry: Optional[Telemetry] = None,
+                 latency_registry: Optional[LatencyRegistry] = None):
         """
         Inicializa el sistema de métricas de visión.
         
         Args:
             telemetry: Instancia de Telemetry para exportar métricas (opcional)
+            latency_registry: Registro de histogramas de latencia (por defecto el global)
         """
         self.telemetry = telemetry
         self.lock = asyncio.Lock()
         
+        # Histogramas de latencia: series por operación y agente en el registro
+        # compartido y un agregado propio para evaluar el umbral p95
+        self.latency = latency_registry or shared_latency_registry
+        self.latency_total = LatencyHistogram()
+        
         # Métricas generales
         self.metrics = {
             "api_calls": {
@@ -180,6 +191,9 @@ class VisionMetrics:
                 self.metrics["latency"]["min_ms"] = min(self.metrics["latency"]["min_ms"], latency_ms)
                 self.metrics["latency"]["max_ms"] = max(self.metrics["latency"]["max_ms"], latency_ms)
                 
+                self.latency_total.record(latency_ms)
+                self.latency.record(LATENCY_METRIC, latency_ms, operation=operation, agent_id=agent_id)
+                
                 # Actualizar latencia por operación
                 if operation not in self.metrics["latency"]["by_operation"]:
                     self.metrics["latency"]["by_operation"][operation] = {
@@ -412,14 +426,15 @@ class VisionMetrics:
             )
         
         # Verificar latencia p95
-        if (self.metrics["latency"]["count"] > 20 and 
-            self.metrics["latency"]["max_ms"] > self.thresholds["latency_p95_ms"]):
-            await self._generate_alert(
-                "medium",
-                "Latency threshold exceeded",
-                f"Maximum latency is {self.metrics['latency']['max_ms']}ms, threshold is {self.thresholds['latency_p95_ms']}ms",
-                {"max_latency_ms": self.metrics["latency"]["max_ms"]}
-            )
+        if self.latency_total.count > 20:
+            p95_ms = self.latency_total.percentile(95)
+            if p95_ms > self.thresholds["latency_p95_ms"]:
+                await self._generate_alert(
+                    "medium",
+                    "Latency threshold exceeded",
+                    f"P95 latency is {p95_ms:.1f}ms, threshold is {self.thresholds['latency_p95_ms']}ms",
+                    {"p95_latency_ms": p95_ms, "max_latency_ms": self.metrics["latency"]["max_ms"]}
+                )
     
     async def _generate_alert(self, severity: str, title: str, message: str, data: Dict[str, Any]) -> None:
         """
@@ -501,7 +516,8 @@ class VisionMetrics:
                     "avg_ms": (self.metrics["latency"]["total_ms"] / self.metrics["latency"]["count"] 
                               if self.metrics["latency"]["count"] > 0 else 0),
                     "min_ms": self.metrics["latency"]["min_ms"] if self.metrics["latency"]["min_ms"] != float('inf') else 0,
-                    "max_ms": self.metrics["latency"]["max_ms"]
+                    "max_ms": self.metrics["latency"]["max_ms"],
+                    "p95_ms": self.latency_total.percentile(95)
                 },
                 "tokens": {
                     "total": self.metrics["tokens"]["total"]
@@ -552,13 +568,25 @@ class VisionMetrics:
                 if self.metrics["latency"]["count"] > 0 else 0
             )
             
+            # Percentiles por operación y por agente
+            by_operation = self.latency.summary(LATENCY_METRIC, group_by="operation")
+            latency_percentiles = self.latency_total.percentiles()
+            
             # Crear objeto de métricas
             metrics = {
                 "timestamp": datetime.now().isoformat(),
                 "api_calls": self.metrics["api_calls"],
                 "latency": {
                     **self.metrics["latency"],
-                    "avg_ms": avg_latency
+                    "by_operation": {
+                        operation: {**values, **by_operation.get(operation, {})}
+                        for operation, values in self.metrics["latency"]["by_operation"].items()
+                    },
+                    "by_agent": self.latency.summary(LATENCY_METRIC, group_by="agent_id"),
+                    "avg_ms": avg_latency,
+                    "p50_ms": latency_percentiles[50],
+                    "p95_ms": latency_percentiles[95],
+                    "p99_ms": latency_percentiles[99]
                 },
                 "tokens": self.metrics["tokens"],
                 "images": self.metrics["images"],
@@ -595,6 +623,10 @@ class VisionMetrics:
             # Guardar histórico antes de reiniciar
             await self.snapshot_metrics()
             
+            # Reiniciar histogramas de latencia
+            self.latency_total.reset()
+            self.latency.clear(LATENCY_METRIC)
+            
             # Reiniciar métricas
             self.metrics = {
                 "api_calls": {
@@ -5,14 +5,13 @@ Este módulo proporciona capacidades de análisis de imágenes, extracción de t
 y otras funcionalidades de visión por computadora utilizando los modelos de Vertex AI.
 """
 import logging
-import base64
 import os
 import json
 import asyncio
 from typing import Dict, Any, Optional, Union, List
-import aiohttp
 from google.cloud import aiplatform
 from google.cloud.aiplatform import VertexAI
+from core.image_handle import ImageHandle
 from core.logging_config import get_logger
 
 # Configurar logger
@@ -48,19 +47,19 @@ class VisionProcessor:
         except Exception as e:
             logger.error(f"Error al inicializar Vertex AI para VisionProcessor: {e}", exc_info=True)
     
-    async def analyze_image(self, image_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    async def analyze_image(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Analiza una imagen utilizando Vertex AI.
         
         Args:
-            image_data: Datos de la imagen (base64, URL o ruta de archivo)
+            image_data: Datos de la imagen (ImageHandle, base64, URL o ruta de archivo)
             
         Returns:
             Dict[str, Any]: Resultados del análisis de la imagen
         """
         try:
-            # Procesar la imagen según el formato proporcionado
-            processed_image = await self._process_image_input(image_data)
+            # Resolver la imagen (un handle compartido se reutiliza sin volver a leerla)
+            image = await ImageHandle.resolve(image_data)
             
             # Construir el prompt para el análisis
             prompt = """
@@ -95,7 +94,7 @@ class VisionProcessor:
                             "role": "user",
                             "parts": [
                                 {"text": prompt},
-                                {"inline_data": {"mime_type": "image/jpeg", "data": processed_image}}
+                                {"inline_data": {"mime_type": image.mime_type, "data": image.base64}}
                             ]
                         }
                     ],
@@ -133,19 +132,19 @@ class VisionProcessor:
                 "error": str(e)
             }
     
-    async def extract_text(self, image_data: Union[str, Dict[str, Any]]) -> Dict[str, Any]:
+    async def extract_text(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]]) -> Dict[str, Any]:
         """
         Extrae texto de una imagen utilizando Vertex AI.
         
         Args:
-            image_data: Datos de la imagen (base64, URL o ruta de archivo)
+            image_data: Datos de la imagen (ImageHandle, base64, URL o ruta de archivo)
             
         Returns:
             Dict[str, Any]: Texto extraído de la imagen
         """
         try:
-            # Procesar la imagen según el formato proporcionado
-            processed_image = await self._process_image_input(image_data)
+            # Resolver la imagen (un handle compartido se reutiliza sin volver a leerla)
+            image = await ImageHandle.resolve(image_data)
             
             # Construir el prompt para la extracción de texto
             prompt = """
@@ -175,7 +174,7 @@ class VisionProcessor:
                             "role": "user",
                             "parts": [
                                 {"text": prompt},
-                                {"inline_data": {"mime_type": "image/jpeg", "data": processed_image}}
+                                {"inline_data": {"mime_type": image.mime_type, "data": image.base64}}
                             ]
                         }
                     ],
@@ -212,80 +211,3 @@ class VisionProcessor:
                 "status": "error",
                 "error": str(e)
             }
-    
-    async def _process_image_input(self, image_data: Union[str, Dict[str, Any]]) -> str:
-        """
-        Procesa los datos de entrada de la imagen en el formato requerido por Vertex AI.
-        
-        Args:
-            image_data: Datos de la imagen (base64, URL o ruta de archivo)
-            
-        Returns:
-            str: Datos de la imagen en formato base64
-        """
-        # Si ya es un diccionario con formato específico
-        if isinstance(image_data, dict):
-            if "base64" in image_data:
-                return image_data["base64"]
-            elif "url" in image_data:
-                # Descargar imagen desde URL
-                return await self._download_image(image_data["url"])
-            elif "path" in image_data:
-                # Leer imagen desde archivo
-                return await self._read_image_file(image_data["path"])
-        
-        # Si es un string, podría ser base64, URL o ruta
-        elif isinstance(image_data, str):
-            # Verificar si es base64
-            if image_data.startswith("data:image"):
-                # Extraer la parte base64 del data URI
-                return image_data.split(",")[1]
-            elif image_data.startswith("http"):
-                # Es una URL
-                return await self._download_image(image_data)
-            else:
-                # Asumir que es una ruta de archivo
-                return await self._read_image_file(image_data)
-        
-        # Si no se pudo procesar, devolver error
-        raise ValueError("Formato de imagen no soportado")
-    
-    async def _download_image(self, url: str) -> str:
-        """
-        Descarga una imagen desde una URL y la convierte a base64.
-        
-        Args:
-            url: URL de la imagen
-            
-        Returns:
-            str: Imagen en formato base64
-        """
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        return base64.b64encode(image_data).decode("utf-8")
-                    else:
-                        raise Exception(f"Error al descargar imagen: {response.status}")
-        except Exception as e:
-            logger.error(f"Error al descargar imagen desde URL: {e}", exc_info=True)
-            raise
-    
-    async def _read_image_file(self, path: str) -> str:
-        """
-        Lee una imagen desde un archivo y la convierte a base64.
-        
-        Args:
-            path: Ruta del archivo de imagen
-            
-        Returns:
-            str: Imagen en formato base64
-        """
-        try:
-            with open(path, "rb") as image_file:
-                image_data = image_file.read()
-                return base64.b64encode(image_data).decode("utf-8")
-        except Exception as e:
-            logger.error(f"Error al leer imagen desde archivo: {e}", exc_info=True)
-            raise
\ No newline at end of file
@@ -13,6 +13,7 @@ import time
 from typing import Dict, Any, Callable, Optional
 
 from infrastructure.a2a_optimized import a2a_server, MessagePriority
+from core.consultation_cache import consultation_cache
 from core.logging_config import get_logger
 
 # Configurar logger
@@ -57,7 +58,10 @@ class A2AAdapter:
             callback = agent_info.get("message_callback")
             if callback and callable(callback):
                 try:
-                    await callback(message["content"])
+                    content = message["content"]
+                    # Las consultas que haga el agente pertenecen al turno del emisor
+                    with consultation_cache.resume(content.get("context") if isinstance(content, dict) else None):
+                        await callback(content)
                 except Exception as e:
                     logger.error(f"Error en callback del agente {agent_id}: {e}")
         
@@ -148,6 +152,18 @@ class A2AAdapter:
         Returns:
             Dict[str, Any]: Respuesta del agente consultado
         """
+        # El contexto viaja como diccionario para que los agentes puedan
+        # leerlo (incluido el sobre de análisis)
+        if hasattr(context, "model_dump"):
+            context = context.model_dump(mode="json")
+        
+        # Dentro de un turno orquestado, las consultas repetidas se reutilizan
+        return await consultation_cache.consult(
+            agent_id, user_input, context,
+            lambda: self._call_agent(agent_id, user_input, context)
+        )
+    
+    async def _call_agent(self, agent_id: str, user_input: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         logger.info(f"Llamando al agente {agent_id} con input: {user_input[:30]}...")
         
         # Verificar si el agente está registrado
@@ -180,11 +196,11 @@ class A2AAdapter:
                 "message_callback": temp_callback
             })
             
-            # Preparar el mensaje
+            # Preparar el mensaje con el turno de consultas activo
             message = {
                 "message_id": message_id,
                 "user_input": user_input,
-                "context": context or {},
+                "context": consultation_cache.propagate(context or {}),
                 "response_to": temp_agent_id,
                 "timestamp": time.time()
             }
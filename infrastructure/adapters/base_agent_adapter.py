@@ -16,6 +16,7 @@ from core.intent_analyzer_optimized import IntentAnalyzer
 from core.state_manager_optimized import StateManager
 from services.program_classification_service import ProgramClassificationService
 from core.telemetry import get_tracer
+from core.analysis_envelope import AnalysisEnvelope, extract_analysis
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -86,12 +87,16 @@ class BaseAgentAdapter(Agent):
                     extra={"user_id": user_id, "agent": self.__class__.__name__}
                 )
                 
-                # Paso 1: Análisis de intención mediante el analizador de intenciones
-                intent_score = await self.intent_analyzer.analyze(
-                    query, 
-                    agent_type=self.__class__.__name__,
-                    user_id=user_id
-                )
+                # Paso 1: Análisis de intención; se reutiliza el del orquestador si viaja
+                # en el contexto y corresponde a esta consulta
+                analysis = extract_analysis(context, query)
+                intent_score = analysis.score_for(getattr(self, "agent_id", "")) if analysis else None
+                if intent_score is None:
+                    intent_score = await self.intent_analyzer.analyze(
+                        query, 
+                        agent_type=self.__class__.__name__,
+                        user_id=user_id
+                    )
                 
                 # Paso 2: Verificar palabras clave de fallback
                 keyword_score = self._check_keywords(query)
@@ -112,6 +117,7 @@ class BaseAgentAdapter(Agent):
                     "keyword_score": keyword_score,
                     "combined_score": combined_score,
                     "final_score": context_adjusted_score,
+                    "analysis_reused": analysis is not None,
                     "agent": self.__class__.__name__,
                     "timestamp": datetime.utcnow().isoformat(),
                 }
@@ -204,6 +210,21 @@ class BaseAgentAdapter(Agent):
             logger.error(f"Error al determinar el tipo de programa: {str(e)}", exc_info=True)
             return "general"  # Valor por defecto en caso de error
     
+    def _get_analysis(self, query: str, **kwargs) -> Optional[AnalysisEnvelope]:
+        """
+        Obtiene el sobre de análisis del orquestador recibido con la consulta.
+        
+        Args:
+            query: La consulta del usuario
+            **kwargs: Argumentos de la ejecución (``analysis`` o ``context``)
+            
+        Returns:
+            El sobre de análisis si es reutilizable para la consulta, o None
+        """
+        if kwargs.get("analysis") is not None:
+            return extract_analysis({"analysis": kwargs["analysis"]}, query)
+        return extract_analysis(kwargs.get("context"), query)
+    
     async def run_async_impl(self, query: str, **kwargs) -> Dict[str, Any]:
         """
         Implementación asíncrona de la ejecución del agente.
@@ -233,8 +233,13 @@ class BiometricsInsightEngineAdapter(BiometricsInsightEngine, BaseAgentAdapter):
             # Registrar inicio de procesamiento
             start_time = time.time()
             
-            # Analizar la intención para determinar el tipo de consulta
-            intent_result = await intent_analyzer_adapter.analyze_intent(query)
+            # Analizar la intención para determinar el tipo de consulta; si el orquestador
+            # ya la analizó para este mismo texto, se reutiliza su resultado
+            analysis = self._get_analysis(query, **kwargs)
+            if analysis is not None:
+                intent_result = analysis.to_intents()
+            else:
+                intent_result = await intent_analyzer_adapter.analyze_intent(query)
             
             # Determinar el tipo de consulta basado en la intención
             query_type = self._determine_query_type(intent_result, query)
@@ -13,6 +13,7 @@ from typing import Any, Dict, List, Optional, Union
 from core.logging_config import get_logger
 from infrastructure.adapters.telemetry_adapter import get_telemetry_adapter, measure_execution_time
 from core.document_processor import document_processor
+from core.image_handle import ImageHandle
 from core.object_recognition import object_recognition
 from core.vision_metrics import vision_metrics
 
@@ -87,7 +88,7 @@ class DocumentAdapter:
     @measure_execution_time("document_adapter.extract_tables")
     async def extract_tables(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         language_code: str = "es-ES",
         agent_id: str = "unknown"
     ) -> Dict[str, Any]:
@@ -95,7 +96,7 @@ class DocumentAdapter:
         Extrae tablas de un documento o imagen.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             language_code: Código de idioma para el OCR
             agent_id: ID del agente que realiza la solicitud (para métricas)
             
@@ -164,7 +165,7 @@ class DocumentAdapter:
     @measure_execution_time("document_adapter.extract_forms")
     async def extract_forms(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         language_code: str = "es-ES",
         agent_id: str = "unknown"
     ) -> Dict[str, Any]:
@@ -172,7 +173,7 @@ class DocumentAdapter:
         Extrae datos de formularios de un documento o imagen.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             language_code: Código de idioma para el OCR
             agent_id: ID del agente que realiza la solicitud (para métricas)
             
@@ -241,7 +242,7 @@ class DocumentAdapter:
     @measure_execution_time("document_adapter.recognize_objects")
     async def recognize_objects(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         domain: str = "general",
         confidence_threshold: float = 0.5,
         agent_id: str = "unknown"
@@ -250,7 +251,7 @@ class DocumentAdapter:
         Reconoce objetos en una imagen para un dominio específico.
         
         Args:
-            image_data: Datos de la imagen (base64, bytes o dict con url o path)
+            image_data: Datos de la imagen (ImageHandle, base64, bytes o dict con url o path)
             domain: Dominio de objetos a reconocer (general, medical, industrial, retail, custom)
             confidence_threshold: Umbral de confianza para incluir detecciones (0.0-1.0)
             agent_id: ID del agente que realiza la solicitud (para métricas)
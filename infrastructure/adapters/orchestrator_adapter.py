@@ -20,6 +20,7 @@ from infrastructure.adapters.state_manager_adapter import state_manager_adapter
 from infrastructure.adapters.intent_analyzer_adapter import intent_analyzer_adapter
 from core.telemetry import telemetry
 from app.schemas.a2a import A2ATaskContext
+from core.analysis_envelope import AnalysisEnvelope, attach_analysis
 from infrastructure.a2a_optimized import MessagePriority
 from clients.vertex_ai.client import VertexAIClient
 
@@ -195,9 +196,12 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
                 priority_name = self._get_priority_name(priority)
                 self.metrics["priority_distribution"][priority_name] += 1
                 
-                # Enrutar el mensaje a los agentes objetivo
+                # Enrutar el mensaje a los agentes objetivo junto con el análisis realizado
+                analysis = self._build_analysis(query, intent, target_agents)
                 start_time = time.time()
-                response = await self._route_message(query, target_agents, priority, user_id, session_id, state)
+                response = await self._route_message(
+                    query, target_agents, priority, user_id, session_id, state, analysis=analysis
+                )
                 end_time = time.time()
                 
                 # Actualizar métricas
@@ -271,9 +275,12 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
                 priority_name = self._get_priority_name(priority)
                 self.metrics["priority_distribution"][priority_name] += 1
                 
-                # Enrutar el mensaje a los agentes objetivo
+                # Enrutar el mensaje a los agentes objetivo junto con el análisis realizado
+                analysis = self._build_analysis(user_input, intent, target_agents)
                 start_time = time.time()
-                response = await self._route_message(user_input, target_agents, priority, user_id, session_id, context)
+                response = await self._route_message(
+                    user_input, target_agents, priority, user_id, session_id, context, analysis=analysis
+                )
                 end_time = time.time()
                 
                 # Actualizar métricas
@@ -339,6 +346,32 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
                 "target_agents": ["fallback_agent"]
             }
     
+    def _build_analysis(self, user_input: str, intent: Dict[str, Any], target_agents: List[str]) -> Optional[AnalysisEnvelope]:
+        """
+        Construye el sobre de análisis que se envía a los agentes objetivo.
+        
+        Args:
+            user_input: El texto de entrada del usuario.
+            intent: La intención analizada.
+            target_agents: Lista de agentes objetivo.
+            
+        Returns:
+            Optional[AnalysisEnvelope]: El sobre, o None si el análisis falló.
+        """
+        intent_type = intent.get("type") or intent.get("primary_intent")
+        if not intent_type or intent_type == "unknown":
+            return None
+        
+        return AnalysisEnvelope.build(
+            query=user_input,
+            primary_intent=intent_type,
+            secondary_intents=intent.get("secondary_intents", []),
+            confidence=intent.get("confidence", 0.0),
+            entities=intent.get("entities", []),
+            target_agents=target_agents,
+            source=self.__class__.__name__
+        )
+    
     async def _determine_target_agents(self, intent: Dict[str, Any], user_input: str, context: Dict[str, Any]) -> Tuple[List[str], MessagePriority]:
         """
         Determina los agentes objetivo y la prioridad del mensaje basado en la intención.
@@ -392,7 +425,8 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
             return ["fallback_agent"], MessagePriority.NORMAL
     
     async def _route_message(self, user_input: str, target_agents: List[str], priority: MessagePriority, 
-                           user_id: Optional[str], session_id: Optional[str], context: Dict[str, Any]) -> Dict[str, Any]:
+                           user_id: Optional[str], session_id: Optional[str], context: Dict[str, Any],
+                           analysis: Optional[AnalysisEnvelope] = None) -> Dict[str, Any]:
         """
         Enruta el mensaje a los agentes objetivo con la prioridad especificada.
         
@@ -403,6 +437,7 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
             user_id: ID del usuario.
             session_id: ID de la sesión.
             context: Contexto adicional.
+            analysis: Sobre de análisis que los agentes pueden reutilizar.
             
         Returns:
             Dict[str, Any]: Respuesta combinada de los agentes.
@@ -416,7 +451,8 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
                 task_context_data = A2ATaskContext(
                     session_id=session_id, 
                     user_id=user_id, 
-                    additional_context=context
+                    additional_context=context or {},
+                    analysis=analysis
                 )
                 
                 # Determinar si se deben llamar a múltiples agentes en paralelo
@@ -451,7 +487,7 @@ class OrchestratorAdapter(NGXNexusOrchestrator, BaseAgentAdapter):
                                 query=user_input,
                                 user_id=user_id,
                                 session_id=session_id,
-                                context=context
+                                context=attach_analysis(context, analysis)
                             ),
                             timeout=timeout
                         )
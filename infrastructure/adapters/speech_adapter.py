@@ -340,7 +340,7 @@ class SpeechAdapter:
         finally:
             telemetry_adapter.end_span(span)
     
-    async def _process_audio_input(self, audio_data: Union[str, bytes, Dict[str, Any]]) -> Union[str, bytes]:
+    async def _process_audio_input(self, audio_data: Union[str, bytes, Dict[str, Any]]) -> Union[str, bytes, Dict[str, str]]:
         """
         Procesa la entrada de audio en diferentes formatos.
         
@@ -348,36 +348,26 @@ class SpeechAdapter:
             audio_data: Datos del audio (base64, bytes o dict con url o path)
             
         Returns:
-            Union[str, bytes]: Datos de audio procesados
+            Union[str, bytes, Dict[str, str]]: Datos de audio procesados
         """
         # Si ya es bytes o base64, devolver directamente
         if isinstance(audio_data, bytes) or (isinstance(audio_data, str) and "base64" in audio_data):
             return audio_data
         
-        # Si es un diccionario, procesar según las claves
+        # URLs y archivos se pasan sin leer: el cliente de voz los procesa por bloques
         if isinstance(audio_data, dict):
-            # Si tiene URL, descargar el audio
             if "url" in audio_data:
-                import aiohttp
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(audio_data["url"]) as response:
-                        if response.status == 200:
-                            return await response.read()
-                        else:
-                            raise ValueError(f"Error al descargar audio de URL: {response.status}")
-            
-            # Si tiene path, leer el archivo
+                return {"url": audio_data["url"]}
+            
             elif "path" in audio_data:
                 path = audio_data["path"]
                 if not os.path.exists(path):
                     raise FileNotFoundError(f"No se encontró el archivo de audio: {path}")
-                
-                with open(path, "rb") as f:
-                    return f.read()
+                return {"path": path}
             
-            # Si tiene base64, extraer
+            # El base64 sin prefijo se identifica como tal ante el cliente
             elif "base64" in audio_data:
-                return audio_data["base64"]
+                return {"base64": audio_data["base64"]}
             
             else:
                 raise ValueError("Formato de audio no válido. Debe contener 'url', 'path' o 'base64'.")
@@ -386,9 +376,7 @@ class SpeechAdapter:
         if isinstance(audio_data, str):
             if not os.path.exists(audio_data):
                 raise FileNotFoundError(f"No se encontró el archivo de audio: {audio_data}")
-            
-            with open(audio_data, "rb") as f:
-                return f.read()
+            return {"path": audio_data}
         
         raise ValueError("Formato de audio no soportado.")
     
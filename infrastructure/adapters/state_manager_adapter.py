@@ -7,6 +7,7 @@ con el código existente.
 """
 
 import asyncio
+import copy
 import json
 import logging
 import time
@@ -15,6 +16,14 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 from core.logging_config import get_logger
+from core.state_patch import (
+    PatchOperation,
+    StateVersionConflict,
+    VersionedState,
+    apply_patch,
+    diff_state,
+    patch_namespaces,
+)
 
 # Intentar importar telemetry_manager del módulo real, si falla usar el mock
 try:
@@ -103,6 +112,10 @@ class StateManagerAdapter:
         self._conversations = {}
         self._cache = {}
         self._cache_ttl = 3600  # 1 hora en segundos
+        
+        # Estado de sesión de los agentes: documento, versión global y versión
+        # de la última modificación de cada campo de primer nivel
+        self._states: Dict[str, Dict[str, Any]] = {}
         self._last_operation_time = time.time()
         
         # Estadísticas
@@ -169,6 +182,7 @@ class StateManagerAdapter:
             # Estadísticas internas del adaptador unificado
             internal_stats = {
                 "total_conversations": len(self._conversations),
+                "total_states": len(self._states),
                 "cache_size": len(self._cache),
                 "last_operation_time": self._last_operation_time
             }
@@ -616,6 +630,7 @@ class StateManagerAdapter:
             # Estadísticas internas del adaptador unificado
             internal_stats = {
                 "total_conversations": len(self._conversations),
+                "total_states": len(self._states),
                 "cache_size": len(self._cache),
                 "last_operation_time": self._last_operation_time
             }
@@ -828,13 +843,264 @@ class StateManagerAdapter:
             telemetry_manager.end_span(span_id)
 
 
+    # --- Estado de sesión de los agentes ---
+
+    def _state_key(self, user_id: str, session_id: str) -> str:
+        return f"{user_id}:{session_id}"
+
+    @staticmethod
+    def _payload_size(payload: Any) -> int:
+        """Bytes que se envían al almacenamiento para una escritura."""
+        return len(json.dumps(payload, default=str).encode("utf-8"))
+
+    async def load_state(self, user_id: str, session_id: str) -> VersionedState:
+        """
+        Carga el estado de una sesión de agente.
+
+        El resultado es un diccionario propio del llamador que guarda además la
+        versión y la copia base de la carga, para que ``save_state`` y
+        ``commit_state`` puedan enviar solo los campos modificados y detectar
+        escrituras concurrentes de otros llamadores.
+
+        Args:
+            user_id: ID del usuario
+            session_id: ID de la sesión
+
+        Returns:
+            VersionedState: Copia del estado (vacía, versión 0, si no existe)
+        """
+        span_id = telemetry_manager.start_span(
+            name="state_manager_adapter.load_state",
+            attributes={"user_id": user_id, "session_id": session_id}
+        )
+
+        try:
+            self.stats["operations"] += 1
+            self._last_operation_time = time.time()
+
+            entry = self._states.get(self._state_key(user_id, session_id))
+            if entry is None:
+                return VersionedState()
+
+            telemetry_manager.set_span_attribute(span_id, "version", entry["version"])
+            return VersionedState(copy.deepcopy(entry["data"]), entry["version"])
+
+        finally:
+            telemetry_manager.end_span(span_id)
+
+    async def save_state(self, user_id: str, session_id: Optional[str], state: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Guarda el estado completo de una sesión de agente.
+
+        Si ``state`` viene de ``load_state`` y nadie ha modificado la sesión
+        desde esa carga, solo se envía el delta; en otro caso se escribe el
+        documento completo (gana la última escritura).
+
+        Args:
+            user_id: ID del usuario
+            session_id: ID de la sesión (se genera uno si no se indica)
+            state: Estado completo de la sesión
+
+        Returns:
+            Dict[str, Any]: Usuario, sesión, estado guardado y nueva versión
+        """
+        session_id = session_id or str(uuid.uuid4())
+        key = self._state_key(user_id, session_id)
+        entry = self._states.get(key)
+
+        if isinstance(state, VersionedState) and state.version == (entry["version"] if entry else 0):
+            version = await self.commit_state(user_id, session_id, state)
+        else:
+            version = await self._write_full_state(key, state)
+            if isinstance(state, VersionedState):
+                state.rebase(version)
+
+        return {
+            "user_id": user_id,
+            "session_id": session_id,
+            "state_data": state,
+            "version": version
+        }
+
+    async def _write_full_state(self, key: str, state: Dict[str, Any]) -> int:
+        span_id = telemetry_manager.start_span(
+            name="state_manager_adapter.save_state",
+            attributes={"state_key": key}
+        )
+
+        try:
+            self.stats["operations"] += 1
+            self._last_operation_time = time.time()
+
+            previous = self._states.get(key)
+            version = (previous["version"] if previous else 0) + 1
+            self._states[key] = {
+                "data": copy.deepcopy(state),
+                "version": version,
+                "field_versions": {field: version for field in state}
+            }
+
+            written = self._payload_size(state)
+            self.stats["state_full_writes"] += 1
+            self.stats["state_bytes_written"] += written
+            telemetry_manager.set_span_attribute(span_id, "bytes_written", written)
+            return version
+
+        finally:
+            telemetry_manager.end_span(span_id)
+
+    async def patch_state(self,
+                          user_id: str,
+                          session_id: str,
+                          operations: List[PatchOperation],
+                          expected_version: Optional[int] = None) -> int:
+        """
+        Aplica un parche JSON Patch sobre el estado almacenado.
+
+        El control de versiones es optimista y por campo: el parche solo se
+        rechaza si alguno de los campos de primer nivel que toca se modificó
+        después de ``expected_version``. El parche se aplica de forma atómica.
+
+        Args:
+            user_id: ID del usuario
+            session_id: ID de la sesión
+            operations: Operaciones ``add``, ``replace`` o ``remove``
+            expected_version: Versión sobre la que se calculó el parche
+
+        Returns:
+            int: Nueva versión del estado
+
+        Raises:
+            StateVersionConflict: Si un campo tocado cambió desde ``expected_version``
+            StatePatchError: Si alguna operación no es aplicable
+        """
+        span_id = telemetry_manager.start_span(
+            name="state_manager_adapter.patch_state",
+            attributes={"user_id": user_id, "session_id": session_id, "operations": len(operations)}
+        )
+
+        try:
+            self.stats["operations"] += 1
+            self._last_operation_time = time.time()
+
+            key = self._state_key(user_id, session_id)
+            entry = self._states.setdefault(key, {"data": {}, "version": 0, "field_versions": {}})
+            if not operations:
+                return entry["version"]
+
+            fields = patch_namespaces(operations)
+            if expected_version is not None:
+                stale = {field for field in fields if entry["field_versions"].get(field, 0) > expected_version}
+                if stale:
+                    self.stats["state_conflicts"] += 1
+                    raise StateVersionConflict(key, expected_version, entry["version"], stale)
+
+            # Solo se copian los campos tocados para poder descartar el parche si falla
+            patched = dict(entry["data"])
+            for field in fields:
+                if field in patched:
+                    patched[field] = copy.deepcopy(patched[field])
+            apply_patch(patched, operations)
+
+            version = entry["version"] + 1
+            entry["data"] = patched
+            entry["version"] = version
+            for field in fields:
+                entry["field_versions"][field] = version
+
+            written = self._payload_size(operations)
+            self.stats["state_patches"] += 1
+            self.stats["state_patch_operations"] += len(operations)
+            self.stats["state_bytes_written"] += written
+            telemetry_manager.set_span_attribute(span_id, "bytes_written", written)
+            return version
+
+        except Exception as e:
+            telemetry_manager.set_span_attribute(span_id, "error", str(e))
+            raise
+
+        finally:
+            telemetry_manager.end_span(span_id)
+
+    async def commit_state(self,
+                           user_id: str,
+                           session_id: str,
+                           state: Dict[str, Any],
+                           base: Optional[Dict[str, Any]] = None,
+                           expected_version: Optional[int] = None,
+                           force: bool = False) -> int:
+        """
+        Guarda solo los cambios de ``state`` respecto a su carga.
+
+        La base y la versión se toman del propio ``state`` si viene de
+        ``load_state``; si no, deben indicarse. Sin base se escribe el
+        documento completo. Si otros escritores modificaron campos que este
+        delta no toca, ``state`` se actualiza con el documento almacenado.
+
+        Args:
+            user_id: ID del usuario
+            session_id: ID de la sesión
+            state: Estado completo modificado por el agente
+            base: Estado tal como se cargó
+            expected_version: Versión de ``base``
+            force: Aplicar el delta aunque haya conflicto (gana la última
+                escritura solo en los campos en conflicto)
+
+        Returns:
+            int: Nueva versión del estado
+
+        Raises:
+            StateVersionConflict: Si otro escritor modificó los mismos campos
+        """
+        if base is None and isinstance(state, VersionedState):
+            base, expected_version = state.base, state.version
+
+        key = self._state_key(user_id, session_id)
+        if base is None:
+            version = await self._write_full_state(key, state)
+            in_sync = True
+        else:
+            entry = self._states.get(key)
+            in_sync = expected_version == (entry["version"] if entry else 0)
+            version = await self.patch_state(user_id, session_id, diff_state(base, state),
+                                             expected_version=None if force else expected_version)
+
+        if isinstance(state, VersionedState):
+            # patch_state no cede el control, así que el documento sigue siendo el recién escrito
+            state.rebase(version, None if in_sync else self._states[key]["data"])
+        return version
+
+    async def get_state_version(self, user_id: str, session_id: str) -> int:
+        """Versión actual del estado de una sesión (0 si no existe)."""
+        entry = self._states.get(self._state_key(user_id, session_id))
+        return entry["version"] if entry else 0
+
+    async def delete_state(self, user_id: str, session_id: str) -> bool:
+        """
+        Elimina el estado de una sesión de agente.
+
+        Args:
+            user_id: ID del usuario
+            session_id: ID de la sesión
+
+        Returns:
+            bool: True si existía y se eliminó
+        """
+        self.stats["operations"] += 1
+        return self._states.pop(self._state_key(user_id, session_id), None) is not None
+
     def _reset_stats(self):
         """Reinicia los contadores de estadísticas para las pruebas."""
         self.stats = {
             "operations": 0,
             "optimized_operations": 0,
             "original_operations": 0,
-            "errors": 0
+            "errors": 0,
+            "state_full_writes": 0,
+            "state_patches": 0,
+            "state_patch_operations": 0,
+            "state_bytes_written": 0,
+            "state_conflicts": 0
         }
 
 # Crear instancia global del adaptador
@@ -4,12 +4,32 @@ Adaptador de telemetría para NGX Agents.
 Este módulo proporciona un adaptador que simplifica la integración con el sistema
 de telemetría, ofreciendo funciones para medir rendimiento, registrar errores y
 crear spans para seguimiento de operaciones.
+
+Los spans no se envían uno a uno al cliente: se registran en proceso, se
+agrupan por traza y, al cerrarse la traza, se decide si se conservan
+(muestreo de cabeza barato más retención por cola de las trazas lentas o con
+errores). Las trazas conservadas pasan a un búfer circular acotado que un
+exportador asíncrono vacía por lotes; cada span conserva sus marcas de tiempo
+y su padre, de modo que el exportador de OpenTelemetry reconstruye la traza
+tal como ocurrió. Las métricas se agregan en instrumentos por nombre y
+atributos (los histogramas en cubetas de ``LatencyHistogram``) y se envían en
+cada volcado en lugar de en cada llamada.
 """
 
+import asyncio
+import contextvars
 import functools
+import itertools
 import logging
+import random
+import threading
 import time
-from typing import Any, Dict, List, Optional, Union, Callable
+import uuid
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union, Callable
+
+from core.latency_histogram import DEFAULT_PERCENTILES, LatencyHistogram
+from core.settings import settings
 
 # Importar telemetría
 try:
@@ -24,6 +44,13 @@ logger = logging.getLogger(__name__)
 # Instancia global del adaptador
 _telemetry_adapter_instance = None
 
+# Span activo en el contexto actual (para asociar hijos a su traza)
+_active_span: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "telemetry_active_span", default=None
+)
+
+MetricKey = Tuple[str, str, Tuple[Tuple[str, Any], ...]]
+
 
 def get_telemetry_adapter():
     """
@@ -59,30 +86,202 @@ def measure_execution_time(metric_name: str, attributes: Optional[Dict[str, Any]
             finally:
                 end_time = time.time()
                 execution_time_ms = (end_time - start_time) * 1000
-                
+
                 # Registrar métrica
                 adapter = get_telemetry_adapter()
                 adapter.record_metric(
-                    metric_name, 
-                    execution_time_ms, 
+                    metric_name,
+                    execution_time_ms,
                     attributes or {}
                 )
         return wrapper
     return decorator
 
 
+class NoOpSpanExporter:
+    """Exportador que descarta los lotes (referencia para medir la sobrecarga)."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        return None
+
+
+class LoggingSpanExporter:
+    """Exportador del modo mock: resume cada lote en el log."""
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        if logger.isEnabledFor(logging.DEBUG):
+            for span in spans:
+                logger.debug(f"SPAN: {span['name']} {span['duration_ms']:.2f}ms trace={span['trace_id']} "
+                             f"error={span['error']} {span['attributes']}")
+
+
+class OpenTelemetrySpanExporter:
+    """
+    Reenvía los lotes a OpenTelemetry conservando tiempos y jerarquía.
+
+    Cada span se crea con las marcas de inicio y fin registradas (no con las del
+    momento de exportar) y como hijo del span ya exportado de su padre: los
+    spans de una traza llegan al búfer ordenados por inicio. Un span cuyo padre
+    ya no se recuerda se exporta como raíz; ``ngx.trace_id`` y
+    ``ngx.parent_span_id`` permiten correlacionarlo igualmente.
+    """
+
+    def __init__(self, tracer: Optional[Any] = None, max_tracked_spans: int = 4096):
+        """
+        Inicializa el exportador.
+
+        Args:
+            tracer: Tracer de OpenTelemetry (por defecto, el del proveedor global)
+            max_tracked_spans: Spans exportados cuyo contexto se recuerda para sus hijos
+        """
+        from opentelemetry import context as otel_context
+        from opentelemetry import trace
+
+        self._trace = trace
+        self._root_context = otel_context.Context()
+        self._tracer = tracer or trace.get_tracer("ngx_agents.telemetry_adapter")
+        self._contexts: "OrderedDict[str, Any]" = OrderedDict()
+        self.max_tracked_spans = max_tracked_spans
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        trace = self._trace
+        for span in spans:
+            attributes = {**span["attributes"], "ngx.trace_id": span["trace_id"]}
+            parent = self._contexts.get(span["parent_id"]) if span["parent_id"] else None
+            if parent is not None:
+                context = trace.set_span_in_context(trace.NonRecordingSpan(parent))
+            else:
+                context = self._root_context
+                if span["parent_id"]:
+                    attributes["ngx.parent_span_id"] = span["parent_id"]
+
+            otel_span = self._tracer.start_span(span["name"], context=context, attributes=attributes,
+                                                start_time=span["start_time_ns"])
+            for event in span["events"]:
+                otel_span.add_event(event["name"], event["attributes"], timestamp=event.get("timestamp_ns"))
+            if span["error"]:
+                otel_span.set_status(trace.Status(trace.StatusCode.ERROR))
+            otel_span.end(end_time=span["end_time_ns"])
+
+            self._contexts[span["span_id"]] = otel_span.get_span_context()
+            if len(self._contexts) > self.max_tracked_spans:
+                self._contexts.popitem(last=False)
+
+
+def _default_span_exporter() -> Any:
+    """OpenTelemetry si la telemetría está activada; en otro caso, el log."""
+    if settings.telemetry_enabled:
+        try:
+            return OpenTelemetrySpanExporter()
+        except ImportError:
+            logger.warning("OpenTelemetry no disponible, los spans se exportan al log")
+    return LoggingSpanExporter()
+
+
+class NoOpMetricExporter:
+    """Exportador que descarta los puntos de métricas."""
+
+    def export(self, points: List[Dict[str, Any]]) -> None:
+        return None
+
+
+class LoggingMetricExporter:
+    """Exportador del modo mock: resume cada instrumento en el log."""
+
+    def export(self, points: List[Dict[str, Any]]) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        for point in points:
+            attr_str = ", ".join(f"{k}={v}" for k, v in point["attributes"].items())
+            if point["kind"] == "counter":
+                logger.info(f"COUNTER: {point['name']} += {point['value']:g} {{{attr_str}}}")
+                continue
+            label = "HISTOGRAM" if point["kind"] == "histogram" else "METRIC"
+            percentiles = ", ".join(f"{key}={value:g}" for key, value in point["percentiles"].items())
+            logger.info(f"{label}: {point['name']} = {point['sum'] / point['count']:g} {{{attr_str}}} "
+                        f"(count={point['count']}, min={point['min']:g}, {percentiles}, max={point['max']:g}, "
+                        f"buckets={len(point['buckets'])})")
+
+
+class MetricInstrument:
+    """
+    Agregado de un contador, métrica o histograma para unos atributos concretos.
+
+    Las métricas y los histogramas conservan la distribución en las cubetas de
+    un ``LatencyHistogram`` (valores no negativos, con error relativo acotado),
+    no solo su media.
+    """
+
+    __slots__ = ("kind", "name", "attributes", "count", "total", "histogram")
+
+    def __init__(self, kind: str, name: str, attributes: Dict[str, Any]):
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes
+        self.count = 0
+        self.total = 0.0
+        self.histogram = LatencyHistogram() if kind != "counter" else None
+
+    def add(self, value: Union[int, float]) -> None:
+        self.count += 1
+        self.total += value
+        if self.histogram is not None:
+            self.histogram.record(value)
+
+    def to_point(self) -> Dict[str, Any]:
+        """
+        Punto exportable del instrumento.
+
+        Returns:
+            Dict[str, Any]: Suma de los contadores, o recuento, suma, extremos,
+            percentiles y cubetas (límite superior, muestras) de las distribuciones
+        """
+        point = {"kind": self.kind, "name": self.name, "attributes": self.attributes, "count": self.count}
+        if self.histogram is None:
+            point["value"] = self.total
+            return point
+        histogram = self.histogram
+        point.update({
+            "sum": self.total,
+            "min": histogram.min_ms,
+            "max": histogram.max_ms,
+            "percentiles": {f"p{p:g}": value for p, value in histogram.percentiles(DEFAULT_PERCENTILES).items()},
+            "buckets": histogram.buckets(),
+        })
+        return point
+
+
 class TelemetryAdapter:
     """
     Adaptador para simplificar la integración con telemetría.
-    
+
     Proporciona una interfaz simplificada para registrar métricas, spans y eventos,
     con fallback a logging cuando la telemetría no está disponible.
     """
 
-    def __init__(self):
-        """Inicializa el adaptador de telemetría."""
+    def __init__(self,
+                 exporter: Optional[Any] = None,
+                 metric_exporter: Optional[Any] = None,
+                 head_sample_rate: Optional[float] = None,
+                 slow_span_ms: Optional[float] = None,
+                 buffer_size: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 export_interval: Optional[float] = None):
+        """
+        Inicializa el adaptador de telemetría.
+
+        Args:
+            exporter: Destino de los lotes de spans (por defecto, OpenTelemetry si la
+                telemetría está activada o el log)
+            metric_exporter: Destino de los instrumentos agregados (por defecto, el log)
+            head_sample_rate: Fracción de trazas conservadas sin mirar su resultado
+            slow_span_ms: Duración a partir de la cual una traza se conserva siempre
+            buffer_size: Capacidad del búfer circular de spans pendientes de exportar
+            batch_size: Spans por lote exportado
+            export_interval: Segundos entre volcados del exportador
+        """
         self.client = None
-        
+
         if TELEMETRY_AVAILABLE:
             try:
                 self.client = TelemetryClient.get_instance()
@@ -92,38 +291,165 @@ class TelemetryAdapter:
         else:
             logger.info("Telemetría no disponible, usando modo mock")
 
+        self.exporter = exporter or _default_span_exporter()
+        self.metric_exporter = metric_exporter or LoggingMetricExporter()
+        self.head_sample_rate = float(head_sample_rate if head_sample_rate is not None
+                                      else settings.telemetry_trace_sample_rate)
+        self.slow_span_ms = float(slow_span_ms if slow_span_ms is not None else settings.telemetry_slow_span_ms)
+        self.buffer_size = int(buffer_size or settings.telemetry_export_buffer_size)
+        self.batch_size = int(batch_size or settings.telemetry_export_batch_size)
+        self.export_interval = float(export_interval or settings.telemetry_export_interval)
+
+        # Trazas abiertas y decisiones ya tomadas (para hijos que terminan tarde)
+        self._traces: Dict[str, Dict[str, Any]] = {}
+        self._decisions: "OrderedDict[str, bool]" = OrderedDict()
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._instruments: Dict[MetricKey, MetricInstrument] = {}
+        self._lock = threading.Lock()
+        self._random = random.random
+        # Identificadores de traza baratos: prefijo aleatorio por proceso y contador
+        self._trace_prefix = uuid.uuid4().hex[:16]
+        self._trace_counter = itertools.count(1)
+        self._span_counter = itertools.count(1)
+
+        self._export_task: Optional[asyncio.Task] = None
+        self._export_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+
+        self.stats = {
+            "spans_started": 0,
+            "spans_ended": 0,
+            "traces_head_sampled": 0,
+            "traces_tail_retained": 0,
+            "traces_dropped": 0,
+            "spans_dropped_overflow": 0,
+            "spans_exported": 0,
+            "export_batches": 0,
+            "export_errors": 0,
+            "metric_records": 0,
+            "metric_flushes": 0,
+        }
+
+    # --- Spans ---
+
     def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Any:
         """
         Inicia un span para seguimiento de operaciones.
 
+        El span hereda la traza del span activo en el contexto; si no hay
+        ninguno abre una traza nueva y decide el muestreo de cabeza.
+
         Args:
             name: Nombre del span
             attributes: Atributos iniciales del span
 
         Returns:
-            Any: Objeto span o None si la telemetría no está disponible
+            Any: Span en proceso (diccionario con nombre, atributos y eventos)
         """
-        if self.client:
-            try:
-                return self.client.start_span(name, attributes or {})
-            except Exception as e:
-                logger.warning(f"Error al iniciar span '{name}': {e}")
-        
-        # Modo mock: retornar un diccionario simple
-        return {"name": name, "attributes": attributes or {}, "events": []}
+        parent = _active_span.get()
+        span = {"name": name, "attributes": dict(attributes) if attributes else {}, "events": []}
+        span["start"] = time.perf_counter()
+        span["start_time_ns"] = time.time_ns()
+        span["error"] = False
+        span["ended"] = False
+
+        with self._lock:
+            self.stats["spans_started"] += 1
+            trace = self._traces.get(parent["trace_id"]) if parent is not None and not parent["ended"] else None
+            if trace is None:
+                trace_id = f"{self._trace_prefix}{next(self._trace_counter):x}"
+                trace = {"spans": [], "open": 0, "keep": self._random() < self.head_sample_rate, "tail": False}
+                if len(self._traces) >= self.buffer_size:
+                    # Trazas con spans que nunca se cerraron: se descarta la más antigua
+                    self._traces.pop(next(iter(self._traces)))
+                    self.stats["traces_dropped"] += 1
+                self._traces[trace_id] = trace
+                if trace["keep"]:
+                    self.stats["traces_head_sampled"] += 1
+                span["parent"] = None
+            else:
+                trace_id = parent["trace_id"]
+                span["parent"] = parent
+            trace["open"] += 1
+            span_id = f"{next(self._span_counter):x}"
+        span["trace_id"] = trace_id
+        span["span_id"] = f"{self._trace_prefix}{span_id}"
+        span["parent_id"] = span["parent"]["span_id"] if span["parent"] is not None else None
+        _active_span.set(span)
+        return span
 
     def end_span(self, span: Any) -> None:
         """
         Finaliza un span.
 
+        Cuando se cierra el último span abierto de la traza se decide si se
+        conserva: por muestreo de cabeza, o por cola si algún span tuvo error
+        o superó ``slow_span_ms``.
+
         Args:
             span: Objeto span a finalizar
         """
-        if self.client and not isinstance(span, dict):
-            try:
-                self.client.end_span(span)
-            except Exception as e:
-                logger.warning(f"Error al finalizar span: {e}")
+        if not isinstance(span, dict) or span.get("ended", True):
+            return
+        span["ended"] = True
+        span["duration_ms"] = (time.perf_counter() - span["start"]) * 1000
+        if _active_span.get() is span:
+            parent = span["parent"]
+            _active_span.set(parent if parent is not None and not parent["ended"] else None)
+        span["parent"] = None
+
+        wake = False
+        with self._lock:
+            self.stats["spans_ended"] += 1
+            trace_id = span["trace_id"]
+            trace = self._traces.get(trace_id)
+            if trace is None:
+                # La traza ya se decidió: el span tardío sigue esa decisión
+                if self._decisions.get(trace_id):
+                    wake = self._enqueue([span])
+                return
+
+            trace["spans"].append(span)
+            if not trace["keep"] and (span["error"] or span["duration_ms"] >= self.slow_span_ms):
+                trace["keep"] = trace["tail"] = True
+            trace["open"] -= 1
+            if trace["open"] > 0:
+                return
+
+            del self._traces[trace_id]
+            self._decisions[trace_id] = trace["keep"]
+            if len(self._decisions) > self.buffer_size:
+                self._decisions.popitem(last=False)
+            if trace["keep"]:
+                if trace["tail"]:
+                    self.stats["traces_tail_retained"] += 1
+                # Por orden de inicio: los padres se exportan antes que sus hijos
+                wake = self._enqueue(sorted(trace["spans"], key=lambda item: item["start"]))
+            else:
+                self.stats["traces_dropped"] += 1
+
+        if wake:
+            self._wake_exporter()
+
+    def _enqueue(self, spans: List[Dict[str, Any]]) -> bool:
+        """Añade spans al búfer circular; devuelve True si hay un lote completo."""
+        for span in spans:
+            if len(self._buffer) >= self.buffer_size:
+                self._buffer.popleft()
+                self.stats["spans_dropped_overflow"] += 1
+            self._buffer.append({
+                "name": span["name"],
+                "trace_id": span["trace_id"],
+                "span_id": span["span_id"],
+                "parent_id": span["parent_id"],
+                "start_time_ns": span["start_time_ns"],
+                "end_time_ns": span["start_time_ns"] + int(span["duration_ms"] * 1_000_000),
+                "duration_ms": span["duration_ms"],
+                "error": span["error"],
+                "attributes": span["attributes"],
+                "events": span["events"],
+            })
+        return len(self._buffer) >= self.batch_size
 
     def set_span_attribute(self, span: Any, key: str, value: Any) -> None:
         """
@@ -134,14 +460,10 @@ class TelemetryAdapter:
             key: Clave del atributo
             value: Valor del atributo
         """
-        if self.client and not isinstance(span, dict):
-            try:
-                self.client.set_span_attribute(span, key, value)
-            except Exception as e:
-                logger.warning(f"Error al establecer atributo '{key}' en span: {e}")
-        elif isinstance(span, dict):
-            # Modo mock: actualizar diccionario
+        if isinstance(span, dict):
             span["attributes"][key] = value
+            if key == "error":
+                span["error"] = True
 
     def add_span_event(self, span: Any, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -152,14 +474,8 @@ class TelemetryAdapter:
             name: Nombre del evento
             attributes: Atributos del evento
         """
-        if self.client and not isinstance(span, dict):
-            try:
-                self.client.add_span_event(span, name, attributes or {})
-            except Exception as e:
-                logger.warning(f"Error al añadir evento '{name}' a span: {e}")
-        elif isinstance(span, dict):
-            # Modo mock: añadir a lista de eventos
-            span["events"].append({"name": name, "attributes": attributes or {}})
+        if isinstance(span, dict):
+            span["events"].append({"name": name, "attributes": attributes or {}, "timestamp_ns": time.time_ns()})
 
     def record_exception(self, span: Any, exception: Exception) -> None:
         """
@@ -169,21 +485,28 @@ class TelemetryAdapter:
             span: Objeto span
             exception: Excepción a registrar
         """
-        if self.client and not isinstance(span, dict):
-            try:
-                self.client.record_exception(span, exception)
-            except Exception as e:
-                logger.warning(f"Error al registrar excepción en span: {e}")
-        elif isinstance(span, dict):
-            # Modo mock: añadir como evento
+        if isinstance(span, dict):
+            span["error"] = True
             span["events"].append({
                 "name": "exception",
                 "attributes": {
                     "exception.type": type(exception).__name__,
                     "exception.message": str(exception)
-                }
+                },
+                "timestamp_ns": time.time_ns()
             })
 
+    # --- Métricas ---
+
+    def _record(self, kind: str, name: str, value: Union[int, float], attributes: Optional[Dict[str, Any]]) -> None:
+        key = (kind, name, tuple(sorted(attributes.items())) if attributes else ())
+        with self._lock:
+            instrument = self._instruments.get(key)
+            if instrument is None:
+                instrument = self._instruments[key] = MetricInstrument(kind, name, dict(attributes or {}))
+            instrument.add(value)
+            self.stats["metric_records"] += 1
+
     def record_metric(self, name: str, value: Union[int, float], attributes: Optional[Dict[str, Any]] = None) -> None:
         """
         Registra una métrica.
@@ -193,15 +516,7 @@ class TelemetryAdapter:
             value: Valor de la métrica
             attributes: Atributos de la métrica
         """
-        if self.client:
-            try:
-                self.client.record_metric(name, value, attributes or {})
-            except Exception as e:
-                logger.warning(f"Error al registrar métrica '{name}': {e}")
-        else:
-            # Modo mock: registrar en log
-            attr_str = ", ".join(f"{k}={v}" for k, v in (attributes or {}).items())
-            logger.info(f"METRIC: {name} = {value} {{{attr_str}}}")
+        self._record("metric", name, value, attributes)
 
     def record_counter(self, name: str, increment: int = 1, attributes: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -212,15 +527,7 @@ class TelemetryAdapter:
             increment: Valor a incrementar
             attributes: Atributos del contador
         """
-        if self.client:
-            try:
-                self.client.record_counter(name, increment, attributes or {})
-            except Exception as e:
-                logger.warning(f"Error al incrementar contador '{name}': {e}")
-        else:
-            # Modo mock: registrar en log
-            attr_str = ", ".join(f"{k}={v}" for k, v in (attributes or {}).items())
-            logger.info(f"COUNTER: {name} += {increment} {{{attr_str}}}")
+        self._record("counter", name, increment, attributes)
 
     def record_histogram(self, name: str, value: Union[int, float], attributes: Optional[Dict[str, Any]] = None) -> None:
         """
@@ -231,15 +538,120 @@ class TelemetryAdapter:
             value: Valor a registrar
             attributes: Atributos del histograma
         """
-        if self.client:
+        self._record("histogram", name, value, attributes)
+
+    def flush_metrics(self) -> int:
+        """
+        Envía los instrumentos agregados desde el último volcado.
+
+        Los contadores se envían como su suma; las métricas y los histogramas
+        con su recuento, extremos, percentiles y cubetas.
+
+        Returns:
+            int: Instrumentos enviados
+        """
+        with self._lock:
+            instruments, self._instruments = self._instruments, {}
+            self.stats["metric_flushes"] += 1
+
+        if instruments:
             try:
-                self.client.record_histogram(name, value, attributes or {})
+                self.metric_exporter.export([instrument.to_point() for instrument in instruments.values()])
             except Exception as e:
-                logger.warning(f"Error al registrar histograma '{name}': {e}")
-        else:
-            # Modo mock: registrar en log
-            attr_str = ", ".join(f"{k}={v}" for k, v in (attributes or {}).items())
-            logger.info(f"HISTOGRAM: {name} = {value} {{{attr_str}}}")
+                logger.warning(f"Error al exportar {len(instruments)} métricas: {e}")
+        return len(instruments)
+
+    # --- Exportación ---
+
+    def export_pending(self) -> int:
+        """
+        Exporta por lotes los spans del búfer de forma síncrona.
+
+        Returns:
+            int: Spans exportados
+        """
+        exported = 0
+        while True:
+            with self._lock:
+                if not self._buffer:
+                    break
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                self.exporter.export(batch)
+                exported += len(batch)
+                self.stats["spans_exported"] += len(batch)
+                self.stats["export_batches"] += 1
+            except Exception as e:
+                self.stats["export_errors"] += 1
+                logger.warning(f"Error al exportar {len(batch)} spans: {e}")
+        return exported
+
+    async def flush(self) -> None:
+        """Exporta los spans pendientes y vuelca las métricas sin bloquear el bucle."""
+        await asyncio.to_thread(self.export_pending)
+        await asyncio.to_thread(self.flush_metrics)
+
+    def start_exporter(self) -> None:
+        """Arranca el exportador por lotes en el bucle de eventos actual."""
+        if self._export_task is not None and not self._export_task.done():
+            return
+        self._export_loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._export_task = asyncio.create_task(self._export_loop_run())
+        logger.info("Exportador de telemetría por lotes iniciado")
+
+    async def stop_exporter(self) -> None:
+        """Detiene el exportador y vuelca lo pendiente."""
+        task, self._export_task = self._export_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._export_loop = None
+        await self.flush()
+
+    def _wake_exporter(self) -> None:
+        loop, wake = self._export_loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            if asyncio.get_running_loop() is loop:
+                wake.set()
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(wake.set)
+
+    async def _export_loop_run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.export_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error en el exportador de telemetría: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del pipeline de telemetría.
+
+        Returns:
+            Dict[str, Any]: Contadores, trazas abiertas, spans en búfer e instrumentos
+        """
+        with self._lock:
+            return {
+                **self.stats,
+                "open_traces": len(self._traces),
+                "buffered_spans": len(self._buffer),
+                "instruments": len(self._instruments),
+                "head_sample_rate": self.head_sample_rate,
+                "slow_span_ms": self.slow_span_ms,
+            }
 
     def get_tracer(self, name: str) -> Any:
         """
@@ -256,7 +668,7 @@ class TelemetryAdapter:
                 return self.client.get_tracer(name)
             except Exception as e:
                 logger.warning(f"Error al obtener tracer '{name}': {e}")
-        
+
         # Modo mock: retornar None
         return None
 
@@ -275,6 +687,6 @@ class TelemetryAdapter:
                 return self.client.get_meter(name)
             except Exception as e:
                 logger.warning(f"Error al obtener meter '{name}': {e}")
-        
+
         # Modo mock: retornar None
         return None
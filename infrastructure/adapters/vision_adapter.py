@@ -12,6 +12,7 @@ import logging
 import os
 from typing import Any, Dict, List, Optional, Union
 
+from core.image_handle import ImageHandle
 from core.logging_config import get_logger
 from infrastructure.adapters.telemetry_adapter import get_telemetry_adapter, measure_execution_time
 from clients.vertex_ai.vision_client import vision_client
@@ -89,7 +90,7 @@ class VisionAdapter:
     @measure_execution_time("vision_adapter.analyze_image")
     async def analyze_image(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         analysis_type: str = "full",
         max_results: int = 10
     ) -> Dict[str, Any]:
@@ -157,7 +158,7 @@ class VisionAdapter:
     @measure_execution_time("vision_adapter.detect_objects")
     async def detect_objects(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         max_results: int = 10
     ) -> Dict[str, Any]:
         """
@@ -215,7 +216,7 @@ class VisionAdapter:
     @measure_execution_time("vision_adapter.detect_text")
     async def detect_text(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]]
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]]
     ) -> Dict[str, Any]:
         """
         Detecta texto en una imagen.
@@ -268,7 +269,7 @@ class VisionAdapter:
     @measure_execution_time("vision_adapter.detect_faces")
     async def detect_faces(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         max_results: int = 10
     ) -> Dict[str, Any]:
         """
@@ -326,7 +327,7 @@ class VisionAdapter:
     @measure_execution_time("vision_adapter.generate_description")
     async def generate_description(
         self,
-        image_data: Union[str, bytes, Dict[str, Any]],
+        image_data: Union[ImageHandle, str, bytes, Dict[str, Any]],
         prompt: str = "Describe detalladamente esta imagen",
         temperature: float = 0.2,
         max_output_tokens: Optional[int] = 1024
@@ -393,7 +394,7 @@ class VisionAdapter:
         finally:
             telemetry_adapter.end_span(span)
     
-    async def _process_image_input(self, image_data: Union[str, bytes, Dict[str, Any]]) -> Union[str, bytes]:
+    async def _process_image_input(self, image_data: Union[ImageHandle, str, bytes, Dict[str, Any]]) -> Union[str, bytes]:
         """
         Procesa la entrada de imagen en diferentes formatos.
         
@@ -403,6 +404,10 @@ class VisionAdapter:
         Returns:
             Union[str, bytes]: Datos de imagen procesados
         """
+        # Un handle ya resuelto comparte sus bytes con los demás análisis
+        if isinstance(image_data, ImageHandle):
+            return image_data.data
+        
         # Si ya es bytes o base64, devolver directamente
         if isinstance(image_data, bytes) or (isinstance(image_data, str) and "base64" in image_data):
             return image_data
@@ -5,12 +5,14 @@ Este módulo proporciona funcionalidades para verificar el estado de la aplicaci
 y sus dependencias, incluyendo endpoints de health check para Kubernetes.
 """
 
+import asyncio
 import time
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 
 # Local imports
 from core.logging_config import configure_logging
+from core.settings import settings
 from clients.supabase_client import SupabaseClient
 from clients.vertex_ai import vertex_ai_client
 from infrastructure.a2a_optimized import a2a_server as a2a_optimized_server
@@ -28,31 +30,77 @@ class HealthCheck:
     
     Esta clase proporciona métodos para verificar el estado de la aplicación
     y sus dependencias, incluyendo endpoints de health check para Kubernetes.
+    
+    Las dependencias se verifican en paralelo, cada una con su propio timeout,
+    y el resultado se guarda en una instantánea que una tarea en segundo plano
+    refresca periódicamente. Las sondas de readiness responden desde esa
+    instantánea (indicando su antigüedad) y solo fuerzan una verificación
+    cuando no existe o supera ``max_staleness``.
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        check_timeout: Optional[float] = None,
+        refresh_interval: Optional[float] = None,
+        max_staleness: Optional[float] = None
+    ):
         """
         Inicializa el gestor de health checks.
+        
+        Args:
+            check_timeout: Timeout por defecto de cada verificación (segundos).
+            refresh_interval: Intervalo de refresco en segundo plano (segundos).
+            max_staleness: Antigüedad máxima de la instantánea antes de forzar
+                una verificación en la propia sonda (segundos).
         """
-        self.dependencies = []
+        self.dependencies: Dict[str, Dict[str, Any]] = {}
         self.startup_checks_passed = False
         self.startup_check_time = None
+        
+        self.check_timeout = check_timeout if check_timeout is not None else settings.health_check_timeout
+        self.refresh_interval = refresh_interval if refresh_interval is not None else settings.health_refresh_interval
+        self.max_staleness = max_staleness if max_staleness is not None else settings.health_max_staleness
+        
+        # Última instantánea de readiness y refresco en curso (compartido entre sondas)
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        
+        self.stats = {
+            "refreshes": 0,
+            "probe_refreshes": 0,
+            "snapshot_reads": 0,
+            "timeouts": 0,
+            "errors": 0
+        }
     
-    def register_dependency(self, name: str, check_func: callable, critical: bool = True) -> None:
+    def register_dependency(
+        self,
+        name: str,
+        check_func: callable,
+        critical: bool = True,
+        timeout: Optional[float] = None
+    ) -> None:
         """
         Registra una dependencia para verificar en los health checks.
         
+        Registrar de nuevo un nombre existente sustituye la verificación anterior.
+        
         Args:
             name: Nombre de la dependencia.
             check_func: Función que verifica el estado de la dependencia.
                 Debe devolver un tuple (bool, str) con el estado y un mensaje.
             critical: Si la dependencia es crítica para la aplicación.
+            timeout: Timeout de la verificación (por defecto ``check_timeout``).
         """
-        self.dependencies.append({
+        self.dependencies[name] = {
             "name": name,
             "check": check_func,
-            "critical": critical
-        })
+            "critical": critical,
+            "timeout": timeout
+        }
+        # La instantánea anterior no incluye la nueva verificación
+        self._snapshot = None
         logger.info(f"Dependencia registrada para health check: {name} (crítica: {critical})")
     
     async def check_liveness(self) -> Tuple[bool, Dict[str, Any]]:
@@ -73,52 +121,137 @@ class HealthCheck:
             "timestamp": time.time()
         }
     
-    async def check_readiness(self) -> Tuple[bool, Dict[str, Any]]:
+    async def _run_check(self, dep: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ejecuta la verificación de una dependencia con su timeout.
+        
+        Args:
+            dep: Dependencia registrada.
+            
+        Returns:
+            Dict[str, Any]: Resultado de la verificación.
+        """
+        timeout = dep["timeout"] if dep["timeout"] is not None else self.check_timeout
+        start = time.perf_counter()
+        try:
+            is_ok, message = await asyncio.wait_for(dep["check"](), timeout=timeout)
+            status = "UP" if is_ok else "DOWN"
+        except asyncio.TimeoutError:
+            is_ok, status = False, "TIMEOUT"
+            message = f"La verificación superó el timeout de {timeout}s"
+            self.stats["timeouts"] += 1
+            logger.warning(f"Timeout verificando dependencia {dep['name']} ({timeout}s)")
+        except Exception as e:
+            is_ok, status, message = False, "ERROR", str(e)
+            self.stats["errors"] += 1
+            logger.exception(f"Error verificando dependencia {dep['name']}")
+        
+        return {
+            "name": dep["name"],
+            "status": status,
+            "critical": dep["critical"],
+            "message": message,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            "ok": is_ok
+        }
+    
+    async def refresh(self) -> Dict[str, Any]:
+        """
+        Verifica todas las dependencias en paralelo y actualiza la instantánea.
+        
+        Las llamadas concurrentes comparten el mismo refresco en curso, que se
+        ejecuta en su propia tarea: cancelar una sonda no cancela el refresco.
+        
+        Returns:
+            Dict[str, Any]: Instantánea actualizada.
+        """
+        task = self._inflight
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._refresh_now())
+            self._inflight = task
+        return await asyncio.shield(task)
+    
+    async def _refresh_now(self) -> Dict[str, Any]:
+        results = await asyncio.gather(*(self._run_check(dep) for dep in list(self.dependencies.values())))
+        dependency_results = []
+        all_critical_ok = True
+        for result in results:
+            if not result.pop("ok") and result["critical"]:
+                all_critical_ok = False
+            dependency_results.append(result)
+        
+        snapshot = {
+            "ready": all_critical_ok,
+            "checked_at": time.time(),
+            "checked_monotonic": time.monotonic(),
+            "dependencies": dependency_results
+        }
+        self._snapshot = snapshot
+        self.stats["refreshes"] += 1
+        return snapshot
+    
+    async def check_readiness(self, max_staleness: Optional[float] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         Verifica si la aplicación está lista para recibir tráfico.
         
         Este método verifica si la aplicación y sus dependencias críticas
-        están listas para procesar solicitudes.
+        están listas para procesar solicitudes. Responde desde la última
+        instantánea salvo que no exista o sea más antigua que ``max_staleness``.
+        
+        Args:
+            max_staleness: Antigüedad máxima aceptada (por defecto la configurada).
         
         Returns:
             Tuple[bool, Dict[str, Any]]: Estado de la aplicación y detalles.
         """
-        dependency_results = []
-        all_critical_ok = True
+        limit = self.max_staleness if max_staleness is None else max_staleness
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot["checked_monotonic"] > limit:
+            self.stats["probe_refreshes"] += 1
+            snapshot = await self.refresh()
+        else:
+            self.stats["snapshot_reads"] += 1
         
-        # Verificar cada dependencia
-        for dep in self.dependencies:
-            try:
-                is_ok, message = await dep["check"]()
-                
-                if not is_ok and dep["critical"]:
-                    all_critical_ok = False
-                
-                dependency_results.append({
-                    "name": dep["name"],
-                    "status": "UP" if is_ok else "DOWN",
-                    "critical": dep["critical"],
-                    "message": message
-                })
-            except Exception as e:
-                logger.exception(f"Error verificando dependencia {dep['name']}")
-                
-                if dep["critical"]:
-                    all_critical_ok = False
-                
-                dependency_results.append({
-                    "name": dep["name"],
-                    "status": "ERROR",
-                    "critical": dep["critical"],
-                    "message": str(e)
-                })
-        
-        return all_critical_ok, {
-            "status": "READY" if all_critical_ok else "NOT_READY",
+        staleness = time.monotonic() - snapshot["checked_monotonic"]
+        return snapshot["ready"], {
+            "status": "READY" if snapshot["ready"] else "NOT_READY",
             "timestamp": time.time(),
-            "dependencies": dependency_results
+            "checked_at": snapshot["checked_at"],
+            "staleness_seconds": round(staleness, 3),
+            # Más antigua que un ciclo de refresco completo: el refresco va con retraso
+            "stale": staleness > self.refresh_interval + self.check_timeout,
+            "dependencies": snapshot["dependencies"]
         }
     
+    async def _refresh_loop(self) -> None:
+        """Refresca la instantánea periódicamente."""
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refrescando health checks: {e}")
+            await asyncio.sleep(self.refresh_interval)
+    
+    def start_background_refresh(self) -> None:
+        """Inicia el refresco periódico de la instantánea en segundo plano."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+        logger.info(f"Refresco de health checks en segundo plano cada {self.refresh_interval}s")
+    
+    async def stop_background_refresh(self) -> None:
+        """Detiene el refresco periódico en segundo plano."""
+        task, self._refresh_task = self._refresh_task, None
+        if task is None or task.done():
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
     async def check_startup(self) -> Tuple[bool, Dict[str, Any]]:
         """
         Verifica si la aplicación se ha inicializado correctamente.
@@ -238,6 +371,12 @@ class HealthCheck:
             "system": {
                 "timestamp": time.time(),
                 "environment": "production"
+            },
+            "health_checks": {
+                **self.stats,
+                "refresh_interval": self.refresh_interval,
+                "max_staleness": self.max_staleness,
+                "background_refresh": self._refresh_task is not None and not self._refresh_task.done()
             }
         }
 
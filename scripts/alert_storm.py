@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tormenta sintética de alertas: tiempo hasta la remediación.
+
+Genera ráfagas de alertas duplicadas de varios incidentes (intercaladas, como
+llegan de Alertmanager durante un incidente) y mide, para cada incidente, el
+tiempo desde su primera alerta hasta que termina su runbook. Compara:
+
+- ``legacy``: réplica del manejador anterior (una cola, un worker, sin
+  deduplicación; cada alerta ejecuta su runbook completo);
+- ``current``: ``AlertProcessor`` con deduplicación por huella, pool de
+  workers y concurrencia por runbook.
+
+Los runbooks se simulan con una latencia fija para aislar el efecto de la
+planificación.
+
+Uso:
+    python scripts/alert_storm.py --incidents 6 --alerts-per-incident 100 --runbook-latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.handlers.alert_handler import ALERT_RUNBOOK_MAPPING, AlertProcessor, enrich_alert, fingerprint_alert
+from core.latency_histogram import LatencyHistogram
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("alert-storm")
+
+
+class SimulatedRunbookExecutor:
+    """Ejecutor de runbooks con latencia fija que anota cuándo termina cada incidente."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.executions = 0
+        self.completed_at: Dict[str, float] = {}
+
+    async def execute_runbook(self, runbook_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        self.executions += 1
+        await asyncio.sleep(self.latency)
+        fingerprint = fingerprint_alert(context["alert"])
+        self.completed_at.setdefault(fingerprint, time.perf_counter())
+        return {"runbook_id": runbook_id, "status": "completed", "execution_id": f"{runbook_id}-{self.executions}"}
+
+
+async def build_storm(incidents: int, alerts_per_incident: int) -> List[Dict[str, Any]]:
+    """Alertas enriquecidas de ``incidents`` incidentes intercaladas."""
+    alert_types = list(ALERT_RUNBOOK_MAPPING)
+    storm = []
+    for index in range(alerts_per_incident):
+        for incident in range(incidents):
+            storm.append(await enrich_alert({
+                "type": alert_types[incident % len(alert_types)],
+                "service": f"service-{incident}",
+                "summary": f"Alerta {index} del incidente {incident}",
+            }))
+    return storm
+
+
+async def run_legacy(storm: List[Dict[str, Any]], executor: SimulatedRunbookExecutor) -> None:
+    """Réplica del manejador anterior: una cola y un único worker secuencial."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for alert in storm:
+        queue.put_nowait(alert)
+    while not queue.empty():
+        alert = queue.get_nowait()
+        await executor.execute_runbook(alert["runbook_id"], {"alert": alert})
+
+
+async def run_current(storm: List[Dict[str, Any]], executor: SimulatedRunbookExecutor,
+                      workers: int, runbook_concurrency: int) -> Dict[str, Any]:
+    """Procesa la tormenta con ``AlertProcessor``."""
+    processor = AlertProcessor(executor, max_workers=workers, runbook_concurrency=runbook_concurrency,
+                               dedup_window=300.0)
+    for alert in storm:
+        processor.submit(alert)
+    await processor.wait_idle()
+    await processor.stop()
+    return processor.get_stats()
+
+
+async def run_storm(incidents: int, alerts_per_incident: int, runbook_latency: float,
+                    workers: int, runbook_concurrency: int) -> Dict[str, Any]:
+    """
+    Ejecuta la tormenta en ambos modos.
+
+    Args:
+        incidents: Incidentes distintos
+        alerts_per_incident: Alertas duplicadas por incidente
+        runbook_latency: Duración simulada de cada runbook (segundos)
+        workers: Workers del procesador actual
+        runbook_concurrency: Ejecuciones simultáneas por runbook
+
+    Returns:
+        Dict[str, Any]: Tiempo hasta la remediación y ejecuciones por modo
+    """
+    storm = await build_storm(incidents, alerts_per_incident)
+    results: Dict[str, Any] = {}
+    for mode in ("legacy", "current"):
+        executor = SimulatedRunbookExecutor(runbook_latency)
+        start = time.perf_counter()
+        if mode == "legacy":
+            await run_legacy(storm, executor)
+            extra: Dict[str, Any] = {}
+        else:
+            stats = await run_current(storm, executor, workers, runbook_concurrency)
+            extra = {"deduplicated": stats["deduplicated"]}
+        elapsed = time.perf_counter() - start
+
+        histogram = LatencyHistogram()
+        for completed_at in executor.completed_at.values():
+            histogram.record((completed_at - start) * 1000)
+        results[mode] = {
+            "elapsed_s": round(elapsed, 3),
+            "runbook_executions": executor.executions,
+            "time_to_remediation_ms": histogram.summary(),
+            **extra,
+        }
+
+    return {
+        "incidents": incidents,
+        "alerts": len(storm),
+        "runbook_latency_s": runbook_latency,
+        "workers": workers,
+        "runbook_concurrency": runbook_concurrency,
+        "modes": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tormenta sintética de alertas")
+    parser.add_argument("--incidents", type=int, default=6, help="Incidentes distintos")
+    parser.add_argument("--alerts-per-incident", type=int, default=100, help="Alertas duplicadas por incidente")
+    parser.add_argument("--runbook-latency", type=float, default=0.2, help="Duración de cada runbook (s)")
+    parser.add_argument("--workers", type=int, default=4, help="Workers del procesador actual")
+    parser.add_argument("--runbook-concurrency", type=int, default=1, help="Ejecuciones simultáneas por runbook")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_storm(args.incidents, args.alerts_per_incident, args.runbook_latency,
+                                    args.workers, args.runbook_concurrency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque en frío del registro de agentes.
+
+Compara la carga perezosa (manifiesto + construcción en el primer uso) con la
+carga completa al inicio. Cada modo se ejecuta en un proceso nuevo para medir:
+
+- import_time: tiempo de importar el router de agentes (y, en modo completo,
+  de construir todos los agentes);
+- time_to_first_request: tiempo hasta tener el agente de la primera petición;
+- rss_mb: memoria residente del proceso tras la primera petición.
+
+Uso:
+    python scripts/benchmark_agent_startup.py --agent recovery_corrective --runs 3
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+
+def _rss_mb() -> float:
+    """Memoria residente actual del proceso en MB."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024) if sys.platform == "darwin" else max_rss / 1024
+
+
+def run_child(mode: str, agent_id: str) -> Dict[str, Any]:
+    """
+    Mide un arranque en el proceso actual.
+
+    Args:
+        mode: "lazy" o "eager"
+        agent_id: Agente de la primera petición
+
+    Returns:
+        Dict[str, Any]: Tiempos, memoria y agentes cargados
+    """
+    os.environ["AGENT_LAZY_LOADING"] = "True" if mode == "lazy" else "False"
+
+    start = time.perf_counter()
+    from app.routers import agents as agents_router
+    if mode == "eager":
+        agents_router.get_agents()
+    import_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    agents_router.list_agent_metadata()
+    agents_router.get_agent(agent_id)
+    first_request = time.perf_counter() - start
+
+    stats = agents_router.agent_registry.get_stats()
+    return {
+        "import_time": import_time,
+        "time_to_first_request": first_request,
+        "startup_to_first_request": import_time + first_request,
+        "rss_mb": _rss_mb(),
+        "agents_loaded": len(stats["loaded"]),
+        "modules_loaded": len(sys.modules),
+    }
+
+
+def run_mode(mode: str, agent_id: str, runs: int) -> Dict[str, Any]:
+    """
+    Ejecuta varios arranques de un modo en procesos nuevos y resume las medidas.
+
+    Args:
+        mode: "lazy" o "eager"
+        agent_id: Agente de la primera petición
+        runs: Número de procesos
+
+    Returns:
+        Dict[str, Any]: Mediana de cada medida
+    """
+    samples: List[Dict[str, Any]] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, "--agent", agent_id],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        key: round(statistics.median(sample[key] for sample in samples), 4)
+        for key in samples[0]
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío del registro de agentes")
+    parser.add_argument("--agent", default="recovery_corrective", help="Agente de la primera petición")
+    parser.add_argument("--runs", type=int, default=3, help="Arranques por modo")
+    parser.add_argument("--child", choices=["lazy", "eager"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.agent)))
+        return
+
+    results = {
+        "agent": args.agent,
+        "runs": args.runs,
+        "lazy": run_mode("lazy", args.agent, args.runs),
+        "eager": run_mode("eager", args.agent, args.runs),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
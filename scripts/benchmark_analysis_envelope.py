@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark de llamadas al modelo por turno con y sin sobre de análisis.
+
+Simula turnos de usuario enrutados por el orquestador al agente
+RecoveryCorrective con clientes simulados (sin red). Para cada turno el
+orquestador clasifica el texto una vez; sin sobre, el agente vuelve a
+clasificarlo en su ``process_message``, y con sobre reutiliza el análisis del
+orquestador. Las skills se sustituyen por un doble que no llama al modelo, de
+modo que solo se cuentan las llamadas de clasificación y extracción.
+
+Uso:
+    python scripts/benchmark_analysis_envelope.py --turns 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, List
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from agents.recovery_corrective.agent import RecoveryCorrective
+from app.schemas.a2a import A2ATaskContext
+from core.analysis_envelope import AnalysisEnvelope
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("analysis-envelope-benchmark")
+
+# Turnos de ejemplo: texto, intención del orquestador y entidades reconocidas
+TURNS: List[Dict[str, Any]] = [
+    {
+        "text": "Me despierto varias veces por la noche y no descanso",
+        "intent": "sleep_coach",
+        "entities": [{"entity_type": "sleep_issue", "value": "despertares nocturnos"}],
+    },
+    {
+        "text": "Tengo dolor en la espalda baja desde hace meses",
+        "intent": "pain",
+        "entities": [
+            {"entity_type": "pain_location", "value": "espalda baja"},
+            {"entity_type": "pain_duration", "value": "meses"},
+        ],
+    },
+    {
+        "text": "¿Cómo evito lesiones cuando salgo a correr?",
+        "intent": "injury_prevention",
+        "entities": [{"entity_type": "activity", "value": "correr"}],
+    },
+    {
+        "text": "Quiero mejorar la movilidad de cadera y hombros",
+        "intent": "mobility",
+        "entities": [
+            {"entity_type": "body_part", "value": "cadera"},
+            {"entity_type": "body_part", "value": "hombros"},
+        ],
+    },
+]
+
+
+class CountingModel:
+    """Cliente de modelo simulado que cuenta las llamadas."""
+
+    def __init__(self, fused_analysis: bool = True):
+        self.fused_analysis = fused_analysis
+        self.calls = 0
+
+    async def generate_response(self, prompt: str, temperature: float = 0.7, **kwargs: Any) -> str:
+        self.calls += 1
+        return "general_recovery"
+
+    async def generate_structured_output(self, prompt: str, **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.fused_analysis:
+            return {"intent": "general_recovery"}
+        raise ValueError("análisis conjunto no disponible")
+
+
+class OrchestratorStub:
+    """Orquestador simulado: una llamada de clasificación por turno."""
+
+    def __init__(self, model: CountingModel):
+        self.model = model
+
+    async def analyze(self, turn: Dict[str, Any]) -> AnalysisEnvelope:
+        self.model.calls += 1
+        return AnalysisEnvelope.build(
+            query=turn["text"],
+            primary_intent=turn["intent"],
+            confidence=0.9,
+            entities=turn["entities"],
+            target_agents=["recovery_corrective"],
+        )
+
+
+def _create_agent(model: CountingModel) -> RecoveryCorrective:
+    with patch("agents.recovery_corrective.agent.GeminiClient", return_value=model), \
+         patch("agents.recovery_corrective.agent.ProgramClassificationService", return_value=MagicMock()):
+        agent = RecoveryCorrective()
+    agent.gemini_client = model
+
+    async def run_skill(skill_name: str, input_data: Any) -> Any:
+        return MagicMock(response=f"respuesta de {skill_name}")
+
+    agent.toolkit.run_skill = run_skill
+    return agent
+
+
+async def run_benchmark(turns: int, fused_analysis: bool) -> Dict[str, Any]:
+    """
+    Ejecuta los turnos sin y con sobre de análisis y cuenta las llamadas al modelo.
+
+    Args:
+        turns: Número de turnos de usuario
+        fused_analysis: Si el modelo simulado responde al análisis conjunto del agente
+
+    Returns:
+        Dict[str, Any]: Llamadas por turno en cada modo
+    """
+    results: Dict[str, Any] = {"turns": turns}
+
+    for mode in ("without_envelope", "with_envelope"):
+        model = CountingModel(fused_analysis=fused_analysis)
+        orchestrator = OrchestratorStub(model)
+        agent = _create_agent(model)
+
+        for i in range(turns):
+            turn = TURNS[i % len(TURNS)]
+            envelope = await orchestrator.analyze(turn)
+            context = A2ATaskContext(
+                user_id="benchmark",
+                analysis=envelope if mode == "with_envelope" else None,
+            ).model_dump(mode="json")
+            await agent.process_message(turn["text"], context=context)
+
+        results[mode] = {
+            "model_calls": model.calls,
+            "model_calls_per_turn": round(model.calls / turns, 2),
+        }
+
+    return results
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de llamadas al modelo por turno con sobre de análisis")
+    parser.add_argument("--turns", type=int, default=50, help="Número de turnos de usuario")
+    parser.add_argument(
+        "--no-fused-analysis",
+        action="store_true",
+        help="Simula que el análisis conjunto del agente falla (usa los prompts específicos)",
+    )
+    args = parser.parse_args()
+
+    results = await run_benchmark(args.turns, fused_analysis=not args.no_fused_analysis)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Efecto de la inyección de latencia en la latencia de cola de un servicio local.
+
+Arranca dos dependencias stub (FastAPI + uvicorn) en hosts de loopback
+distintos y lanza peticiones concurrentes a ambas con ``httpx.AsyncClient``
+sin keep-alive (cada petición abre conexión). Durante la medición se inyecta
+latencia solo en la primera dependencia y se compara:
+
+- ``baseline``: sin fallos;
+- ``legacy``: el parche anterior de ``socket.socket.connect`` con
+  ``time.sleep`` (congela el bucle y también retrasa a la dependencia sana);
+- ``async``: ``core.fault_injection`` en la frontera de ``httpx``
+  (solo esperan las peticiones a la dependencia afectada).
+
+El informe JSON incluye p50/p95/p99 de cada dependencia y el retraso máximo
+del bucle de eventos en cada modo.
+
+Uso:
+    python scripts/benchmark_chaos_injection.py --requests 400 --concurrency 32 --latency constant:50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.fault_injection import Fault, LatencyDistribution, fault_injector
+from core.latency_histogram import LatencyRegistry
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("chaos-injection-benchmark")
+
+REQUEST_METRIC = "chaos_benchmark.request"
+FAULTY_HOST = "127.0.0.1"
+HEALTHY_HOST = "127.0.0.2"
+
+
+def create_stub_app(latency: float) -> FastAPI:
+    """Dependencia simulada con latencia fija."""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping() -> Dict[str, Any]:
+        await asyncio.sleep(latency)
+        return {"ok": True}
+
+    return app
+
+
+def start_stub_server(app: FastAPI, host: str) -> uvicorn.Server:
+    """Arranca el servidor stub en un hilo y espera a que acepte conexiones."""
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    server.base_url = f"http://{host}:{port}"
+    return server
+
+
+def legacy_latency_patch(target_host: str, distribution: LatencyDistribution, rng: random.Random):
+    """Réplica del handler anterior: ``time.sleep`` dentro de ``socket.connect``."""
+    original_connect = socket.socket.connect
+
+    def delayed_connect(self, address):
+        if isinstance(address, tuple) and address[0] == target_host:
+            time.sleep(distribution.sample_ms(rng) / 1000.0)
+        return original_connect(self, address)
+
+    socket.socket.connect = delayed_connect
+    return original_connect
+
+
+async def _heartbeat(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    """Mide cuánto se retrasa el bucle de eventos respecto al intervalo esperado."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_mode(mode: str, urls: Dict[str, str], requests: int, concurrency: int,
+                   distribution: LatencyDistribution, seed: int) -> Dict[str, Any]:
+    """
+    Ejecuta la carga en un modo y devuelve sus métricas.
+
+    Args:
+        mode: ``baseline``, ``legacy`` o ``async``
+        urls: URL base de cada dependencia ("faulty" y "healthy")
+        requests: Peticiones totales (repartidas entre ambas dependencias)
+        concurrency: Corrutinas concurrentes
+        distribution: Latencia inyectada en la dependencia afectada
+        seed: Semilla de los sorteos
+
+    Returns:
+        Dict[str, Any]: Latencias por dependencia y retraso del bucle
+    """
+    latencies = LatencyRegistry()
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait("faulty" if index % 2 == 0 else "healthy")
+
+    limits = httpx.Limits(max_keepalive_connections=0)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        async def worker() -> None:
+            while not queue.empty():
+                dependency = queue.get_nowait()
+                start = time.perf_counter()
+                response = await client.get(f"{urls[dependency]}/ping")
+                response.raise_for_status()
+                latencies.record(REQUEST_METRIC, (time.perf_counter() - start) * 1000, dependency=dependency)
+
+        original_connect = None
+        fault = Fault(boundary="http", targets=(FAULTY_HOST,), latency=distribution)
+        if mode == "legacy":
+            original_connect = legacy_latency_patch(FAULTY_HOST, distribution, random.Random(seed))
+        elif mode == "async":
+            fault_injector.seed(seed)
+            fault_injector.add(fault)
+
+        stop = asyncio.Event()
+        lags: List[float] = []
+        heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        finally:
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await heartbeat
+            if original_connect is not None:
+                socket.socket.connect = original_connect
+            fault_injector.remove(fault.fault_id)
+
+    by_dependency = latencies.summary(REQUEST_METRIC, group_by="dependency")
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        "max_loop_lag_ms": round(max(lags, default=0.0) * 1000, 1),
+        "latency_ms": by_dependency,
+    }
+
+
+async def run_benchmark(requests: int, concurrency: int, latency: str, server_latency: float,
+                        seed: int) -> Dict[str, Any]:
+    """
+    Ejecuta los tres modos contra las mismas dependencias.
+
+    Args:
+        requests: Peticiones por modo
+        concurrency: Corrutinas concurrentes
+        latency: Especificación de la latencia inyectada
+        server_latency: Latencia propia de cada dependencia (segundos)
+        seed: Semilla de los sorteos
+
+    Returns:
+        Dict[str, Any]: Informe por modo
+    """
+    distribution = LatencyDistribution.parse(latency)
+    servers = {
+        "faulty": start_stub_server(create_stub_app(server_latency), FAULTY_HOST),
+        "healthy": start_stub_server(create_stub_app(server_latency), HEALTHY_HOST),
+    }
+    urls = {name: server.base_url for name, server in servers.items()}
+    try:
+        # Calentamiento: importaciones y primeras conexiones fuera de la medición
+        await run_mode("baseline", urls, concurrency, concurrency, distribution, seed)
+        modes = [await run_mode(mode, urls, requests, concurrency, distribution, seed)
+                 for mode in ("baseline", "legacy", "async")]
+    finally:
+        for server in servers.values():
+            server.should_exit = True
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "injected_latency": latency,
+        "server_latency_ms": server_latency * 1000,
+        "modes": {result.pop("mode"): result for result in modes},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Latencia de cola con inyección de fallos bloqueante y asíncrona")
+    parser.add_argument("--requests", type=int, default=400, help="Peticiones por modo")
+    parser.add_argument("--concurrency", type=int, default=32, help="Corrutinas concurrentes")
+    parser.add_argument("--latency", default="constant:50", help="Latencia inyectada (tipo:mediana_ms[:dispersión])")
+    parser.add_argument("--server-latency", type=float, default=0.005, help="Latencia propia de las dependencias (s)")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los sorteos")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.requests, args.concurrency, args.latency,
+                                        args.server_latency, args.seed))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
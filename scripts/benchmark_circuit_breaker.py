@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark del sobrecoste por llamada del circuit breaker.
+
+Compara ``core.circuit_breaker.CircuitBreaker`` con una réplica de la
+implementación anterior (``asyncio.Lock`` adquirido dos veces por llamada,
+ventana en lista recortada con ``pop(0)`` y recorrida con ``count(False)``, y
+el mismo histograma de latencia). El coste de la ventana anterior crece con
+``--window-size``; el de la actual no depende de él.
+
+Lanza muchas corrutinas concurrentes que llaman a una función trivial a
+través del breaker y resta el tiempo de la misma carga sin breaker.
+
+Uso:
+    python scripts/benchmark_circuit_breaker.py --concurrency 1000 --calls 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.circuit_breaker import CircuitBreaker, CircuitBreakerConfig
+from core.latency_histogram import LatencyHistogram
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("circuit-breaker-benchmark")
+
+
+class LegacyCircuitBreaker:
+    """Réplica del camino de llamada del circuit breaker anterior (solo estado cerrado)."""
+
+    def __init__(self, window_size: int):
+        self.window_size = window_size
+        self.results_window: List[bool] = []
+        self.lock = asyncio.Lock()
+        self.latency = LatencyHistogram()
+        self.avg_response_time = 0.0
+        self.total_calls = 0
+        self.successful_calls = 0
+
+    async def execute(self, func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        async with self.lock:
+            pass
+        start_time = time.time()
+        result = await func(*args, **kwargs)
+        async with self.lock:
+            self.successful_calls += 1
+            self.total_calls += 1
+            self.latency.record((time.time() - start_time) * 1000)
+            self.avg_response_time = self.latency.mean_ms / 1000
+            self.results_window.append(True)
+            if len(self.results_window) > self.window_size:
+                self.results_window.pop(0)
+            # El breaker anterior evaluaba la tasa de fallos sobre la lista
+            _ = self.results_window.count(False) / len(self.results_window)
+        return result
+
+
+async def _call() -> int:
+    # Cede el control como haría una llamada real a un servicio
+    await asyncio.sleep(0)
+    return 1
+
+
+async def _run_load(execute: Callable[..., Awaitable[Any]], concurrency: int, calls: int) -> float:
+    async def worker() -> None:
+        for _ in range(calls):
+            await execute(_call)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run_benchmark(concurrency: int, calls: int, window_size: int, rounds: int) -> Dict[str, Any]:
+    """
+    Ejecuta el microbenchmark.
+
+    Args:
+        concurrency: Corrutinas concurrentes
+        calls: Llamadas por corrutina
+        window_size: Tamaño de la ventana del breaker anterior
+        rounds: Repeticiones (se toma la mejor)
+
+    Returns:
+        Dict[str, Any]: Sobrecoste por llamada de cada implementación
+    """
+    async def direct(func: Callable[..., Awaitable[Any]]) -> Any:
+        return await func()
+
+    total_calls = concurrency * calls
+    timings: Dict[str, List[float]] = {"baseline": [], "legacy": [], "current": []}
+    for _ in range(rounds):
+        legacy = LegacyCircuitBreaker(window_size)
+        current = CircuitBreaker("benchmark", CircuitBreakerConfig(window_size=window_size))
+        timings["baseline"].append(await _run_load(direct, concurrency, calls))
+        timings["legacy"].append(await _run_load(legacy.execute, concurrency, calls))
+        timings["current"].append(await _run_load(current.execute, concurrency, calls))
+
+    best = {name: min(values) for name, values in timings.items()}
+    overhead = {
+        name: round((best[name] - best["baseline"]) / total_calls * 1e6, 2)
+        for name in ("legacy", "current")
+    }
+    return {
+        "concurrency": concurrency,
+        "calls": total_calls,
+        "window_size": window_size,
+        "elapsed_s": {name: round(value, 3) for name, value in best.items()},
+        "overhead_us_per_call": overhead,
+        "speedup": round(overhead["legacy"] / overhead["current"], 2) if overhead["current"] > 0 else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmark del circuit breaker")
+    parser.add_argument("--concurrency", type=int, default=1000, help="Corrutinas concurrentes")
+    parser.add_argument("--calls", type=int, default=50, help="Llamadas por corrutina")
+    parser.add_argument("--window-size", type=int, default=100, help="Tamaño de ventana del breaker anterior")
+    parser.add_argument("--rounds", type=int, default=3, help="Repeticiones")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.concurrency, args.calls, args.window_size, args.rounds))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrencia de GeminiClient.
+
+Lanza llamadas concurrentes desde varios agentes contra un modelo simulado
+(sin red) y reporta el throughput, el número de instancias de modelo
+construidas y las llamadas atribuidas a un agente distinto del que las
+originó. La mitad de los agentes tiene el presupuesto agotado con acción
+DEGRADE, de modo que se ejercita la selección de modelo por llamada.
+
+Uso:
+    python scripts/benchmark_gemini_client_concurrency.py --agents 10 --calls 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import clients.gemini_client as gemini_module
+from clients.gemini_client import GeminiClient
+from core.budget import AgentBudget, BudgetAction, budget_manager
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("gemini-client-benchmark")
+
+
+class SimulatedModel:
+    """Modelo simulado con latencia fija que cuenta sus construcciones."""
+
+    constructed = 0
+    latency = 0.005
+
+    def __init__(self, model_name: str, **kwargs: Any):
+        SimulatedModel.constructed += 1
+        self.model_name = model_name
+
+    async def generate_content_async(self, prompt: str, **kwargs: Any) -> Any:
+        await asyncio.sleep(self.latency)
+        return type("Response", (), {"text": f"{self.model_name}|{prompt}"})()
+
+
+async def run_benchmark(num_agents: int, calls_per_agent: int) -> Dict[str, Any]:
+    """
+    Ejecuta el benchmark y devuelve las métricas.
+
+    Args:
+        num_agents: Número de agentes concurrentes
+        calls_per_agent: Llamadas por agente
+
+    Returns:
+        Dict[str, Any]: Resultados del benchmark
+    """
+    gemini_module.genai.GenerativeModel = SimulatedModel
+    GeminiClient._instance = None
+    client = GeminiClient(optimize_prompts=False, use_cache=False)
+    client.model = client.models.get(client.model_name)
+
+    degraded = {f"agent_{i}" for i in range(0, num_agents, 2)}
+    for agent_id in degraded:
+        budget_manager.set_budget(AgentBudget(
+            agent_id=agent_id,
+            max_tokens=1,
+            action_on_limit=BudgetAction.DEGRADE,
+            fallback_model="gemini-1.5-flash",
+        ))
+
+    attributed: List[Tuple[str, str]] = []
+    original_record_usage = budget_manager.record_usage
+
+    async def tracking_record_usage(agent_id: str, prompt_tokens: int, completion_tokens: int, model: str):
+        attributed.append((agent_id, model))
+        return await original_record_usage(agent_id, prompt_tokens, completion_tokens, model)
+
+    budget_manager.record_usage = tracking_record_usage
+
+    async def agent_worker(agent_id: str) -> List[Tuple[str, str]]:
+        results = []
+        with client.agent_context(agent_id):
+            for i in range(calls_per_agent):
+                text = await client.generate_text(f"{agent_id} consulta {i}", temperature=0.1 * (i % 3))
+                results.append((agent_id, text))
+        return results
+
+    constructed_before = SimulatedModel.constructed
+    start = time.perf_counter()
+    per_agent = await asyncio.gather(*(agent_worker(f"agent_{i}") for i in range(num_agents)))
+    elapsed = time.perf_counter() - start
+
+    total_calls = num_agents * calls_per_agent
+    wrong_model = sum(
+        1
+        for results in per_agent
+        for agent_id, text in results
+        if text.startswith("gemini-1.5-flash") != (agent_id in degraded)
+    )
+    misattributed = sum(1 for agent_id, model in attributed if (model == "gemini-1.5-flash") != (agent_id in degraded))
+
+    return {
+        "agents": num_agents,
+        "total_calls": total_calls,
+        "calls_per_second": round(total_calls / elapsed, 1),
+        "models_constructed_during_run": SimulatedModel.constructed - constructed_before,
+        "wrong_model_responses": wrong_model,
+        "misattributed_usage_records": misattributed,
+        "registry_stats": dict(client.models.stats),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de GeminiClient")
+    parser.add_argument("--agents", type=int, default=10, help="Número de agentes concurrentes")
+    parser.add_argument("--calls", type=int, default=200, help="Llamadas por agente")
+    args = parser.parse_args()
+
+    results = await run_benchmark(args.agents, args.calls)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark de una solicitud con varios análisis de visión sobre la misma imagen.
+
+Cada solicitud ejecuta la preparación de entrada de tablas, formularios y
+reconocimiento de objetos (lectura, hash para la clave de caché y píxeles
+decodificados) más la descripción con el modelo (base64) y una miniatura para
+la vista previa. Compara:
+
+- legacy: cada análisis resuelve la imagen por su cuenta, como hacían los
+  ``_process_image_input`` de ``DocumentProcessor``, ``ObjectRecognition`` y
+  ``VisionProcessor`` (réplica de esa preparación);
+- handle: la solicitud resuelve un ``ImageHandle`` y todos los análisis
+  comparten sus bytes, hash, píxeles, base64 y miniatura.
+
+Solo se mide la preparación de la imagen: la parte simulada de cada análisis
+es idéntica en ambos modos.
+
+Uso:
+    python scripts/benchmark_image_handle.py --requests 20 --width 2400 --height 1800
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from PIL import Image
+
+from core.image_handle import ImageHandle
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("image-handle-benchmark")
+
+ANALYSES = [
+    ("extract_tables", {"language_code": "es-ES"}),
+    ("extract_forms", {"language_code": "es-ES"}),
+    ("recognize_objects", {"domain": "general", "confidence_threshold": 0.5}),
+]
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    """Genera una imagen JPEG con ruido (difícil de comprimir)."""
+    img = Image.effect_noise((width, height), 40).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _legacy_key(image_bytes: bytes, params: Dict[str, Any]) -> str:
+    """Clave de ``image_cache.generate_key`` calculada a partir de los bytes."""
+    params_hash = hashlib.md5(str(sorted(params.items())).encode("utf-8")).hexdigest()
+    return f"{hashlib.md5(image_bytes).hexdigest()}_{params_hash}"
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+async def legacy_request(path: str) -> int:
+    """Cada análisis lee, resume y decodifica la imagen de nuevo."""
+    checksum = 0
+    for operation, params in ANALYSES:
+        image_bytes = _read(path)
+        key = _legacy_key(image_bytes, {"operation": operation, **params})
+        pixels = np.asarray(Image.open(io.BytesIO(image_bytes)))
+        checksum += len(key) + pixels.shape[0]
+    # Descripción con el modelo: lectura y base64 de la imagen completa
+    encoded = base64.b64encode(_read(path)).decode("utf-8")
+    # Miniatura para la vista previa
+    thumbnail = Image.open(io.BytesIO(_read(path)))
+    thumbnail.thumbnail((256, 256))
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, format="JPEG")
+    return checksum + len(encoded) + len(buffer.getvalue())
+
+
+async def handle_request(path: str) -> int:
+    """La solicitud resuelve un handle y los análisis lo comparten."""
+    image = await ImageHandle.resolve(path)
+    checksum = 0
+    for operation, params in ANALYSES:
+        shared = await ImageHandle.resolve(image)
+        key = shared.cache_key({"operation": operation, **params})
+        checksum += len(key) + shared.pixels.shape[0]
+    return checksum + len(image.base64) + len(image.thumbnail((256, 256)))
+
+
+async def run_mode(mode: str, path: str, requests: int) -> Dict[str, Any]:
+    request = legacy_request if mode == "legacy" else handle_request
+    latencies: List[float] = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await request(path)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(latencies), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+async def run_benchmark(requests: int, width: int, height: int) -> Dict[str, Any]:
+    """
+    Mide la preparación de imagen por solicitud en ambos modos.
+
+    Args:
+        requests: Solicitudes por modo
+        width: Ancho de la imagen
+        height: Alto de la imagen
+
+    Returns:
+        Dict[str, Any]: Latencias por modo y aceleración
+    """
+    image_bytes = make_jpeg(width, height)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "documento.jpg")
+        with open(path, "wb") as f:
+            f.write(image_bytes)
+
+        results = {mode: await run_mode(mode, path, requests) for mode in ("legacy", "handle")}
+
+    return {
+        "requests": requests,
+        "image": {"width": width, "height": height, "bytes": len(image_bytes)},
+        "analyses_per_request": len(ANALYSES) + 2,
+        "modes": results,
+        "speedup": round(results["legacy"]["median_ms"] / results["handle"]["median_ms"], 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de solicitudes con varios análisis de visión")
+    parser.add_argument("--requests", type=int, default=20, help="Solicitudes por modo")
+    parser.add_argument("--width", type=int, default=2400, help="Ancho de la imagen")
+    parser.add_argument("--height", type=int, default=1800, help="Alto de la imagen")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run_benchmark(args.requests, args.width, args.height)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
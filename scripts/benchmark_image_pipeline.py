@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark del pipeline de preprocesamiento de imágenes.
+
+Procesa muchas imágenes de forma concurrente y mide, mientras tanto, el
+retraso del bucle de eventos con una tarea que duerme intervalos cortos (lo
+que notaría cualquier chat concurrente). Compara:
+
+- inline: la optimización se ejecuta dentro del bucle de eventos (comportamiento anterior);
+- pool: la optimización se ejecuta en el ProcessPoolExecutor de ImageOptimizer.
+
+Uso:
+    python scripts/benchmark_image_pipeline.py --images 32 --width 4000 --height 3000
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from PIL import Image
+
+from core.image_optimizer import ImageOptimizer, _optimize_image_bytes
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("image-pipeline-benchmark")
+
+TICK_INTERVAL = 0.01
+
+
+def make_jpeg(width: int, height: int) -> bytes:
+    """Genera una imagen JPEG con ruido (difícil de comprimir)."""
+    img = Image.effect_noise((width, height), 40).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+async def measure_loop_lag(stop: asyncio.Event, samples: List[float]) -> None:
+    """Registra cuánto se retrasa cada despertar respecto a lo previsto."""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_INTERVAL
+        await asyncio.sleep(TICK_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def run_mode(mode: str, image: bytes, images: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Procesa las imágenes en un modo y mide retraso del bucle y rendimiento.
+
+    Args:
+        mode: "inline" o "pool"
+        image: Imagen JPEG de prueba
+        images: Número de imágenes a procesar
+        args: Argumentos de línea de comandos
+
+    Returns:
+        Dict[str, Any]: Rendimiento y percentiles del retraso del bucle
+    """
+    optimizer = ImageOptimizer(
+        max_workers=args.workers,
+        max_pending=args.max_pending,
+        task_timeout=args.timeout,
+    )
+    params = {
+        "max_width": optimizer.max_width,
+        "max_height": optimizer.max_height,
+        "quality": optimizer.quality,
+        "force_format": None,
+        "preserve_text_quality": not args.no_text_detection,
+    }
+
+    async def process_inline() -> None:
+        # Ejecución bloqueante dentro del bucle, como antes del pool
+        _optimize_image_bytes(image, "jpeg", params)
+        await asyncio.sleep(0)
+
+    async def process_pool() -> None:
+        await optimizer.optimize_image(image, preserve_text_quality=params["preserve_text_quality"])
+
+    if mode == "pool":
+        # Arrancar los procesos fuera de la medición
+        await optimizer.optimize_image(image)
+
+    lag_samples: List[float] = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lag_samples))
+
+    start = time.perf_counter()
+    worker = process_pool if mode == "pool" else process_inline
+    await asyncio.gather(*(worker() for _ in range(images)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await lag_task
+    await optimizer.shutdown()
+
+    lag_samples.sort()
+    lag_ms = [sample * 1000 for sample in lag_samples] or [0.0]
+    return {
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(images / elapsed, 2),
+        "loop_lag_ms": {
+            "p50": round(statistics.median(lag_ms), 2),
+            "p99": round(lag_ms[min(len(lag_ms) - 1, int(len(lag_ms) * 0.99))], 2),
+            "max": round(lag_ms[-1], 2),
+        },
+        "errors": optimizer.stats["errors"],
+        "timeouts": optimizer.stats["timeouts"],
+        "draft_decodes": optimizer.stats["draft_decodes"],
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de preprocesamiento de imágenes")
+    parser.add_argument("--images", type=int, default=32, help="Número de imágenes por modo")
+    parser.add_argument("--width", type=int, default=4000, help="Ancho de la imagen de prueba")
+    parser.add_argument("--height", type=int, default=3000, help="Alto de la imagen de prueba")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Procesos del pool")
+    parser.add_argument("--max-pending", type=int, default=8, help="Imágenes en curso como máximo")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Plazo por imagen en segundos")
+    parser.add_argument("--no-text-detection", action="store_true", help="Desactiva la heurística de texto")
+    parser.add_argument("--modes", default="inline,pool", help="Modos a medir separados por comas")
+    args = parser.parse_args()
+
+    image = make_jpeg(args.width, args.height)
+    results: Dict[str, Any] = {"images": args.images, "image_bytes": len(image)}
+    for mode in args.modes.split(","):
+        results[mode] = await run_mode(mode.strip(), image, args.images, args)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
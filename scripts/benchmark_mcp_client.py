@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmark del cliente MCP asíncrono frente a un servidor MCP local simulado.
+
+Arranca un servidor stub (FastAPI + uvicorn) en un puerto local con latencia
+configurable y compara dos modos con la misma carga concurrente:
+
+- ``blocking``: una petición ``requests`` nueva por llamada, ejecutada dentro
+  de la corrutina como hacía el cliente anterior.
+- ``async``: ``MCPClient`` con pool keep-alive, límite por servidor, lecturas
+  combinadas y caché del listado de herramientas.
+
+Además del throughput, mide el retraso máximo del bucle de eventos con una
+tarea latido, que refleja cuánto bloquea cada modo al resto de la aplicación.
+
+Uso:
+    python scripts/benchmark_mcp_client.py --calls 200 --concurrency 20 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import requests
+import uvicorn
+from fastapi import FastAPI
+
+from tools.mcp_client import MCPClient
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("mcp-client-benchmark")
+
+
+def create_stub_app(latency: float) -> FastAPI:
+    """
+    Crea un servidor MCP simulado con latencia fija.
+
+    Args:
+        latency: Latencia de cada respuesta (segundos)
+
+    Returns:
+        FastAPI: Aplicación del servidor stub
+    """
+    app = FastAPI()
+    app.state.requests = 0
+
+    @app.get("/tools")
+    async def list_tools() -> Dict[str, Any]:
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return {"tools": [{"name": "query"}, {"name": "search"}]}
+
+    @app.post("/tools/call")
+    async def call_tool(body: Dict[str, Any]) -> Dict[str, Any]:
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return {"result": body.get("name"), "arguments": body.get("arguments", {})}
+
+    @app.get("/users/{user_id}")
+    async def get_user(user_id: str) -> Dict[str, Any]:
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return {"id": user_id}
+
+    return app
+
+
+def start_stub_server(app: FastAPI) -> uvicorn.Server:
+    """Arranca el servidor stub en un hilo y espera a que acepte conexiones."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    server.base_url = f"http://127.0.0.1:{port}"
+    return server
+
+
+def build_workload(calls: int) -> List[Dict[str, Any]]:
+    """Mezcla de listados de herramientas, llamadas a herramientas y lecturas."""
+    workload = []
+    for index in range(calls):
+        kind = index % 4
+        if kind == 0:
+            workload.append({"endpoint": "tools"})
+        elif kind == 1:
+            workload.append({"endpoint": "tools/call", "method": "POST",
+                             "data": {"name": "query", "arguments": {"n": index}}})
+        else:
+            workload.append({"endpoint": f"users/{index % 16}"})
+    return workload
+
+
+async def _heartbeat(stop: asyncio.Event, lags: List[float], interval: float = 0.005) -> None:
+    """Mide cuánto se retrasa el bucle de eventos respecto al intervalo esperado."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_mode(mode: str, base_url: str, workload: List[Dict[str, Any]],
+                   concurrency: int) -> Dict[str, Any]:
+    """
+    Ejecuta la carga en un modo y devuelve sus métricas.
+
+    Args:
+        mode: ``blocking`` o ``async``
+        base_url: URL del servidor stub
+        workload: Llamadas a realizar
+        concurrency: Corrutinas concurrentes
+
+    Returns:
+        Dict[str, Any]: Métricas del modo
+    """
+    client = MCPClient(base_url=base_url, max_concurrency_per_server=concurrency)
+    queue: asyncio.Queue = asyncio.Queue()
+    for call in workload:
+        queue.put_nowait(call)
+
+    async def blocking_call(call: Dict[str, Any]) -> Dict[str, Any]:
+        method = call.get("method", "GET")
+        data = call.get("data")
+        response = requests.request(
+            method,
+            f"{base_url}/{call['endpoint']}",
+            params=data if method == "GET" else None,
+            json=data if method != "GET" else None,
+            timeout=15,
+        )
+        return response.json()
+
+    async def async_call(call: Dict[str, Any]) -> Dict[str, Any]:
+        if call["endpoint"] == "tools":
+            return {"tools": await client.list_tools()}
+        return await client.call_endpoint(**call)
+
+    handler = blocking_call if mode == "blocking" else async_call
+    if mode == "async":
+        # Crear el pool fuera de la medición (carga del contexto TLS)
+        await client.get_client()
+
+    async def worker() -> None:
+        while not queue.empty():
+            await handler(queue.get_nowait())
+
+    stop = asyncio.Event()
+    lags: List[float] = []
+    heartbeat = asyncio.create_task(_heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await heartbeat
+    await client.close()
+
+    result = {
+        "mode": mode,
+        "calls": len(workload),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(workload) / elapsed, 1),
+        "max_loop_lag_ms": round(max(lags, default=0.0) * 1000, 1),
+    }
+    if mode == "async":
+        result["client_stats"] = client.get_stats()
+    return result
+
+
+async def run_benchmark(calls: int, concurrency: int, latency_ms: float) -> Dict[str, Any]:
+    """
+    Ejecuta ambos modos contra el mismo servidor stub.
+
+    Args:
+        calls: Llamadas por modo
+        concurrency: Corrutinas concurrentes
+        latency_ms: Latencia del servidor stub
+
+    Returns:
+        Dict[str, Any]: Resultados del benchmark
+    """
+    app = create_stub_app(latency_ms / 1000)
+    server = start_stub_server(app)
+    workload = build_workload(calls)
+    results = {}
+    try:
+        for mode in ("blocking", "async"):
+            before = app.state.requests
+            results[mode] = await run_mode(mode, server.base_url, workload, concurrency)
+            results[mode]["server_requests"] = app.state.requests - before
+    finally:
+        server.should_exit = True
+
+    results["speedup"] = round(results["async"]["throughput_rps"] / results["blocking"]["throughput_rps"], 2)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del cliente MCP asíncrono")
+    parser.add_argument("--calls", type=int, default=200, help="Llamadas por modo")
+    parser.add_argument("--concurrency", type=int, default=20, help="Corrutinas concurrentes")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Latencia del servidor stub")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args.calls, args.concurrency, args.latency_ms))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la transcripción de grabaciones largas.
+
+Genera notas de voz WAV (16 kHz, mono) de distintas duraciones, con tramos de
+voz separados por pausas, y mide el pico de memoria (tracemalloc) y la latencia
+de transcripción con un modelo simulado cuya latencia crece con la duración del
+audio enviado. Compara:
+
+- legacy: réplica del cliente anterior (lectura completa, base64 de toda la
+  grabación y una única llamada);
+- streaming: ``AudioStreamPipeline`` (lectura por bloques, segmentación por
+  actividad de voz y segmentos transcritos en paralelo).
+
+También mide una segunda pasada sobre el mismo audio (lo que hace
+``analyze_audio`` tras ``transcribe_audio``), que en streaming sale de la caché.
+
+Uso:
+    python scripts/benchmark_speech_streaming.py --minutes 1 5 10 --concurrency 4
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from clients.vertex_ai.audio_stream import AudioStreamPipeline
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("speech-streaming-benchmark")
+
+RATE = 16000
+
+
+def write_voice_note(path: str, minutes: float) -> None:
+    """Escribe por tramos una nota de voz: 8 s de voz (distinta en cada tramo) y 1 s de pausa."""
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        t = np.arange(8 * RATE) / RATE
+        pause = bytes(2 * RATE)
+        for index in range(max(1, int(minutes * 60 / 9))):
+            wav.writeframes((np.sin(2 * np.pi * (200 + index) * t) * 8000).astype("<i2").tobytes())
+            wav.writeframes(pause)
+
+
+class SimulatedModel:
+    """Modelo cuya latencia es fija más proporcional a los segundos de audio."""
+
+    def __init__(self, base_latency: float, seconds_per_audio_second: float):
+        self.base_latency = base_latency
+        self.seconds_per_audio_second = seconds_per_audio_second
+        self.calls = 0
+
+    async def __call__(self, content: str) -> Dict[str, Any]:
+        self.calls += 1
+        with wave.open(io.BytesIO(base64.b64decode(content))) as wav:
+            seconds = wav.getnframes() / wav.getframerate()
+        await asyncio.sleep(self.base_latency + seconds * self.seconds_per_audio_second)
+        return {"text": "texto", "confidence": 0.9}
+
+
+async def legacy_transcribe(path: str, model: SimulatedModel) -> Dict[str, Any]:
+    """Réplica del cliente anterior: archivo completo en base64 y una llamada."""
+    with open(path, "rb") as f:
+        content = base64.b64encode(f.read()).decode("utf-8")
+    return await model(content)
+
+
+def _measure(run) -> Dict[str, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"latency_s": round(elapsed, 3), "peak_mb": round(peak / 1024 / 1024, 2)}
+
+
+def run_benchmark(minutes: List[float], concurrency: int, chunk_size: int,
+                  base_latency: float, seconds_per_audio_second: float) -> Dict[str, Any]:
+    """
+    Mide memoria y latencia por duración de grabación.
+
+    Args:
+        minutes: Duraciones de las grabaciones
+        concurrency: Segmentos transcritos en paralelo
+        chunk_size: Tamaño de los bloques leídos
+        base_latency: Latencia fija del modelo simulado (s)
+        seconds_per_audio_second: Latencia del modelo por segundo de audio
+
+    Returns:
+        Dict[str, Any]: Resultados por duración y modo
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for duration in minutes:
+            path = os.path.join(tmp, f"nota_{duration}.wav")
+            write_voice_note(path, duration)
+
+            legacy_model = SimulatedModel(base_latency, seconds_per_audio_second)
+            legacy = _measure(lambda: legacy_transcribe(path, legacy_model))
+
+            pipeline = AudioStreamPipeline(chunk_size=chunk_size, max_concurrency=concurrency,
+                                           vad_threshold=0.02, min_silence_ms=500, max_segment_seconds=30)
+            model = SimulatedModel(base_latency, seconds_per_audio_second)
+            streaming = _measure(lambda: pipeline.transcribe(path, model, cache_namespace="chirp:es-ES"))
+            first_pass_calls = model.calls
+            second_pass = _measure(lambda: pipeline.transcribe(path, model, cache_namespace="chirp:es-ES"))
+
+            results.append({
+                "minutes": duration,
+                "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2),
+                "legacy": legacy,
+                "streaming": {**streaming, "segments": first_pass_calls},
+                "streaming_second_pass": {**second_pass, "model_calls": model.calls - first_pass_calls},
+            })
+
+    return {
+        "chunk_size": chunk_size,
+        "concurrency": concurrency,
+        "model_latency": {"base_s": base_latency, "per_audio_second_s": seconds_per_audio_second},
+        "recordings": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de transcripción en streaming")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 5, 10], help="Duraciones (minutos)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Segmentos en paralelo")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Tamaño de bloque (bytes)")
+    parser.add_argument("--base-latency", type=float, default=0.2, help="Latencia fija del modelo (s)")
+    parser.add_argument("--per-audio-second", type=float, default=0.01, help="Latencia por segundo de audio (s)")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.minutes, args.concurrency, args.chunk_size,
+                                   args.base_latency, args.per_audio_second), indent=2))
+
+
+if __name__ == "__main__":
+    main()
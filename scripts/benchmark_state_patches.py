@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Bytes escritos por turno: estado completo frente a parches por campo.
+
+Simula una sesión de ``PrecisionNutritionArchitect``: en cada turno se carga el
+contexto, se añaden los mensajes del turno a ``conversation_history`` y,
+periódicamente, un plan de comidas, una recomendación de suplementos o un
+análisis de biomarcadores, y se guarda. Compara:
+
+- ``full``: escritura del documento completo en cada turno (comportamiento
+  anterior de ``_update_context``);
+- ``patch``: ``commit_state``, que envía solo el delta JSON Patch.
+
+Uso:
+    python scripts/benchmark_state_patches.py --turns 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from infrastructure.adapters.state_manager_adapter import state_manager_adapter
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("state-patch-benchmark")
+
+
+def initial_context() -> Dict[str, Any]:
+    """Contexto vacío tal como lo crea ``_get_context``."""
+    return {
+        "conversation_history": [],
+        "user_profile": {"goal": "recomposición", "weight_kg": 82, "allergies": ["lactosa"]},
+        "meal_plans": [],
+        "supplement_recommendations": [],
+        "biomarker_analyses": [],
+        "last_updated": "",
+    }
+
+
+def apply_turn(context: Dict[str, Any], turn: int) -> None:
+    """Cambios que hace un turno típico sobre el contexto."""
+    context["conversation_history"].append({
+        "role": "user",
+        "content": f"Turno {turn}: ¿qué ajusto en la cena si hoy entrené piernas y dormí 6 horas?",
+        "timestamp": f"2025-01-01T10:{turn % 60:02d}:00",
+    })
+    context["conversation_history"].append({
+        "role": "assistant",
+        "content": "Aumenta los carbohidratos complejos en la cena y prioriza proteína de digestión lenta. " * 3,
+        "timestamp": f"2025-01-01T10:{turn % 60:02d}:05",
+    })
+    if turn % 5 == 0:
+        context["meal_plans"].append({
+            "turn": turn,
+            "days": [{"day": day, "meals": ["avena", "pollo con arroz", "salmón", "yogur"]} for day in range(7)],
+        })
+    if turn % 10 == 0:
+        context["supplement_recommendations"].append({"turn": turn, "items": ["creatina", "vitamina D", "omega-3"]})
+    if turn % 25 == 0:
+        context["biomarker_analyses"].append({"turn": turn, "markers": {"glucose": 92, "hdl": 55, "ldl": 110}})
+    context["last_updated"] = f"2025-01-01 10:{turn % 60:02d}:05"
+
+
+async def run_session(mode: str, turns: int) -> Dict[str, Any]:
+    """
+    Ejecuta una sesión completa en un modo.
+
+    Args:
+        mode: ``full`` o ``patch``
+        turns: Turnos de la sesión
+
+    Returns:
+        Dict[str, Any]: Bytes escritos por turno y tiempo total
+    """
+    user_id, session_id = f"benchmark-{mode}", f"session-{time.time_ns()}"
+    stats = state_manager_adapter.stats
+    await state_manager_adapter.save_state(user_id, session_id, initial_context())
+
+    per_turn: List[int] = []
+    start = time.perf_counter()
+    for turn in range(1, turns + 1):
+        context = await state_manager_adapter.load_state(user_id, session_id)
+        apply_turn(context, turn)
+        before = stats["state_bytes_written"]
+        if mode == "full":
+            await state_manager_adapter._write_full_state(state_manager_adapter._state_key(user_id, session_id),
+                                                          context)
+        else:
+            await state_manager_adapter.commit_state(user_id, session_id, context)
+        per_turn.append(stats["state_bytes_written"] - before)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "total_bytes": sum(per_turn),
+        "mean_bytes_per_turn": round(sum(per_turn) / len(per_turn), 1),
+        "max_bytes_per_turn": max(per_turn),
+        "bytes_at_turn": {str(turn): per_turn[turn - 1] for turn in (1, turns // 4, turns // 2, turns) if turn >= 1},
+        "final_version": await state_manager_adapter.get_state_version(user_id, session_id),
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "final_state": await state_manager_adapter.load_state(user_id, session_id),
+    }
+
+
+async def run_benchmark(turns: int) -> Dict[str, Any]:
+    """Ejecuta ambos modos y comprueba que el estado final coincide."""
+    results = {mode: await run_session(mode, turns) for mode in ("full", "patch")}
+    final_states = [result.pop("final_state") for result in results.values()]
+    results["same_final_state"] = final_states[0] == final_states[1]
+    results["reduction"] = round(results["full"]["total_bytes"] / max(results["patch"]["total_bytes"], 1), 1)
+    return {"turns": turns, "modes": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bytes escritos por turno con estado completo y con parches")
+    parser.add_argument("--turns", type=int, default=200, help="Turnos de la sesión")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run_benchmark(args.turns)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
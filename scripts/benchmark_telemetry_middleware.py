@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark del middleware de telemetría.
+
+Mide las solicitudes por segundo que atraviesan una aplicación FastAPI con la
+pila de middleware habitual (CORS + telemetría) en tres configuraciones:
+sin telemetría, telemetría con todos los spans y telemetría con muestreo.
+Las solicitudes se envían en proceso mediante ``httpx.ASGITransport``, de modo
+que el resultado refleja únicamente el coste del middleware.
+
+Uso:
+    python scripts/benchmark_telemetry_middleware.py --requests 5000 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.trace import TracerProvider
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.middleware.telemetry import TelemetryMiddleware
+
+# Configurar logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("telemetry-middleware-benchmark")
+# httpx registra cada solicitud en INFO, lo que distorsionaría la medición
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def build_app(telemetry: bool, sample_rate: float = 1.0) -> FastAPI:
+    """
+    Construye una aplicación de prueba con rutas parametrizadas.
+
+    Args:
+        telemetry: Si se añade el middleware de telemetría
+        sample_rate: Fracción de solicitudes que generan span
+
+    Returns:
+        FastAPI: Aplicación configurada
+    """
+    app = FastAPI()
+
+    @app.post("/agents/{agent_id}/run")
+    async def run_agent(agent_id: str) -> Dict[str, Any]:
+        return {"agent_id": agent_id, "status": "ok"}
+
+    @app.get("/health")
+    async def health() -> Dict[str, str]:
+        return {"status": "ok"}
+
+    if telemetry:
+        # Proveedores del SDK sin exportador: mide el coste de instrumentar, no de exportar
+        app.add_middleware(
+            TelemetryMiddleware,
+            sample_rate=sample_rate,
+            tracer=TracerProvider().get_tracer("benchmark"),
+            meter=MeterProvider().get_meter("benchmark"),
+        )
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+    return app
+
+
+async def run_scenario(app: FastAPI, total_requests: int, concurrency: int) -> Dict[str, float]:
+    """
+    Ejecuta un escenario de carga sobre la aplicación.
+
+    Args:
+        app: Aplicación a medir
+        total_requests: Número total de solicitudes
+        concurrency: Solicitudes concurrentes
+
+    Returns:
+        Dict[str, float]: Solicitudes por segundo y duración total
+    """
+    transport = httpx.ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int) -> None:
+            async with semaphore:
+                response = await client.post(f"/agents/agent_{i % 1000}/run")
+                response.raise_for_status()
+
+        # Calentamiento
+        await asyncio.gather(*(one(i) for i in range(min(200, total_requests))))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests_per_second": round(total_requests / elapsed, 1),
+        "duration_seconds": round(elapsed, 3),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del middleware de telemetría")
+    parser.add_argument("--requests", type=int, default=5000, help="Número de solicitudes por escenario")
+    parser.add_argument("--concurrency", type=int, default=50, help="Solicitudes concurrentes")
+    parser.add_argument("--sample-rate", type=float, default=0.1, help="Tasa de muestreo del escenario muestreado")
+    parser.add_argument("--output", type=str, default=None, help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    scenarios = {
+        "telemetry_off": build_app(telemetry=False),
+        "telemetry_on": build_app(telemetry=True, sample_rate=1.0),
+        f"telemetry_sampled_{args.sample_rate}": build_app(telemetry=True, sample_rate=args.sample_rate),
+    }
+
+    results: Dict[str, Any] = {}
+    baseline: Optional[float] = None
+    for name, app in scenarios.items():
+        result = await run_scenario(app, args.requests, args.concurrency)
+        if baseline is None:
+            baseline = result["requests_per_second"]
+        result["relative_to_off"] = round(result["requests_per_second"] / baseline, 3)
+        results[name] = result
+        logger.info(f"{name}: {result['requests_per_second']} req/s ({result['relative_to_off']:.1%} del baseline)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"Resultados guardados en {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
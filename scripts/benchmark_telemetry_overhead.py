@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Sobrecarga de CPU del adaptador de telemetría por operación instrumentada.
+
+Cada operación simulada abre un span raíz con dos hijos, añade atributos y un
+evento, y registra dos métricas y un contador (el patrón de agentes, skills y
+clientes). Compara, frente a la misma operación sin telemetría:
+
+- ``legacy_client``: réplica del adaptador anterior con un cliente no-op (cada
+  llamada se despacha al cliente);
+- ``legacy_otel``: la misma réplica sobre un cliente OpenTelemetry SDK que
+  exporta cada span al terminar (``SimpleSpanProcessor`` con un exportador
+  no-op) y registra cada métrica en su instrumento;
+- ``legacy_mock``: réplica del modo mock anterior (cada métrica se formatea y
+  se registra en el log, como ocurre hoy sin cliente);
+- ``pipeline``: ``TelemetryAdapter`` actual con exportadores no-op, muestreo
+  de cabeza configurable y métricas agregadas en histogramas (incluye el
+  volcado final).
+
+Uso:
+    python scripts/benchmark_telemetry_overhead.py --operations 50000 --head-sample-rate 0.01
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from opentelemetry.sdk.metrics import MeterProvider
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor, SpanExporter, SpanExportResult
+
+from infrastructure.adapters.telemetry_adapter import NoOpMetricExporter, NoOpSpanExporter, TelemetryAdapter
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("telemetry-overhead-benchmark")
+
+# El log de la réplica del modo mock está activo pero sin salida
+legacy_logger = logging.getLogger("telemetry-overhead-benchmark.legacy")
+legacy_logger.setLevel(logging.INFO)
+legacy_logger.addHandler(logging.NullHandler())
+legacy_logger.propagate = False
+
+
+class NoOpClient:
+    """Cliente de telemetría que no hace nada."""
+
+    def start_span(self, name: str, attributes: Dict[str, Any]) -> object:
+        return object()
+
+    def end_span(self, span: Any) -> None:
+        pass
+
+    def set_span_attribute(self, span: Any, key: str, value: Any) -> None:
+        pass
+
+    def add_span_event(self, span: Any, name: str, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_metric(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        pass
+
+    def record_counter(self, name: str, increment: int, attributes: Dict[str, Any]) -> None:
+        pass
+
+
+class NoOpOTelExporter(SpanExporter):
+    """Exportador OpenTelemetry que descarta los spans."""
+
+    def export(self, spans) -> SpanExportResult:
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class OTelClient:
+    """Cliente sobre el SDK de OpenTelemetry: un span y un registro por llamada."""
+
+    def __init__(self):
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(NoOpOTelExporter()))
+        self.tracer = provider.get_tracer("benchmark")
+        self.meter = MeterProvider().get_meter("benchmark")
+        self._instruments: Dict[str, Any] = {}
+
+    def start_span(self, name: str, attributes: Dict[str, Any]) -> Any:
+        return self.tracer.start_span(name, attributes=attributes)
+
+    def end_span(self, span: Any) -> None:
+        span.end()
+
+    def set_span_attribute(self, span: Any, key: str, value: Any) -> None:
+        span.set_attribute(key, value)
+
+    def add_span_event(self, span: Any, name: str, attributes: Dict[str, Any]) -> None:
+        span.add_event(name, attributes)
+
+    def record_metric(self, name: str, value: float, attributes: Dict[str, Any]) -> None:
+        if name not in self._instruments:
+            self._instruments[name] = self.meter.create_histogram(name)
+        self._instruments[name].record(value, attributes)
+
+    def record_counter(self, name: str, increment: int, attributes: Dict[str, Any]) -> None:
+        if name not in self._instruments:
+            self._instruments[name] = self.meter.create_counter(name)
+        self._instruments[name].add(increment, attributes)
+
+
+class LegacyTelemetryAdapter:
+    """Réplica del adaptador anterior: cada llamada va al cliente o al log."""
+
+    def __init__(self, client: Optional[NoOpClient]):
+        self.client = client
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> Any:
+        if self.client:
+            try:
+                return self.client.start_span(name, attributes or {})
+            except Exception as e:
+                legacy_logger.warning(f"Error al iniciar span '{name}': {e}")
+        return {"name": name, "attributes": attributes or {}, "events": []}
+
+    def end_span(self, span: Any) -> None:
+        if self.client and not isinstance(span, dict):
+            try:
+                self.client.end_span(span)
+            except Exception as e:
+                legacy_logger.warning(f"Error al finalizar span: {e}")
+
+    def set_span_attribute(self, span: Any, key: str, value: Any) -> None:
+        if self.client and not isinstance(span, dict):
+            try:
+                self.client.set_span_attribute(span, key, value)
+            except Exception as e:
+                legacy_logger.warning(f"Error al establecer atributo '{key}' en span: {e}")
+        elif isinstance(span, dict):
+            span["attributes"][key] = value
+
+    def add_span_event(self, span: Any, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        if self.client and not isinstance(span, dict):
+            try:
+                self.client.add_span_event(span, name, attributes or {})
+            except Exception as e:
+                legacy_logger.warning(f"Error al añadir evento '{name}' a span: {e}")
+        elif isinstance(span, dict):
+            span["events"].append({"name": name, "attributes": attributes or {}})
+
+    def record_metric(self, name: str, value: float, attributes: Optional[Dict[str, Any]] = None) -> None:
+        if self.client:
+            try:
+                self.client.record_metric(name, value, attributes or {})
+            except Exception as e:
+                legacy_logger.warning(f"Error al registrar métrica '{name}': {e}")
+        else:
+            attr_str = ", ".join(f"{k}={v}" for k, v in (attributes or {}).items())
+            legacy_logger.info(f"METRIC: {name} = {value} {{{attr_str}}}")
+
+    def record_counter(self, name: str, increment: int = 1, attributes: Optional[Dict[str, Any]] = None) -> None:
+        if self.client:
+            try:
+                self.client.record_counter(name, increment, attributes or {})
+            except Exception as e:
+                legacy_logger.warning(f"Error al incrementar contador '{name}': {e}")
+        else:
+            attr_str = ", ".join(f"{k}={v}" for k, v in (attributes or {}).items())
+            legacy_logger.info(f"COUNTER: {name} += {increment} {{{attr_str}}}")
+
+
+def _work(index: int) -> int:
+    """Trabajo propio de la operación (igual en todos los modos)."""
+    return sum(range(index % 50))
+
+
+def instrumented_operation(adapter: Any, index: int) -> int:
+    """Operación con el patrón de instrumentación de agentes y skills."""
+    agent = "nutrition" if index % 2 else "training"
+    root = adapter.start_span("agent.process", {"agent_id": agent})
+    child = adapter.start_span("skill.execute", {"skill": "meal_plan"})
+    result = _work(index)
+    adapter.set_span_attribute(child, "result_size", result)
+    adapter.end_span(child)
+    client_span = adapter.start_span("client.generate", {"model": "gemini"})
+    adapter.add_span_event(client_span, "response_received", {"tokens": 128})
+    adapter.end_span(client_span)
+    adapter.set_span_attribute(root, "success", True)
+    adapter.end_span(root)
+    adapter.record_metric("agent.latency_ms", result * 0.1, {"agent_id": agent})
+    adapter.record_metric("client.tokens", 128, {"model": "gemini"})
+    adapter.record_counter("agent.requests", 1, {"agent_id": agent})
+    return result
+
+
+def _time(operations: int, operation: Callable[[int], Any], finish: Optional[Callable[[], Any]] = None) -> float:
+    start = time.perf_counter()
+    for index in range(operations):
+        operation(index)
+    if finish is not None:
+        finish()
+    return time.perf_counter() - start
+
+
+def run_benchmark(operations: int, head_sample_rate: float, repeats: int) -> Dict[str, Any]:
+    """
+    Mide el coste por operación de cada modo (mejor de ``repeats`` repeticiones).
+
+    Args:
+        operations: Operaciones instrumentadas por repetición
+        head_sample_rate: Muestreo de cabeza del pipeline
+        repeats: Repeticiones por modo
+
+    Returns:
+        Dict[str, Any]: Microsegundos por operación y sobrecarga sobre la base
+    """
+    def run_pipeline() -> float:
+        adapter = TelemetryAdapter(exporter=NoOpSpanExporter(), metric_exporter=NoOpMetricExporter(),
+                                   head_sample_rate=head_sample_rate, batch_size=256, buffer_size=4096)
+
+        def finish() -> None:
+            adapter.export_pending()
+            adapter.flush_metrics()
+
+        elapsed = _time(operations, lambda index: instrumented_operation(adapter, index), finish)
+        run_pipeline.stats = adapter.get_stats()
+        return elapsed
+
+    legacy_otel = LegacyTelemetryAdapter(OTelClient())
+    modes = {
+        "none": lambda: _time(operations, _work),
+        "legacy_client": lambda: _time(operations,
+                                       lambda index: instrumented_operation(LegacyTelemetryAdapter(NoOpClient()), index)),
+        "legacy_otel": lambda: _time(operations,
+                                     lambda index: instrumented_operation(legacy_otel, index)),
+        "legacy_mock": lambda: _time(operations,
+                                     lambda index: instrumented_operation(LegacyTelemetryAdapter(None), index)),
+        "pipeline": run_pipeline,
+    }
+
+    results: Dict[str, Any] = {}
+    for mode, run in modes.items():
+        best = min(run() for _ in range(repeats))
+        results[mode] = {"us_per_op": round(best / operations * 1e6, 3)}
+
+    baseline = results["none"]["us_per_op"]
+    for mode in ("legacy_client", "legacy_otel", "legacy_mock", "pipeline"):
+        results[mode]["overhead_us_per_op"] = round(results[mode]["us_per_op"] - baseline, 3)
+
+    stats = run_pipeline.stats
+    return {
+        "operations": operations,
+        "spans_per_operation": 3,
+        "metrics_per_operation": 3,
+        "head_sample_rate": head_sample_rate,
+        "modes": results,
+        "pipeline_stats": {key: stats[key] for key in (
+            "traces_head_sampled", "traces_dropped", "spans_exported", "export_batches", "metric_records",
+        )},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sobrecarga del adaptador de telemetría por operación")
+    parser.add_argument("--operations", type=int, default=50000, help="Operaciones por repetición")
+    parser.add_argument("--head-sample-rate", type=float, default=0.01, help="Muestreo de cabeza del pipeline")
+    parser.add_argument("--repeats", type=int, default=3, help="Repeticiones por modo (se toma la mejor)")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(args.operations, args.head_sample_rate, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de extremo a extremo sin acceso a red.
+
+Envía conversaciones de varios turnos por la ruta real ``POST /chat/`` de la
+aplicación FastAPI (en proceso, con ``httpx.ASGITransport``), el orquestador,
+el adaptador A2A y los agentes especializados. Solo se sustituyen:
+
+- los modelos de Gemini y Vertex AI, por el backend determinista de
+  ``tests.mocks.model_backend`` (latencia, errores y tokens configurables);
+- la autenticación, por un usuario fijo;
+- la clasificación de intención, por la intención con la que está etiquetado
+  cada turno del guion (desactivable con ``--use-intent-analyzer``).
+
+Los agentes se registran en el adaptador A2A con un manejador en proceso que
+responde al remitente de cada mensaje. El resultado es un JSON con
+rendimiento, latencias de cola y llamadas al modelo por petición que sirve
+como línea base; con ``--baseline`` se compara contra una ejecución anterior y
+el script termina con código 1 si hay regresiones.
+
+Con ``--fault`` se inyectan fallos asíncronos en las fronteras de los clientes
+(``core.fault_injection``) durante la medición; comparando contra una línea
+base sin fallos se obtiene su efecto en la latencia de cola de extremo a extremo.
+
+Uso:
+    python scripts/offline_load_test.py --sessions 40 --turns 4 --concurrency 8 --output baseline.json
+    python scripts/offline_load_test.py --sessions 40 --turns 4 --concurrency 8 --baseline baseline.json
+    python scripts/offline_load_test.py --baseline baseline.json \
+        --fault "boundary=a2a,target=elite_training_strategist,latency=lognormal:300:0.6,error_rate=0.05"
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Configuración sin servicios externos antes de importar la aplicación
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+os.environ.setdefault("ENABLE_TELEMETRY", "false")
+
+from core.fault_injection import Fault, fault_injector
+from core.latency_histogram import LatencyRegistry
+from tests.mocks.model_backend import FakeModelBackend, LatencyDistribution
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("offline-load-test")
+
+TURN_METRIC = "offline_load.turn"
+AGENT_METRIC = "offline_load.agent"
+LOAD_USER_ID = "offline-load-user"
+
+# Conversaciones de varios turnos etiquetadas con el agente que debe atenderlas
+CONVERSATIONS: List[Dict[str, Any]] = [
+    {
+        "agent": "elite_training_strategist",
+        "turns": [
+            "Quiero un plan de fuerza de 4 días a la semana para ganar masa muscular.",
+            "¿Puedo cambiar el día 3 por una sesión de cardio?",
+            "¿Cómo debería progresar el peso cada semana?",
+            "Hoy me sentí muy cansado en la sentadilla, ¿ajusto algo?",
+        ],
+    },
+    {
+        "agent": "precision_nutrition_architect",
+        "turns": [
+            "Necesito un plan de comidas de 2200 kcal alto en proteína.",
+            "Soy intolerante a la lactosa, ¿qué cambio?",
+            "¿Qué puedo cenar después de entrenar por la noche?",
+            "Dame una lista de la compra para la semana.",
+        ],
+    },
+    {
+        "agent": "recovery_corrective",
+        "turns": [
+            "Me duele la rodilla derecha al bajar escaleras desde hace una semana.",
+            "¿Qué ejercicios de movilidad puedo hacer en casa?",
+            "¿Puedo seguir corriendo mientras me recupero?",
+        ],
+    },
+    {
+        "agent": "biometrics_insight_engine",
+        "turns": [
+            "Mi variabilidad cardíaca ha bajado esta semana, ¿qué significa?",
+            "También duermo menos de 6 horas, ¿está relacionado?",
+            "¿Qué métricas debería vigilar a diario?",
+        ],
+    },
+    {
+        "agent": "motivation_behavior_coach",
+        "turns": [
+            "Me cuesta mantener la constancia para entrenar por las mañanas.",
+            "¿Cómo puedo crear el hábito sin agobiarme?",
+            "Esta semana fallé dos días, ¿qué hago ahora?",
+        ],
+    },
+    {
+        "agent": "progress_tracker",
+        "turns": [
+            "¿Cómo ha evolucionado mi peso en el último mes?",
+            "Compara mis marcas de press de banca con las de enero.",
+            "¿Voy bien para mi objetivo de verano?",
+        ],
+    },
+]
+
+
+def build_sessions(sessions: int, turns: int, users: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Genera las sesiones de tráfico de forma determinista.
+
+    Args:
+        sessions: Número de sesiones
+        turns: Turnos por sesión
+        users: Número de usuarios distintos
+        seed: Semilla del reparto de conversaciones
+
+    Returns:
+        List[Dict[str, Any]]: Sesiones con usuario, agente y textos de cada turno
+    """
+    rng = random.Random(seed)
+    result = []
+    for index in range(sessions):
+        conversation = rng.choice(CONVERSATIONS)
+        texts = [conversation["turns"][turn % len(conversation["turns"])] for turn in range(turns)]
+        result.append({
+            "user_id": f"{LOAD_USER_ID}-{index % users}",
+            "session_id": f"offline-load-session-{seed}-{index}",
+            "agent": conversation["agent"],
+            "turns": texts,
+        })
+    return result
+
+
+async def register_agents(agent_ids: List[str], latencies: LatencyRegistry) -> Dict[str, Any]:
+    """
+    Construye los agentes y los registra en el adaptador A2A con un manejador en proceso.
+
+    Args:
+        agent_ids: Agentes a registrar
+        latencies: Registro donde se anotan las latencias por agente
+
+    Returns:
+        Dict[str, Any]: Agentes registrados y errores de construcción
+    """
+    from core.agent_registry import agent_registry
+    from infrastructure.adapters.a2a_adapter import a2a_adapter
+
+    registered: List[str] = []
+    failed: Dict[str, str] = {}
+    for agent_id in agent_ids:
+        try:
+            agent = await asyncio.to_thread(agent_registry.get, agent_id)
+        except Exception as e:
+            failed[agent_id] = str(e) or type(e).__name__
+            continue
+
+        def make_handler(agent_id: str, agent: Any):
+            async def handler(message: Dict[str, Any]) -> None:
+                context = message.get("context") or {}
+                start = time.perf_counter()
+                try:
+                    result = await agent._run_async_impl(
+                        message.get("user_input", ""),
+                        user_id=context.get("user_id"),
+                        session_id=context.get("session_id"),
+                        context=context
+                    )
+                    if not isinstance(result, dict):
+                        result = {"status": "success", "output": str(result)}
+                except Exception as e:
+                    result = {"status": "error", "error": str(e), "output": f"Error en el agente {agent_id}"}
+                result.setdefault("agent_id", agent_id)
+                result.setdefault("agent_name", getattr(agent, "name", agent_id))
+                latencies.record(AGENT_METRIC, (time.perf_counter() - start) * 1000, agent_id=agent_id)
+                await a2a_adapter.send_message(
+                    from_agent_id=agent_id,
+                    to_agent_id=message["response_to"],
+                    message=result,
+                    priority="HIGH"
+                )
+            return handler
+
+        a2a_adapter.register_agent(agent_id, {
+            "name": getattr(agent, "name", agent_id),
+            "description": getattr(agent, "description", ""),
+            "message_callback": make_handler(agent_id, agent)
+        })
+        registered.append(agent_id)
+
+    # El registro en el servidor A2A se completa en tareas de fondo
+    await asyncio.sleep(0.1)
+    return {"registered": registered, "failed": failed}
+
+
+def scripted_intent_analyzer(sessions: List[Dict[str, Any]]):
+    """
+    Crea un sustituto de ``analyze_intent`` que devuelve la intención del guion.
+
+    Args:
+        sessions: Sesiones de tráfico (cada texto se asocia a su agente)
+
+    Returns:
+        Callable: Corrutina compatible con ``intent_analyzer_adapter.analyze_intent``
+    """
+    intents = {text: session["agent"] for session in sessions for text in session["turns"]}
+
+    async def analyze_intent(user_query: str, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        return {
+            "primary_intent": intents.get(user_query, "general"),
+            "secondary_intents": [],
+            "confidence": 0.9,
+            "entities": []
+        }
+
+    return analyze_intent
+
+
+async def run_session(client: Any, session: Dict[str, Any], semaphore: asyncio.Semaphore,
+                      latencies: LatencyRegistry, outcomes: Dict[str, int]) -> None:
+    """
+    Ejecuta los turnos de una sesión en orden.
+
+    Args:
+        client: Cliente HTTP contra la aplicación
+        session: Sesión a ejecutar
+        semaphore: Límite de sesiones concurrentes
+        latencies: Registro de latencias por turno
+        outcomes: Contador de resultados por código de estado
+    """
+    async with semaphore:
+        for turn, text in enumerate(session["turns"], start=1):
+            start = time.perf_counter()
+            try:
+                response = await client.post("/chat/", json={
+                    "text": text,
+                    "user_id": session["user_id"],
+                    "session_id": session["session_id"]
+                })
+                outcome = str(response.status_code)
+            except Exception as e:
+                outcome = type(e).__name__
+            latencies.record(TURN_METRIC, (time.perf_counter() - start) * 1000, turn=turn, agent_id=session["agent"])
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Compara un informe con una línea base.
+
+    Args:
+        report: Informe de la ejecución actual
+        baseline: Informe de referencia
+        tolerance: Empeoramiento relativo permitido (0.2 = 20%)
+
+    Returns:
+        List[str]: Descripción de cada regresión detectada
+    """
+    regressions = []
+
+    def check(name: str, current: float, reference: float, higher_is_worse: bool = True) -> None:
+        if not reference:
+            return
+        change = (current - reference) / reference
+        if (change if higher_is_worse else -change) > tolerance:
+            regressions.append(f"{name}: {reference} -> {current} ({change:+.1%})")
+
+    check("throughput_rps", report["throughput_rps"], baseline.get("throughput_rps", 0), higher_is_worse=False)
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        check(f"latency_ms.{key}", report["latency_ms"][key], baseline.get("latency_ms", {}).get(key, 0))
+    check("model_calls_per_request", report["model_calls_per_request"], baseline.get("model_calls_per_request", 0))
+
+    # La tasa de error se compara en puntos absolutos
+    if report["error_rate"] - baseline.get("error_rate", 0) > 0.01:
+        regressions.append(f"error_rate: {baseline.get('error_rate', 0)} -> {report['error_rate']}")
+    return regressions
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Monta la aplicación con el backend falso y ejecuta la carga.
+
+    Args:
+        args: Argumentos de línea de comandos
+
+    Returns:
+        Dict[str, Any]: Informe de la ejecución
+    """
+    import httpx
+
+    from app.main import app
+    from app.routers import chat as chat_router
+    from core.agent_registry import agent_registry
+    from core.auth import get_current_user
+    from infrastructure.adapters.a2a_adapter import a2a_adapter
+    from infrastructure.adapters.intent_analyzer_adapter import intent_analyzer_adapter
+
+    backend = FakeModelBackend(
+        seed=args.seed,
+        latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate,
+        output_tokens=tuple(int(value) for value in args.output_tokens.split(",")),
+    )
+    latencies = LatencyRegistry()
+    sessions = build_sessions(args.sessions, args.turns, args.users, args.seed)
+    agent_ids = [aid for aid in agent_registry.parse_agent_ids(args.agents) if aid != "ngx_nexus_orchestrator"]
+    faults = [Fault.parse(spec) for spec in args.fault]
+
+    with ExitStack() as stack:
+        stack.enter_context(backend.patched())
+        if not args.use_intent_analyzer:
+            stack.enter_context(patch.object(intent_analyzer_adapter, "analyze_intent", scripted_intent_analyzer(sessions)))
+        app.dependency_overrides[get_current_user] = lambda: LOAD_USER_ID
+        stack.callback(app.dependency_overrides.pop, get_current_user, None)
+
+        await a2a_adapter.start()
+        agents = await register_agents(agent_ids, latencies)
+
+        orchestrator = chat_router.get_orchestrator()
+        # Las llamadas A2A van en proceso por el adaptador; no hace falta WebSocket
+        orchestrator.is_connected = True
+        for agent_id in agents["registered"]:
+            orchestrator.intent_to_agent_map.setdefault(agent_id, [agent_id])
+
+        # Calentamiento: construye cachés de importación y modelos fuera de la medición
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://offline", timeout=None) as client:
+            warmup = build_sessions(min(len(CONVERSATIONS), args.sessions), 1, 1, args.seed + 1)
+            warmup_semaphore = asyncio.Semaphore(args.concurrency)
+            await asyncio.gather(*(
+                run_session(client, session, warmup_semaphore, LatencyRegistry(), {}) for session in warmup
+            ))
+            backend.reset()
+
+            outcomes: Dict[str, int] = {}
+            semaphore = asyncio.Semaphore(args.concurrency)
+            # Los fallos solo afectan a la medición, no al calentamiento
+            fault_injector.seed(args.seed)
+            with fault_injector.injected(*faults):
+                start = time.perf_counter()
+                await asyncio.gather(*(run_session(client, session, semaphore, latencies, outcomes) for session in sessions))
+                elapsed = time.perf_counter() - start
+
+        await a2a_adapter.stop()
+
+    requests = sum(outcomes.values())
+    model = backend.get_stats()
+    return {
+        "config": {
+            "sessions": args.sessions,
+            "turns": args.turns,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "output_tokens": args.output_tokens,
+            "scripted_intents": not args.use_intent_analyzer,
+            "faults": args.fault,
+        },
+        "requests": requests,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(1 - outcomes.get("200", 0) / requests, 4) if requests else 0.0,
+        "status_codes": outcomes,
+        "latency_ms": latencies.summary(TURN_METRIC),
+        "latency_by_turn_ms": latencies.summary(TURN_METRIC, group_by="turn"),
+        "latency_by_agent_ms": latencies.summary(AGENT_METRIC, group_by="agent_id"),
+        "model_calls_per_request": round(model["calls"] / requests, 3) if requests else 0.0,
+        "model": model,
+        "agents": agents,
+        "faults": [fault.to_dict() for fault in faults],
+    }
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga de extremo a extremo sin red")
+    parser.add_argument("--sessions", type=int, default=40, help="Número de sesiones")
+    parser.add_argument("--turns", type=int, default=4, help="Turnos por sesión")
+    parser.add_argument("--users", type=int, default=10, help="Usuarios distintos")
+    parser.add_argument("--concurrency", type=int, default=8, help="Sesiones concurrentes")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del tráfico y del modelo falso")
+    parser.add_argument("--latency", default="lognormal:400:0.5",
+                        help="Latencia del modelo: tipo:mediana_ms[:dispersión] (constant, uniform, lognormal)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probabilidad de error por llamada al modelo")
+    parser.add_argument("--output-tokens", default="40,200", help="Rango de tokens de salida: mínimo,máximo")
+    parser.add_argument("--agents", default="*", help="Agentes a registrar separados por comas ('*' para todos)")
+    parser.add_argument("--use-intent-analyzer", action="store_true",
+                        help="Usa el analizador de intención real en lugar de la intención del guion")
+    parser.add_argument("--output", help="Ruta donde guardar el informe JSON")
+    parser.add_argument("--baseline", help="Informe JSON de referencia para detectar regresiones")
+    parser.add_argument("--fault", action="append", default=[],
+                        help="Fallo a inyectar durante la medición, p. ej. 'boundary=http,target=*.example.com,latency=constant:200' (repetible)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido frente a la línea base")
+    args = parser.parse_args()
+
+    report = await run_load(args)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_with_baseline(report, baseline, args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
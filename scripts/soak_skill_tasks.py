@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Prueba de resistencia (soak) del registro de tareas de skills.
+
+Ejecuta millones de tareas sobre una skill sintética y muestrea
+periódicamente la memoria residente del proceso y el tamaño del registro.
+Con el registro acotado la memoria debe estabilizarse tras el calentamiento;
+el script falla si crece más de ``--max-growth-mb`` entre el primer muestreo
+posterior al calentamiento y el final.
+
+Uso:
+    python scripts/soak_skill_tasks.py --executions 1000000 --max-entries 10000
+    python scripts/soak_skill_tasks.py --store /tmp/skill_tasks.db
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import warnings
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core.skill import Skill
+from core.skill_tasks import SkillTaskRegistry, SkillTaskStore
+
+logging.basicConfig(level=logging.ERROR)
+logger = logging.getLogger("skill-tasks-soak")
+
+
+class SoakSkill(Skill):
+    """Skill sintética con un resultado de tamaño realista."""
+
+    def __init__(self):
+        super().__init__(name="soak", description="Skill sintética para la prueba de resistencia")
+
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"echo": input_data.get("data"), "items": list(range(16))}
+
+
+def rss_mb() -> float:
+    """Memoria residente actual del proceso en MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        import resource
+        # En macOS ru_maxrss está en bytes y es el pico, no el valor actual
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+async def run_soak(executions: int, max_entries: int, ttl: float, store_path: str,
+                   samples: int) -> Dict[str, Any]:
+    """
+    Ejecuta la prueba y devuelve los muestreos de memoria.
+
+    Args:
+        executions: Número total de ejecuciones
+        max_entries: Capacidad del registro en memoria
+        ttl: Caducidad de las tareas terminadas (segundos)
+        store_path: Ruta del almacén en disco ("" lo desactiva)
+        samples: Número de muestreos
+
+    Returns:
+        Dict[str, Any]: Muestreos y resumen
+    """
+    skill = SoakSkill()
+    store = SkillTaskStore(store_path, ttl=ttl) if store_path else None
+    skill.tasks = SkillTaskRegistry(skill.id, max_entries=max_entries, ttl=ttl, store=store)
+
+    every = max(executions // samples, 1)
+    history: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for index in range(executions):
+            await skill.execute_task(f"task-{index}", {"data": {"value": index}})
+            if (index + 1) % every == 0:
+                history.append({
+                    "executions": index + 1,
+                    "rss_mb": round(rss_mb(), 1),
+                    "registry_size": len(skill.tasks),
+                    "elapsed_s": round(time.perf_counter() - start, 1),
+                })
+    if store is not None:
+        store.close()
+
+    # El primer tramo incluye el llenado del registro hasta su capacidad
+    warm = next((sample for sample in history if sample["executions"] >= 2 * max_entries), history[0])
+    return {
+        "executions": executions,
+        "throughput_per_s": round(executions / (time.perf_counter() - start), 1),
+        "registry": skill.tasks.get_stats(),
+        "rss_after_warmup_mb": warm["rss_mb"],
+        "rss_final_mb": history[-1]["rss_mb"],
+        "rss_growth_mb": round(history[-1]["rss_mb"] - warm["rss_mb"], 1),
+        "samples": history,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soak test del registro de tareas de skills")
+    parser.add_argument("--executions", type=int, default=1_000_000, help="Ejecuciones totales")
+    parser.add_argument("--max-entries", type=int, default=10000, help="Capacidad del registro")
+    parser.add_argument("--ttl", type=float, default=3600.0, help="Caducidad de tareas terminadas")
+    parser.add_argument("--store", default="", help="Ruta del almacén SQLite (vacío lo desactiva)")
+    parser.add_argument("--samples", type=int, default=20, help="Número de muestreos")
+    parser.add_argument("--max-growth-mb", type=float, default=16.0, help="Crecimiento máximo tolerado")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_soak(args.executions, args.max_entries, args.ttl, args.store, args.samples))
+    print(json.dumps(results, indent=2))
+    if results["rss_growth_mb"] > args.max_growth_mb:
+        logger.error(f"La memoria creció {results['rss_growth_mb']} MB tras el calentamiento")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
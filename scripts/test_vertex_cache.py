@@ -104,6 +104,7 @@ async def run_cache_test(config: Dict[str, Any], iterations: int = 50) -> Dict[s
         prompt = TEST_PROMPTS[i]
         namespace = f"test_{i % 3}"  # Usar 3 namespaces diferentes
         
+        before = time.time()
         response = await client.generate_content(
             prompt=prompt,
             temperature=0.7,
@@ -112,7 +113,7 @@ async def run_cache_test(config: Dict[str, Any], iterations: int = 50) -> Dict[s
         )
         
         stats["total_requests"] += 1
-        stats["total_latency_ms"] += client.stats["latency_ms"]["content_generation"][-1]
+        stats["total_latency_ms"] += (time.time() - before) * 1000
     
     # Fase 2: Pruebas de acceso con patrones
     logger.info("Fase 2: Pruebas de acceso con patrones")
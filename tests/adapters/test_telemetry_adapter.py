@@ -180,6 +180,7 @@ class TestTelemetryAdapter:
         
         # Registrar métrica
         adapter.record_metric("test_metric", 42, {"dim": "value"})
+        adapter.flush_metrics()
         
         # Verificar que se registró en el log
         assert "METRIC: test_metric = 42 {dim=value}" in caplog.text, "La métrica debería registrarse en el log"
@@ -189,6 +190,7 @@ class TestTelemetryAdapter:
         
         # Registrar contador
         adapter.record_counter("test_counter", 1, {"dim": "value"})
+        adapter.flush_metrics()
         
         # Verificar que se registró en el log
         assert "COUNTER: test_counter += 1 {dim=value}" in caplog.text, "El contador debería registrarse en el log"
@@ -198,6 +200,7 @@ class TestTelemetryAdapter:
         
         # Registrar histograma
         adapter.record_histogram("test_histogram", 100, {"dim": "value"})
+        adapter.flush_metrics()
         
         # Verificar que se registró en el log
         assert "HISTOGRAM: test_histogram = 100 {dim=value}" in caplog.text, "El histograma debería registrarse en el log"
@@ -0,0 +1,159 @@
+"""
+Pruebas para el pipeline de spans y métricas del adaptador de telemetría.
+
+Verifican el muestreo de cabeza, la retención por cola de las trazas lentas o
+con errores (con todos sus spans), el búfer circular acotado, la exportación
+asíncrona por lotes, que el exportador de OpenTelemetry conserva los tiempos
+y la jerarquía de los spans y la agregación de métricas en histogramas.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from infrastructure.adapters import TelemetryAdapter
+from infrastructure.adapters.telemetry_adapter import OpenTelemetrySpanExporter
+
+
+class RecordingExporter:
+    """Exportador que guarda los lotes recibidos."""
+
+    def __init__(self):
+        self.batches: List[List[Dict[str, Any]]] = []
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        self.batches.append(spans)
+
+    @property
+    def names(self) -> List[str]:
+        return [span["name"] for batch in self.batches for span in batch]
+
+
+class RecordingMetricExporter:
+    """Exportador que guarda los puntos de métricas recibidos."""
+
+    def __init__(self):
+        self.points: List[Dict[str, Any]] = []
+
+    def export(self, points: List[Dict[str, Any]]) -> None:
+        self.points.extend(points)
+
+
+def _trace(adapter: TelemetryAdapter, name: str, child_delay: float = 0.0, error: bool = False) -> None:
+    root = adapter.start_span(name)
+    child = adapter.start_span(f"{name}.child")
+    if child_delay:
+        time.sleep(child_delay)
+    if error:
+        adapter.record_exception(child, ValueError("fallo"))
+    adapter.end_span(child)
+    adapter.end_span(root)
+
+
+def test_tail_sampling_keeps_slow_and_errored_traces():
+    exporter = RecordingExporter()
+    adapter = TelemetryAdapter(exporter=exporter, head_sample_rate=0.0, slow_span_ms=20.0, batch_size=100)
+
+    for index in range(50):
+        _trace(adapter, f"fast-{index}")
+    _trace(adapter, "slow", child_delay=0.03)
+    _trace(adapter, "failed", error=True)
+    adapter.export_pending()
+
+    # Las trazas conservadas incluyen todos sus spans, aunque el raíz fuera rápido
+    assert sorted(exporter.names) == ["failed", "failed.child", "slow", "slow.child"]
+    stats = adapter.get_stats()
+    assert stats["traces_dropped"] == 50
+    assert stats["traces_tail_retained"] == 2
+    assert stats["open_traces"] == 0
+
+    sampled = TelemetryAdapter(exporter=exporter, head_sample_rate=1.0, slow_span_ms=1000.0)
+    _trace(sampled, "sampled")
+    assert sampled.get_stats()["buffered_spans"] == 2
+
+
+def test_ring_buffer_is_bounded_and_exported_in_batches():
+    exporter = RecordingExporter()
+    adapter = TelemetryAdapter(exporter=exporter, head_sample_rate=1.0, buffer_size=10, batch_size=4)
+
+    for index in range(8):
+        _trace(adapter, f"op-{index}")
+
+    stats = adapter.get_stats()
+    assert stats["buffered_spans"] == 10
+    assert stats["spans_dropped_overflow"] == 6
+    assert adapter.export_pending() == 10
+    assert [len(batch) for batch in exporter.batches] == [4, 4, 2]
+    # Se conservan los más recientes, cada traza con el padre antes que el hijo
+    assert exporter.names[-2:] == ["op-7", "op-7.child"]
+
+
+def test_async_exporter_flushes_when_a_batch_fills():
+    exporter = RecordingExporter()
+    adapter = TelemetryAdapter(exporter=exporter, head_sample_rate=1.0, batch_size=4, export_interval=60.0)
+
+    async def run():
+        adapter.start_exporter()
+        for index in range(2):
+            _trace(adapter, f"op-{index}")
+        await asyncio.sleep(0.05)
+        exported_before_stop = sum(len(batch) for batch in exporter.batches)
+        _trace(adapter, "pending")
+        await adapter.stop_exporter()
+        return exported_before_stop
+
+    assert asyncio.run(run()) == 4
+    assert sorted(exporter.names[-2:]) == ["pending", "pending.child"]
+
+
+def test_opentelemetry_export_keeps_recorded_times_and_parents():
+    memory = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(memory))
+    exporter = OpenTelemetrySpanExporter(tracer=provider.get_tracer("test"))
+    # Lotes de 1 span: el padre y el hijo se exportan en llamadas distintas
+    adapter = TelemetryAdapter(exporter=exporter, head_sample_rate=1.0, batch_size=1)
+
+    before = time.time_ns()
+    _trace(adapter, "agent", child_delay=0.02)
+    time.sleep(0.05)
+    adapter.export_pending()
+
+    spans = {span.name: span for span in memory.get_finished_spans()}
+    root, child = spans["agent"], spans["agent.child"]
+    assert root.parent is None
+    assert child.parent.span_id == root.context.span_id
+    assert child.context.trace_id == root.context.trace_id
+    # Las marcas son las registradas, no las del momento de exportar
+    assert before <= root.start_time <= child.start_time
+    assert child.end_time - child.start_time >= 20_000_000
+    assert root.end_time < before + 50_000_000
+    assert root.attributes["ngx.trace_id"] == child.attributes["ngx.trace_id"]
+
+
+def test_metrics_are_aggregated_before_dispatch():
+    metrics = RecordingMetricExporter()
+    adapter = TelemetryAdapter(exporter=RecordingExporter(), metric_exporter=metrics)
+
+    for value in range(1, 1001):
+        adapter.record_counter("requests", 1, {"agent": "nutrition"})
+        adapter.record_metric("latency_ms", value, {"agent": "nutrition"})
+    adapter.record_counter("requests", 1, {"agent": "training"})
+
+    assert metrics.points == []
+    assert adapter.flush_metrics() == 3
+    points = {(point["name"], point["attributes"]["agent"]): point for point in metrics.points}
+    assert points[("requests", "nutrition")]["value"] == 1000
+    assert points[("requests", "training")]["value"] == 1
+
+    # La distribución se exporta por cubetas, con las colas incluidas
+    latency = points[("latency_ms", "nutrition")]
+    assert (latency["count"], latency["sum"], latency["min"], latency["max"]) == (1000, 500500, 1, 1000)
+    assert sum(count for _, count in latency["buckets"]) == 1000
+    assert abs(latency["percentiles"]["p99"] - 990) / 990 < 0.02
+    assert abs(latency["percentiles"]["p50"] - 500) / 500 < 0.02
+    assert adapter.flush_metrics() == 0
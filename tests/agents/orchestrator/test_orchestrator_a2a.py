@@ -433,3 +433,17 @@ async def test_orchestrator_process_request_successful_single_agent(orchestrator
     assert result["agent_id"] == orchestrator.agent_id
     orchestrator._get_agent_responses.assert_called_once()
     orchestrator._synthesize.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_orchestrator_fallback_intent_does_not_send_analysis(orchestrator):
+    """Con la intención por defecto (JSON no válido) los agentes no reciben un sobre de análisis."""
+    orchestrator._get_context = AsyncMock(return_value={})
+    orchestrator._update_context = AsyncMock()
+    orchestrator.adk_toolkit = MagicMock()
+    orchestrator.adk_toolkit.execute_skill = AsyncMock(side_effect=["no es JSON", "Respuesta sintetizada"])
+    orchestrator._get_agent_responses = AsyncMock(return_value={})
+
+    await orchestrator._process_request("Hola", user_id="u1", session_id="s1")
+
+    orchestrator._get_agent_responses.assert_called_once()
+    assert orchestrator._get_agent_responses.call_args.kwargs["analysis"] is None
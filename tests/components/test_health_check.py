@@ -0,0 +1,97 @@
+"""
+Pruebas para las verificaciones de readiness concurrentes y cacheadas.
+
+Verifican que las dependencias se comprueban en paralelo con timeout propio,
+que las sondas responden desde la instantánea indicando su antigüedad y que
+las sondas simultáneas comparten un único refresco.
+"""
+
+import asyncio
+import sys
+import time
+import types
+from unittest.mock import MagicMock
+
+# infrastructure.health importa el paquete clients.vertex_ai, que depende de la
+# telemetría de GCP; estas pruebas solo registran dependencias propias, por lo
+# que el paquete se sustituye mientras se importa el módulo.
+_vertex_ai_stub = types.ModuleType("clients.vertex_ai")
+_vertex_ai_stub.vertex_ai_client = MagicMock()
+_previous_vertex_ai = sys.modules.get("clients.vertex_ai")
+sys.modules["clients.vertex_ai"] = _vertex_ai_stub
+try:
+    from infrastructure.health import HealthCheck
+finally:
+    if _previous_vertex_ai is None:
+        sys.modules.pop("clients.vertex_ai", None)
+    else:
+        sys.modules["clients.vertex_ai"] = _previous_vertex_ai
+
+
+def _check(delay: float, ok: bool = True, calls: list = None):
+    async def check():
+        if calls is not None:
+            calls.append(1)
+        await asyncio.sleep(delay)
+        return ok, "ok" if ok else "caída"
+    return check
+
+
+def test_checks_run_concurrently_with_timeouts():
+    health = HealthCheck(check_timeout=0.1, refresh_interval=10.0, max_staleness=30.0)
+    health.register_dependency("db", _check(0.05), critical=True)
+    health.register_dependency("cache", _check(0.05, ok=False), critical=False)
+    health.register_dependency("vertex", _check(1.0), critical=True, timeout=0.05)
+
+    start = time.perf_counter()
+    ready, details = asyncio.run(health.check_readiness())
+    elapsed = time.perf_counter() - start
+
+    # Con verificaciones secuenciales serían al menos 0.15 s
+    assert elapsed < 0.09
+    assert ready is False
+    statuses = {dep["name"]: dep["status"] for dep in details["dependencies"]}
+    assert statuses == {"db": "UP", "cache": "DOWN", "vertex": "TIMEOUT"}
+    assert health.stats["timeouts"] == 1
+
+
+def test_probes_answer_from_snapshot_and_report_staleness():
+    calls = []
+    health = HealthCheck(check_timeout=0.03, refresh_interval=0.05, max_staleness=30.0)
+    health.register_dependency("db", _check(0.02, calls=calls))
+
+    async def run():
+        # Las sondas simultáneas comparten el primer refresco
+        await asyncio.gather(*(health.check_readiness() for _ in range(20)))
+        assert len(calls) == 1
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        ready, details = await health.check_readiness()
+        probe_time = time.perf_counter() - start
+        return ready, details, probe_time
+
+    ready, details, probe_time = asyncio.run(run())
+    assert ready is True
+    assert len(calls) == 1
+    assert probe_time < 0.01
+    assert details["staleness_seconds"] >= 0.1
+    assert details["stale"] is True
+    assert health.stats["snapshot_reads"] == 1
+
+
+def test_background_refresh_keeps_snapshot_fresh():
+    calls = []
+    health = HealthCheck(check_timeout=1.0, refresh_interval=0.02, max_staleness=0.5)
+    health.register_dependency("db", _check(0.0, calls=calls))
+
+    async def run():
+        health.start_background_refresh()
+        await asyncio.sleep(0.11)
+        _, details = await health.check_readiness()
+        await health.stop_background_refresh()
+        return details
+
+    details = asyncio.run(run())
+    assert len(calls) >= 4
+    assert details["stale"] is False
+    assert health.stats["probe_refreshes"] == 0
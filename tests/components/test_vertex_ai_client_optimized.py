@@ -413,3 +413,33 @@ async def test_get_stats():
     
     # Verificar que el mock fue llamado una vez
     mock_get_stats.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_generate_content_reuses_prompt_prefix():
+    """Prueba que el prefijo estable se identifica por hash y se cuenta como reutilizado."""
+    from core.prompt_builder import PrefixCache, PromptBuilder
+
+    client = VertexAIClient()
+    client._initialized = True
+    client.connection_pool.acquire = AsyncMock(return_value={"mock": True})
+    client.connection_pool.release = AsyncMock()
+
+    cache = PrefixCache()
+    instructions = "Eres un especialista en recuperación. " * 50
+
+    def build(query):
+        return PromptBuilder(cache).static("instructions", instructions).dynamic(query).build()
+
+    first_parts, second_parts = build("¿Cómo recupero la rodilla?"), build("¿Cómo duermo mejor?")
+    first = await client.generate_content(first_parts, skip_cache=True)
+    second = await client.generate_content(second_parts, skip_cache=True)
+
+    assert first_parts.prefix_hash == second_parts.prefix_hash
+    assert first["usage"]["prefix_tokens_reused"] == 0
+    assert second["usage"]["prefix_tokens_reused"] == second_parts.prefix_tokens
+    assert second["prefix_hash"] == second_parts.prefix_hash
+    assert client.stats["tokens"]["prefix_reused"] == second_parts.prefix_tokens
+    assert client.stats["prefix_cache"] == {
+        "hits": 1, "misses": 1, "context_caches_created": 0, "context_cache_errors": 0
+    }
@@ -15,23 +15,23 @@ from app.schemas.agent import AgentRunRequest
 
 def test_list_agents(test_client: TestClient, auth_headers):
     """Prueba el endpoint para listar agentes."""
-    with patch("app.routers.agents.get_agents") as mock_get_agents:
-        # Configurar el mock para devolver agentes de prueba
-        mock_agents = {
-            "test_agent_1": MagicMock(
+    with patch("app.routers.agents.list_agent_metadata") as mock_list_agents:
+        # Configurar el mock para devolver metadatos de agentes de prueba
+        mock_agents = [
+            MagicMock(
                 agent_id="test_agent_1",
                 name="Test Agent 1",
                 description="Test agent for testing",
                 capabilities=["test", "mock"]
             ),
-            "test_agent_2": MagicMock(
+            MagicMock(
                 agent_id="test_agent_2",
                 name="Test Agent 2",
                 description="Another test agent",
                 capabilities=["test", "mock"]
             )
-        }
-        mock_get_agents.return_value = mock_agents
+        ]
+        mock_list_agents.return_value = mock_agents
         
         # Realizar la solicitud
         response = test_client.get("/agents/", headers=auth_headers)
@@ -0,0 +1,382 @@
+"""
+Backend de modelo falso y determinista para pruebas de carga sin red.
+
+Sustituye la frontera con los SDK de Gemini (``google.generativeai``) y de
+Vertex AI (modelos del ``ConnectionPool``) por modelos en proceso, de modo que
+``GeminiClient`` y ``VertexAIClient`` ejecutan su código real (caché,
+presupuesto, pool, estadísticas) y solo la llamada remota es simulada.
+
+Cada llamada toma su latencia de una distribución configurable, puede fallar
+con una tasa de error dada y devuelve un número de tokens de salida acotado.
+Los sorteos dependen de la semilla, la operación y el prompt (no del orden de
+llegada), así que dos ejecuciones con la misma semilla y el mismo tráfico
+producen las mismas respuestas aunque la concurrencia las intercale distinto.
+
+Las llamadas síncronas del SDK (``generate_content``, ``get_embeddings``,
+``send_message``) duermen con ``time.sleep``: igual que el SDK real, bloquean
+el bucle de eventos si el código que las usa no las delega a un hilo.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from unittest.mock import patch
+
+from core.fault_injection import LatencyDistribution
+from core.latency_histogram import LatencyRegistry
+from core.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Operaciones simuladas
+GEMINI_GENERATE = "gemini.generate"
+GEMINI_CHAT = "gemini.chat"
+VERTEX_GENERATE = "vertex.generate"
+VERTEX_EMBEDDING = "vertex.embedding"
+
+EMBEDDING_DIMENSIONS = 768
+LATENCY_METRIC = "fake_model.call"
+
+_WORDS = (
+    "entrenamiento", "recuperación", "nutrición", "descanso", "progreso", "objetivo",
+    "sesión", "fuerza", "movilidad", "hidratación", "sueño", "hábito", "plan", "semana",
+)
+
+
+class FakeModelError(RuntimeError):
+    """Error inyectado por el backend falso (simula un 503 del proveedor)."""
+
+
+class FakeModelBackend:
+    """
+    Backend de modelo en proceso con latencia, errores y tokens configurables.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency: Optional[LatencyDistribution] = None,
+        operation_latency: Optional[Dict[str, LatencyDistribution]] = None,
+        error_rate: float = 0.0,
+        output_tokens: Tuple[int, int] = (40, 200),
+    ):
+        """
+        Inicializa el backend.
+
+        Args:
+            seed: Semilla de los sorteos
+            latency: Distribución de latencia por defecto
+            operation_latency: Distribuciones por operación (p. ej. "vertex.embedding")
+            error_rate: Probabilidad de que una llamada falle (0.0-1.0)
+            output_tokens: Rango (mínimo, máximo) de tokens de salida por respuesta
+        """
+        self.seed = seed
+        self.latency = latency or LatencyDistribution()
+        self.operation_latency = operation_latency or {}
+        self.error_rate = error_rate
+        self.output_tokens = output_tokens
+        self.latencies = LatencyRegistry(max_series=64)
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Any] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Reinicia contadores e histogramas (la semilla se conserva)."""
+        with self._lock:
+            self._occurrences.clear()
+            self.stats = {
+                "calls": 0,
+                "errors": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "calls_by_operation": {},
+                "calls_by_model": {},
+            }
+        self.latencies.clear()
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Estimación aproximada de tokens (4 caracteres por token)."""
+        return max(1, len(text) // 4)
+
+    def _draw(self, operation: str, model_name: str, prompt: str) -> Tuple[float, bool, int, random.Random]:
+        # El sorteo depende de la semilla, la operación, el prompt y cuántas
+        # veces se ha visto ese prompt, no del orden entre llamadas distintas
+        digest = hashlib.sha256(f"{operation}\x00{prompt}".encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+        rng = random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+        distribution = self.operation_latency.get(operation, self.latency)
+        latency_ms = distribution.sample_ms(rng)
+        failed = rng.random() < self.error_rate
+        completion_tokens = rng.randint(*self.output_tokens)
+
+        prompt_tokens = self.estimate_tokens(prompt)
+        with self._lock:
+            stats = self.stats
+            stats["calls"] += 1
+            stats["calls_by_operation"][operation] = stats["calls_by_operation"].get(operation, 0) + 1
+            stats["calls_by_model"][model_name] = stats["calls_by_model"].get(model_name, 0) + 1
+            if failed:
+                stats["errors"] += 1
+            else:
+                stats["prompt_tokens"] += prompt_tokens
+                stats["completion_tokens"] += completion_tokens
+        self.latencies.record(LATENCY_METRIC, latency_ms, operation=operation, model=model_name)
+        return latency_ms / 1000, failed, completion_tokens, rng
+
+    @staticmethod
+    def _render_text(prompt: str, completion_tokens: int, rng: random.Random) -> str:
+        # Aproximadamente un token por palabra corta
+        words = [rng.choice(_WORDS) for _ in range(completion_tokens)]
+        sentence = " ".join(words)
+        if "json" in prompt.lower():
+            return json.dumps(
+                {"response": sentence, "summary": " ".join(words[:8]), "confidence": round(rng.uniform(0.6, 0.95), 2)},
+                ensure_ascii=False,
+            )
+        return sentence[:1].upper() + sentence[1:] + "."
+
+    def _response(self, prompt: str, completion_tokens: int, rng: random.Random) -> "FakeResponse":
+        return FakeResponse(
+            text=self._render_text(prompt, completion_tokens, rng),
+            prompt_tokens=self.estimate_tokens(prompt),
+            completion_tokens=completion_tokens,
+        )
+
+    def generate(self, operation: str, model_name: str, prompt: Any) -> "FakeResponse":
+        """
+        Simula una llamada síncrona (bloquea el hilo durante la latencia).
+
+        Args:
+            operation: Operación simulada
+            model_name: Modelo solicitado
+            prompt: Prompt enviado
+
+        Returns:
+            FakeResponse: Respuesta con texto, candidatos y uso de tokens
+
+        Raises:
+            FakeModelError: Si la llamada sorteó un error
+        """
+        prompt = str(prompt)
+        delay, failed, completion_tokens, rng = self._draw(operation, model_name, prompt)
+        time.sleep(delay)
+        if failed:
+            raise FakeModelError(f"Error inyectado en {operation} ({model_name})")
+        return self._response(prompt, completion_tokens, rng)
+
+    async def generate_async(self, operation: str, model_name: str, prompt: Any) -> "FakeResponse":
+        """
+        Simula una llamada asíncrona (cede el bucle durante la latencia).
+
+        Args:
+            operation: Operación simulada
+            model_name: Modelo solicitado
+            prompt: Prompt enviado
+
+        Returns:
+            FakeResponse: Respuesta con texto, candidatos y uso de tokens
+
+        Raises:
+            FakeModelError: Si la llamada sorteó un error
+        """
+        prompt = str(prompt)
+        delay, failed, completion_tokens, rng = self._draw(operation, model_name, prompt)
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeModelError(f"Error inyectado en {operation} ({model_name})")
+        return self._response(prompt, completion_tokens, rng)
+
+    def embed(self, model_name: str, texts: List[str]) -> List["FakeEmbedding"]:
+        """
+        Simula ``TextEmbeddingModel.get_embeddings`` con vectores deterministas.
+
+        Args:
+            model_name: Modelo solicitado
+            texts: Textos a vectorizar
+
+        Returns:
+            List[FakeEmbedding]: Un embedding por texto
+
+        Raises:
+            FakeModelError: Si la llamada sorteó un error
+        """
+        joined = "\x00".join(texts)
+        delay, failed, _, _ = self._draw(VERTEX_EMBEDDING, model_name, joined)
+        time.sleep(delay)
+        if failed:
+            raise FakeModelError(f"Error inyectado en {VERTEX_EMBEDDING} ({model_name})")
+        embeddings = []
+        for text in texts:
+            rng = random.Random(f"{self.seed}:embedding:{text}")
+            embeddings.append(FakeEmbedding([rng.uniform(-1, 1) for _ in range(EMBEDDING_DIMENSIONS)]))
+        return embeddings
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene contadores y latencias simuladas.
+
+        Returns:
+            Dict[str, Any]: Llamadas, errores, tokens y percentiles por operación
+        """
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        stats["total_tokens"] = stats["prompt_tokens"] + stats["completion_tokens"]
+        stats["latency_ms"] = self.latencies.summary(LATENCY_METRIC, group_by="operation")
+        return stats
+
+    @contextmanager
+    def patched(self) -> Iterator["FakeModelBackend"]:
+        """
+        Instala el backend en los clientes de Gemini y Vertex AI.
+
+        Los clientes que no se pueden importar se omiten con un aviso, de modo
+        que el backend sirve también en entornos con solo uno de los SDK.
+
+        Yields:
+            FakeModelBackend: El propio backend
+        """
+        with ExitStack() as stack:
+            self._patch_gemini(stack)
+            self._patch_vertex(stack)
+            yield self
+
+    def _patch_gemini(self, stack: ExitStack) -> None:
+        try:
+            from clients import gemini_client as gemini_module
+        except ImportError as e:
+            logger.warning(f"Backend falso: cliente Gemini no disponible ({e})")
+            return
+
+        backend = self
+        stack.enter_context(patch.object(gemini_module.genai, "configure", lambda **kwargs: None))
+        stack.enter_context(
+            patch.object(gemini_module.genai, "GenerativeModel", lambda model_name, **kwargs: FakeGenerativeModel(backend, model_name))
+        )
+        stack.enter_context(patch.object(gemini_module.settings, "GEMINI_API_KEY", gemini_module.settings.GEMINI_API_KEY or "offline"))
+
+        # El singleton puede conservar modelos reales creados antes del parche
+        client = gemini_module.gemini_client
+        client.models.clear()
+        client.model = None
+        stack.callback(client.models.clear)
+        stack.callback(setattr, client, "model", None)
+
+    def _patch_vertex(self, stack: ExitStack) -> None:
+        try:
+            from clients.vertex_ai.client import vertex_ai_client
+            from clients.vertex_ai.connection import ConnectionPool
+        except ImportError as e:
+            logger.warning(f"Backend falso: cliente Vertex AI no disponible ({e})")
+            return
+
+        backend = self
+
+        async def create_client(pool: ConnectionPool) -> Dict[str, Any]:
+            return {
+                "text_model": FakeGenerativeModel(backend, "gemini-1.5-pro-latest", operation=VERTEX_GENERATE),
+                "embedding_model": FakeEmbeddingModel(backend, "textembedding-gecko@latest"),
+                "multimodal_model": FakeGenerativeModel(backend, "gemini-1.5-pro-vision-latest", operation=VERTEX_GENERATE),
+                "project_id": pool.project_id,
+                "location": pool.location,
+                "mock": False,
+            }
+
+        async def get_project_id(pool: ConnectionPool) -> str:
+            pool.project_id = pool.project_id or "offline-load-test"
+            return pool.project_id
+
+        stack.enter_context(patch.object(ConnectionPool, "_create_new_client", create_client))
+        stack.enter_context(patch.object(ConnectionPool, "_get_project_id", get_project_id))
+        # Sin cachés de contexto remotas
+        stack.enter_context(patch.object(vertex_ai_client, "context_cache_min_tokens", 0))
+
+
+class FakeUsageMetadata:
+    """Uso de tokens con los nombres de campo del SDK."""
+
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+        self.total_token_count = prompt_tokens + completion_tokens
+        self.cached_content_token_count = 0
+
+
+class FakeFinishReason:
+    name = "STOP"
+
+
+class FakeCandidate:
+    finish_reason = FakeFinishReason()
+
+
+class FakeResponse:
+    """Respuesta con la forma de ``GenerateContentResponse``."""
+
+    def __init__(self, text: str, prompt_tokens: int, completion_tokens: int):
+        self.text = text
+        self.candidates = [FakeCandidate()]
+        self.usage_metadata = FakeUsageMetadata(prompt_tokens, completion_tokens)
+
+
+class FakeEmbedding:
+    """Embedding con la forma de ``TextEmbedding``."""
+
+    def __init__(self, values: List[float]):
+        self.values = values
+
+
+class FakeChatSession:
+    """Sesión de chat con la forma de ``ChatSession``."""
+
+    def __init__(self, model: "FakeGenerativeModel", history: Optional[List[Any]] = None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content: Any, **kwargs: Any) -> FakeResponse:
+        response = self.model.backend.generate(GEMINI_CHAT, self.model.model_name, content)
+        self.history.extend([content, response.text])
+        return response
+
+    async def send_message_async(self, content: Any, **kwargs: Any) -> FakeResponse:
+        response = await self.model.backend.generate_async(GEMINI_CHAT, self.model.model_name, content)
+        self.history.extend([content, response.text])
+        return response
+
+
+class FakeGenerativeModel:
+    """Modelo generativo con la interfaz usada de ``GenerativeModel``."""
+
+    def __init__(self, backend: FakeModelBackend, model_name: str, operation: str = GEMINI_GENERATE):
+        self.backend = backend
+        self.model_name = model_name
+        self.operation = operation
+
+    def generate_content(self, contents: Any, **kwargs: Any) -> FakeResponse:
+        return self.backend.generate(self.operation, self.model_name, contents)
+
+    async def generate_content_async(self, contents: Any, **kwargs: Any) -> FakeResponse:
+        return await self.backend.generate_async(self.operation, self.model_name, contents)
+
+    def start_chat(self, history: Optional[List[Any]] = None, **kwargs: Any) -> FakeChatSession:
+        return FakeChatSession(self, history)
+
+
+class FakeEmbeddingModel:
+    """Modelo de embeddings con la interfaz usada de ``TextEmbeddingModel``."""
+
+    def __init__(self, backend: FakeModelBackend, model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def get_embeddings(self, texts: List[str]) -> List[FakeEmbedding]:
+        return self.backend.embed(self.model_name, texts)
@@ -0,0 +1,127 @@
+"""
+Pruebas unitarias para el motor de analítica biométrica local.
+
+Verifican que los cálculos vectorizados (medias móviles, pendientes, puntos
+de cambio y anomalías) son correctos y que el resumen para el prompt es
+compacto y determinista.
+"""
+
+import json
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from agents.biometrics_insight_engine.analytics import (
+    anomaly_zscores,
+    build_prompt_data,
+    detect_change_point,
+    linear_slope,
+    rolling_mean,
+    summarize_biometric_data,
+    to_columnar,
+)
+
+
+def _records(values, start=date(2025, 1, 1), unit="ms", **extra):
+    """Genera registros diarios con el formato usado por el agente."""
+    return [
+        {"date": (start + timedelta(days=i)).isoformat(), "value": v, "unit": unit, **extra}
+        for i, v in enumerate(values)
+    ]
+
+
+@pytest.fixture
+def long_history():
+    """Historial de un año de HRV y sueño."""
+    rng = np.random.default_rng(42)
+    days = 365
+    hrv = np.concatenate([rng.normal(50, 3, 180), rng.normal(60, 3, days - 180)])
+    sleep = [
+        {
+            "date": (date(2025, 1, 1) + timedelta(days=i)).isoformat(),
+            "total_duration": float(7 + rng.normal(0, 0.5)),
+            "deep_sleep": 1.5,
+            "rem_sleep": 2.0,
+            "unit": "hours",
+        }
+        for i in range(days)
+    ]
+    return {
+        "hrv": {"rmssd": _records([float(v) for v in hrv])},
+        "sleep": {"daily": sleep},
+    }
+
+
+def test_to_columnar_expands_multi_field_records(long_history):
+    series = to_columnar(long_history)
+
+    assert "hrv.rmssd" in series
+    assert "sleep.daily.total_duration" in series
+    assert "sleep.daily.deep_sleep" in series
+    assert len(series["hrv.rmssd"]) == 365
+
+
+def test_to_columnar_sorts_by_date():
+    data = {"weight": _records([3.0, 1.0, 2.0])}
+    data["weight"].reverse()
+
+    series = to_columnar(data)["weight"]
+
+    assert series.values.tolist() == [3.0, 1.0, 2.0]
+    assert series.start == "2025-01-01"
+
+
+def test_rolling_mean_and_slope():
+    values = np.arange(10, dtype=float)
+
+    assert rolling_mean(values, 3).tolist() == pytest.approx([1, 2, 3, 4, 5, 6, 7, 8])
+    assert rolling_mean(values, 20).size == 0
+    assert linear_slope(np.arange(10), values * 2) == pytest.approx(2.0)
+
+
+def test_detect_change_point_finds_level_shift():
+    values = np.array([10.0] * 20 + [20.0] * 20) + np.tile([0.5, -0.5], 20)
+
+    change = detect_change_point(values)
+
+    assert change is not None
+    assert change["index"] == 20
+    assert change["before"] == pytest.approx(10.0, abs=0.1)
+    assert change["after"] == pytest.approx(20.0, abs=0.1)
+    assert detect_change_point(np.ones(20)) is None
+
+
+def test_anomaly_zscores_flags_outlier():
+    values = np.array([50, 51, 49, 50, 52, 48, 50, 95], dtype=float)
+
+    zscores = anomaly_zscores(values)
+
+    assert np.argmax(np.abs(zscores)) == 7
+    assert abs(zscores[7]) > 2.5
+
+
+def test_summary_includes_hrv_and_sleep_aggregates(long_history):
+    summary = summarize_biometric_data(long_history)
+
+    assert summary["data_points"] == 365 * 4
+    assert summary["hrv"]["metric"] == "hrv.rmssd"
+    assert summary["hrv"]["recent_mean"] > summary["hrv"]["baseline_mean"]
+    assert summary["sleep"]["deep_sleep_ratio"] == pytest.approx(1.5 / 7, abs=0.02)
+    assert summary["metrics"]["hrv.rmssd"]["change_point"]["at"] == "2025-06-30"
+
+
+def test_prompt_data_is_compact_and_deterministic(long_history):
+    raw = json.dumps(long_history, indent=2)
+
+    first = build_prompt_data(long_history)
+    second = build_prompt_data(long_history)
+
+    assert first == second
+    assert len(first) * 10 < len(raw)
+
+
+def test_prompt_data_falls_back_to_raw_data():
+    data = {"notes": {"journal": [{"date": "2025-01-01", "text": "bien"}]}}
+
+    assert json.loads(build_prompt_data(data)) == data
@@ -0,0 +1,199 @@
+"""
+Pruebas para la generación fusionada de resultados de skills.
+
+Usan un modelo local simulado que responde de forma determinista a cada tarea
+para verificar que la generación fusionada produce los mismos resultados que
+las llamadas individuales con menos rondas al modelo, y que los pasos que
+faltan se regeneran con su prompt original. El modelo simulado respeta el
+``response_schema`` recibido (los pasos de forma libre llegan como strings JSON).
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+from agents.shared.fused_generation import FusedGeneration
+from core.prompt_builder import PrefixCache, PromptBuilder
+
+RESPONSE_PROMPT = "Eres un especialista. Responde a: ¿cómo prevenir lesiones al correr?"
+PLAN_PROMPT = "Genera un plan de prevención en formato JSON. TAREA=plan"
+EXERCISES_PROMPT = "Genera ejercicios en formato JSON array. TAREA=exercises"
+
+ANSWERS = {
+    "response": "Plan detallado para corredores",
+    "plan": {"target_area": "rodilla", "warm_up": "10 minutos"},
+    "exercises": [{"name": "Puente de glúteo", "sets": 3}],
+}
+
+
+class FakeModel:
+    """Modelo simulado que resuelve tareas individuales o fusionadas con latencia fija."""
+
+    def __init__(self, latency=0.01, drop_keys=()):
+        self.latency = latency
+        self.drop_keys = set(drop_keys)
+        self.calls = 0
+        self.structured_kwargs = []
+
+    async def generate_response(self, prompt, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ANSWERS["response"]
+
+    async def generate_structured_output(self, prompt, **kwargs):
+        self.calls += 1
+        self.structured_kwargs.append(kwargs)
+        await asyncio.sleep(self.latency)
+        keys = re.findall(r'### Clave "(\w+)"', prompt)
+        if keys:
+            properties = kwargs["response_schema"]["properties"]
+            fused = {}
+            for key in keys:
+                if key in self.drop_keys:
+                    continue
+                value = ANSWERS[key]
+                fused[key] = json.dumps(value) if properties[key]["type"] == "string" and key != "response" else value
+            return json.dumps(fused)
+        task = re.search(r"TAREA=(\w+)", prompt).group(1)
+        return ANSWERS[task]
+
+
+def _generation(model, fuse=True):
+    generation = FusedGeneration(model, temperature=0.4, fuse=fuse)
+    generation.text("response", RESPONSE_PROMPT)
+    generation.object("plan", PLAN_PROMPT)
+    generation.array("exercises", EXERCISES_PROMPT)
+    return generation
+
+
+@pytest.mark.asyncio
+async def test_fused_results_match_individual_calls():
+    fused_model, separate_model = FakeModel(), FakeModel()
+
+    fused = await _generation(fused_model).run()
+    separate = await _generation(separate_model, fuse=False).run()
+
+    assert fused == separate == ANSWERS
+    assert fused_model.calls == 1
+    assert separate_model.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_missing_steps_are_regenerated_concurrently():
+    model = FakeModel(latency=0.05, drop_keys={"plan", "exercises"})
+
+    start = asyncio.get_running_loop().time()
+    results = await _generation(model).run()
+    elapsed = asyncio.get_running_loop().time() - start
+
+    assert results == ANSWERS
+    assert model.calls == 3
+    # Una ronda fusionada más una ronda concurrente para los pasos que faltan
+    assert elapsed < 0.05 * 3
+
+
+@pytest.mark.asyncio
+async def test_invalid_fused_output_falls_back_to_each_prompt():
+    class BrokenFusedModel(FakeModel):
+        async def generate_structured_output(self, prompt, **kwargs):
+            if "### Clave" in prompt:
+                self.calls += 1
+                return "no es JSON"
+            return await super().generate_structured_output(prompt, **kwargs)
+
+    model = BrokenFusedModel()
+
+    assert await _generation(model).run() == ANSWERS
+    assert model.calls == 4
+
+
+@pytest.mark.asyncio
+async def test_nullable_step_accepts_null():
+    class NullModel(FakeModel):
+        async def generate_structured_output(self, prompt, **kwargs):
+            self.calls += 1
+            return {"response": "Texto", "protocol": None}
+
+    model = NullModel()
+    generation = FusedGeneration(model)
+    generation.text("response", RESPONSE_PROMPT)
+    generation.object("protocol", "Protocolo en JSON o null", nullable=True)
+
+    assert await generation.run() == {"response": "Texto", "protocol": None}
+    assert model.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fused_call_sends_response_schema_and_text_temperature():
+    model = FakeModel()
+
+    await _generation(model).run()
+
+    kwargs = model.structured_kwargs[0]
+    assert kwargs["response_mime_type"] == "application/json"
+    assert kwargs["temperature"] == 0.4
+    schema = kwargs["response_schema"]
+    assert schema["type"] == "object"
+    assert schema["required"] == ["response", "plan", "exercises"]
+    assert all(prop["type"] == "string" for prop in schema["properties"].values())
+
+
+@pytest.mark.asyncio
+async def test_step_schema_is_sent_and_enforced():
+    exercise_schema = {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "sets": {"type": "integer"}},
+            "required": ["name", "sets"],
+        },
+    }
+
+    class WrongShapeModel(FakeModel):
+        async def generate_structured_output(self, prompt, **kwargs):
+            self.calls += 1
+            self.structured_kwargs.append(kwargs)
+            if "### Clave" in prompt:
+                return {"response": "Texto", "exercises": [{"name": "Puente de glúteo"}]}
+            return ANSWERS["exercises"]
+
+    model = WrongShapeModel()
+    generation = FusedGeneration(model)
+    generation.text("response", RESPONSE_PROMPT)
+    generation.array("exercises", EXERCISES_PROMPT, schema=exercise_schema)
+
+    results = await generation.run()
+
+    assert model.structured_kwargs[0]["response_schema"]["properties"]["exercises"] == exercise_schema
+    # El array fusionado no cumple el esquema: se regenera con el esquema del paso
+    assert results == {"response": "Texto", "exercises": ANSWERS["exercises"]}
+    assert model.structured_kwargs[1]["response_schema"] == exercise_schema
+
+
+@pytest.mark.asyncio
+async def test_static_prefix_leads_the_fused_prompt_and_is_forwarded():
+    parts = (
+        PromptBuilder(cache=PrefixCache())
+        .static(("skill", "injury_prevention", "PRIME"), lambda: "Eres un especialista. Programa PRIME.")
+        .dynamic("Responde a: ¿cómo prevenir lesiones al correr?")
+        .build()
+    )
+    model = FakeModel()
+    generation = FusedGeneration(model)
+    generation.text("response", parts)
+    generation.object("plan", PLAN_PROMPT)
+
+    fused_prompt = generation.build_prompt()
+    results = await generation.run()
+
+    assert fused_prompt.text.startswith(parts.prefix)
+    assert fused_prompt.prefix_hash == parts.prefix_hash
+    assert parts.prefix not in fused_prompt.suffix
+    assert parts.suffix in fused_prompt.suffix
+    kwargs = model.structured_kwargs[0]
+    assert kwargs["prompt_prefix"] == parts.prefix
+    assert kwargs["prefix_hash"] == parts.prefix_hash
+    assert results == {"response": ANSWERS["response"], "plan": ANSWERS["plan"]}
+
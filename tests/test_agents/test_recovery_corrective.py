@@ -149,6 +149,112 @@ class TestRecoveryCorrective(unittest.TestCase):
         call_args = self.gemini_client_mock.generate_response.call_args[0][0]
         self.assertIn("PRIME", call_args)
 
+    def test_injury_prevention_skill_uses_single_fused_call(self):
+        """Verifica que la skill genera respuesta, plan y ejercicios en una sola llamada."""
+        injury_prevention_skill = next(
+            skill for skill in self.agent.toolkit.skills if skill.name == "injury_prevention"
+        )
+        self.gemini_client_mock.generate_structured_output.return_value = {
+            "response": "Respuesta fusionada",
+            "prevention_plan": {"target_area": "rodilla"},
+            "exercises": [{"name": "Puente de glúteo"}]
+        }
+
+        from agents.recovery_corrective.agent import InjuryPreventionInput
+
+        result = asyncio.run(injury_prevention_skill.handler(
+            InjuryPreventionInput(query="¿Cómo puedo prevenir lesiones al correr?")
+        ))
+
+        self.assertEqual(result.response, "Respuesta fusionada")
+        self.assertEqual(result.prevention_plan, {"target_area": "rodilla"})
+        self.assertEqual(self.gemini_client_mock.generate_structured_output.call_count, 1)
+        self.gemini_client_mock.generate_response.assert_not_called()
+        fused_prompt = self.gemini_client_mock.generate_structured_output.call_args[0][0]
+        self.assertIn("PRIME", fused_prompt)
+
+    def test_process_message_analyzes_intent_and_data_in_one_call(self):
+        """Verifica que la intención y los datos de la skill se extraen juntos."""
+        self.gemini_client_mock.generate_structured_output.return_value = {
+            "intent": "sleep_optimization",
+            "sleep_issues": ["Despertares nocturnos"]
+        }
+        self.agent.toolkit.run_skill = AsyncMock(return_value=MagicMock(response="Plan de sueño"))
+
+        result = asyncio.run(self.agent.process_message("Me despierto varias veces por la noche"))
+
+        self.assertEqual(result, "Plan de sueño")
+        self.gemini_client_mock.generate_response.assert_not_called()
+        self.assertEqual(self.gemini_client_mock.generate_structured_output.call_count, 1)
+        skill_name, input_data = self.agent.toolkit.run_skill.call_args[0]
+        self.assertEqual(skill_name, "sleep_optimization")
+        self.assertEqual(input_data.sleep_issues, ["Despertares nocturnos"])
+
+    def test_process_message_reuses_orchestrator_analysis(self):
+        """Verifica que el sobre de análisis del orquestador evita la clasificación propia."""
+        from app.schemas.a2a import A2ATaskContext
+        from core.analysis_envelope import AnalysisEnvelope
+
+        message = "Me despierto varias veces por la noche"
+        envelope = AnalysisEnvelope.build(
+            query=message,
+            primary_intent="sleep_optimization",
+            confidence=0.9,
+            entities=[{"entity_type": "sleep_issue", "value": "Despertares nocturnos"}],
+            target_agents=["recovery_corrective"]
+        )
+        context = A2ATaskContext(user_id="u1", analysis=envelope).model_dump(mode="json")
+        self.agent.toolkit.run_skill = AsyncMock(return_value=MagicMock(response="Plan de sueño"))
+
+        result = asyncio.run(self.agent.process_message(message, context=context))
+
+        self.assertEqual(result, "Plan de sueño")
+        self.gemini_client_mock.generate_response.assert_not_called()
+        self.gemini_client_mock.generate_structured_output.assert_not_called()
+        skill_name, input_data = self.agent.toolkit.run_skill.call_args[0]
+        self.assertEqual(skill_name, "sleep_optimization")
+        self.assertEqual(input_data.sleep_issues, ["Despertares nocturnos"])
+
+    def test_envelope_without_entities_keeps_targeted_extraction(self):
+        """Verifica que los datos que el sobre no trae se extraen con su prompt específico."""
+        from app.schemas.a2a import A2ATaskContext
+        from core.analysis_envelope import AnalysisEnvelope
+
+        message = "Me lesioné el tobillo hace una semana"
+        envelope = AnalysisEnvelope.build(query=message, primary_intent="rehabilitation", confidence=0.9)
+        context = A2ATaskContext(user_id="u1", analysis=envelope).model_dump(mode="json")
+        self.gemini_client_mock.generate_structured_output.return_value = {
+            "injury_type": "esguince de tobillo",
+            "injury_phase": "subaguda"
+        }
+        self.agent.toolkit.run_skill = AsyncMock(return_value=MagicMock(response="Plan de rehabilitación"))
+
+        asyncio.run(self.agent.process_message(message, context=context))
+
+        self.gemini_client_mock.generate_response.assert_not_called()
+        self.assertEqual(self.gemini_client_mock.generate_structured_output.call_count, 1)
+        self.assertIn("fase de la lesión", self.gemini_client_mock.generate_structured_output.call_args[0][0])
+        skill_name, input_data = self.agent.toolkit.run_skill.call_args[0]
+        self.assertEqual(skill_name, "rehabilitation")
+        self.assertEqual(input_data.injury_type, "esguince de tobillo")
+        self.assertEqual(input_data.injury_phase, "subaguda")
+
+    def test_skill_prompts_share_program_prefix(self):
+        """Verifica que el contexto del programa forma un prefijo memorizado común a todas las consultas."""
+        from agents.recovery_corrective.agent import build_skill_prompt
+        from agents.shared.program_definitions import format_program_context
+
+        program_context = format_program_context("PRIME", "recovery", "Protocolos de recuperación recomendados")
+        first = build_skill_prompt(("test_skill", "PRIME"), "Rol", "Instrucciones",
+                                   '"¿Cómo prevenir lesiones?"', program_context)
+        second = build_skill_prompt(("test_skill", "PRIME"), "Rol", "Instrucciones",
+                                    '"¿Cómo recuperarme?"', program_context)
+
+        self.assertIn(program_context.strip(), first.prefix)
+        self.assertNotIn("¿Cómo prevenir", first.prefix)
+        self.assertEqual(second.prefix_hash, first.prefix_hash)
+        self.assertTrue(second.prefix_reused)
+        self.assertTrue(second.text.startswith(first.prefix))
 
 if __name__ == "__main__":
     unittest.main()
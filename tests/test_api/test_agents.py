@@ -15,23 +15,23 @@ from app.schemas.agent import AgentRunRequest
 
 def test_list_agents(test_client: TestClient, auth_headers):
     """Prueba el endpoint para listar agentes."""
-    with patch("app.routers.agents.get_agents") as mock_get_agents:
-        # Configurar el mock para devolver agentes de prueba
-        mock_agents = {
-            "test_agent_1": MagicMock(
+    with patch("app.routers.agents.list_agent_metadata") as mock_list_agents:
+        # Configurar el mock para devolver metadatos de agentes de prueba
+        mock_agents = [
+            MagicMock(
                 agent_id="test_agent_1",
                 name="Test Agent 1",
                 description="Test agent for testing",
                 capabilities=["test", "mock"]
             ),
-            "test_agent_2": MagicMock(
+            MagicMock(
                 agent_id="test_agent_2",
                 name="Test Agent 2",
                 description="Another test agent",
                 capabilities=["test", "mock"]
             )
-        }
-        mock_get_agents.return_value = mock_agents
+        ]
+        mock_list_agents.return_value = mock_agents
         
         # Realizar la solicitud
         response = test_client.get("/agents/", headers=auth_headers)
@@ -178,3 +178,24 @@ async def test_async_run_agent(async_client: AsyncClient, auth_headers):
         assert response.status_code == 200
         assert "response" in response.json()
         assert response.json()["agent_id"] == "test_agent"
+
+
+@pytest.mark.asyncio
+async def test_load_agent_builds_agent_off_the_event_loop():
+    """Prueba que un agente aún no construido se construye fuera del event loop."""
+    import threading
+    from app.routers import agents as agents_router
+
+    loop_thread = threading.get_ident()
+    build_threads = []
+
+    def build(agent_id):
+        build_threads.append(threading.get_ident())
+        return MagicMock(agent_id=agent_id)
+
+    with patch.object(agents_router.agent_registry, "is_loaded", return_value=False), \
+            patch("app.routers.agents.get_agent", side_effect=build):
+        agent = await agents_router.load_agent("test_agent_1")
+
+    assert agent.agent_id == "test_agent_1"
+    assert build_threads and build_threads[0] != loop_thread
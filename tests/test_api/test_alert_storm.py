@@ -0,0 +1,110 @@
+"""
+Pruebas del procesamiento de alertas durante una tormenta de incidentes.
+
+Envían cientos de alertas duplicadas de unos pocos incidentes y miden el
+tiempo hasta la remediación de cada uno: con deduplicación por huella y un
+pool de workers cada incidente ejecuta su runbook una sola vez, en paralelo
+con los demás y sin superar la concurrencia por runbook.
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.handlers.alert_handler import AlertProcessor, enrich_alert, fingerprint_alert
+
+
+class FakeRunbookExecutor:
+    """Ejecutor de runbooks con latencia fija que registra la concurrencia."""
+
+    def __init__(self, latency: float, fail_first: Optional[str] = None):
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls: Dict[str, int] = {}
+        self.active: Dict[str, int] = {}
+        self.max_active: Dict[str, int] = {}
+
+    async def execute_runbook(self, runbook_id: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        self.calls[runbook_id] = self.calls.get(runbook_id, 0) + 1
+        self.active[runbook_id] = self.active.get(runbook_id, 0) + 1
+        self.max_active[runbook_id] = max(self.max_active.get(runbook_id, 0), self.active[runbook_id])
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active[runbook_id] -= 1
+        if runbook_id == self.fail_first and self.calls[runbook_id] == 1:
+            return {"runbook_id": runbook_id, "status": "failed", "error": "fallo simulado"}
+        return {"runbook_id": runbook_id, "status": "completed", "execution_id": f"{runbook_id}-1"}
+
+
+async def _alert(alert_type: str, service: str, index: int) -> Dict[str, Any]:
+    return await enrich_alert({
+        "type": alert_type,
+        "service": service,
+        "summary": f"Alerta {index}",
+        "timestamp": f"2025-05-13T17:{index % 60:02d}:00Z",
+    })
+
+
+def test_storm_is_coalesced_and_remediated_in_parallel():
+    executor = FakeRunbookExecutor(latency=0.05)
+    processor = AlertProcessor(executor, max_workers=4, runbook_concurrency=1, dedup_window=60.0)
+    incidents = [
+        ("high_latency", "api"),
+        ("high_error_rate", "api"),
+        ("high_cpu_usage", "worker"),
+        ("high_memory_usage", "worker"),  # comparte runbook con high_cpu_usage
+        ("low_cache_hit_rate", "cache"),
+    ]
+
+    async def run():
+        start = time.perf_counter()
+        for index in range(100):
+            for alert_type, service in incidents:
+                processor.submit(await _alert(alert_type, service, index))
+        await processor.wait_idle()
+        elapsed = time.perf_counter() - start
+        await processor.stop()
+        return elapsed
+
+    elapsed = asyncio.run(run())
+    stats = processor.get_stats()
+    assert stats["accepted"] == 5 and stats["deduplicated"] == 495
+    assert executor.calls == {
+        "incident_response": 1,
+        "error_rate_response": 1,
+        "resource_optimization": 2,
+        "cache_optimization": 1,
+    }
+    assert max(executor.max_active.values()) == 1
+    # Un único worker sin deduplicar tardaría 500 × 50 ms
+    assert elapsed < 0.5
+    assert stats["time_to_remediation_ms"]["count"] == 5
+    assert stats["time_to_remediation_ms"]["max_ms"] < 300
+
+
+def test_failed_remediation_is_retried_by_the_next_alert():
+    executor = FakeRunbookExecutor(latency=0.0, fail_first="incident_response")
+    processor = AlertProcessor(executor, max_workers=2, runbook_concurrency=1, dedup_window=60.0)
+
+    async def run():
+        first = processor.submit(await _alert("high_latency", "api", 0))
+        await processor.wait_idle()
+        retry = processor.submit(await _alert("high_latency", "api", 1))
+        await processor.wait_idle()
+        duplicate = processor.submit(await _alert("high_latency", "api", 2))
+        await processor.stop()
+        return first, retry, duplicate
+
+    first, retry, duplicate = asyncio.run(run())
+    assert first["status"] == "accepted" and retry["status"] == "accepted"
+    assert duplicate["status"] == "deduplicated"
+    assert executor.calls == {"incident_response": 2}
+    assert processor.stats["failed"] == 1 and processor.stats["executed"] == 1
+
+
+def test_fingerprint_ignores_volatile_fields():
+    base = {"type": "high_latency", "runbook_id": "incident_response", "labels": {"pod": "api-1"}}
+    assert fingerprint_alert({**base, "summary": "a", "timestamp": "t1"}) == fingerprint_alert({**base, "timestamp": "t2"})
+    assert fingerprint_alert(base) != fingerprint_alert({**base, "labels": {"pod": "api-2"}})
+    assert fingerprint_alert({**base, "fingerprint": "am-123"}) == "am-123"
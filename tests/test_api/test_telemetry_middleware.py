@@ -0,0 +1,165 @@
+"""
+Pruebas para el middleware ASGI de telemetría.
+
+Verifican que las métricas se etiquetan con la plantilla de la ruta, que el
+muestreo de spans es configurable y que las respuestas en streaming no se
+almacenan en memoria.
+"""
+
+import importlib
+import sys
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from tests.mocks.core import telemetry as mock_telemetry
+
+
+class RecordingInstrument:
+    """Instrumento de métricas que guarda las mediciones."""
+
+    def __init__(self):
+        self.calls = []
+
+    def add(self, value, attributes=None):
+        self.calls.append((value, attributes or {}))
+
+    def record(self, value, attributes=None):
+        self.calls.append((value, attributes or {}))
+
+
+class RecordingMeter:
+    """Meter que crea instrumentos de registro."""
+
+    def __init__(self):
+        self.instruments = {}
+
+    def create_counter(self, name, **kwargs):
+        return self.instruments.setdefault(name, RecordingInstrument())
+
+    def create_histogram(self, name, **kwargs):
+        return self.instruments.setdefault(name, RecordingInstrument())
+
+
+class RecordingSpan:
+    """Span que guarda nombre y atributos."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes or {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def update_name(self, name):
+        self.name = name
+
+
+class RecordingTracer:
+    """Tracer que guarda los spans iniciados."""
+
+    def __init__(self):
+        self.spans = []
+
+    def start_as_current_span(self, name, context=None, attributes=None):
+        span = RecordingSpan(name, attributes)
+        self.spans.append(span)
+        return span
+
+
+@pytest.fixture
+def telemetry_module(monkeypatch):
+    """Importa el middleware con la telemetría simulada."""
+    monkeypatch.setitem(sys.modules, "core.telemetry", mock_telemetry)
+    monkeypatch.delitem(sys.modules, "app.middleware.telemetry", raising=False)
+    module = importlib.import_module("app.middleware.telemetry")
+    yield module
+    sys.modules.pop("app.middleware.telemetry", None)
+
+
+def _build_app(module, tracer, meter, sample_rate=1.0):
+    app = FastAPI()
+
+    @app.post("/agents/{agent_id}/run")
+    async def run_agent(agent_id: str):
+        return {"agent_id": agent_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield b"x" * 10
+
+        return StreamingResponse(chunks())
+
+    app.add_middleware(module.TelemetryMiddleware, sample_rate=sample_rate, tracer=tracer, meter=meter)
+    return app
+
+
+async def _client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_metrics_use_route_template(telemetry_module):
+    tracer, meter = RecordingTracer(), RecordingMeter()
+    app = _build_app(telemetry_module, tracer, meter)
+
+    async with await _client(app) as client:
+        for agent_id in ("a", "b", "c"):
+            response = await client.post(f"/agents/{agent_id}/run")
+            assert response.status_code == 200
+            assert response.headers["x-request-id"]
+        await client.get("/missing/path")
+
+    routes = {attrs["http.route"] for _, attrs in meter.instruments["http.requests"].calls}
+    assert routes == {"/agents/{agent_id}/run", telemetry_module.UNMATCHED_ROUTE}
+    assert tracer.spans[0].name == "POST /agents/{agent_id}/run"
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_propagated(telemetry_module):
+    app = _build_app(telemetry_module, RecordingTracer(), RecordingMeter())
+
+    async with await _client(app) as client:
+        response = await client.post("/agents/a/run", headers={"X-Request-ID": "abc-123"})
+
+    assert response.headers["x-request-id"] == "abc-123"
+
+
+@pytest.mark.asyncio
+async def test_span_sampling_is_configurable(telemetry_module):
+    tracer, meter = RecordingTracer(), RecordingMeter()
+    app = _build_app(telemetry_module, tracer, meter, sample_rate=0.0)
+
+    async with await _client(app) as client:
+        for _ in range(5):
+            await client.post("/agents/a/run")
+        await client.post(
+            "/agents/a/run",
+            headers={"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"},
+        )
+
+    # Solo la solicitud con traceparent genera span; las métricas se registran siempre
+    assert len(tracer.spans) == 1
+    assert len(meter.instruments["http.requests"].calls) == 6
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_size_is_counted(telemetry_module):
+    meter = RecordingMeter()
+    app = _build_app(telemetry_module, RecordingTracer(), meter)
+
+    async with await _client(app) as client:
+        response = await client.get("/stream")
+
+    assert response.content == b"x" * 30
+    assert meter.instruments["http.response.size"].calls[-1][0] == 30
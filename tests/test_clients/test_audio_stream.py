@@ -0,0 +1,171 @@
+"""
+Pruebas para el pipeline de transcripción en streaming del cliente de voz.
+
+Verifican la segmentación por actividad de voz con reensamblado en orden, el
+límite de segmentos en curso, la caché por contenido (también entre formatos
+de entrada), que cancelar una solicitud no cancela a las que comparten sus
+segmentos y que la memoria no crece con la duración de la grabación.
+"""
+
+import asyncio
+import base64
+import importlib.util
+import io
+import os
+import tracemalloc
+import wave
+
+import numpy as np
+
+# El paquete clients.vertex_ai importa dependencias de GCP; el pipeline solo
+# depende de la configuración y se carga directamente.
+_STREAM_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "clients", "vertex_ai", "audio_stream.py")
+_spec = importlib.util.spec_from_file_location("vertex_ai_audio_stream", _STREAM_PATH)
+audio_stream = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(audio_stream)
+
+RATE = 16000
+LIMIT = 64 * 1024 * 1024
+
+
+def _wav(parts):
+    """WAV mono de 16 bits: cada parte es (segundos, hay_voz)."""
+    samples = []
+    for seconds, voiced in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        samples.append(np.sin(2 * np.pi * 220 * t) * 8000 if voiced else np.zeros_like(t))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(np.concatenate(samples).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class FakeTranscriber:
+    """Transcribe cada segmento con su duración; los más largos tardan menos."""
+
+    def __init__(self):
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, content):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            with wave.open(io.BytesIO(base64.b64decode(content))) as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+            await asyncio.sleep(0.05 / seconds)
+            return {"text": f"voz-{round(seconds, 1)}", "confidence": 0.9}
+        finally:
+            self.active -= 1
+
+
+def test_segments_are_transcribed_concurrently_and_reassembled_in_order(tmp_path):
+    path = tmp_path / "nota.wav"
+    path.write_bytes(_wav([(0.5, False), (0.6, True), (1.0, False), (1.2, True), (1.0, False), (1.8, True), (0.5, False)]))
+    pipeline = audio_stream.AudioStreamPipeline(chunk_size=4096, max_concurrency=2, vad_threshold=0.02,
+                                                min_silence_ms=500, max_segment_seconds=30, cache_size=16,
+                                                max_audio_bytes=LIMIT)
+    transcriber = FakeTranscriber()
+
+    result = asyncio.run(pipeline.transcribe({"path": str(path)}, transcriber, cache_namespace="chirp:es-ES"))
+
+    # Se conserva un margen de 150 ms antes y después de cada tramo con voz
+    assert result["text"] == "voz-0.9 voz-1.5 voz-2.1"
+    assert [segment["index"] for segment in result["segments"]] == [0, 1, 2]
+    assert result["segments"][0]["start_ms"] == 330
+    assert transcriber.max_active == 2
+    assert result["confidence"] == 0.9
+    assert pipeline.get_stats()["streamed"] == 1
+
+
+def test_transcripts_are_cached_by_content_across_inputs():
+    audio = _wav([(0.2, False), (0.8, True), (0.2, False)])
+    pipeline = audio_stream.AudioStreamPipeline(chunk_size=1024, max_concurrency=4, vad_threshold=0.02,
+                                                min_silence_ms=300, max_segment_seconds=30, cache_size=16,
+                                                max_audio_bytes=LIMIT)
+    transcriber = FakeTranscriber()
+
+    first = asyncio.run(pipeline.transcribe(audio, transcriber, cache_namespace="chirp:es-ES"))
+    data_uri = "data:audio/wav;base64," + base64.b64encode(audio).decode("utf-8")
+    again = asyncio.run(pipeline.transcribe(data_uri, transcriber, cache_namespace="chirp:es-ES"))
+    other_language = asyncio.run(pipeline.transcribe(audio, transcriber, cache_namespace="chirp:en-US"))
+
+    assert again["text"] == first["text"] == other_language["text"]
+    assert [segment["cached"] for segment in again["segments"]] == [True]
+    assert transcriber.calls == 2
+
+    # Los formatos comprimidos se transcriben en un único segmento, también en caché
+    mp3 = b"ID3" + bytes(range(256)) * 64
+    stats_before = pipeline.get_stats()["single_segment"]
+    for _ in range(2):
+        asyncio.run(pipeline.transcribe({"base64": base64.b64encode(mp3).decode("utf-8")},
+                                        lambda content: asyncio.sleep(0, {"text": "comprimido", "confidence": 0.5})))
+    assert pipeline.get_stats()["single_segment"] == stats_before + 2
+    assert pipeline.get_stats()["cache_hits"] == 2
+
+
+def test_cancelling_a_request_does_not_cancel_coalesced_waiters():
+    audio = _wav([(0.3, False), (1.0, True), (0.3, False)])
+    pipeline = audio_stream.AudioStreamPipeline(chunk_size=4096, max_concurrency=2, vad_threshold=0.02,
+                                                min_silence_ms=500, max_segment_seconds=30, cache_size=16,
+                                                max_audio_bytes=LIMIT)
+    calls = []
+
+    async def slow_transcriber(content):
+        calls.append(content)
+        await asyncio.sleep(0.1)
+        return {"text": "hola", "confidence": 0.9}
+
+    async def run():
+        first = asyncio.create_task(pipeline.transcribe(audio, slow_transcriber, cache_namespace="chirp:es-ES"))
+        await asyncio.sleep(0.02)
+        second = asyncio.create_task(pipeline.transcribe(audio, slow_transcriber, cache_namespace="chirp:es-ES"))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        result = await second
+        assert first.cancelled()
+        assert result["text"] == "hola"
+        assert len(calls) == 1
+
+        # Si se cancela la única solicitud que espera, la llamada al modelo se cancela
+        other = _wav([(0.3, False), (0.8, True), (0.3, False)])
+        lone = asyncio.create_task(pipeline.transcribe(other, slow_transcriber, cache_namespace="chirp:es-ES"))
+        await asyncio.sleep(0.02)
+        lone.cancel()
+        await asyncio.gather(lone, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert pipeline._inflight == {}
+        assert (await pipeline.transcribe(other, slow_transcriber, cache_namespace="chirp:es-ES"))["text"] == "hola"
+        assert len(calls) == 3
+
+    asyncio.run(run())
+
+
+def test_peak_memory_is_bounded_by_chunks_and_segments(tmp_path):
+    # Diez minutos de voz continua: ~19 MB de PCM
+    path = tmp_path / "sesion.wav"
+    path.write_bytes(_wav([(600.0, True)]))
+    pipeline = audio_stream.AudioStreamPipeline(chunk_size=64 * 1024, max_concurrency=2, vad_threshold=0.02,
+                                                min_silence_ms=500, max_segment_seconds=10, cache_size=0,
+                                                max_audio_bytes=LIMIT)
+
+    async def transcribe(content):
+        await asyncio.sleep(0)
+        return {"text": "x", "confidence": 1.0}
+
+    tracemalloc.start()
+    try:
+        result = asyncio.run(pipeline.transcribe(str(path), transcribe))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert len(result["segments"]) == 61
+    assert all(segment["end_ms"] - segment["start_ms"] <= 10000 for segment in result["segments"])
+    assert result["bytes_read"] == os.path.getsize(path)
+    assert peak < 4 * 1024 * 1024
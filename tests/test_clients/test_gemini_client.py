@@ -0,0 +1,172 @@
+"""
+Pruebas para la selección de modelo por llamada en GeminiClient.
+
+Verifican que las instancias de modelo se reutilizan, que la atribución por
+agente no se mezcla entre llamadas concurrentes y que la degradación por
+presupuesto no modifica el modelo compartido del cliente.
+"""
+
+import asyncio
+
+import pytest
+
+import clients.gemini_client as gemini_module
+from clients.gemini_client import GeminiClient, GeminiModelRegistry
+from core.budget import AgentBudget, BudgetAction, budget_manager
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Modelo simulado que cuenta sus construcciones."""
+
+    constructed = 0
+
+    def __init__(self, model_name, **kwargs):
+        FakeModel.constructed += 1
+        self.model_name = model_name
+        self.kwargs = kwargs
+
+    async def generate_content_async(self, prompt, **kwargs):
+        await asyncio.sleep(0.001)
+        return FakeResponse(f"{self.model_name}:{prompt}")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Cliente Gemini aislado con un modelo simulado."""
+    FakeModel.constructed = 0
+    monkeypatch.setattr(gemini_module.genai, "GenerativeModel", FakeModel)
+    monkeypatch.setattr(GeminiClient, "_instance", None)
+    monkeypatch.setattr(budget_manager, "budgets", {})
+    monkeypatch.setattr(budget_manager, "usage", {})
+    monkeypatch.setattr(budget_manager, "last_reset", {})
+
+    instance = GeminiClient(model_name="gemini-1.5-pro", optimize_prompts=False, use_cache=False)
+    instance.model = instance.models.get(instance.model_name)
+    return instance
+
+
+def test_registry_reuses_models_per_config(monkeypatch):
+    monkeypatch.setattr(gemini_module.genai, "GenerativeModel", FakeModel)
+    FakeModel.constructed = 0
+    registry = GeminiModelRegistry(max_models=2)
+
+    first = registry.get("gemini-1.5-pro", {"temperature": 0.1})
+    assert registry.get("gemini-1.5-pro", {"temperature": 0.1}) is first
+    assert registry.get("gemini-1.5-pro", {"temperature": 0.7}) is not first
+    assert FakeModel.constructed == 2
+
+    registry.get("gemini-1.5-flash")
+    assert registry.stats["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_agents_are_attributed_independently(client, monkeypatch):
+    recorded = []
+
+    async def fake_record_usage(agent_id, prompt_tokens, completion_tokens, model):
+        recorded.append((agent_id, model))
+        return True, None
+
+    monkeypatch.setattr(budget_manager, "record_usage", fake_record_usage)
+
+    async def run_as(agent_id):
+        client.set_current_agent(agent_id)
+        await asyncio.sleep(0)
+        await client.generate_text(f"hola desde {agent_id}")
+        return client.current_agent_id
+
+    agents = [f"agent_{i}" for i in range(20)]
+    results = await asyncio.gather(*(run_as(agent_id) for agent_id in agents))
+
+    assert results == agents
+    assert sorted(agent_id for agent_id, _ in recorded) == sorted(agents)
+    assert client.current_agent_id == "default"
+
+
+@pytest.mark.asyncio
+async def test_degraded_agent_does_not_affect_others(client):
+    budget_manager.set_budget(AgentBudget(
+        agent_id="over_budget",
+        max_tokens=1,
+        action_on_limit=BudgetAction.DEGRADE,
+        fallback_model="gemini-1.5-flash",
+    ))
+
+    async def run_as(agent_id):
+        with client.agent_context(agent_id):
+            return await client.generate_text("x" * 40)
+
+    for _ in range(10):
+        results = await asyncio.gather(run_as("over_budget"), run_as("normal"))
+        assert results[0].startswith("gemini-1.5-flash:")
+        assert results[1].startswith("gemini-1.5-pro:")
+
+    # Una instancia por (modelo, configuración): sin construcción por llamada
+    assert FakeModel.constructed == 3
+    assert client.model.model_name == "gemini-1.5-pro"
+
+
+@pytest.mark.asyncio
+async def test_blocked_call_is_not_sent(client):
+    budget_manager.set_budget(AgentBudget(
+        agent_id="blocked",
+        max_tokens=1,
+        action_on_limit=BudgetAction.BLOCK,
+    ))
+
+    with client.agent_context("blocked"):
+        result = await client.generate_text("x" * 40)
+
+    assert "restricciones de presupuesto" in result
+    assert budget_manager.get_usage("blocked") is None
+
+
+@pytest.mark.asyncio
+async def test_structured_output_sends_prefix_first_and_tracks_reuse(client, monkeypatch):
+    prompts = []
+
+    async def fake_generate(self, prompt, **kwargs):
+        prompts.append(prompt)
+        return FakeResponse('{"ok": true}')
+
+    monkeypatch.setattr(FakeModel, "generate_content_async", fake_generate)
+
+    for query in ("¿Cómo prevenir lesiones?", "¿Cómo recuperarme?"):
+        result = await client.generate_structured_output(
+            query, prompt_prefix="Eres un especialista. Programa PRIME.", prefix_hash="abc"
+        )
+        assert result == {"ok": True}
+
+    assert all(prompt.startswith("Eres un especialista. Programa PRIME.") for prompt in prompts)
+    assert prompts[1].endswith("¿Cómo recuperarme?")
+    assert client.prefix_stats["misses"] == 1
+    assert client.prefix_stats["hits"] == 1
+    assert client.prefix_stats["reused_prefix_tokens"] > 0
+
+
+@pytest.mark.asyncio
+async def test_cached_text_is_keyed_by_model_and_generation_config(client, monkeypatch):
+    calls = []
+
+    async def fake_generate(self, prompt, **kwargs):
+        calls.append((self.model_name, self.kwargs.get("generation_config")))
+        return FakeResponse(f"{self.model_name}:{len(calls)}")
+
+    monkeypatch.setattr(FakeModel, "generate_content_async", fake_generate)
+    client.use_cache = True
+
+    with client.agent_context("cache_key_agent"):
+        cold = await client.generate_text("¿Cuánto debo dormir?", temperature=0.1)
+        assert await client.generate_text("¿Cuánto debo dormir?", temperature=0.1) == cold
+        warmer = await client.generate_text("¿Cuánto debo dormir?", temperature=0.9)
+        other_model = await client.generate_text("¿Cuánto debo dormir?", temperature=0.1,
+                                                 model_name="gemini-1.5-flash")
+
+    assert len(calls) == 3
+    assert len({cold, warmer, other_model}) == 3
+    assert other_model.startswith("gemini-1.5-flash:")
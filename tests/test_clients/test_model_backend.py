@@ -0,0 +1,87 @@
+"""
+Pruebas para el backend de modelo falso de las pruebas de carga sin red.
+
+Verifican que los sorteos son deterministas con independencia del orden, que
+la tasa de error y los tokens se respetan y que GeminiClient ejecuta su código
+real contra el backend instalado.
+"""
+
+import asyncio
+
+import pytest
+
+from clients.gemini_client import gemini_client
+from tests.mocks.model_backend import (
+    GEMINI_CHAT,
+    GEMINI_GENERATE,
+    FakeModelBackend,
+    FakeModelError,
+    LatencyDistribution,
+)
+
+
+def test_draws_do_not_depend_on_call_order():
+    prompts = [f"prompt {index}" for index in range(20)]
+
+    def run(order):
+        backend = FakeModelBackend(seed=3, latency=LatencyDistribution.parse("constant:0"))
+        return {prompt: backend.generate(GEMINI_GENERATE, "model", prompt).text for prompt in order}
+
+    assert run(prompts) == run(list(reversed(prompts)))
+    assert run(prompts) != {
+        prompt: FakeModelBackend(seed=4, latency=LatencyDistribution.parse("constant:0"))
+        .generate(GEMINI_GENERATE, "model", prompt).text
+        for prompt in prompts
+    }
+
+
+def test_error_rate_tokens_and_latency():
+    backend = FakeModelBackend(
+        seed=1,
+        latency=LatencyDistribution.parse("uniform:0.5:0.5"),
+        error_rate=0.25,
+        output_tokens=(5, 10),
+    )
+
+    errors = 0
+    for index in range(400):
+        try:
+            response = backend.generate(GEMINI_GENERATE, "model", f"consulta {index}")
+        except FakeModelError:
+            errors += 1
+            continue
+        assert 5 <= response.usage_metadata.candidates_token_count <= 10
+
+    stats = backend.get_stats()
+    assert stats["calls"] == 400
+    assert stats["errors"] == errors
+    assert 0.15 < errors / 400 < 0.35
+    assert stats["latency_ms"][GEMINI_GENERATE]["max_ms"] <= 0.75 + 1e-6
+
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("pareto:100")
+
+
+def test_gemini_client_runs_against_backend():
+    backend = FakeModelBackend(seed=2, latency=LatencyDistribution.parse("constant:1"))
+    use_cache = gemini_client.use_cache
+    gemini_client.use_cache = False
+
+    async def run():
+        text = await gemini_client.generate_text("Dame un plan de entrenamiento en JSON")
+        reply = await gemini_client.chat([
+            {"role": "user", "content": "Hola"},
+            {"role": "user", "content": "¿Qué entreno hoy?"},
+        ])
+        return text, reply
+
+    try:
+        with backend.patched():
+            text, reply = asyncio.run(run())
+    finally:
+        gemini_client.use_cache = use_cache
+
+    assert text.startswith("{") and reply
+    stats = backend.get_stats()
+    assert stats["calls_by_operation"] == {GEMINI_GENERATE: 1, GEMINI_CHAT: 2}
+    assert stats["completion_tokens"] > 0
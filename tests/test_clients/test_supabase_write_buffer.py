@@ -0,0 +1,130 @@
+"""
+Pruebas para el búfer de escritura diferida de Supabase.
+
+Usan ``InMemoryWriteStore`` en lugar de la base de datos y verifican la
+fusión en lotes por tabla, el volcado por tamaño y por antigüedad, los
+reintentos, la contrapresión y la recuperación desde el WAL.
+"""
+
+import asyncio
+
+import pytest
+
+from clients.supabase_write_buffer import InMemoryWriteStore, SupabaseWriteBuffer
+
+
+def _buffer(store, **kwargs):
+    params = {"batch_size": 100, "max_age": 60.0, "max_pending": 1000, "max_retries": 2,
+              "retry_delay": 0.001, "wal_path": ""}
+    params.update(kwargs)
+    return SupabaseWriteBuffer(store=store, **params)
+
+
+def test_inserts_and_updates_are_coalesced_per_table():
+    store = InMemoryWriteStore()
+    buffer = _buffer(store, batch_size=1000)
+
+    async def run():
+        for index in range(150):
+            await buffer.insert("agent_activities", [{"id": str(index), "n": index}])
+        await buffer.insert("events", [{"id": "e1"}, {"id": "e2"}])
+        await buffer.update("agent_activities", {"status": "a"}, {"id": "1"})
+        await buffer.update("agent_activities", {"status": "b", "seen": True}, {"id": "1"})
+        assert store.calls == []
+        written = await buffer.flush()
+        await buffer.stop()
+        return written
+
+    assert asyncio.run(run()) == 153
+    assert store.calls == [("insert", "agent_activities", 150), ("update", "agent_activities", 1), ("insert", "events", 2)]
+    assert store.tables["agent_activities"][1] == {"id": "1", "n": 1, "status": "b", "seen": True}
+    assert buffer.stats["coalesced_updates"] == 1
+    assert buffer.pending == 0
+
+
+def test_flush_by_size_and_by_age():
+    store = InMemoryWriteStore()
+    buffer = _buffer(store, batch_size=10, max_age=0.05)
+
+    async def run():
+        await buffer.insert("events", [{"id": str(index)} for index in range(10)])
+        await asyncio.sleep(0.01)
+        # El lote completo se vuelca sin esperar a la antigüedad
+        assert store.calls == [("insert", "events", 10)]
+
+        await buffer.insert("events", [{"id": "late"}])
+        await asyncio.sleep(0.2)
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert store.calls == [("insert", "events", 10), ("insert", "events", 1)]
+
+
+def test_failed_batches_are_retried_and_requeued():
+    store = InMemoryWriteStore()
+    buffer = _buffer(store, max_retries=2)
+
+    async def run():
+        await buffer.insert("events", [{"id": "1"}])
+        await buffer.update("events", {"status": "done"}, {"id": "1"})
+
+        store.failures_remaining = 2
+        assert await buffer.flush() == 2
+        assert buffer.stats["retries"] == 2
+
+        await buffer.insert("events", [{"id": "2"}])
+        store.failures_remaining = 10
+        assert await buffer.flush() == 0
+        assert buffer.pending == 1
+
+        store.failures_remaining = 0
+        assert await buffer.flush() == 1
+        await buffer.stop()
+
+    asyncio.run(run())
+    assert [row["id"] for row in store.tables["events"]] == ["1", "2"]
+    assert buffer.stats["failed_batches"] == 1
+
+
+def test_backpressure_rejects_when_store_is_down():
+    store = InMemoryWriteStore()
+    store.failures_remaining = 10 ** 6
+    buffer = _buffer(store, max_pending=5, max_retries=0, enqueue_timeout=0.05)
+
+    async def run():
+        await buffer.insert("events", [{"id": str(index)} for index in range(5)])
+        with pytest.raises(asyncio.QueueFull):
+            await buffer.insert("events", [{"id": "overflow"}])
+
+    asyncio.run(run())
+    assert buffer.stats["backpressure_waits"] == 1
+    assert buffer.stats["rejected"] == 1
+    assert buffer.pending == 5
+
+
+def test_pending_writes_survive_restart_through_wal(tmp_path):
+    wal_path = str(tmp_path / "wal" / "supabase.jsonl")
+
+    async def crash_before_flush():
+        buffer = _buffer(InMemoryWriteStore(), wal_path=wal_path)
+        await buffer.insert("events", [{"id": "1"}, {"id": "2"}], upsert=True)
+        await buffer.update("events", {"status": "done"}, {"id": "1"})
+        # Sin stop(): el proceso cae con las escrituras en el búfer
+
+    asyncio.run(crash_before_flush())
+    with open(wal_path, "a", encoding="utf-8") as f:
+        f.write('{"op": "insert", "tab')
+
+    store = InMemoryWriteStore()
+    buffer = _buffer(store, wal_path=wal_path)
+
+    async def restart():
+        await buffer.start()
+        assert buffer.stats["recovered"] == 3
+        await buffer.stop()
+
+    asyncio.run(restart())
+    assert store.calls == [("upsert", "events", 2), ("update", "events", 1)]
+    assert store.tables["events"][0] == {"id": "1", "status": "done"}
+    with open(wal_path, encoding="utf-8") as f:
+        assert f.read() == ""
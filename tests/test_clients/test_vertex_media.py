@@ -0,0 +1,164 @@
+"""
+Pruebas para la obtención compartida de recursos multimedia de Vertex AI.
+
+Verifican que las URLs repetidas se descargan una sola vez, que las descargas
+concurrentes se combinan (sin que cancelar una solicitud cancele a las demás),
+que el tamaño máximo se respeta por solicitud y que la sesión HTTP se reutiliza
+entre descargas.
+"""
+
+import asyncio
+import base64
+import importlib.util
+import os
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+# El paquete clients.vertex_ai importa dependencias de GCP; el módulo de
+# recursos multimedia solo depende de aiohttp y se carga directamente.
+_MEDIA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "clients", "vertex_ai", "media.py")
+_spec = importlib.util.spec_from_file_location("vertex_ai_media", _MEDIA_PATH)
+media = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(media)
+
+PHOTO = b"\x89PNG" + bytes(range(256)) * 40
+
+
+def _fetcher(cache_dir="", max_bytes=1024 * 1024):
+    """Crea un gestor con límites explícitos (independiente de la configuración)."""
+    return media.MediaFetcher(max_bytes=max_bytes, cache_dir=cache_dir, max_cache_bytes=10 * 1024 * 1024)
+
+
+@pytest_asyncio.fixture
+async def server():
+    """Servidor HTTP local que cuenta las solicitudes recibidas."""
+    hits = {"count": 0}
+
+    async def photo(request):
+        hits["count"] += 1
+        await asyncio.sleep(0.01)
+        return web.Response(body=PHOTO, content_type="image/png")
+
+    async def large(request):
+        hits["count"] += 1
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b"x" * 1024)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/photo.png", photo)
+    app.router.add_get("/large", large)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    test_server.hits = hits
+    yield test_server
+    await test_server.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_url_is_downloaded_once(server, tmp_path):
+    fetcher = _fetcher(str(tmp_path))
+    url = str(server.make_url("/photo.png"))
+
+    try:
+        first = await fetcher.fetch_base64(url)
+        second = await fetcher.fetch_base64(url)
+    finally:
+        await fetcher.close()
+
+    assert base64.b64decode(first) == PHOTO
+    assert second == first
+    assert server.hits["count"] == 1
+    assert fetcher.stats["cache_hits"] == 1
+
+    # Una instancia nueva (p. ej. tras reiniciar) reutiliza la caché en disco
+    restarted = _fetcher(str(tmp_path))
+    assert await restarted.fetch(url) == PHOTO
+    assert server.hits["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_downloads_are_coalesced(server):
+    fetcher = _fetcher()
+    url = str(server.make_url("/photo.png"))
+
+    try:
+        results = await asyncio.gather(*(fetcher.fetch(url) for _ in range(5)))
+        session = await fetcher.get_session()
+        assert await fetcher.get_session() is session
+    finally:
+        await fetcher.close()
+
+    assert all(result == PHOTO for result in results)
+    assert server.hits["count"] == 1
+    assert fetcher.stats["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelling_first_fetch_does_not_cancel_coalesced_fetches(server):
+    fetcher = _fetcher()
+    url = str(server.make_url("/photo.png"))
+
+    try:
+        first = asyncio.create_task(fetcher.fetch(url))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(fetcher.fetch(url))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == PHOTO
+        with pytest.raises(asyncio.CancelledError):
+            await first
+    finally:
+        await fetcher.close()
+
+    assert server.hits["count"] == 1
+    assert fetcher.stats["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_size_limit_is_checked_per_caller(server):
+    fetcher = _fetcher(max_bytes=4096)
+    url = str(server.make_url("/large"))
+
+    try:
+        small, large = await asyncio.gather(
+            fetcher.fetch(url, max_bytes=4096),
+            fetcher.fetch(url, max_bytes=64 * 1024),
+            return_exceptions=True,
+        )
+    finally:
+        await fetcher.close()
+
+    # Un límite menor en la primera solicitud no hace fallar a la que admite más
+    assert isinstance(small, media.MediaTooLargeError)
+    assert large == b"x" * 10 * 1024
+
+
+@pytest.mark.asyncio
+async def test_streamed_download_respects_size_limit(server):
+    fetcher = _fetcher(max_bytes=4096)
+
+    try:
+        with pytest.raises(media.MediaTooLargeError):
+            await fetcher.fetch(str(server.make_url("/large")))
+    finally:
+        await fetcher.close()
+
+    assert fetcher.stats["rejected_too_large"] == 1
+
+
+@pytest.mark.asyncio
+async def test_read_file_checks_size(tmp_path):
+    path = tmp_path / "photo.png"
+    path.write_bytes(PHOTO)
+    fetcher = _fetcher()
+
+    assert base64.b64decode(await fetcher.read_file_base64(str(path))) == PHOTO
+    with pytest.raises(media.MediaTooLargeError):
+        await fetcher.read_file(str(path), max_bytes=10)
@@ -0,0 +1,125 @@
+"""
+Pruebas para el registro de agentes basado en manifiesto.
+
+Verifican que los metadatos se listan sin importar el módulo del agente, que
+cada agente se construye una sola vez en su primer uso con las dependencias
+declaradas y que el precalentamiento tolera agentes que fallan.
+"""
+
+import asyncio
+import json
+import sys
+import threading
+import types
+
+import pytest
+
+from core.agent_registry import AgentRegistry
+
+MODULE_NAME = "fake_agents_for_registry_tests"
+
+
+class FakeAgent:
+    instances = 0
+
+    def __init__(self, state_manager=None, mcp_toolkit=None, agent_id=None):
+        FakeAgent.instances += 1
+        self.state_manager = state_manager
+        self.mcp_toolkit = mcp_toolkit
+        self.agent_id = agent_id
+        self.name = "Fake"
+
+
+class BrokenAgent:
+    def __init__(self, **kwargs):
+        raise RuntimeError("dependencia no disponible")
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    manifest = {
+        "agents": {
+            "fake_agent": {
+                "module": MODULE_NAME,
+                "class": "FakeAgent",
+                "name": "Fake Agent",
+                "description": "Agente de prueba",
+                "capabilities": ["test"],
+                "dependencies": ["state_manager", "mcp_toolkit"],
+                "kwargs": {"agent_id": "fake_agent"},
+            },
+            "broken_agent": {
+                "module": MODULE_NAME,
+                "class": "BrokenAgent",
+                "name": "Broken Agent",
+            },
+        }
+    }
+    path = tmp_path / "agents.json"
+    path.write_text(json.dumps(manifest), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def fake_module(monkeypatch):
+    FakeAgent.instances = 0
+    module = types.ModuleType(MODULE_NAME)
+    module.FakeAgent = FakeAgent
+    module.BrokenAgent = BrokenAgent
+    return lambda: monkeypatch.setitem(sys.modules, MODULE_NAME, module)
+
+
+def test_list_agents_does_not_import_modules(manifest_path):
+    registry = AgentRegistry(manifest_path=manifest_path)
+
+    entries = {entry.agent_id: entry for entry in registry.list_agents()}
+
+    assert set(entries) == {"fake_agent", "broken_agent"}
+    assert entries["fake_agent"].class_name == "FakeAgent"
+    assert entries["fake_agent"].capabilities == ["test"]
+    assert MODULE_NAME not in sys.modules
+    assert registry.get_stats()["loaded"] == []
+
+
+def test_get_builds_once_with_shared_dependencies(manifest_path, fake_module):
+    fake_module()
+    toolkit_builds = []
+    registry = AgentRegistry(
+        manifest_path=manifest_path,
+        providers={
+            "state_manager": lambda: "state",
+            "mcp_toolkit": lambda: toolkit_builds.append(1) or "toolkit",
+        },
+    )
+
+    threads = [threading.Thread(target=registry.get, args=("fake_agent",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    agent = registry.get("fake_agent")
+
+    assert FakeAgent.instances == 1
+    assert toolkit_builds == [1]
+    assert (agent.state_manager, agent.mcp_toolkit, agent.agent_id) == ("state", "toolkit", "fake_agent")
+    assert registry.is_loaded("fake_agent")
+    assert registry.get_stats()["loads"] == 1
+
+    with pytest.raises(KeyError):
+        registry.get("unknown_agent")
+
+
+def test_prewarm_and_load_all_skip_failing_agents(manifest_path, fake_module):
+    fake_module()
+    registry = AgentRegistry(
+        manifest_path=manifest_path,
+        providers={"state_manager": lambda: "state", "mcp_toolkit": lambda: "toolkit"},
+    )
+
+    results = asyncio.run(registry.prewarm(registry.parse_agent_ids("*")))
+
+    assert results == {"fake_agent": True, "broken_agent": False}
+    assert set(registry.load_all()) == {"fake_agent"}
+    assert registry.get_stats()["load_errors"] == 2
+    assert registry.parse_agent_ids("fake_agent, unknown_agent") == ["fake_agent"]
+    assert registry.parse_agent_ids("") == []
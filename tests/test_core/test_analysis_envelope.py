@@ -0,0 +1,100 @@
+"""
+Pruebas para el sobre de análisis que el orquestador comparte con los agentes.
+
+Verifican que el sobre solo se reutiliza para el mismo texto, con la versión
+actual y mientras está vigente, y que sobrevive al paso por el contexto de la
+tarea A2A tal como lo reciben los agentes.
+"""
+
+import time
+
+from app.schemas.a2a import A2ATaskContext
+from core.analysis_envelope import (
+    ANALYSIS_ENVELOPE_VERSION,
+    AnalysisEnvelope,
+    attach_analysis,
+    extract_analysis,
+)
+
+QUERY = "Me duele la rodilla cuando corro, ¿cómo me recupero?"
+
+
+def _envelope(**kwargs):
+    params = {
+        "query": QUERY,
+        "primary_intent": "Pain",
+        "secondary_intents": ["injury_prevention"],
+        "confidence": 0.85,
+        "entities": [
+            {"entity_type": "body_part", "value": "rodilla", "confidence": 0.9},
+            {"entity_type": "activity", "value": "correr", "confidence": 0.8},
+            {"entity_type": "body_part", "value": "tobillo", "confidence": 0.7},
+        ],
+        "target_agents": ["recovery_corrective"],
+    }
+    params.update(kwargs)
+    return AnalysisEnvelope.build(**params)
+
+
+def test_build_normalizes_intents_and_entities():
+    envelope = _envelope()
+
+    assert envelope.version == ANALYSIS_ENVELOPE_VERSION
+    assert envelope.intents == ["pain", "injury_prevention"]
+    assert envelope.entities == {"body_part": ["rodilla", "tobillo"], "activity": "correr"}
+    assert envelope.score_for("recovery_corrective") == 0.85
+    assert envelope.score_for("precision_nutrition_architect") == 0.0
+    assert _envelope(target_agents=[]).score_for("recovery_corrective") is None
+
+
+def test_envelope_applies_only_to_same_fresh_text():
+    envelope = _envelope()
+
+    assert envelope.applies_to("  me duele la RODILLA cuando corro, ¿cómo me recupero? ", max_age=30)
+    assert not envelope.applies_to("Quiero un plan de nutrición", max_age=30)
+
+    stale = envelope.model_copy(update={"created_at": time.time() - 60})
+    assert not stale.applies_to(QUERY, max_age=30)
+
+    future_version = envelope.model_copy(update={"version": ANALYSIS_ENVELOPE_VERSION + 1})
+    assert not future_version.applies_to(QUERY, max_age=30)
+
+
+def test_envelope_travels_in_a2a_task_context():
+    envelope = _envelope()
+    task_context = A2ATaskContext(user_id="u1", session_id="s1", analysis=envelope)
+
+    # El adaptador A2A envía el contexto serializado como diccionario
+    payload = task_context.model_dump(mode="json")
+    received = extract_analysis(payload, QUERY, max_age=30)
+
+    assert received == envelope
+    assert extract_analysis(task_context, QUERY, max_age=30) == envelope
+    assert extract_analysis(payload, "Otra consulta", max_age=30) is None
+    assert extract_analysis({"user_id": "u1"}, QUERY, max_age=30) is None
+
+
+def test_attach_analysis_and_invalid_payloads():
+    envelope = _envelope()
+    context = {"history": []}
+
+    attached = attach_analysis(context, envelope)
+
+    assert "analysis" not in context
+    assert extract_analysis(attached, QUERY, max_age=30) == envelope
+    assert extract_analysis({"additional_context": attached}, QUERY, max_age=30) == envelope
+    assert attach_analysis(context, None) == context
+    assert extract_analysis({"analysis": {"version": 1}}, QUERY, max_age=30) is None
+
+
+def test_to_intents_matches_intent_analyzer_output():
+    intents = _envelope().to_intents()
+
+    assert [intent.intent_type for intent in intents] == ["pain", "injury_prevention"]
+    assert intents[0].agents == ["recovery_corrective"]
+    assert {(e.entity_type, e.value) for e in intents[0].entities} == {
+        ("body_part", "rodilla"),
+        ("body_part", "tobillo"),
+        ("activity", "correr"),
+    }
+    assert intents[1].entities == []
@@ -0,0 +1,141 @@
+"""
+Pruebas para la contabilidad de presupuestos compartida entre réplicas.
+
+Verifican que el registro de uso no serializa a los agentes, que el uso
+pendiente se vuelca por lotes al almacén compartido, que el límite se aplica
+de forma global entre varias instancias y que la acción QUEUE difiere las
+llamadas hasta que vuelve a haber presupuesto.
+"""
+
+import asyncio
+
+import pytest
+
+from core.budget import (
+    AgentBudget,
+    BudgetAction,
+    BudgetManager,
+    InMemoryBudgetStore,
+    UsageDelta,
+)
+
+
+def _new_manager(store=None, **kwargs):
+    """Crea un gestor independiente (el de módulo es un singleton)."""
+    manager = object.__new__(BudgetManager)
+    manager._initialized = False
+    manager.__init__(usage_store=store, **kwargs)
+    return manager
+
+
+def _budget(agent_id, max_tokens=1000, action=BudgetAction.BLOCK):
+    return AgentBudget(agent_id=agent_id, max_tokens=max_tokens, action_on_limit=action)
+
+
+@pytest.mark.asyncio
+async def test_record_usage_does_not_take_lock():
+    manager = _new_manager()
+    for i in range(50):
+        manager.set_budget(_budget(f"agent_{i}", max_tokens=10_000))
+
+    async with manager._lock:
+        # Con el lock tomado (p. ej. durante un volcado) el registro no se bloquea
+        results = await asyncio.wait_for(
+            asyncio.gather(*(
+                manager.record_usage(f"agent_{i % 50}", 10, 5, "gemini-1.5-flash")
+                for i in range(500)
+            )),
+            timeout=1,
+        )
+
+    assert all(allowed for allowed, _ in results)
+    assert manager.get_usage("agent_0").total_tokens == 150
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_pending_usage():
+    store = InMemoryBudgetStore()
+    manager = _new_manager(store, lease_fraction=1.0)
+    manager.set_budget(_budget("agent_a"))
+
+    for _ in range(10):
+        await manager.record_usage("agent_a", 10, 10, "gemini-1.5-flash")
+
+    assert store.increment_calls == 0
+    assert await manager.flush() == 1
+    assert store.increment_calls == 1
+    assert list(store.totals.values())[0].total_tokens == 200
+    assert manager._pending == {}
+
+
+@pytest.mark.asyncio
+async def test_limit_is_enforced_across_replicas():
+    store = InMemoryBudgetStore()
+    replicas = [_new_manager(store) for _ in range(2)]
+    for manager in replicas:
+        manager.set_budget(_budget("shared", max_tokens=1000))
+
+    # Cada réplica consume 600 tokens: localmente ninguna supera el límite
+    for manager in replicas:
+        allowed, _ = await manager.record_usage("shared", 300, 300, "gemini-1.5-flash")
+        assert allowed
+    await asyncio.gather(*(manager.flush() for manager in replicas))
+    await replicas[0].flush()
+
+    assert replicas[0].check_budget("shared") == (False, None)
+    assert replicas[1].check_budget("shared") == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_pending_usage():
+    class FailingStore(InMemoryBudgetStore):
+        async def increment(self, batch):
+            raise ConnectionError("redis no disponible")
+
+    manager = _new_manager(FailingStore(), lease_fraction=1.0)
+    manager.set_budget(_budget("agent_a"))
+    await manager.record_usage("agent_a", 40, 10, "gemini-1.5-flash")
+
+    assert await manager.flush() == 0
+    assert sum(delta.total_tokens for delta in manager._pending.values()) == 50
+
+
+@pytest.mark.asyncio
+async def test_queue_action_defers_until_budget_is_available():
+    manager = _new_manager()
+    manager.set_budget(_budget("queued", max_tokens=100, action=BudgetAction.QUEUE))
+    await manager.record_usage("queued", 100, 50, "gemini-1.5-flash")
+
+    assert manager.check_budget("queued") == (False, None)
+    assert manager.should_queue("queued")
+
+    async def work(value):
+        return value * 2
+
+    future = manager.defer("queued", work, 21)
+    assert manager.process_deferred() == 0
+    assert manager.get_budget_status("queued")["deferred_requests"] == 1
+
+    manager._reset_usage("queued")
+    assert manager.process_deferred() == 1
+    assert await asyncio.wait_for(future, timeout=1) == 42
+
+
+@pytest.mark.asyncio
+async def test_defer_rejects_when_queue_is_full():
+    manager = _new_manager(max_deferred_per_agent=1)
+
+    async def work():
+        return None
+
+    manager.defer("queued", work)
+    with pytest.raises(asyncio.QueueFull):
+        manager.defer("queued", work)
+
+
+def test_usage_delta_merge():
+    delta = UsageDelta(10, 5, 0.1)
+    delta.merge(UsageDelta(1, 2, 0.2))
+
+    assert delta.total_tokens == 18
+    assert delta.estimated_cost_usd == pytest.approx(0.3)
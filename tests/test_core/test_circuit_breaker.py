@@ -0,0 +1,155 @@
+"""
+Pruebas para el circuit breaker con ventana de cubetas temporales.
+
+Verifican la caducidad de la ventana, la apertura por umbral de fallos y por
+tasa de error, y que el estado half-open solo deja pasar un número acotado
+de sondas simultáneas.
+"""
+
+import asyncio
+
+import pytest
+
+from core.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitBreakerOpenError,
+    CircuitState,
+    RollingWindow,
+)
+
+
+async def _fail():
+    raise RuntimeError("caído")
+
+
+async def _ok():
+    return "ok"
+
+
+def test_rolling_window_expires_old_buckets():
+    window = RollingWindow(duration=10.0, buckets=5)
+    window.record(False, now=100.0)
+    window.record(True, now=101.0)
+    window.record(False, now=104.5)
+
+    assert window.totals(now=105.0) == (1, 2)
+    # A los 10 s de la primera cubeta solo queda la del instante 104.5
+    assert window.totals(now=111.0) == (0, 1)
+    assert window.totals(now=500.0) == (0, 0)
+
+
+def test_trips_on_failures_within_window_only():
+    breaker = CircuitBreaker("cb_window_test", CircuitBreakerConfig(
+        failure_threshold=3, window_size=100, window_duration=0.05, window_buckets=5, timeout=60,
+    ))
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.execute(_fail)
+        await asyncio.sleep(0.08)
+        # Los fallos anteriores ya caducaron
+        with pytest.raises(RuntimeError):
+            await breaker.execute(_fail)
+        assert breaker.state == CircuitState.CLOSED
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.execute(_fail)
+        assert breaker.state == CircuitState.OPEN
+        with pytest.raises(CircuitBreakerOpenError):
+            await breaker.execute(_ok)
+
+    asyncio.run(run())
+    assert breaker.get_state()["window"]["failures"] == 3
+    assert breaker.stats["rejected_calls"] == 1
+
+
+def test_trips_on_error_rate():
+    breaker = CircuitBreaker("cb_rate_test", CircuitBreakerConfig(
+        failure_threshold=100, window_size=4, error_threshold_percentage=50.0,
+    ))
+
+    async def run():
+        await breaker.execute(_ok)
+        await breaker.execute(_ok)
+        with pytest.raises(RuntimeError):
+            await breaker.execute(_fail)
+        assert breaker.state == CircuitState.CLOSED
+        with pytest.raises(RuntimeError):
+            await breaker.execute(_fail)
+
+    asyncio.run(run())
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.get_state()["failure_rate"] == 50.0
+
+
+def test_half_open_admits_bounded_probes():
+    breaker = CircuitBreaker("cb_half_open_test", CircuitBreakerConfig(
+        failure_threshold=1, success_threshold=2, timeout=0, half_open_max_calls=2,
+    ))
+    running = []
+
+    async def slow_ok():
+        running.append(1)
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def attempt():
+        try:
+            return await breaker.execute(slow_ok)
+        except CircuitBreakerOpenError:
+            return "rejected"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await breaker.execute(_fail)
+        assert breaker.state == CircuitState.OPEN
+        return await asyncio.gather(*(attempt() for _ in range(10)))
+
+    results = asyncio.run(run())
+    assert results.count("ok") == 2
+    assert results.count("rejected") == 8
+    assert len(running) == 2
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.half_open_in_flight == 0
+    assert breaker.stats["probe_calls"] == 2
+
+
+def test_failed_probe_reopens_and_stragglers_do_not_decide():
+    breaker = CircuitBreaker("cb_probe_test", CircuitBreakerConfig(
+        failure_threshold=2, success_threshold=1, timeout=0, window_size=100,
+    ))
+
+    async def slow(delay, error=None):
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return "ok"
+
+    async def run():
+        # Llamada iniciada con el circuito cerrado que falla ya en half-open
+        straggler = asyncio.create_task(breaker.execute(slow, 0.02, RuntimeError("tarde")))
+        await asyncio.sleep(0)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.execute(_fail)
+        assert breaker.state == CircuitState.OPEN
+
+        probe = asyncio.create_task(breaker.execute(slow, 0.05))
+        await asyncio.sleep(0)
+        assert breaker.state == CircuitState.HALF_OPEN
+        with pytest.raises(RuntimeError):
+            await straggler
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert await probe == "ok"
+        assert breaker.state == CircuitState.CLOSED
+
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await breaker.execute(_fail)
+        with pytest.raises(RuntimeError):
+            await breaker.execute(_fail)  # sonda fallida
+        assert breaker.state == CircuitState.OPEN
+
+    asyncio.run(run())
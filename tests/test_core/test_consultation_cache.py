@@ -0,0 +1,181 @@
+"""
+Pruebas para la memoización por turno de las consultas entre agentes.
+
+Usan agentes simulados sobre un transporte A2A en memoria que entrega cada
+mensaje en una tarea con contexto vacío (como el servidor real), de modo que
+el turno solo llega al agente consultado a través del mensaje.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from core.consultation_cache import ConsultationCache, consultation_key
+from infrastructure.adapters import a2a_adapter as a2a_module
+from infrastructure.adapters.a2a_adapter import A2AAdapter
+
+
+class InMemoryA2AServer:
+    """Transporte A2A mínimo: cada mensaje se procesa en su propia tarea."""
+
+    def __init__(self):
+        self.handlers: Dict[str, Any] = {}
+
+    async def register_agent(self, agent_id: str, message_handler) -> bool:
+        self.handlers[agent_id] = message_handler
+        return True
+
+    async def unregister_agent(self, agent_id: str) -> bool:
+        self.handlers.pop(agent_id, None)
+        return True
+
+    async def send_message(self, from_agent_id: str, to_agent_id: str, message: Dict[str, Any], priority=None) -> bool:
+        handler = self.handlers.get(to_agent_id)
+        if handler is None:
+            return False
+        asyncio.get_running_loop().create_task(handler({"content": message}), context=contextvars.Context())
+        return True
+
+
+def _stub_agent(adapter: A2AAdapter, agent_id: str, executions: List[str], consults=(), delay: float = 0.02,
+                status: str = "success"):
+    """Agente simulado que consulta a otros agentes y responde al emisor."""
+
+    async def callback(message: Dict[str, Any]) -> None:
+        executions.append(agent_id)
+        outputs = await asyncio.gather(*(
+            adapter.call_agent(peer, query, context={"user_id": "user-1"}) for peer, query in consults
+        ))
+        await asyncio.sleep(delay)
+        await adapter.send_message(agent_id, message["response_to"], {
+            "status": status,
+            "output": f"{agent_id}: {message['user_input']}",
+            "consulted": [output.get("status") for output in outputs],
+            "agent_id": agent_id,
+            "agent_name": agent_id,
+        })
+
+    adapter.register_agent(agent_id, {"name": agent_id, "message_callback": callback})
+
+
+def _run_with_transport(scenario):
+    with patch.object(a2a_module, "a2a_server", InMemoryA2AServer()):
+        return asyncio.run(scenario())
+
+
+def test_duplicate_consults_in_a_turn_run_once():
+    cache = ConsultationCache(max_depth=3)
+    executions: List[str] = []
+
+    async def scenario():
+        adapter = A2AAdapter()
+        _stub_agent(adapter, "biometrics", executions)
+        _stub_agent(adapter, "nutrition", executions, consults=[("biometrics", "¿Cuál es la HRV del usuario?")])
+        _stub_agent(adapter, "training", executions, consults=[("biometrics", "cual es la  HRV del usuario")])
+        _stub_agent(adapter, "recovery", executions, consults=[("biometrics", "Cuál es la HRV del usuario.")])
+        await asyncio.sleep(0)
+
+        with patch.object(a2a_module, "consultation_cache", cache):
+            async with cache.turn() as scope:
+                responses = await adapter.call_multiple_agents("Plan de hoy", ["nutrition", "training", "recovery"],
+                                                               context={"user_id": "user-1"})
+                # Una consulta posterior del mismo turno sale de la caché
+                again = await adapter.call_agent("biometrics", "¿cuál es la HRV del usuario?",
+                                                 context={"user_id": "user-1"})
+            # Fuera del turno se vuelve a ejecutar el agente
+            await adapter.call_agent("biometrics", "¿Cuál es la HRV del usuario?", context={"user_id": "user-1"})
+        return responses, again, scope
+
+    responses, again, scope = _run_with_transport(scenario)
+    assert all(response["status"] == "success" for response in responses.values())
+    assert all(response["consulted"] == ["success"] for response in responses.values())
+    assert again["agent_id"] == "biometrics"
+    assert executions.count("biometrics") == 2
+    assert scope.stats["calls"] == 4
+    assert scope.saved_calls == 3
+    assert cache.get_stats()["saved_calls"] == 3
+    # El contexto relevante forma parte de la clave
+    assert consultation_key("biometrics", "HRV", {"user_id": "a"}) != consultation_key("biometrics", "HRV", {"user_id": "b"})
+
+
+def test_fan_out_depth_is_bounded_and_errors_are_not_memoized():
+    cache = ConsultationCache(max_depth=2)
+    executions: List[str] = []
+
+    async def scenario():
+        adapter = A2AAdapter()
+        # a -> b -> c: la consulta de b a c supera la profundidad máxima
+        _stub_agent(adapter, "agent_a", executions, consults=[("agent_b", "pregunta")])
+        _stub_agent(adapter, "agent_b", executions, consults=[("agent_c", "pregunta")])
+        _stub_agent(adapter, "agent_c", executions)
+        _stub_agent(adapter, "flaky", executions, status="error")
+        await asyncio.sleep(0)
+
+        with patch.object(a2a_module, "consultation_cache", cache):
+            async with cache.turn() as scope:
+                response = await adapter.call_agent("agent_a", "inicio")
+                await adapter.call_agent("flaky", "estado")
+                await adapter.call_agent("flaky", "estado")
+        return response, scope
+
+    response, scope = _run_with_transport(scenario)
+    assert response["status"] == "success"
+    assert "agent_c" not in executions
+    assert scope.stats["depth_limited"] == 1
+    assert executions.count("flaky") == 2
+
+
+def test_nested_consult_of_an_ancestor_does_not_wait_on_itself():
+    cache = ConsultationCache(max_depth=4)
+    executions: List[str] = []
+
+    async def scenario():
+        adapter = A2AAdapter()
+        # a -> b -> c -> b: la última consulta es idéntica a su ancestra en curso
+        _stub_agent(adapter, "agent_a", executions, consults=[("agent_b", "pregunta")])
+        _stub_agent(adapter, "agent_b", executions, consults=[("agent_c", "detalle")])
+        _stub_agent(adapter, "agent_c", executions, consults=[("agent_b", "pregunta")])
+        await asyncio.sleep(0)
+
+        with patch.object(a2a_module, "consultation_cache", cache):
+            async with cache.turn() as scope:
+                response = await asyncio.wait_for(adapter.call_agent("agent_a", "inicio"), timeout=5)
+        return response, scope
+
+    response, scope = _run_with_transport(scenario)
+    assert response["status"] == "success"
+    assert executions == ["agent_a", "agent_b", "agent_c", "agent_b"]
+    assert scope.stats["coalesced"] == 0
+    assert scope.stats["depth_limited"] == 1
+
+
+def test_cancelling_the_first_consult_does_not_cancel_coalesced_ones():
+    cache = ConsultationCache(max_depth=3)
+    executions: List[str] = []
+
+    async def call():
+        executions.append("biometrics")
+        await asyncio.sleep(0.05)
+        return {"status": "success", "output": "HRV 62", "agent_id": "biometrics"}
+
+    async def scenario():
+        async with cache.turn() as scope:
+            first = asyncio.create_task(cache.consult("biometrics", "HRV", {"user_id": "user-1"}, call))
+            await asyncio.sleep(0.01)
+            second = asyncio.create_task(cache.consult("biometrics", "hrv", {"user_id": "user-1"}, call))
+            await asyncio.sleep(0)
+            first.cancel()
+            response = await second
+            try:
+                await first
+                cancelled = False
+            except asyncio.CancelledError:
+                cancelled = True
+        return response, cancelled, scope
+
+    response, cancelled, scope = asyncio.run(scenario())
+    assert cancelled
+    assert response["output"] == "HRV 62"
+    assert executions == ["biometrics"]
+    assert scope.stats["coalesced"] == 1
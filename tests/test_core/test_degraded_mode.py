@@ -0,0 +1,111 @@
+"""
+Pruebas para la propagación de estados en el gestor de modos degradados.
+
+Verifican que un cambio de estado llega de inmediato a todos los servicios y
+funcionalidades dependientes, que el grafo rechaza ciclos y que la consulta
+de funcionalidades lee una instantánea sin necesidad de bucle de eventos.
+"""
+
+import asyncio
+
+import pytest
+
+from core.degraded_mode import (
+    DegradationLevel,
+    DegradationReason,
+    DegradedModeManager,
+    FeatureDisabledException,
+    feature_check,
+)
+
+
+@pytest.fixture
+def manager():
+    previous = DegradedModeManager._instance
+    DegradedModeManager._instance = None
+    yield DegradedModeManager()
+    DegradedModeManager._instance = previous
+
+
+def test_status_change_propagates_in_one_pass(manager):
+    notifications = []
+
+    async def run():
+        await manager.register_callback(lambda level, reason, message: notifications.append(level))
+        # Registrados antes que su dependencia para ejercitar el rango incremental
+        await manager.register_service("api", "API", "API pública", dependencies=["cache"])
+        await manager.register_service("cache", "Cache", "Caché", is_critical=True, dependencies=["db"])
+        await manager.register_service("reports", "Reports", "Informes", dependencies=["db", "cache"])
+        await manager.register_service("db", "DB", "Base de datos", is_critical=True)
+        await manager.set_feature_enabled("advanced:reports", True, depends_on=["reports"])
+        await manager.set_feature_enabled("chat", True, depends_on=["api"])
+        assert manager.feature_enabled("chat") and manager.feature_enabled("advanced:reports")
+
+        await manager.set_service_unavailable("db", DegradationReason.EXTERNAL_SERVICE, "caída", DegradationLevel.HIGH)
+        down = {service_id: service.is_available for service_id, service in manager.services.items()}
+        state = (manager.feature_enabled("chat"), manager.feature_enabled("advanced:reports"))
+
+        await manager.set_service_available("db")
+        return down, state
+
+    down, state = asyncio.run(run())
+    assert down == {"api": False, "cache": False, "reports": False, "db": False}
+    assert state == (False, False)
+    assert notifications == [DegradationLevel.HIGH, DegradationLevel.NONE]
+    assert all(service.is_available for service in manager.services.values())
+    assert manager.services["api"].degradation_level == DegradationLevel.NONE
+    assert manager.feature_enabled("chat") and manager.feature_enabled("advanced:reports")
+
+
+def test_dependency_degradation_is_inherited_and_own_failure_kept(manager):
+    async def run():
+        await manager.register_service("db", "DB", "Base de datos")
+        await manager.register_service("api", "API", "API pública", dependencies=["db"])
+        await manager.set_service_unavailable("db", DegradationReason.RESOURCE_LIMIT, "sin conexiones", DegradationLevel.CRITICAL)
+        api = await manager.get_service_status("api")
+        assert api["degradation_level"] == DegradationLevel.CRITICAL.value
+        assert api["degradation_reason"] == DegradationReason.EXTERNAL_SERVICE.value
+        assert api["unavailable_dependencies"] == ["db"]
+
+        await manager.set_service_unavailable("api", DegradationReason.PERFORMANCE, "lenta", DegradationLevel.LOW)
+        await manager.set_service_available("db")
+        api = await manager.get_service_status("api")
+        assert api["is_available"] is False
+        assert api["degradation_level"] == DegradationLevel.LOW.value
+        assert api["degradation_reason"] == DegradationReason.PERFORMANCE.value
+
+        await manager.unregister_service("db")
+        await manager.set_service_available("api")
+        assert (await manager.get_service_status("api"))["is_available"] is True
+
+    asyncio.run(run())
+
+
+def test_cycles_are_rejected(manager):
+    async def run():
+        await manager.register_service("a", "A", "A", dependencies=["b"])
+        await manager.register_service("b", "B", "B", dependencies=["c"])
+        with pytest.raises(ValueError):
+            await manager.register_service("c", "C", "C", dependencies=["a"])
+        with pytest.raises(ValueError):
+            await manager.register_service("d", "D", "D", dependencies=["d"])
+        await manager.register_service("c", "C", "C")
+
+    asyncio.run(run())
+    assert "c" in manager.services and "d" not in manager.services
+    assert manager._rank["a"] > manager._rank["b"] > manager._rank["c"]
+
+
+def test_feature_check_reads_snapshot_without_event_loop(manager):
+    @feature_check("export")
+    def export():
+        return "ok"
+
+    asyncio.run(manager.register_service("storage", "Storage", "Almacenamiento"))
+    asyncio.run(manager.set_feature_enabled("export", True, depends_on=["storage"]))
+    assert export() == "ok"
+
+    asyncio.run(manager.set_service_unavailable("storage", DegradationReason.MAINTENANCE))
+    with pytest.raises(FeatureDisabledException):
+        export()
+    assert manager.feature_enabled("unknown", default=False) is False
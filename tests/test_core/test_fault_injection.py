@@ -0,0 +1,124 @@
+"""
+Pruebas para la inyección de fallos asíncrona en las fronteras de los clientes.
+
+Verifican que la latencia inyectada solo suspende las llamadas al objetivo (el
+bucle sigue atendiendo al resto), que los errores usan la excepción nativa de
+cada cliente, que los envoltorios se retiran al terminar y que los eventos de
+red del gestor de caos usan el inyector.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+import redis.asyncio as redis
+from redis import exceptions as redis_exceptions
+
+from core.chaos_testing import ChaosEvent, ChaosEventType, ChaosTestingManager
+from core.fault_injection import Fault, FaultInjector, LatencyDistribution, fault_injector
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True})))
+
+
+async def _timed_get(client: httpx.AsyncClient, url: str) -> float:
+    start = time.perf_counter()
+    response = await client.get(url)
+    assert response.status_code == 200
+    return time.perf_counter() - start
+
+
+def test_latency_is_scoped_and_does_not_block_the_loop():
+    injector = FaultInjector(seed=1)
+    original_send = httpx.AsyncClient.send
+    fault = Fault(boundary="http", targets=("slow.internal",), latency=LatencyDistribution("constant", 100.0))
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        async with _client() as client:
+            with injector.injected(fault):
+                assert httpx.AsyncClient.send is not original_send
+                slow, fast = await asyncio.gather(
+                    _timed_get(client, "http://slow.internal/a"),
+                    _timed_get(client, "http://fast.internal/b"),
+                )
+        ticking.cancel()
+        return slow, fast, ticks
+
+    slow, fast, ticks = asyncio.run(run())
+    assert slow >= 0.1
+    assert fast < 0.05
+    # El bucle siguió atendiendo a otras corrutinas durante la espera
+    assert ticks >= 10
+    assert httpx.AsyncClient.send is original_send
+    assert fault.stats["calls"] == 1 and fault.stats["delayed"] == 1
+    assert injector.get_stats()["installed_boundaries"] == []
+
+
+def test_errors_use_native_client_exceptions():
+    injector = FaultInjector(seed=1)
+
+    async def run():
+        with injector.injected(
+            Fault(boundary="http", targets=("api.example.com",), error_rate=1.0, error_kind="timeout"),
+            Fault(boundary="redis", targets=("cache-a",), error_rate=1.0),
+        ):
+            async with _client() as client:
+                with pytest.raises(httpx.ConnectTimeout):
+                    await client.get("http://api.example.com/")
+                assert (await client.get("http://other.example.com/")).status_code == 200
+            # Falla antes de abrir ninguna conexión
+            with pytest.raises(redis_exceptions.ConnectionError):
+                await redis.Redis(host="cache-a").get("key")
+
+    asyncio.run(run())
+    assert injector.stats["calls_affected"] == 2
+
+
+def test_fault_parse_and_validation():
+    fault = Fault.parse("boundary=a2a,target=elite_*|recovery_*,latency=lognormal:200:0.5,error_rate=0.1")
+    assert fault.targets == ("elite_*", "recovery_*")
+    assert fault.latency == LatencyDistribution("lognormal", 200.0, 0.5)
+    assert fault.matches("elite_training_strategist") and not fault.matches("progress_tracker")
+    with pytest.raises(ValueError):
+        Fault.parse("boundary=smtp")
+    with pytest.raises(ValueError):
+        Fault.parse("boundary=http,error_rate=2")
+    with pytest.raises(ValueError):
+        Fault.parse("boundary=http,latency_ms=10")
+
+
+def test_network_latency_event_uses_async_injector():
+    manager = ChaosTestingManager()
+
+    async def run():
+        await manager.enable(safe_mode=True)
+        event = ChaosEvent("latency-test", ChaosEventType.NETWORK_LATENCY, "db.internal", duration=1,
+                           parameters={"boundary": "http", "latency": "constant:80"})
+        await manager.register_event(event)
+        await manager.start_event("latency-test")
+        await asyncio.sleep(0.01)
+        assert [fault.fault_id for fault in fault_injector.active_faults()] == ["latency-test"]
+        async with _client() as client:
+            slow, fast = await asyncio.gather(
+                _timed_get(client, "http://db.internal/"),
+                _timed_get(client, "http://cache.internal/"),
+            )
+        await manager.disable()
+        await asyncio.sleep(0)
+        return slow, fast
+
+    slow, fast = asyncio.run(run())
+    assert slow >= 0.08 and fast < 0.05
+    assert fault_injector.active_faults() == []
+    assert manager.events["latency-test"].status == "cancelled"
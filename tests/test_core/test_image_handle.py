@@ -0,0 +1,80 @@
+"""
+Pruebas para el handle de imagen compartido entre análisis de visión.
+
+Verifican que una solicitud con varios análisis sobre la misma imagen la lee,
+abre y resume una sola vez, y que los derivados (base64, píxeles, miniaturas)
+se calculan de forma perezosa y se reutilizan.
+"""
+
+import asyncio
+import base64
+import hashlib
+import io
+from unittest.mock import patch
+
+from PIL import Image
+
+from core import image_handle as image_handle_module
+from core.image_handle import ImageHandle
+from core.image_optimizer import ImageOptimizer
+
+
+def _png(width=640, height=480, seed=40):
+    buffer = io.BytesIO()
+    Image.effect_noise((width, height), seed).convert("RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_multi_analysis_request_resolves_and_decodes_once(tmp_path):
+    path = tmp_path / "documento.png"
+    data = _png(1600, 1200)
+    path.write_bytes(data)
+    optimizer = ImageOptimizer(max_workers=1, max_pending=2, task_timeout=30, use_process_pool=False)
+
+    async def scenario():
+        image = await ImageHandle.resolve({"path": str(path)})
+        optimized = await asyncio.gather(
+            optimizer.optimize_image(image, force_format="jpeg", preserve_text_quality=False),
+            optimizer.optimize_image(image, force_format="webp", preserve_text_quality=False),
+        )
+        handles = await asyncio.gather(*(ImageHandle.resolve(image) for _ in range(3)))
+        return image, optimized, handles
+
+    with patch.object(ImageHandle, "_read_file", wraps=ImageHandle._read_file) as read:
+        image, optimized, handles = asyncio.run(scenario())
+
+    assert read.call_count == 1
+    assert all(handle is image for handle in handles)
+    with patch.object(image_handle_module.Image, "open", wraps=Image.open) as opened:
+        keys = {handle.cache_key({"operation": operation}) for handle in handles for operation in ("tables", "forms")}
+        assert all(handle.pixels.shape == (1200, 1600, 3) for handle in handles)
+        assert all(handle.image.width == 1600 for handle in handles)
+    assert opened.call_count == 1
+    assert [metadata["new_width"] for _, metadata in optimized] == [1024, 1024]
+    assert (image.format, image.source, image.size) == ("png", "path", len(data))
+    # Las claves coinciden con las que ``image_cache.generate_key`` calcula a partir de los bytes
+    params = {"operation": "tables"}
+    legacy_key = f"{hashlib.md5(data).hexdigest()}_{hashlib.md5(str(sorted(params.items())).encode()).hexdigest()}"
+    assert image.cache_key(params) == legacy_key
+    assert len(keys) == 2
+
+
+def test_derived_data_is_lazy_and_cached():
+    data = _png(300, 200)
+    image = asyncio.run(ImageHandle.resolve("data:image/png;base64," + base64.b64encode(data).decode()))
+
+    # El base64 de un data URI se entrega sin decodificarlo
+    assert image._data is None
+    assert base64.b64decode(image.base64) == data
+    assert image.mime_type == "image/png"
+    assert image.data == data
+    assert image.pixels.shape == (200, 300, 3)
+    assert image.pixels is image.pixels
+
+    thumbnail = image.thumbnail((64, 64))
+    assert image.thumbnail((64, 64)) is thumbnail
+    assert Image.open(io.BytesIO(thumbnail)).size == (64, 43)
+
+    # Un handle existente se reutiliza y los bytes sin formato se identifican por su firma
+    assert asyncio.run(ImageHandle.resolve(image)) is image
+    assert asyncio.run(ImageHandle.resolve(data)).format == "png"
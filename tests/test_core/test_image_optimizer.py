@@ -0,0 +1,103 @@
+"""
+Pruebas para el pipeline de preprocesamiento de imágenes.
+
+Verifican la decodificación draft de JPEG grandes, que el base64 se decodifica
+y recodifica una sola vez, el plazo por tarea y la ejecución en el pool de
+procesos.
+"""
+
+import asyncio
+import base64
+import io
+
+from PIL import Image
+
+from core.image_optimizer import ImageOptimizer, _optimize_image_bytes
+
+
+def _jpeg(width, height, quality=95):
+    buffer = io.BytesIO()
+    Image.effect_noise((width, height), 40).convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _params(**kwargs):
+    params = {
+        "max_width": 1024,
+        "max_height": 1024,
+        "quality": 85,
+        "force_format": None,
+        "preserve_text_quality": False,
+    }
+    params.update(kwargs)
+    return params
+
+
+def test_large_jpeg_uses_draft_decoding():
+    optimized, metadata = _optimize_image_bytes(_jpeg(2400, 2200), "jpeg", _params())
+
+    assert metadata["draft_decoded"]
+    assert (metadata["original_width"], metadata["original_height"]) == (2400, 2200)
+    assert (metadata["new_width"], metadata["new_height"]) == (1024, 938)
+    assert Image.open(io.BytesIO(optimized)).size == (1024, 938)
+
+    # Con preservación de texto el tamaño objetivo es mayor y no compensa
+    _, metadata = _optimize_image_bytes(_jpeg(2400, 2200), "jpeg", _params(preserve_text_quality=True))
+    assert not metadata["draft_decoded"]
+
+
+def test_small_image_is_not_reencoded_back():
+    buffer = io.BytesIO()
+    Image.effect_noise((32, 32), 40).convert("RGB").save(buffer, format="PNG", optimize=True)
+
+    optimized, metadata = _optimize_image_bytes(buffer.getvalue(), "png", _params())
+
+    assert optimized is None
+    assert metadata["optimization_reverted"]
+    assert metadata["bytes_saved"] == 0
+
+
+def test_data_uri_round_trip_in_thread_mode():
+    optimizer = ImageOptimizer(max_workers=1, max_pending=2, task_timeout=30, use_process_pool=False)
+    data_uri = "data:image/jpeg;base64," + base64.b64encode(_jpeg(1600, 1200)).decode("utf-8")
+
+    result, metadata = asyncio.run(optimizer.optimize_image(data_uri, preserve_text_quality=False))
+
+    assert result.startswith("data:image/jpeg;base64,")
+    decoded = Image.open(io.BytesIO(base64.b64decode(result.split(",")[1])))
+    assert decoded.size == (metadata["new_width"], metadata["new_height"]) == (1024, 768)
+    assert optimizer.stats["images_processed"] == 1
+    assert optimizer.stats["pending"] == 0
+
+
+def test_deadline_returns_original_image():
+    optimizer = ImageOptimizer(max_workers=1, max_pending=1, task_timeout=0.001, use_process_pool=False)
+    image = _jpeg(2000, 2000)
+
+    async def run():
+        return await asyncio.gather(*(optimizer.optimize_image(image) for _ in range(3)))
+
+    results = asyncio.run(run())
+
+    assert all(result == image and "error" in metadata for result, metadata in results)
+    assert optimizer.stats["timeouts"] == 3
+    assert optimizer.stats["pending"] == 0
+
+
+def test_process_pool_optimizes_concurrent_images():
+    optimizer = ImageOptimizer(max_workers=2, max_pending=2, task_timeout=60)
+    image = _jpeg(1600, 1200)
+
+    async def run():
+        try:
+            return await asyncio.gather(
+                *(optimizer.optimize_image(image, preserve_text_quality=False) for _ in range(4))
+            )
+        finally:
+            await optimizer.shutdown()
+
+    results = asyncio.run(run())
+
+    assert [metadata["new_width"] for _, metadata in results] == [1024] * 4
+    assert all(isinstance(result, bytes) and len(result) < len(image) for result, _ in results)
+    assert optimizer.stats["errors"] == 0
@@ -0,0 +1,115 @@
+"""
+Pruebas para los histogramas de latencia y el registro compartido.
+
+Verifican la precisión de los percentiles, que la memoria no crece con el
+número de muestras, la fusión de series por operación y por agente y la
+integración con el circuit breaker.
+"""
+
+import asyncio
+import random
+
+import pytest
+
+from core.circuit_breaker import CircuitBreaker
+from core.latency_histogram import LatencyHistogram, LatencyRegistry, latency_registry
+
+
+def _exact_percentile(values, percentile):
+    ordered = sorted(values)
+    index = max(0, -(-len(ordered) * percentile // 100) - 1)
+    return ordered[int(index)]
+
+
+def test_percentiles_are_within_precision():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    histogram = LatencyHistogram(precision=0.01)
+    for value in values:
+        histogram.record(value)
+
+    for percentile in (50, 95, 99):
+        exact = _exact_percentile(values, percentile)
+        assert histogram.percentile(percentile) == pytest.approx(exact, rel=0.011)
+
+    summary = histogram.summary()
+    assert summary["count"] == 20000
+    assert summary["min_ms"] == pytest.approx(min(values), abs=1e-3)
+    assert summary["max_ms"] == pytest.approx(max(values), abs=1e-3)
+    assert set(summary) >= {"p50_ms", "p95_ms", "p99_ms", "mean_ms"}
+
+
+def test_memory_is_bounded_by_buckets():
+    histogram = LatencyHistogram()
+    for _ in range(5):
+        for value in range(1, 10001):
+            histogram.record(value / 10)
+    buckets = len(histogram._counts)
+
+    for value in range(1, 10001):
+        histogram.record(value / 10)
+
+    assert len(histogram._counts) == buckets
+    assert histogram.count == 60000
+
+    histogram.record(0)
+    histogram.record(10 ** 9)
+    assert histogram.percentile(0) == 0.0
+    assert histogram.max_ms == 10 ** 9
+
+
+def test_registry_groups_by_operation_and_agent():
+    registry = LatencyRegistry()
+    for _ in range(10):
+        registry.record("vision.api_call", 100, operation="analyze_image", agent_id="a")
+        registry.record("vision.api_call", 300, operation="analyze_image", agent_id="b")
+        registry.record("vision.api_call", 50, operation="extract_text", agent_id="a")
+
+    by_operation = registry.summary("vision.api_call", group_by="operation")
+    by_agent = registry.summary("vision.api_call", group_by="agent_id")
+
+    assert by_operation["analyze_image"]["count"] == 20
+    assert by_operation["analyze_image"]["p99_ms"] == pytest.approx(300, rel=0.01)
+    assert by_agent["a"]["count"] == 20
+    assert by_agent["a"]["p50_ms"] == pytest.approx(50, rel=0.01)
+    assert registry.summary("vision.api_call", agent_id="b")["p50_ms"] == pytest.approx(300, rel=0.01)
+    assert registry.get_stats()["metrics"]["vision.api_call"]["count"] == 30
+
+    registry.clear("vision.api_call")
+    assert registry.summary("vision.api_call")["count"] == 0
+
+
+def test_registry_series_are_bounded():
+    registry = LatencyRegistry(max_series=2)
+    for agent in range(5):
+        registry.record("op", 10, agent_id=str(agent))
+
+    assert registry.get_stats()["series"] == 3
+    assert registry.get_stats()["overflowed_series"] == 3
+    assert registry.summary("op")["count"] == 5
+
+
+def test_merge_requires_same_configuration():
+    with pytest.raises(ValueError):
+        LatencyHistogram(precision=0.01).merge(LatencyHistogram(precision=0.05))
+
+
+def test_circuit_breaker_exposes_latency_percentiles():
+    breaker = CircuitBreaker("latency_histogram_test")
+    breaker.latency.reset()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        return True
+
+    async def run():
+        for _ in range(3):
+            await breaker.execute(call)
+
+    asyncio.run(run())
+
+    stats = breaker.get_state()["stats"]
+    assert stats["latency_ms"]["count"] == 3
+    assert stats["latency_ms"]["p50_ms"] >= 10
+    assert stats["avg_response_time"] == pytest.approx(stats["latency_ms"]["mean_ms"] / 1000, rel=0.01)
+    assert latency_registry.summary("circuit_breaker.call", breaker="latency_histogram_test")["count"] == 3
@@ -0,0 +1,78 @@
+"""
+Pruebas para el ensamblado de prompts con prefijo estable memorizado.
+
+Verifican que el prefijo se renderiza una sola vez por combinación de
+secciones, que su hash es estable e independiente del sufijo y que las
+estadísticas reflejan los tokens de prefijo reutilizados.
+"""
+
+from agents.shared.program_definitions import format_program_context
+from core.prompt_builder import PrefixCache, PromptBuilder, estimate_tokens, hash_prefix
+
+INSTRUCTIONS = "Eres un especialista en prevención de lesiones y recuperación física."
+
+
+def _build(cache, program_type, query, renders):
+    def render_program():
+        renders.append(program_type)
+        return format_program_context(program_type, "recovery", "Protocolos de recuperación recomendados")
+
+    return (
+        PromptBuilder(cache)
+        .static("instructions", INSTRUCTIONS)
+        .static(("program", program_type), render_program)
+        .dynamic(f'El usuario solicita: "{query}"')
+        .build()
+    )
+
+
+def test_prefix_is_rendered_once_and_hash_is_stable():
+    cache, renders = PrefixCache(), []
+
+    first = _build(cache, "PRIME", "¿Cómo prevengo lesiones al correr?", renders)
+    second = _build(cache, "PRIME", "Me duele el hombro", renders)
+
+    assert renders == ["PRIME"]
+    assert first.prefix == second.prefix
+    assert first.prefix_hash == second.prefix_hash == hash_prefix(first.prefix)
+    assert not first.prefix_reused and second.prefix_reused
+    assert first.text.startswith(INSTRUCTIONS)
+    assert first.text.endswith('"¿Cómo prevengo lesiones al correr?"')
+    assert "CONTEXTO DEL PROGRAMA PRIME" in first.prefix
+
+
+def test_different_static_sections_get_different_prefixes():
+    cache, renders = PrefixCache(), []
+
+    prime = _build(cache, "PRIME", "consulta", renders)
+    longevity = _build(cache, "LONGEVITY", "consulta", renders)
+
+    assert renders == ["PRIME", "LONGEVITY"]
+    assert prime.prefix_hash != longevity.prefix_hash
+
+
+def test_stats_report_reused_prefix_tokens():
+    cache, renders = PrefixCache(), []
+
+    parts = [_build(cache, "PRIME", f"consulta {i}", renders) for i in range(3)]
+    stats = cache.get_stats()
+
+    assert parts[0].prefix_tokens == estimate_tokens(parts[0].prefix) > 0
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["reused_prefix_tokens"] == 2 * parts[0].prefix_tokens
+    assert stats["rendered_prefix_tokens"] == parts[0].prefix_tokens
+
+
+def test_cache_is_bounded_and_prompt_without_static_sections():
+    cache, renders = PrefixCache(max_entries=1), []
+
+    _build(cache, "PRIME", "consulta", renders)
+    _build(cache, "LONGEVITY", "consulta", renders)
+    _build(cache, "PRIME", "consulta", renders)
+
+    assert renders == ["PRIME", "LONGEVITY", "PRIME"]
+    assert cache.get_stats()["evictions"] == 2
+
+    parts = PromptBuilder(cache).dynamic("solo sufijo").build()
+    assert parts.prefix == "" and parts.prefix_hash == "" and parts.text == "solo sufijo"
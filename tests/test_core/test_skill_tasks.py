@@ -0,0 +1,95 @@
+"""
+Pruebas para el registro acotado de tareas de skills.
+
+Verifican la caducidad de las tareas terminadas, la expulsión por capacidad
+sin tocar las tareas en curso, la recuperación desde el almacén en disco y
+que la memoria del registro se mantiene plana con muchas ejecuciones.
+"""
+
+import asyncio
+import gc
+import time
+import tracemalloc
+import warnings
+from typing import Any, Dict
+
+from core.skill import Skill, SkillStatus
+from core.skill_tasks import SkillTaskRegistry, SkillTaskStore
+
+
+class EchoSkill(Skill):
+    """Skill mínima que devuelve su entrada."""
+
+    def __init__(self, **registry_kwargs: Any):
+        super().__init__(name="echo", description="Devuelve la entrada")
+        self.tasks = SkillTaskRegistry(self.id, **registry_kwargs)
+
+    async def execute(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {"echo": input_data.get("data")}
+
+
+def _task(task_id: str, status: SkillStatus) -> Dict[str, Any]:
+    return {"task_id": task_id, "status": status, "result": None}
+
+
+def test_finished_tasks_expire_and_running_tasks_stay():
+    registry = SkillTaskRegistry("skill", max_entries=100, ttl=10.0, store=None)
+    registry.add("running", _task("running", SkillStatus.RUNNING))
+    registry.add("done", _task("done", SkillStatus.PENDING))
+    registry.update("done", status=SkillStatus.COMPLETED, result={"ok": True})
+
+    assert registry.get("done")["result"] == {"ok": True}
+    assert registry.prune(now=time.monotonic() + 11.0) == 1
+    assert registry.get("done") is None
+    assert registry.get("running")["status"] == SkillStatus.RUNNING
+    assert registry.get_stats()["expired"] == 1
+
+
+def test_capacity_evicts_oldest_finished_and_offloads_to_disk(tmp_path):
+    store = SkillTaskStore(str(tmp_path / "tasks.db"), batch_size=2)
+    registry = SkillTaskRegistry("skill", max_entries=3, ttl=3600.0, store=store)
+    registry.add("running", _task("running", SkillStatus.RUNNING))
+    for index in range(5):
+        registry.add(f"t{index}", _task(f"t{index}", SkillStatus.PENDING))
+        registry.update(f"t{index}", status=SkillStatus.COMPLETED, result={"n": index})
+
+    assert len(registry) == 3
+    assert "running" in registry and "t4" in registry and "t0" not in registry
+    restored = registry.get("t0")
+    assert restored["status"] is SkillStatus.COMPLETED
+    assert restored["result"] == {"n": 0}
+    assert store.count() == 3
+    store.close()
+
+    # El almacén sobrevive al proceso y a otra instancia del registro
+    reopened = SkillTaskRegistry("skill", max_entries=3, ttl=3600.0,
+                                 store=SkillTaskStore(str(tmp_path / "tasks.db")))
+    assert reopened.get("t2")["result"] == {"n": 2}
+    assert reopened.get("t2", default="missing") is not None
+    assert SkillTaskRegistry("other", store=reopened.store).get("t2") is None
+
+
+def test_skill_executions_keep_memory_flat():
+    skill = EchoSkill(max_entries=500, ttl=3600.0, store=None)
+
+    async def run(count: int, offset: int) -> None:
+        # Los avisos capturados por pytest también ocuparían memoria
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for index in range(offset, offset + count):
+                await skill.execute_task(f"task-{index}", {"data": {"value": index}})
+
+    tracemalloc.start()
+    asyncio.run(run(2000, 0))
+    gc.collect()
+    baseline = tracemalloc.get_traced_memory()[0]
+    asyncio.run(run(10000, 2000))
+    gc.collect()
+    grown = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+
+    assert len(skill.tasks) == 500
+    assert skill.get_task_status("task-11999")["status"] is SkillStatus.COMPLETED
+    assert skill.get_task_status("task-0") is None
+    # Crecimiento muy inferior a lo que ocuparían 10 000 registros retenidos
+    assert grown < 256 * 1024
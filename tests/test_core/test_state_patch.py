@@ -0,0 +1,132 @@
+"""
+Pruebas para los parches de estado por campo con versión optimista.
+
+Verifican que el delta entre dos contextos reproduce el documento, que las
+listas que crecen se envían como inserciones al final, que los conflictos se
+detectan solo en los campos tocados (también entre cargas concurrentes de la
+misma sesión) y que ``save_state`` envía deltas tras ``load_state``.
+"""
+
+import asyncio
+import copy
+import uuid
+
+import pytest
+
+from core.state_patch import StatePatchError, StateVersionConflict, apply_patch, diff_state
+from infrastructure.adapters.state_manager_adapter import state_manager_adapter
+
+
+def test_diff_and_apply_roundtrip():
+    base = {
+        "conversation_history": [{"role": "user", "content": "hola"}],
+        "user_profile": {"goal": "fuerza", "weight": 80},
+        "meal_plans": [],
+        "last_updated": "2025-01-01 10:00:00",
+        "obsolete": True,
+    }
+    updated = copy.deepcopy(base)
+    updated["conversation_history"].append({"role": "assistant", "content": "plan/dieta ~ok"})
+    updated["user_profile"]["weight"] = 79
+    updated["meal_plans"] = [{"day": 1}]
+    updated["last_updated"] = "2025-01-01 10:05:00"
+    updated["a/b"] = 1
+    del updated["obsolete"]
+
+    operations = diff_state(base, updated)
+    assert {"op": "add", "path": "/conversation_history/-",
+            "value": {"role": "assistant", "content": "plan/dieta ~ok"}} in operations
+    assert {"op": "replace", "path": "/user_profile/weight", "value": 79} in operations
+    assert {"op": "remove", "path": "/obsolete"} in operations
+    assert apply_patch(copy.deepcopy(base), operations) == updated
+    assert diff_state(updated, updated) == []
+
+    with pytest.raises(StatePatchError):
+        apply_patch({}, [{"op": "replace", "path": "/missing", "value": 1}])
+
+
+def test_patch_conflicts_only_on_touched_fields():
+    user_id, session_id = f"user-{uuid.uuid4().hex}", "session"
+
+    async def run():
+        await state_manager_adapter.save_state(user_id, session_id, {"meal_plans": [], "user_profile": {}})
+        version = await state_manager_adapter.get_state_version(user_id, session_id)
+
+        # Otro escritor modifica el perfil
+        await state_manager_adapter.patch_state(
+            user_id, session_id, [{"op": "replace", "path": "/user_profile", "value": {"goal": "fuerza"}}],
+            expected_version=version)
+
+        # Un parche sobre otro campo con la versión antigua se acepta
+        await state_manager_adapter.patch_state(
+            user_id, session_id, [{"op": "add", "path": "/meal_plans/-", "value": {"day": 1}}],
+            expected_version=version)
+
+        # Tocar el perfil con la versión antigua es un conflicto
+        with pytest.raises(StateVersionConflict) as conflict:
+            await state_manager_adapter.patch_state(
+                user_id, session_id, [{"op": "replace", "path": "/user_profile/goal", "value": "resistencia"}],
+                expected_version=version)
+        assert conflict.value.fields == ["user_profile"]
+
+        # Un parche inválido no deja cambios a medias
+        with pytest.raises(StatePatchError):
+            await state_manager_adapter.patch_state(user_id, session_id, [
+                {"op": "add", "path": "/meal_plans/-", "value": {"day": 2}},
+                {"op": "remove", "path": "/meal_plans/9"},
+            ])
+        return await state_manager_adapter.load_state(user_id, session_id)
+
+    state = asyncio.run(run())
+    assert state == {"meal_plans": [{"day": 1}], "user_profile": {"goal": "fuerza"}}
+
+
+def test_save_state_sends_deltas_after_load():
+    user_id, session_id = f"user-{uuid.uuid4().hex}", "session"
+    history = [{"role": "user", "content": "x" * 200} for _ in range(50)]
+
+    async def run():
+        await state_manager_adapter.save_state(user_id, session_id, {"conversation_history": history})
+        stats = state_manager_adapter.stats
+        full_writes, written = stats["state_full_writes"], stats["state_bytes_written"]
+
+        context = await state_manager_adapter.load_state(user_id, session_id)
+        context["conversation_history"].append({"role": "assistant", "content": "ok"})
+        result = await state_manager_adapter.save_state(user_id, session_id, context)
+
+        assert stats["state_full_writes"] == full_writes
+        assert stats["state_bytes_written"] - written < 100
+        assert result["version"] == 2
+        return await state_manager_adapter.load_state(user_id, session_id)
+
+    state = asyncio.run(run())
+    assert len(state["conversation_history"]) == 51
+    assert state["conversation_history"][-1] == {"role": "assistant", "content": "ok"}
+
+
+def test_concurrent_loads_do_not_lose_updates():
+    user_id, session_id = f"user-{uuid.uuid4().hex}", "session"
+
+    async def run():
+        await state_manager_adapter.save_state(user_id, session_id, {"a": 1, "b": 1})
+        first = await state_manager_adapter.load_state(user_id, session_id)
+        second = await state_manager_adapter.load_state(user_id, session_id)
+
+        second["b"] = 2
+        await state_manager_adapter.commit_state(user_id, session_id, second)
+
+        # El delta de la primera carga no toca "b" y no pisa la otra escritura
+        first["a"] = 5
+        await state_manager_adapter.commit_state(user_id, session_id, first)
+        assert first == {"a": 5, "b": 2}
+
+        # Tocar un campo que otro escritor modificó después de la carga es un conflicto
+        second["a"] = 7
+        with pytest.raises(StateVersionConflict) as conflict:
+            await state_manager_adapter.commit_state(user_id, session_id, second)
+        assert conflict.value.fields == ["a"]
+
+        await state_manager_adapter.commit_state(user_id, session_id, second, force=True)
+        return await state_manager_adapter.load_state(user_id, session_id)
+
+    assert asyncio.run(run()) == {"a": 7, "b": 2}
@@ -0,0 +1,140 @@
+"""
+Pruebas para el cliente MCP asíncrono.
+
+Usan un servidor MCP simulado sobre ``httpx.MockTransport`` y verifican el
+límite de concurrencia por servidor, la combinación de lecturas idénticas
+(que sobrevive a la cancelación de quien la inició),
+la caché del listado de herramientas y el manejo de errores.
+"""
+
+import asyncio
+import json
+
+import httpx
+
+from tools.mcp_client import MCPClient
+
+
+class StubServer:
+    """Servidor MCP simulado que registra la concurrencia observada."""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.requests = []
+        self.active = {}
+        self.max_active = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.requests.append((request.method, request.url.host, request.url.path))
+        self.active[host] = self.active.get(host, 0) + 1
+        self.max_active[host] = max(self.max_active.get(host, 0), self.active[host])
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active[host] -= 1
+
+        if request.url.path == "/tools":
+            return httpx.Response(200, json={"tools": [{"name": "query"}]})
+        if request.url.path == "/tools/call":
+            body = json.loads(request.content)
+            return httpx.Response(200, json={"result": body["name"], "arguments": body["arguments"]})
+        if request.url.path.startswith("/users/"):
+            return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+        return httpx.Response(503, json={"detail": "unavailable"})
+
+
+def _client(server, **kwargs):
+    return MCPClient(
+        base_url="http://mcp.local",
+        api_key="secret",
+        transport=httpx.MockTransport(server),
+        **kwargs,
+    )
+
+
+def test_requests_share_pool_and_respect_per_server_limit():
+    server = StubServer()
+    client = _client(server, max_concurrency_per_server=3)
+
+    async def run():
+        pool = await client.get_client()
+        results = await client.call_many(
+            [{"endpoint": f"users/{index}"} for index in range(12)]
+            + [{"endpoint": f"http://other.local/users/{index}"} for index in range(3)]
+        )
+        assert await client.get_client() is pool
+        await client.close()
+        return results
+
+    results = asyncio.run(run())
+    assert [result["id"] for result in results] == [str(index) for index in range(12)] + ["0", "1", "2"]
+    assert server.max_active == {"mcp.local": 3, "other.local": 3}
+    assert client.stats["limit_waits"] > 0
+
+
+def test_identical_reads_are_coalesced_and_tool_list_cached():
+    server = StubServer()
+    client = _client(server, tools_cache_ttl=60.0)
+
+    async def run():
+        users = await asyncio.gather(*(client.get_user_data("42") for _ in range(5)))
+        tools = [await client.list_tools() for _ in range(3)]
+        client.invalidate_cache("tools")
+        tools.append(await client.list_tools())
+        called = await asyncio.gather(*(client.call_tool("query", {"sql": "select 1"}) for _ in range(2)))
+        await client.close()
+        return users, tools, called
+
+    users, tools, called = asyncio.run(run())
+    assert all(user == {"id": "42"} for user in users)
+    assert all(tool_list == [{"name": "query"}] for tool_list in tools)
+    assert called[0]["arguments"] == {"sql": "select 1"}
+    # Una lectura de usuario, dos listados (antes y después de invalidar) y dos llamadas
+    assert [path for _, _, path in server.requests].count("/users/42") == 1
+    assert [path for _, _, path in server.requests].count("/tools") == 2
+    assert [path for _, _, path in server.requests].count("/tools/call") == 2
+    assert client.stats["coalesced"] == 4
+    assert client.stats["cache_hits"] == 2
+
+
+def test_errors_are_returned_and_not_cached():
+    server = StubServer(latency=0)
+    client = _client(server)
+
+    async def run():
+        first = await client.call_endpoint("missing", cache_ttl=60.0)
+        second = await client.call_endpoint("missing", cache_ttl=60.0)
+        await client.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert "error" in first and "error" in second
+    assert client.stats["errors"] == 2
+    assert client.get_stats()["cached_responses"] == 0
+
+
+def test_cancelling_first_read_does_not_cancel_coalesced_reads():
+    server = StubServer(latency=0.05)
+    client = _client(server)
+
+    async def run():
+        first = asyncio.create_task(client.call_endpoint("users/7"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(client.call_endpoint("users/7"))
+        await asyncio.sleep(0)
+        first.cancel()
+        result = await second
+        cancelled = False
+        try:
+            await first
+        except asyncio.CancelledError:
+            cancelled = True
+        await client.close()
+        return result, cancelled
+
+    result, cancelled = asyncio.run(run())
+    assert result == {"id": "7"}
+    assert cancelled
+    assert len(server.requests) == 1
+    assert client.stats["coalesced"] == 1
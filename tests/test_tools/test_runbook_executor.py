@@ -0,0 +1,54 @@
+"""
+Pruebas para la caché de runbooks parseados del ejecutor.
+
+Verifican que las ejecuciones repetidas no releen el YAML del disco y que la
+caché se invalida cuando cambia el archivo.
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+from tools.runbooks import RunbookExecutor
+
+RUNBOOK = """
+name: "Prueba"
+steps:
+  - id: "wait"
+    command:
+      name: "wait"
+      args:
+        seconds: 0
+"""
+
+
+def _executor(tmp_path) -> RunbookExecutor:
+    return RunbookExecutor(runbooks_dir=str(tmp_path), telemetry_adapter=MagicMock(),
+                           pagerduty_client=AsyncMock())
+
+
+def test_parsed_runbooks_are_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / "restart.yaml"
+    path.write_text(RUNBOOK)
+    executor = _executor(tmp_path)
+
+    async def run():
+        results = [await executor.execute_runbook("restart") for _ in range(3)]
+        first = await executor.get_runbook("restart")
+
+        path.write_text(RUNBOOK.replace("Prueba", "Prueba v2"))
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second = await executor.get_runbook("restart")
+
+        path.unlink()
+        missing = await executor.get_runbook("restart")
+        return results, first, second, missing
+
+    results, first, second, missing = asyncio.run(run())
+    assert [result["status"] for result in results] == ["completed"] * 3
+    # Tres ejecuciones en el mismo segundo con identificadores distintos
+    assert len({result["execution_id"] for result in results}) == 3
+    assert first["name"] == "Prueba" and second["name"] == "Prueba v2"
+    assert missing is None
+    assert executor.cache_stats == {"hits": 3, "misses": 1, "reloads": 1}
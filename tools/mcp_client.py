@@ -1,24 +1,77 @@
+import asyncio
+import importlib.util
+import json
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import requests
+import httpx
+
+from core.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# HTTP/2 permite multiplexar varias peticiones sobre una misma conexión;
+# solo se activa si el paquete opcional ``h2`` está instalado.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+TOOLS_ENDPOINT = "tools"
+
+
+@dataclass
+class _InflightRequest:
+    """Lectura en curso compartida por las peticiones GET idénticas."""
+
+    task: asyncio.Task
+    waiters: int = 0
+
 
 class MCPClient:
-    """Cliente para interactuar con servidores compatibles con Model Context Protocol (MCP).
+    """Cliente asíncrono para servidores compatibles con Model Context Protocol (MCP).
 
     La URL base y la clave de API se obtienen preferentemente de las variables de entorno
     `MCP_BASE_URL` y `MCP_API_KEY`, lo que evita hard-coding de credenciales.
+
+    Todas las peticiones comparten un pool de conexiones keep-alive creado de forma
+    perezosa en el bucle de eventos activo, que debe cerrarse con ``close()`` al apagar
+    la aplicación. Cada servidor (origen de la URL) tiene su propio límite de peticiones
+    simultáneas, las lecturas idénticas en curso se combinan en una sola petición y el
+    listado de herramientas se cachea durante ``tools_cache_ttl`` segundos.
     """
 
     def __init__(
         self,
         base_url: Optional[str] = None,
         api_key: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_concurrency_per_server: Optional[int] = None,
+        tools_cache_ttl: Optional[float] = None,
+        timeout: Optional[float] = None,
+        keepalive_expiry: float = 30.0,
+        http2: Optional[bool] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ) -> None:
+        """
+        Inicializa el cliente MCP.
+
+        Args:
+            base_url: URL base del servidor (por defecto ``MCP_BASE_URL``)
+            api_key: Clave de API (por defecto ``MCP_API_KEY``)
+            max_connections: Conexiones simultáneas máximas del pool
+                (por defecto ``MCP_MAX_CONNECTIONS``)
+            max_concurrency_per_server: Peticiones simultáneas máximas por servidor
+                (por defecto ``MCP_MAX_CONCURRENCY_PER_SERVER``)
+            tools_cache_ttl: Segundos durante los que se reutiliza el listado de
+                herramientas (por defecto ``MCP_TOOLS_CACHE_TTL``); 0 lo desactiva
+            timeout: Tiempo máximo de una petición (por defecto ``MCP_REQUEST_TIMEOUT``)
+            keepalive_expiry: Segundos que se mantiene abierta una conexión ociosa
+            http2: Usar HTTP/2 cuando el servidor lo negocie (por defecto si ``h2``
+                está instalado)
+            transport: Transporte httpx alternativo (pruebas)
+        """
         self.base_url: str = (base_url or os.getenv("MCP_BASE_URL", "")).rstrip("/")
         self.api_key: Optional[str] = api_key or os.getenv("MCP_API_KEY")
 
@@ -26,43 +79,263 @@ class MCPClient:
         if self.api_key:
             self.headers["Authorization"] = f"Bearer {self.api_key}"
 
+        self.max_connections = max_connections or settings.mcp_max_connections
+        self.max_concurrency_per_server = max_concurrency_per_server or settings.mcp_max_concurrency_per_server
+        self.tools_cache_ttl = tools_cache_ttl if tools_cache_ttl is not None else settings.mcp_tools_cache_ttl
+        self.timeout = timeout or settings.mcp_request_timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = HTTP2_AVAILABLE if http2 is None else (http2 and HTTP2_AVAILABLE)
+        self._transport = transport
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, _InflightRequest] = {}
+        self._cache: Dict[str, Tuple[float, Any]] = {}  # clave -> (expiración, respuesta)
+
+        self.stats = {
+            "requests": 0,
+            "errors": 0,
+            "coalesced": 0,
+            "cache_hits": 0,
+            "limit_waits": 0,
+        }
+
+    # ---------------------------------------------------------------------
+    # Pool de conexiones
+    # ---------------------------------------------------------------------
+    async def get_client(self) -> httpx.AsyncClient:
+        """
+        Obtiene el cliente HTTP compartido, creándolo si es necesario.
+
+        Returns:
+            httpx.AsyncClient: Cliente asociado al bucle de eventos activo
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._client_loop = loop
+            # Los semáforos y las peticiones en curso pertenecen al bucle anterior
+            self._limits = {}
+            self._inflight = {}
+        return self._client
+
+    async def close(self) -> None:
+        """Cierra el pool de conexiones compartido."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+        self._limits = {}
+        self._inflight = {}
+
+    def _get_limit(self, server: str) -> asyncio.Semaphore:
+        """Obtiene el semáforo de peticiones simultáneas de un servidor."""
+        limit = self._limits.get(server)
+        if limit is None:
+            limit = asyncio.Semaphore(self.max_concurrency_per_server)
+            self._limits[server] = limit
+        return limit
+
     # ---------------------------------------------------------------------
     # Métodos genéricos
     # ---------------------------------------------------------------------
-    def call_endpoint(
+    def _build_url(self, endpoint: str) -> str:
+        """Construye la URL completa; acepta URLs absolutas de otros servidores."""
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+        return f"{self.base_url}/{endpoint.lstrip('/')}"
+
+    async def call_endpoint(
         self,
         endpoint: str,
         method: str = "GET",
         data: Optional[Dict[str, Any]] = None,
-        timeout: int = 15,
+        timeout: Optional[float] = None,
+        cache_ttl: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """Realiza una petición HTTP al endpoint indicado y devuelve JSON."""
-        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        """
+        Realiza una petición HTTP al endpoint indicado y devuelve JSON.
+
+        Las peticiones GET idénticas que coinciden en el tiempo se resuelven con
+        una única petición al servidor.
+
+        Args:
+            endpoint: Ruta relativa a la URL base o URL absoluta
+            method: Método HTTP
+            data: Parámetros (GET) o cuerpo JSON (resto de métodos)
+            timeout: Tiempo máximo de la petición (por defecto el del cliente)
+            cache_ttl: Segundos durante los que se reutiliza la respuesta de un GET
+
+        Returns:
+            Dict[str, Any]: Respuesta JSON o ``{"error": ...}`` si la petición falla
+        """
+        method = method.upper()
+        url = self._build_url(endpoint)
+        if method != "GET":
+            return await self._request(method, url, data, timeout)
+
+        key = f"{url}?{json.dumps(data, sort_keys=True, default=str)}" if data else url
+        if cache_ttl:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.stats["cache_hits"] += 1
+                return cached[1]
+
+        # Combinar lecturas idénticas en curso. La petición es una tarea del
+        # cliente: cancelar una lectura no cancela a las que la comparten.
+        await self.get_client()
+        request = self._inflight.get(key)
+        if request is not None:
+            self.stats["coalesced"] += 1
+        else:
+            request = _InflightRequest(asyncio.create_task(self._cached_get(key, url, data, timeout, cache_ttl)))
+            self._inflight[key] = request
+            request.task.add_done_callback(lambda task: self._release(key, request))
+
+        request.waiters += 1
         try:
-            response = requests.request(
-                method.upper(),
-                url,
-                headers=self.headers,
-                params=data if method.upper() == "GET" else None,
-                json=data if method.upper() != "GET" else None,
-                timeout=timeout,
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as exc:
-            logger.error("Error en llamada MCP %s -> %s", url, exc)
-            return {"error": str(exc)}
+            return await asyncio.shield(request.task)
+        except asyncio.CancelledError:
+            # Si nadie más espera la lectura, deja de tener sentido
+            if request.waiters == 1 and not request.task.done():
+                self._release(key, request)
+                request.task.cancel()
+            raise
+        finally:
+            request.waiters -= 1
+
+    async def _cached_get(
+        self,
+        key: str,
+        url: str,
+        data: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+        cache_ttl: Optional[float],
+    ) -> Dict[str, Any]:
+        result = await self._request("GET", url, data, timeout)
+        if cache_ttl and "error" not in result:
+            self._cache[key] = (time.monotonic() + cache_ttl, result)
+        return result
+
+    def _release(self, key: str, request: _InflightRequest) -> None:
+        if self._inflight.get(key) is request:
+            del self._inflight[key]
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        """Envía una petición respetando el límite de concurrencia del servidor."""
+        client = await self.get_client()
+        parts = urlsplit(url)
+        limit = self._get_limit(f"{parts.scheme}://{parts.netloc}")
+        if limit.locked():
+            self.stats["limit_waits"] += 1
+
+        async with limit:
+            self.stats["requests"] += 1
+            try:
+                response = await client.request(
+                    method,
+                    url,
+                    params=data if method == "GET" else None,
+                    json=data if method != "GET" else None,
+                    timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+                )
+                response.raise_for_status()
+                return response.json()
+            except (httpx.HTTPError, ValueError) as exc:
+                self.stats["errors"] += 1
+                logger.error("Error en llamada MCP %s -> %s", url, exc)
+                return {"error": str(exc)}
+
+    async def call_many(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Envía varias peticiones a la vez sobre el pool compartido.
+
+        Las peticiones se solapan hasta el límite de cada servidor; con HTTP/2
+        viajan multiplexadas sobre la misma conexión.
+
+        Args:
+            calls: Argumentos de ``call_endpoint`` para cada petición
+
+        Returns:
+            List[Dict[str, Any]]: Respuestas en el mismo orden que ``calls``
+        """
+        return list(await asyncio.gather(*(self.call_endpoint(**call) for call in calls)))
+
+    def invalidate_cache(self, endpoint: Optional[str] = None) -> None:
+        """
+        Descarta respuestas cacheadas.
+
+        Args:
+            endpoint: Endpoint cuyas respuestas se descartan (todas si es None)
+        """
+        if endpoint is None:
+            self._cache.clear()
+            return
+        url = self._build_url(endpoint)
+        for key in [key for key in self._cache if key == url or key.startswith(f"{url}?")]:
+            del self._cache[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene las estadísticas del cliente.
+
+        Returns:
+            Dict[str, Any]: Contadores, peticiones en curso y configuración del pool
+        """
+        return {
+            **self.stats,
+            "inflight": len(self._inflight),
+            "cached_responses": len(self._cache),
+            "max_connections": self.max_connections,
+            "max_concurrency_per_server": self.max_concurrency_per_server,
+            "http2": self.http2,
+        }
+
+    # ------------------------------------------------------------------
+    # Herramientas MCP
+    # ------------------------------------------------------------------
+    async def list_tools(self, server_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lista las herramientas del servidor; la respuesta se cachea."""
+        endpoint = f"{server_url.rstrip('/')}/{TOOLS_ENDPOINT}" if server_url else TOOLS_ENDPOINT
+        res = await self.call_endpoint(endpoint, cache_ttl=self.tools_cache_ttl)
+        return res.get("tools", []) if isinstance(res, dict) else []
+
+    async def call_tool(
+        self,
+        tool_name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        server_url: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        endpoint = f"{server_url.rstrip('/')}/{TOOLS_ENDPOINT}/call" if server_url else f"{TOOLS_ENDPOINT}/call"
+        return await self.call_endpoint(endpoint, "POST", {"name": tool_name, "arguments": arguments or {}})
 
     # ------------------------------------------------------------------
     # Helpers específicos
     # ------------------------------------------------------------------
-    def get_user_data(self, user_id: str) -> Dict[str, Any]:
-        return self.call_endpoint(f"users/{user_id}")
+    async def get_user_data(self, user_id: str) -> Dict[str, Any]:
+        return await self.call_endpoint(f"users/{user_id}")
 
-    def get_program_data(self, program_id: str) -> Dict[str, Any]:
-        return self.call_endpoint(f"programs/{program_id}")
+    async def get_program_data(self, program_id: str) -> Dict[str, Any]:
+        return await self.call_endpoint(f"programs/{program_id}")
 
-    def log_interaction(
+    async def log_interaction(
         self,
         user_id: str,
         agent_id: str,
@@ -75,12 +348,16 @@ class MCPClient:
             "message": message,
             "response": response,
         }
-        return self.call_endpoint("interactions", "POST", payload)
+        return await self.call_endpoint("interactions", "POST", payload)
 
-    def search_knowledge_base(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    async def search_knowledge_base(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         payload = {"query": query, "limit": limit}
-        res = self.call_endpoint("knowledge/search", "GET", payload)
+        res = await self.call_endpoint("knowledge/search", "GET", payload)
         return res.get("results", []) if isinstance(res, dict) else []
 
-    def update_user_data(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
-        return self.call_endpoint(f"users/{user_id}", "PUT", data)
+    async def update_user_data(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.call_endpoint(f"users/{user_id}", "PUT", data)
+
+
+# Instancia global compartida por el toolkit y los agentes
+mcp_client = MCPClient()
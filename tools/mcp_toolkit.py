@@ -17,7 +17,7 @@ class MCPToolkit:
     
     def __init__(self):
         """Inicializa el toolkit MCP y su cliente por defecto."""
-        from tools.mcp_client import MCPClient
+        from tools.mcp_client import MCPClient, mcp_client
 
         self.available_servers = {
             "databutton": "Integración con Databutton para almacenamiento y visualización",
@@ -28,8 +28,8 @@ class MCPToolkit:
             "think": "Integración con Think para razonamiento avanzado",
         }
 
-        # Cliente MCP reusable
-        self._mcp_client: MCPClient = MCPClient()
+        # Cliente MCP compartido (un único pool de conexiones por proceso)
+        self._mcp_client: MCPClient = mcp_client
 
     # -------------------------------------------------------------
     # Exposición del cliente para los agentes
@@ -464,3 +464,50 @@ async def resolve_incident(incident_id: str) -> Dict[str, Any]:
             "message": f"Excepción al resolver incidente: {str(e)}",
             "error_type": type(e).__name__
         }
+
+
+class PagerDutyClient:
+    """
+    Cliente de eventos de PagerDuty usado por el ejecutor de runbooks.
+    
+    Adapta ``send_alert`` a la firma de la API de eventos v2 (``group`` y
+    ``class`` viajan en los detalles del evento).
+    """
+    
+    async def send_event(
+        self,
+        summary: str,
+        severity: str = "info",
+        source: str = "ngx-agents",
+        component: str = "api",
+        group: Optional[str] = None,
+        class_name: Optional[str] = None,
+        custom_details: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Envía un evento a PagerDuty.
+        
+        Args:
+            summary: Resumen del evento
+            severity: Severidad del evento (critical, error, warning, info)
+            source: Fuente del evento
+            component: Componente que generó el evento
+            group: Grupo lógico del evento
+            class_name: Clase del evento
+            custom_details: Detalles adicionales del evento
+            
+        Returns:
+            Dict[str, Any]: Respuesta de PagerDuty
+        """
+        details = dict(custom_details or {})
+        if group:
+            details["group"] = group
+        if class_name:
+            details["class"] = class_name
+        return await send_alert(
+            summary=summary,
+            severity=severity,
+            source=source,
+            component=component,
+            details=details
+        )
@@ -10,9 +10,10 @@ import os
 import yaml
 import json
 import time
+import uuid
 import asyncio
 import logging
-from typing import Dict, Any, List, Optional, Callable, Union
+from typing import Dict, Any, List, Optional, Callable, Tuple, Union
 from datetime import datetime
 
 from infrastructure.adapters import get_telemetry_adapter
@@ -48,6 +49,10 @@ class RunbookExecutor:
         # Registro de ejecuciones
         self.executions = {}
         
+        # Caché de runbooks parseados: ruta -> (mtime_ns, tamaño, definición)
+        self._runbook_cache: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+        self.cache_stats = {"hits": 0, "misses": 0, "reloads": 0}
+        
         # Registro de comandos disponibles
         self._register_commands()
     
@@ -85,8 +90,7 @@ class RunbookExecutor:
                     
                     try:
                         # Cargar metadatos del runbook
-                        with open(filepath, "r") as f:
-                            runbook = yaml.safe_load(f)
+                        runbook = self._load_runbook_file(filepath)
                             
                         result.append({
                             "id": os.path.splitext(filename)[0],
@@ -107,10 +111,39 @@ class RunbookExecutor:
         finally:
             self.telemetry.end_span(span)
     
+    def _load_runbook_file(self, filepath: str) -> Dict[str, Any]:
+        """
+        Carga un runbook desde disco reutilizando la versión parseada.
+        
+        La entrada de la caché se invalida cuando cambian la fecha de
+        modificación o el tamaño del archivo.
+        
+        Args:
+            filepath: Ruta del archivo YAML.
+            
+        Returns:
+            Dict[str, Any]: Definición del runbook (compartida; no modificar).
+        """
+        stat = os.stat(filepath)
+        cached = self._runbook_cache.get(filepath)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self.cache_stats["hits"] += 1
+            return cached[2]
+        
+        with open(filepath, "r") as f:
+            runbook = yaml.safe_load(f) or {}
+        
+        self.cache_stats["reloads" if cached is not None else "misses"] += 1
+        self._runbook_cache[filepath] = (stat.st_mtime_ns, stat.st_size, runbook)
+        return runbook
+    
     async def get_runbook(self, runbook_id: str) -> Optional[Dict[str, Any]]:
         """
         Obtiene la definición de un runbook.
         
+        Las definiciones parseadas se guardan en caché y solo se releen del
+        disco cuando el archivo cambia.
+        
         Args:
             runbook_id: ID del runbook.
             
@@ -129,13 +162,12 @@ class RunbookExecutor:
             if not os.path.exists(filepath):
                 filepath = os.path.join(self.runbooks_dir, f"{runbook_id}.yml")
                 if not os.path.exists(filepath):
+                    self._runbook_cache.pop(os.path.join(self.runbooks_dir, f"{runbook_id}.yaml"), None)
+                    self._runbook_cache.pop(filepath, None)
                     return None
             
-            # Cargar runbook
-            with open(filepath, "r") as f:
-                runbook = yaml.safe_load(f)
-                
-            return runbook
+            # Cargar runbook (desde la caché si el archivo no ha cambiado)
+            return self._load_runbook_file(filepath)
         except Exception as e:
             self.telemetry.record_exception(span, e)
             logger.error(f"Error al obtener runbook {runbook_id}: {str(e)}")
@@ -158,7 +190,8 @@ class RunbookExecutor:
             "runbook_id": runbook_id
         })
         
-        execution_id = f"{runbook_id}-{int(time.time())}"
+        # Sufijo aleatorio: puede haber varias ejecuciones del mismo runbook por segundo
+        execution_id = f"{runbook_id}-{int(time.time())}-{uuid.uuid4().hex[:8]}"
         
         try:
             # Cargar runbook
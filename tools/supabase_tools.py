@@ -9,6 +9,7 @@ from typing import Any, Dict, List, Optional, Union
 from pydantic import BaseModel, Field
 
 from clients.supabase_client import supabase_client
+from clients.supabase_write_buffer import supabase_write_buffer
 from core.skill import Skill, skill_registry
 
 
@@ -89,12 +90,14 @@ class SupabaseInsertInput(BaseModel):
     table: str = Field(..., description="Nombre de la tabla donde insertar")
     data: Union[Dict[str, Any], List[Dict[str, Any]]] = Field(..., description="Datos a insertar")
     upsert: bool = Field(False, description="Si es True, actualiza registros existentes")
+    write_behind: bool = Field(False, description="Si es True, encola la inserción y se escribe en lote más tarde")
 
 
 class SupabaseInsertOutput(BaseModel):
     """Esquema de salida para la skill de inserción en Supabase."""
     results: List[Dict[str, Any]] = Field(..., description="Registros insertados")
     count: int = Field(..., description="Número de registros insertados")
+    queued: bool = Field(False, description="Si la escritura quedó encolada en el búfer de escritura diferida")
 
 
 class SupabaseInsertSkill(Skill):
@@ -132,6 +135,16 @@ class SupabaseInsertSkill(Skill):
         data = input_data["data"]
         upsert = input_data.get("upsert", False)
         
+        # Encolar en el búfer de escritura diferida si no se necesita la respuesta de la base de datos
+        if input_data.get("write_behind", False):
+            rows = data if isinstance(data, list) else [data]
+            await supabase_write_buffer.insert(table, rows, upsert=upsert)
+            return {
+                "results": rows,
+                "count": len(rows),
+                "queued": True
+            }
+        
         # Ejecutar inserción
         results = await supabase_client.insert(
             table_name=table,
@@ -285,12 +298,14 @@ class SupabaseUpdateInput(BaseModel):
     table: str = Field(..., description="Nombre de la tabla donde actualizar")
     data: Dict[str, Any] = Field(..., description="Datos a actualizar")
     filters: Dict[str, Any] = Field(..., description="Filtros para identificar registros")
+    write_behind: bool = Field(False, description="Si es True, encola la actualización y se escribe en lote más tarde")
 
 
 class SupabaseUpdateOutput(BaseModel):
     """Esquema de salida para la skill de actualización en Supabase."""
     results: List[Dict[str, Any]] = Field(..., description="Registros actualizados")
     count: int = Field(..., description="Número de registros actualizados")
+    queued: bool = Field(False, description="Si la escritura quedó encolada en el búfer de escritura diferida")
 
 
 class SupabaseUpdateSkill(Skill):
@@ -328,6 +343,15 @@ class SupabaseUpdateSkill(Skill):
         data = input_data["data"]
         filters = input_data["filters"]
         
+        # Encolar en el búfer; las actualizaciones pendientes con los mismos filtros se fusionan
+        if input_data.get("write_behind", False):
+            await supabase_write_buffer.update(table, data, filters)
+            return {
+                "results": [],
+                "count": 0,
+                "queued": True
+            }
+        
         # Ejecutar actualización
         results = await supabase_client.update(
             table_name=table,